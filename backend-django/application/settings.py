@@ -311,6 +311,15 @@ JWT_ALGORITHM = "HS256"
 # 修复：缩短 token 过期时间
 JWT_ACCESS_TOKEN_EXPIRE_MINUTES = int(os.environ.get('JWT_ACCESS_TOKEN_EXPIRE_MINUTES', 60 * 24))  # 默认1小时
 JWT_REFRESH_TOKEN_EXPIRE_MINUTES = int(os.environ.get('JWT_REFRESH_TOKEN_EXPIRE_MINUTES', 60 * 24 * 7))  # 默认7天
+# 已验证 token 的进程内缓存容量（条），0 表示不缓存
+JWT_VERIFY_CACHE_SIZE = int(os.environ.get('JWT_VERIFY_CACHE_SIZE', 1024))
+# 登录防暴力破解（滑动窗口计数，单位：秒）
+LOGIN_USER_FAILURE_WINDOW = 60 * 60  # 用户名失败计数窗口
+LOGIN_USER_LOCK_THRESHOLD = 5  # 窗口内密码错误次数达到后锁定账户
+LOGIN_USER_FAILURE_LIMIT = 15  # 窗口内同一用户名失败次数上限
+LOGIN_IP_FAILURE_WINDOW = 5 * 60  # IP失败计数窗口
+LOGIN_IP_FAILURE_LIMIT = 30  # 窗口内同一IP失败次数上限
+LOGIN_IP_LOCKOUT_DURATION = 15 * 60  # IP锁定时长
 
 
 # # ================================================= #
@@ -334,6 +343,9 @@ API_WHITE_LIST = [
 
 API_LOG_ENABLE = True
 ENABLE_LOGIN_ANALYSIS_LOG = True
+# IP 属地离线数据库（python manage.py build_ip_database <csv> 生成）及热点 IP 缓存条数
+IP_LOCATION_DB = BASE_DIR / 'data' / 'ip_location.db'
+IP_LOCATION_CACHE_SIZE = 10000
 API_LOG_METHODS = 'ALL'
 API_MODEL_MAP = {}
 
@@ -428,6 +440,44 @@ CHANNEL_LAYERS = {
     },
 }
 
+# 监控采样器集群模式：多进程部署时通过缓存租约保证每个数据源只有一个进程在采样
+MONITOR_SAMPLER_CLUSTER_MODE = True
+
+# 监控历史时序存储（服务器 / Redis / 数据库采样的趋势数据）
+MONITOR_HISTORY_ENABLED = True
+MONITOR_HISTORY_DIR = os.path.join(BASE_DIR, 'monitor_history')
+# 各分辨率保留时间（秒），未配置的使用默认值：raw 7天、1m 30天、5m 90天、1h 365天
+MONITOR_HISTORY_RETENTION = {}
+# 调度器进程采样监控历史的间隔（秒），1m / 5m / 1h 聚合记录也由该线程汇总
+MONITOR_HISTORY_SAMPLE_INTERVAL = 10
+
+# 定时任务调度进程：等待任务变更事件的最长时间（秒，兼作心跳节奏）和全量对账周期（秒）
+SCHEDULER_POLL_INTERVAL = 5
+SCHEDULER_FULL_SYNC_INTERVAL = 300
+# 调度集群模式：可同时运行多个 start_scheduler.py 进程，任务按一致性哈希分片，节点心跳超过 SCHEDULER_NODE_TTL 秒视为下线
+SCHEDULER_CLUSTER_MODE = False
+SCHEDULER_NODE_TTL = 30
+# 定时任务各执行器的并发数：thread 线程池、process 常驻工作进程、subprocess 独立子进程
+SCHEDULER_EXECUTOR_WORKERS = {'thread': 10, 'process': 2, 'subprocess': 2}
+# 定时任务执行日志保留天数（调度器进程每 SCHEDULER_LOG_PRUNE_INTERVAL 秒分批清理一次），每日统计保留天数
+SCHEDULER_LOG_RETENTION_DAYS = 30
+SCHEDULER_STAT_RETENTION_DAYS = 365
+SCHEDULER_LOG_PRUNE_INTERVAL = 3600
+SCHEDULER_LOG_PRUNE_BATCH_SIZE = 5000
+# 登录日志小时汇总：调度器进程每 LOGIN_STAT_ROLLUP_INTERVAL 秒汇总一次已结束超过 LOGIN_STAT_ROLLUP_DELAY 秒的小时，汇总保留天数
+LOGIN_STAT_ROLLUP_INTERVAL = 300
+LOGIN_STAT_ROLLUP_DELAY = 300
+LOGIN_STAT_ROLLUP_CHUNK_HOURS = 24
+LOGIN_STAT_RETENTION_DAYS = 365
+# 每日集成报告数据平台：BASE_URL 为空时使用模拟数据；超时（秒）、重试次数、采集线程数、单主机并发上限
+INTEGRATION_DATA_PLATFORM = {
+    'BASE_URL': '',
+    'TIMEOUT': 10,
+    'RETRIES': 2,
+    'MAX_WORKERS': 16,
+    'PER_HOST_LIMIT': 8,
+}
+
 DEFAULT_PASSWORD = "123456"
 
 # ================================================= #
@@ -1,7 +1,10 @@
 from typing import List
 from ninja import Router, File, UploadedFile, Form
 from django.shortcuts import get_object_or_404
-from apps.code_scan.models import ScanProject, ScanTask, ScanResult, ShieldApplication
+from django.db.models import Q
+from apps.code_scan.models import (
+    ScanProject, ScanTask, ScanResult, ScanResultOccurrence, ScanLatestTask, ShieldApplication,
+)
 from apps.code_scan.schemas import (
     ScanProjectSchema, ScanProjectCreateSchema,
     ScanTaskSchema, ScanResultSchema,
@@ -23,7 +26,6 @@ router = Router()
 def list_projects(request, keyword: str = None, page: int = 1, pageSize: int = 20):
     qs = ScanProject.objects.filter(is_deleted=False).select_related('caretaker')
     if keyword:
-        from django.db.models import Q
         qs = qs.filter(Q(name__icontains=keyword) | Q(repo_url__icontains=keyword))
     
     total = qs.count()
@@ -42,22 +44,21 @@ def list_project_overview(request, page: int = 1, pageSize: int = 20):
     projects = list(projects_qs[start:end])
     project_ids = [p["id"] for p in projects]
 
-    tasks = (
-        ScanTask.objects.filter(project_id__in=project_ids, is_deleted=False, status="success")
-        .order_by("-sys_create_datetime")
-        .values("id", "project_id", "tool_name", "sys_create_datetime")
+    # 最新任务指针：每个 项目 + 工具 一行，解析完成时维护
+    pointers = (
+        ScanLatestTask.objects.filter(project_id__in=project_ids, task__is_deleted=False)
+        .order_by("-task__sys_create_datetime")
+        .values("project_id", "tool_name", "task_id", "task__sys_create_datetime")
     )
 
     latest_task_by_proj_tool: dict[tuple[str, str], dict] = {}
     latest_time_by_project: dict[str, str] = {}
-    for t in tasks:
-        key = (t["project_id"], t["tool_name"])
-        if key not in latest_task_by_proj_tool:
-            latest_task_by_proj_tool[key] = t
+    for t in pointers:
+        latest_task_by_proj_tool[(t["project_id"], t["tool_name"])] = {"id": t["task_id"]}
         if t["project_id"] not in latest_time_by_project:
             latest_time_by_project[t["project_id"]] = (
-                t["sys_create_datetime"].isoformat(sep=" ", timespec="seconds")
-                if t.get("sys_create_datetime")
+                t["task__sys_create_datetime"].isoformat(sep=" ", timespec="seconds")
+                if t.get("task__sys_create_datetime")
                 else None
             )
 
@@ -149,7 +150,26 @@ def list_tasks(request, project_id: str, page: int = 1, pageSize: int = 20):
 
 @router.get("/results", response=List[ScanResultSchema], auth=BearerAuth(), summary="获取任务结果列表")
 def list_results(request, task_id: str):
-    return ScanResult.objects.filter(task_id=task_id, is_deleted=False)
+    # 缺陷按指纹只保存一行，某次任务的结果由该任务的出现记录关联得到，行号、严重程度、屏蔽状态取该次扫描时的值
+    task = get_object_or_404(ScanTask, id=task_id)
+    occurrences = (
+        ScanResultOccurrence.objects.filter(task=task, result__is_deleted=False)
+        .select_related("result")
+        .order_by("-severity", "result__file_path")
+    )
+    results = []
+    for occurrence in occurrences:
+        result = occurrence.result
+        result.task_id = occurrence.task_id
+        result.lifecycle_status = occurrence.lifecycle_status
+        result.occurrences = occurrence.occurrences
+        result.line_number = occurrence.line_number
+        result.severity = occurrence.severity
+        result.shield_status = occurrence.shield_status
+        results.append(result)
+    # 升级前按任务保存的历史副本
+    results.extend(ScanResult.objects.filter(task=task, lifecycle_status__isnull=True, is_deleted=False))
+    return results
 
 @router.get("/results/{result_id}/shield-records", response=List[ShieldRecordSchema], auth=BearerAuth(), summary="获取屏蔽记录")
 def list_result_shield_records(request, result_id: str):
@@ -186,26 +206,11 @@ def list_result_shield_records(request, result_id: str):
 
 @router.get("/projects/{project_id}/latest-results", response=PaginatedScanResultSchema, auth=BearerAuth(), summary="获取最新扫描结果")
 def list_latest_results(request, project_id: str, tool_name: str = None, page: int = 1, pageSize: int = 20):
-    tasks_qs = ScanTask.objects.filter(project_id=project_id, is_deleted=False, status="success")
-    
+    pointers = ScanLatestTask.objects.filter(project_id=project_id, task__is_deleted=False)
     if tool_name:
-        # If tool_name is specified, get latest task for that tool
-        # Actually, we want latest task per tool, but filter by tool_name if provided
-        tasks_qs = tasks_qs.filter(tool_name=tool_name)
-
-    tasks = (
-        tasks_qs
-        .order_by("-sys_create_datetime")
-        .values("id", "tool_name", "sys_create_datetime")
-    )
-
-    latest_task_by_tool: dict[str, str] = {}
-    for t in tasks:
-        tool = t["tool_name"]
-        if tool not in latest_task_by_tool:
-            latest_task_by_tool[tool] = str(t["id"])
+        pointers = pointers.filter(tool_name=tool_name)
 
-    task_ids = list(latest_task_by_tool.values())
+    task_ids = [str(task_id) for task_id in pointers.values_list("task_id", flat=True)]
     if not task_ids:
         return {"items": [], "total": 0}
 
@@ -0,0 +1,116 @@
+# Generated by Django 5.2.7 on 2026-10-19 11:20
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+# 重复结果中保留作为当前缺陷的优先级
+SHIELD_PRIORITY = {'Shielded': 2, 'Pending': 1}
+
+
+def backfill_lifecycle(apps, schema_editor):
+    """
+    已有结果补齐项目/工具/首次发现任务，并建立最新任务指针。
+    每个 项目 + 工具 最新成功任务中的结果作为当前缺陷（遗留），更早任务中的历史副本保持不变。
+    最新任务中相同指纹的多条结果只保留一条作为当前缺陷（优先保留已屏蔽/申请中的），记录出现次数，其余仍为历史副本。
+    """
+    ScanTask = apps.get_model('code_scan', 'ScanTask')
+    ScanResult = apps.get_model('code_scan', 'ScanResult')
+    ScanLatestTask = apps.get_model('code_scan', 'ScanLatestTask')
+
+    for task in ScanTask.objects.all().only('id', 'project_id', 'tool_name').iterator():
+        ScanResult.objects.filter(task_id=task.id).update(
+            project_id=task.project_id,
+            tool_name=task.tool_name,
+            first_seen_task_id=task.id,
+        )
+
+    latest = {}
+    for task in ScanTask.objects.filter(is_deleted=False, status='success').order_by('-sys_create_datetime').iterator():
+        latest.setdefault((task.project_id, task.tool_name), task.id)
+    for (project_id, tool_name), task_id in latest.items():
+        ScanLatestTask.objects.create(project_id=project_id, tool_name=tool_name, task_id=task_id)
+        kept = {}
+        for result in ScanResult.objects.filter(task_id=task_id, is_deleted=False).only(
+            'id', 'fingerprint', 'shield_status',
+        ).iterator():
+            entry = kept.get(result.fingerprint)
+            if entry is None:
+                kept[result.fingerprint] = [result, 1]
+                continue
+            entry[1] += 1
+            if SHIELD_PRIORITY.get(result.shield_status, 0) > SHIELD_PRIORITY.get(entry[0].shield_status, 0):
+                entry[0] = result
+        for result, occurrences in kept.values():
+            ScanResult.objects.filter(id=result.id).update(lifecycle_status='persisting', occurrences=occurrences)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('code_scan', '0002_scanproject_caretaker'),
+        ('core', '0006_alter_user_manager'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scanresult',
+            name='project',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='defects', to='code_scan.scanproject', verbose_name='项目'),
+        ),
+        migrations.AddField(
+            model_name='scanresult',
+            name='tool_name',
+            field=models.CharField(blank=True, default='', max_length=50, verbose_name='扫描工具'),
+        ),
+        migrations.AddField(
+            model_name='scanresult',
+            name='first_seen_task',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='code_scan.scantask', verbose_name='首次发现任务'),
+        ),
+        migrations.AddField(
+            model_name='scanresult',
+            name='fixed_task',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='code_scan.scantask', verbose_name='修复任务'),
+        ),
+        migrations.AddField(
+            model_name='scanresult',
+            name='lifecycle_status',
+            field=models.CharField(blank=True, choices=[('new', '新增'), ('persisting', '遗留'), ('fixed', '已修复')], max_length=20, null=True, verbose_name='生命周期状态'),
+        ),
+        migrations.AddField(
+            model_name='scanresult',
+            name='occurrences',
+            field=models.IntegerField(default=1, verbose_name='出现次数'),
+        ),
+        migrations.AddIndex(
+            model_name='scanresult',
+            index=models.Index(fields=['project', 'tool_name', 'lifecycle_status'], name='scan_result_project_b6f1c2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='scanresult',
+            index=models.Index(fields=['task', 'shield_status'], name='scan_result_task_id_3e8a4d_idx'),
+        ),
+        migrations.CreateModel(
+            name='ScanLatestTask',
+            fields=[
+                ('id', models.CharField(default=uuid.uuid4, editable=False, help_text='主键ID', max_length=36, primary_key=True, serialize=False)),
+                ('sys_create_datetime', models.DateTimeField(auto_now_add=True, db_index=True, help_text='创建时间')),
+                ('sys_update_datetime', models.DateTimeField(auto_now=True, db_index=True, help_text='更新时间')),
+                ('is_deleted', models.BooleanField(db_index=True, default=False, help_text='是否删除（软删除标识）')),
+                ('sort', models.IntegerField(db_index=True, default=0, help_text='排序（数字越大越靠前）')),
+                ('tool_name', models.CharField(max_length=50, verbose_name='扫描工具')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='latest_tasks', to='code_scan.scanproject', verbose_name='项目')),
+                ('sys_creator', models.ForeignKey(blank=True, db_constraint=False, help_text='创建人', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='%(app_label)s_%(class)s_created', to='core.user')),
+                ('sys_modifier', models.ForeignKey(blank=True, db_constraint=False, help_text='修改人', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='%(app_label)s_%(class)s_modified', to='core.user')),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='code_scan.scantask', verbose_name='最新任务')),
+            ],
+            options={
+                'verbose_name': '最新扫描任务',
+                'verbose_name_plural': '最新扫描任务',
+                'db_table': 'scan_latest_task',
+                'unique_together': {('project', 'tool_name')},
+            },
+        ),
+        migrations.RunPython(backfill_lifecycle, migrations.RunPython.noop),
+    ]
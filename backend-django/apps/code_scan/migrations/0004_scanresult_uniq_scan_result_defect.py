@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('code_scan', '0003_scan_defect_lifecycle'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='scanresult',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_deleted', False), ('lifecycle_status__isnull', False)), fields=('project', 'tool_name', 'fingerprint'), name='uniq_scan_result_defect'),
+        ),
+    ]
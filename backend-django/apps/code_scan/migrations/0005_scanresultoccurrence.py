@@ -0,0 +1,92 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:10
+
+import bisect
+import uuid
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_occurrences(apps, schema_editor):
+    """
+    由已有缺陷行补齐出现记录。
+    升级前没有逐任务的记录，按缺陷行的首次发现任务和最近一次发现任务之间的成功任务补齐，
+    行号、严重程度、屏蔽状态只能取缺陷行的当前值；之后入库的任务按实际结果写入。
+    """
+    ScanTask = apps.get_model('code_scan', 'ScanTask')
+    ScanResult = apps.get_model('code_scan', 'ScanResult')
+    ScanResultOccurrence = apps.get_model('code_scan', 'ScanResultOccurrence')
+
+    # (项目, 工具) -> ([创建时间], [任务ID])，按创建时间排序
+    tasks_by_group = defaultdict(lambda: ([], []))
+    task_time = {}
+    for task in ScanTask.objects.filter(is_deleted=False, status='success').order_by('sys_create_datetime').only(
+        'id', 'project_id', 'tool_name', 'sys_create_datetime',
+    ).iterator():
+        times, task_ids = tasks_by_group[(task.project_id, task.tool_name)]
+        times.append(task.sys_create_datetime)
+        task_ids.append(task.id)
+        task_time[task.id] = task.sys_create_datetime
+
+    batch = []
+    for result in ScanResult.objects.filter(lifecycle_status__isnull=False, is_deleted=False).only(
+        'id', 'project_id', 'tool_name', 'task_id', 'first_seen_task_id', 'occurrences',
+        'line_number', 'severity', 'shield_status',
+    ).iterator():
+        last_seen = task_time.get(result.task_id)
+        if last_seen is None:
+            continue
+        first_seen = task_time.get(result.first_seen_task_id, last_seen)
+        times, task_ids = tasks_by_group[(result.project_id, result.tool_name)]
+        for task_id in task_ids[bisect.bisect_left(times, first_seen):bisect.bisect_right(times, last_seen)]:
+            batch.append(ScanResultOccurrence(
+                task_id=task_id,
+                result_id=result.id,
+                lifecycle_status='new' if task_id == result.first_seen_task_id else 'persisting',
+                occurrences=result.occurrences,
+                line_number=result.line_number,
+                severity=result.severity,
+                shield_status=result.shield_status,
+            ))
+        if len(batch) >= 1000:
+            ScanResultOccurrence.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    ScanResultOccurrence.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('code_scan', '0004_scanresult_uniq_scan_result_defect'),
+        ('core', '0006_alter_user_manager'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScanResultOccurrence',
+            fields=[
+                ('id', models.CharField(default=uuid.uuid4, editable=False, help_text='主键ID', max_length=36, primary_key=True, serialize=False)),
+                ('sys_create_datetime', models.DateTimeField(auto_now_add=True, db_index=True, help_text='创建时间')),
+                ('sys_update_datetime', models.DateTimeField(auto_now=True, db_index=True, help_text='更新时间')),
+                ('is_deleted', models.BooleanField(db_index=True, default=False, help_text='是否删除（软删除标识）')),
+                ('sort', models.IntegerField(db_index=True, default=0, help_text='排序（数字越大越靠前）')),
+                ('lifecycle_status', models.CharField(choices=[('new', '新增'), ('persisting', '遗留'), ('fixed', '已修复')], max_length=20, verbose_name='生命周期状态')),
+                ('occurrences', models.IntegerField(default=1, verbose_name='出现次数')),
+                ('line_number', models.IntegerField(verbose_name='行号')),
+                ('severity', models.CharField(choices=[('High', '高'), ('Medium', '中'), ('Low', '低')], max_length=20, verbose_name='严重程度')),
+                ('shield_status', models.CharField(choices=[('Normal', '正常'), ('Pending', '屏蔽申请中'), ('Shielded', '已屏蔽'), ('Rejected', '已驳回')], default='Normal', max_length=20, verbose_name='屏蔽状态')),
+                ('result', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='task_occurrences', to='code_scan.scanresult', verbose_name='缺陷')),
+                ('sys_creator', models.ForeignKey(blank=True, db_constraint=False, help_text='创建人', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='%(app_label)s_%(class)s_created', to='core.user')),
+                ('sys_modifier', models.ForeignKey(blank=True, db_constraint=False, help_text='修改人', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='%(app_label)s_%(class)s_modified', to='core.user')),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='result_occurrences', to='code_scan.scantask', verbose_name='任务')),
+            ],
+            options={
+                'verbose_name': '缺陷出现记录',
+                'verbose_name_plural': '缺陷出现记录',
+                'db_table': 'scan_result_occurrence',
+                'unique_together': {('task', 'result')},
+            },
+        ),
+        migrations.RunPython(backfill_occurrences, migrations.RunPython.noop),
+    ]
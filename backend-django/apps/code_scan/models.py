@@ -57,7 +57,19 @@ class ScanResult(RootModel):
         ('Shielded', '已屏蔽'),
         ('Rejected', '已驳回'),
     )
+    LIFECYCLE_STATUS_CHOICES = (
+        ('new', '新增'),
+        ('persisting', '遗留'),
+        ('fixed', '已修复'),
+    )
+    # 每个缺陷（项目 + 工具 + 指纹）只保存一行，task 指向最近一次发现该缺陷的任务
     task = models.ForeignKey(ScanTask, on_delete=models.CASCADE, related_name='results', verbose_name="任务")
+    project = models.ForeignKey(ScanProject, on_delete=models.CASCADE, null=True, blank=True, related_name='defects', verbose_name="项目")
+    tool_name = models.CharField(max_length=50, blank=True, default='', verbose_name="扫描工具")
+    first_seen_task = models.ForeignKey(ScanTask, on_delete=models.SET_NULL, null=True, blank=True, related_name='+', verbose_name="首次发现任务")
+    fixed_task = models.ForeignKey(ScanTask, on_delete=models.SET_NULL, null=True, blank=True, related_name='+', verbose_name="修复任务")
+    lifecycle_status = models.CharField(max_length=20, choices=LIFECYCLE_STATUS_CHOICES, null=True, blank=True, verbose_name="生命周期状态")
+    occurrences = models.IntegerField(default=1, verbose_name="出现次数")
     
     file_path = models.CharField(max_length=500, verbose_name="文件路径")
     line_number = models.IntegerField(verbose_name="行号")
@@ -77,6 +89,49 @@ class ScanResult(RootModel):
         verbose_name = '扫描结果'
         verbose_name_plural = verbose_name
         ordering = ['-severity', 'file_path']
+        indexes = [
+            models.Index(fields=['project', 'tool_name', 'lifecycle_status'], name='scan_result_project_b6f1c2_idx'),
+            models.Index(fields=['task', 'shield_status'], name='scan_result_task_id_3e8a4d_idx'),
+        ]
+        constraints = [
+            # 旧版按任务保存的历史副本没有生命周期状态，不受约束
+            models.UniqueConstraint(
+                fields=['project', 'tool_name', 'fingerprint'],
+                condition=models.Q(lifecycle_status__isnull=False, is_deleted=False),
+                name='uniq_scan_result_defect',
+            ),
+        ]
+
+
+class ScanLatestTask(RootModel):
+    """每个项目每个工具最近一次成功的扫描任务，解析完成时维护"""
+    project = models.ForeignKey(ScanProject, on_delete=models.CASCADE, related_name='latest_tasks', verbose_name="项目")
+    tool_name = models.CharField(max_length=50, verbose_name="扫描工具")
+    task = models.ForeignKey(ScanTask, on_delete=models.CASCADE, related_name='+', verbose_name="最新任务")
+
+    class Meta:
+        db_table = 'scan_latest_task'
+        verbose_name = '最新扫描任务'
+        verbose_name_plural = verbose_name
+        unique_together = ('project', 'tool_name')
+
+
+class ScanResultOccurrence(RootModel):
+    """缺陷在某次任务中出现的记录，保存该次扫描时的行号、严重程度和屏蔽状态，用于查看历史任务的结果"""
+    task = models.ForeignKey(ScanTask, on_delete=models.CASCADE, related_name='result_occurrences', verbose_name="任务")
+    result = models.ForeignKey(ScanResult, on_delete=models.CASCADE, related_name='task_occurrences', verbose_name="缺陷")
+    lifecycle_status = models.CharField(max_length=20, choices=ScanResult.LIFECYCLE_STATUS_CHOICES, verbose_name="生命周期状态")
+    occurrences = models.IntegerField(default=1, verbose_name="出现次数")
+    line_number = models.IntegerField(verbose_name="行号")
+    severity = models.CharField(max_length=20, choices=ScanResult.SEVERITY_CHOICES, verbose_name="严重程度")
+    shield_status = models.CharField(max_length=20, choices=ScanResult.SHIELD_STATUS_CHOICES, default='Normal', verbose_name="屏蔽状态")
+
+    class Meta:
+        db_table = 'scan_result_occurrence'
+        verbose_name = '缺陷出现记录'
+        verbose_name_plural = verbose_name
+        unique_together = ('task', 'result')
+
 
 class ShieldApplication(RootModel):
     STATUS_CHOICES = (
@@ -5,9 +5,12 @@ from datetime import datetime
 from django.shortcuts import get_object_or_404
 from django.conf import settings
 from django.db import transaction
+from django.db.models import Q
 from django.core.files.storage import default_storage
 from django.core.files.base import ContentFile
-from apps.code_scan.models import ScanProject, ScanTask, ScanResult, ShieldApplication
+from apps.code_scan.models import (
+    ScanProject, ScanTask, ScanResult, ScanResultOccurrence, ScanLatestTask, ShieldApplication,
+)
 from apps.code_scan.parsers.factory import ParserFactory
 from core.user.user_model import User
 
@@ -137,53 +140,155 @@ class ScanService:
         try:
             parser = ParserFactory.get_parser(task.tool_name)
             defects = parser.parse(task.report_file)
-            
+
             with transaction.atomic():
-                # 如果是重跑任务，清除旧结果
-                ScanResult.objects.filter(task=task).delete()
-                
-                results_to_create = []
-                for item in defects:
-                    # 生成指纹: 文件路径 + 缺陷类型 + 描述 (不包含行号，以支持代码移动)
-                    # 如果需要区分同一文件中的相同错误，建议工具提供更稳定的 context hash
-                    fingerprint_str = f"{item['file_path']}:{item['defect_type']}:{item['description']}"
-                    fingerprint = hashlib.md5(fingerprint_str.encode()).hexdigest()
-                    
-                    # 自动匹配屏蔽规则 (同项目 + 同指纹 + 已屏蔽状态)
-                    is_shielded = ScanResult.objects.filter(
-                        task__project=task.project,
-                        fingerprint=fingerprint,
-                        shield_status='Shielded'
-                    ).exists()
-                    
-                    status = 'Shielded' if is_shielded else 'Normal'
-                    
-                    results_to_create.append(ScanResult(
-                        task=task,
-                        file_path=item['file_path'],
-                        line_number=item['line_number'],
-                        defect_type=item['defect_type'],
-                        severity=item['severity'],
-                        description=item['description'],
-                        fingerprint=fingerprint,
-                        shield_status=status,
-                        help_info=item.get('help_info'),
-                        code_snippet=item.get('code_snippet')
-                    ))
-                
-                ScanResult.objects.bulk_create(results_to_create)
-                
-            task.status = 'success'
-            task.processed_time = datetime.now()
-            task.log = f"成功解析 {len(defects)} 个缺陷。"
-            task.save()
-            
+                summary = ScanService.ingest_defects(task, defects)
+                task.status = 'success'
+                task.processed_time = datetime.now()
+                task.log = (
+                    f"成功解析 {len(defects)} 个缺陷（去重后 {summary['total']} 个）："
+                    f"新增 {summary['new']}，遗留 {summary['persisting']}，修复 {summary['fixed']}。"
+                )
+                task.save()
+                ScanService.update_latest_task(task)
+
         except Exception as e:
             task.status = 'failed'
             task.log = f"处理失败: {str(e)}"
             task.save()
             logger.exception(f"处理任务 {task_id} 失败")
 
+    @staticmethod
+    def make_fingerprint(item: dict) -> str:
+        # 生成指纹: 文件路径 + 缺陷类型 + 描述 (不包含行号，以支持代码移动)
+        # 如果需要区分同一文件中的相同错误，建议工具提供更稳定的 context hash
+        fingerprint_str = f"{item['file_path']}:{item['defect_type']}:{item['description']}"
+        return hashlib.md5(fingerprint_str.encode()).hexdigest()
+
+    @staticmethod
+    def ingest_defects(task: ScanTask, defects: list) -> dict:
+        """
+        按指纹合并入库，与该项目该工具的上一次扫描对比计算缺陷生命周期
+        - 每个缺陷（项目 + 工具 + 指纹）只保存一行，task 指向最近一次发现的任务
+        - 上次存在、本次存在：遗留；本次首次出现或修复后再次出现：新增；上次存在、本次不存在：已修复
+        - 屏蔽状态保存在缺陷行上，后续扫描自动沿用
+        - 每个本次出现的缺陷写入一条出现记录（保存本次的行号、严重程度、屏蔽状态），历史任务的结果由出现记录查询
+        - 需在事务中调用，锁定 项目 + 工具 的最新任务指针行
+        """
+        # 同一报告内相同指纹只保留一条，记录出现次数
+        incoming: dict = {}
+        for item in defects:
+            fingerprint = ScanService.make_fingerprint(item)
+            if fingerprint in incoming:
+                incoming[fingerprint][1] += 1
+            else:
+                incoming[fingerprint] = [item, 1]
+
+        # 先确保指针行存在再加行锁，同一 项目 + 工具 的并发入库（包括首次扫描）依次执行
+        pointer, _ = ScanLatestTask.objects.get_or_create(
+            project_id=task.project_id, tool_name=task.tool_name, defaults={'task': task},
+        )
+        pointer = ScanLatestTask.objects.select_for_update().get(pk=pointer.pk)
+        current_filter = Q(lifecycle_status='fixed')
+        if pointer.task_id != task.id:
+            current_filter |= Q(task_id=pointer.task_id)
+        # 重跑任务时本任务已写入的结果同样参与合并
+        current_filter |= Q(task_id=task.id)
+        existing = {
+            r.fingerprint: r
+            for r in ScanResult.objects.filter(
+                current_filter, project_id=task.project_id, tool_name=task.tool_name, is_deleted=False
+            ).exclude(lifecycle_status__isnull=True)
+        }
+        shielded = set(
+            ScanResult.objects.filter(project_id=task.project_id, shield_status='Shielded', is_deleted=False)
+            .values_list('fingerprint', flat=True)
+        )
+
+        to_create, to_update = [], []
+        summary = {'new': 0, 'persisting': 0, 'fixed': 0}
+        for fingerprint, (item, occurrences) in incoming.items():
+            row = existing.pop(fingerprint, None)
+            if row is None:
+                row = ScanResult(
+                    task=task,
+                    project_id=task.project_id,
+                    tool_name=task.tool_name,
+                    first_seen_task=task,
+                    fingerprint=fingerprint,
+                    lifecycle_status='new',
+                    # 自动匹配屏蔽规则 (同项目 + 同指纹 + 已屏蔽状态)
+                    shield_status='Shielded' if fingerprint in shielded else 'Normal',
+                )
+                to_create.append(row)
+            else:
+                if row.lifecycle_status == 'fixed':
+                    # 修复后再次出现按新增处理，首次发现任务从本次重新计算
+                    row.lifecycle_status = 'new'
+                    row.first_seen_task = task
+                    row.fixed_task = None
+                elif row.task_id != task.id or row.lifecycle_status != 'new':
+                    row.lifecycle_status = 'persisting'
+                row.task = task
+                to_update.append(row)
+            summary[row.lifecycle_status] += 1
+            row.file_path = item['file_path']
+            row.line_number = item['line_number']
+            row.defect_type = item['defect_type']
+            row.severity = item['severity']
+            row.description = item['description']
+            row.help_info = item.get('help_info')
+            row.code_snippet = item.get('code_snippet')
+            row.occurrences = occurrences
+
+        # 上次扫描存在、本次未出现的缺陷标记为已修复
+        for row in existing.values():
+            if row.lifecycle_status != 'fixed':
+                row.lifecycle_status = 'fixed'
+                row.fixed_task = task
+                to_update.append(row)
+                summary['fixed'] += 1
+
+        ScanResult.objects.bulk_create(to_create, batch_size=1000)
+        ScanResult.objects.bulk_update(
+            to_update,
+            [
+                'task', 'first_seen_task', 'lifecycle_status', 'fixed_task', 'file_path', 'line_number',
+                'defect_type', 'severity', 'description', 'help_info', 'code_snippet', 'occurrences',
+            ],
+            batch_size=1000,
+        )
+
+        # 重跑任务时先清除本任务上次写入的出现记录
+        ScanResultOccurrence.objects.filter(task=task).delete()
+        ScanResultOccurrence.objects.bulk_create(
+            [
+                ScanResultOccurrence(
+                    task=task,
+                    result=row,
+                    lifecycle_status=row.lifecycle_status,
+                    occurrences=row.occurrences,
+                    line_number=row.line_number,
+                    severity=row.severity,
+                    shield_status=row.shield_status,
+                )
+                for row in to_create + to_update
+                if row.task_id == task.id and row.lifecycle_status != 'fixed'
+            ],
+            batch_size=1000,
+        )
+        summary['total'] = len(incoming)
+        return summary
+
+    @staticmethod
+    def update_latest_task(task: ScanTask):
+        """维护 项目 + 工具 的最新任务指针"""
+        ScanLatestTask.objects.update_or_create(
+            project_id=task.project_id,
+            tool_name=task.tool_name,
+            defaults={'task': task},
+        )
+
     @staticmethod
     def apply_shield(user, result_ids, approver_id, reason):
         """申请屏蔽缺陷"""
@@ -195,6 +300,7 @@ class ScanService:
                 if result.shield_status == 'Normal':
                     result.shield_status = 'Pending'
                     result.save()
+                    ScanService.sync_occurrence_shield(result)
                     
                     ShieldApplication.objects.create(
                         result=result,
@@ -220,3 +326,11 @@ class ScanService:
             else:
                 result.shield_status = 'Rejected'
             result.save()
+            ScanService.sync_occurrence_shield(result)
+
+    @staticmethod
+    def sync_occurrence_shield(result: ScanResult):
+        """屏蔽状态变更同步到缺陷最近一次出现的记录，更早任务的记录保持当时的状态"""
+        ScanResultOccurrence.objects.filter(result=result, task_id=result.task_id).update(
+            shield_status=result.shield_status
+        )
@@ -2,6 +2,7 @@ from django.db import transaction
 from django.db.models import Prefetch
 from django.shortcuts import get_object_or_404
 from common import fu_crud
+from common.utils.list_to_tree import build_tree
 from .models import OrganizationNode, PositionStaff
 from .schemas import OrgNodeCreate, OrgNodeUpdate, PositionStaffCreate
 
@@ -98,28 +99,8 @@ def get_tree_data():
         'linked_project__milestone',
     ).order_by('-sort_order', 'sys_create_datetime')
     
-    # Build tree in memory
-    node_map = {n.id: n for n in nodes}
-    roots = []
-    
-    # Initialize child_list for all nodes
-    for node in nodes:
-        node.child_list = []
-        
-    # Build parent-child relationships
-    for node in nodes:
-        if node.parent_id:
-            parent = node_map.get(node.parent_id)
-            if parent:
-                parent.child_list.append(node)
-            else:
-                # Orphan node, treat as root
-                roots.append(node)
-        else:
-            # Root node
-            roots.append(node)
-            
-    return roots
+    # Build tree in memory (orphan nodes are treated as roots)
+    return build_tree(nodes, children_key='child_list', keep_empty_children=True)
 
 def get_valid_parent_tree(node_id: str = None):
     """获取可用父节点树（排除当前节点及其子树）"""
@@ -132,48 +113,5 @@ def get_valid_parent_tree(node_id: str = None):
         'linked_project__milestone',
     ).order_by('-sort_order', 'sys_create_datetime')
     
-    # 1. Build full tree in memory
-    node_map = {str(n.id): n for n in nodes}
-    roots = []
-    
-    for node in nodes:
-        node.child_list = []
-        
-    for node in nodes:
-        if node.parent_id:
-            parent = node_map.get(str(node.parent_id))
-            if parent:
-                parent.child_list.append(node)
-            else:
-                roots.append(node)
-        else:
-            roots.append(node)
-            
-    # 2. If no node_id, return full tree
-    if not node_id:
-        return roots
-
-    # 3. Identify forbidden nodes (target node and its descendants)
-    forbidden_ids = set()
-    if node_id in node_map:
-        target = node_map[node_id]
-        # BFS to find all descendants
-        stack = [target]
-        while stack:
-            curr = stack.pop()
-            forbidden_ids.add(str(curr.id))
-            stack.extend(curr.child_list)
-            
-    # 4. Filter the tree
-    # Helper to filter children recursively
-    def filter_children(node_list):
-        result = []
-        for node in node_list:
-            if str(node.id) in forbidden_ids:
-                continue
-            # Recursively filter children
-            node.child_list = filter_children(node.child_list)
-            result.append(node)
-        return result
-
-    return filter_children(roots)
+    # 排除当前节点及其子树（节点不能挂到自己或子孙节点下）
+    return build_tree(nodes, children_key='child_list', keep_empty_children=True, exclude_id=node_id or None)
@@ -1,11 +1,18 @@
+import logging
 from datetime import date
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 
-from django.core.mail import EmailMultiAlternatives
+from django.core.mail import EmailMultiAlternatives, get_connection
 from django.template.defaultfilters import escape
 
 from .integration_schema import MetricCell
 
+logger = logging.getLogger(__name__)
+
+CODE_KEYS = ["codecheck_error_num", "bin_scope_error_num", "build_check_error_num", "compile_error_num"]
+DT_KEYS = ["dt_pass_rate", "dt_pass_num", "dt_line_coverage", "dt_method_coverage"]
+EMPTY_ROW = '<tr><td class="muted">暂无数据</td></tr>'
+
 
 def _cell_html(cell: MetricCell) -> str:
     value = "-"
@@ -28,7 +35,29 @@ def _cell_html(cell: MetricCell) -> str:
     return f'<span style="{color}">{value}</span>'
 
 
+def render_project_rows(project: Dict) -> Tuple[str, str]:
+    """渲染单个项目在两张表中的行，同一项目只需渲染一次，可被多封邮件复用"""
+    cells = {c.key: c for c in project["code_metrics"] + project["dt_metrics"]}
+    name_td = f"<td><b>{escape(project['project_name'])}</b><div class='muted'>{escape(project.get('project_domain') or '')}</div></td>"
+
+    def project_row(keys: List[str]) -> str:
+        return "".join([f"<td>{_cell_html(cells.get(k) or MetricCell(key=k, name=k))}</td>" for k in keys])
+
+    return f"<tr>{name_td}{project_row(CODE_KEYS)}</tr>", f"<tr>{name_td}{project_row(DT_KEYS)}</tr>"
+
+
 def build_daily_email_html(record_date: date, projects: List[Dict]) -> str:
+    code_rows = []
+    dt_rows = []
+    for p in projects:
+        code_row, dt_row = render_project_rows(p)
+        code_rows.append(code_row)
+        dt_rows.append(dt_row)
+    return compose_daily_email_html(record_date, code_rows, dt_rows)
+
+
+def compose_daily_email_html(record_date: date, code_rows: List[str], dt_rows: List[str]) -> str:
+    """由已渲染的项目行拼装整封邮件"""
     style = """
     <style>
       body{font-family:-apple-system,BlinkMacSystemFont,Segoe UI,Roboto,Helvetica,Arial;line-height:1.5;color:#111827;}
@@ -46,13 +75,6 @@ def build_daily_email_html(record_date: date, projects: List[Dict]) -> str:
     </style>
     """
 
-    def project_row(cells: Dict[str, MetricCell], keys: List[str]) -> str:
-        tds = "".join([f"<td>{_cell_html(cells.get(k) or MetricCell(key=k,name=k))}</td>" for k in keys])
-        return tds
-
-    code_keys = ["codecheck_error_num", "bin_scope_error_num", "build_check_error_num", "compile_error_num"]
-    dt_keys = ["dt_pass_rate", "dt_pass_num", "dt_line_coverage", "dt_method_coverage"]
-
     code_header = """
       <tr>
         <th style="width:180px;">项目</th>
@@ -72,13 +94,6 @@ def build_daily_email_html(record_date: date, projects: List[Dict]) -> str:
       </tr>
     """
 
-    code_rows = []
-    dt_rows = []
-    for p in projects:
-        cells = {c.key: c for c in p["code_metrics"] + p["dt_metrics"]}
-        code_rows.append(f"<tr><td><b>{escape(p['project_name'])}</b><div class='muted'>{escape(p.get('project_domain') or '')}</div></td>{project_row(cells, code_keys)}</tr>")
-        dt_rows.append(f"<tr><td><b>{escape(p['project_name'])}</b><div class='muted'>{escape(p.get('project_domain') or '')}</div></td>{project_row(cells, dt_keys)}</tr>")
-
     html = f"""
     <html>
       <head>{style}</head>
@@ -90,12 +105,12 @@ def build_daily_email_html(record_date: date, projects: List[Dict]) -> str:
 
         <div class="card">
           <h2>代码检测类</h2>
-          <table>{code_header}{''.join(code_rows) or '<tr><td class=\"muted\">暂无数据</td></tr>'}</table>
+          <table>{code_header}{''.join(code_rows) or EMPTY_ROW}</table>
         </div>
 
         <div class="card">
           <h2>DT 测试数据</h2>
-          <table>{dt_header}{''.join(dt_rows) or '<tr><td class=\"muted\">暂无数据</td></tr>'}</table>
+          <table>{dt_header}{''.join(dt_rows) or EMPTY_ROW}</table>
         </div>
       </body>
     </html>
@@ -108,3 +123,39 @@ def send_html_email(to_email: str, subject: str, html: str):
     msg.attach_alternative(html, "text/html")
     msg.send()
 
+
+def send_html_emails(messages: List[Tuple[str, str, str]], batch_size: int = 100) -> List[Optional[str]]:
+    """
+    批量发送 HTML 邮件，复用同一个 SMTP 连接。
+    每 batch_size 封重建一次连接（避免触发服务端单连接发信上限）；单封失败时重连后继续发送后续邮件。
+
+    :param messages: [(to_email, subject, html), ...]
+    :return: 与 messages 一一对应的错误信息，发送成功为 None
+    """
+    errors: List[Optional[str]] = []
+    connection = get_connection()
+    try:
+        for start in range(0, len(messages), batch_size):
+            _reopen(connection)
+            for to_email, subject, html in messages[start:start + batch_size]:
+                msg = EmailMultiAlternatives(subject=subject, to=[to_email], connection=connection)
+                msg.attach_alternative(html, "text/html")
+                try:
+                    connection.send_messages([msg])
+                    errors.append(None)
+                except Exception as e:
+                    logger.error(f"发送集成报告邮件失败 {to_email}: {e}")
+                    errors.append(str(e))
+                    _reopen(connection)
+    finally:
+        connection.close()
+    return errors
+
+
+def _reopen(connection):
+    """重建 SMTP 连接；失败时保持关闭，下一封邮件发送时会再次尝试连接"""
+    try:
+        connection.close()
+        connection.open()
+    except Exception as e:
+        logger.error(f"连接邮件服务器失败: {e}")
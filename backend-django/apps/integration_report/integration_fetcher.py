@@ -1,16 +1,65 @@
+import logging
 import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date
-from typing import Dict, Tuple, Optional
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlencode, urlsplit
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PLATFORM_URL = "https://dataplatform.example.com"
+
+# 数据平台接口: kind -> (配置中的任务ID字段, {指标Key: 响应字段})
+METRIC_SOURCES = {
+    "codecheck": ("code_check_task_id", {"codecheck_error_num": "error_num"}),
+    "bin-scope": ("bin_scope_task_id", {"bin_scope_error_num": "error_num"}),
+    "build-check": ("build_check_task_id", {"build_check_error_num": "error_num"}),
+    "compile-check": ("compile_check_task_id", {"compile_error_num": "error_num"}),
+    "dt": ("dt_project_id", {
+        "dt_pass_rate": "pass_rate",
+        "dt_pass_num": "pass_num",
+        "dt_line_coverage": "line_coverage",
+        "dt_method_coverage": "method_coverage",
+    }),
+}
+
+
+def get_platform_settings() -> dict:
+    """数据平台访问配置，BASE_URL 为空时使用模拟数据"""
+    options = {
+        "BASE_URL": "",
+        "TIMEOUT": 10,
+        "RETRIES": 2,
+        "MAX_WORKERS": 16,
+        "PER_HOST_LIMIT": 8,
+    }
+    options.update(getattr(settings, "INTEGRATION_DATA_PLATFORM", {}))
+    return options
+
+
+def build_metric_url(base_url: str, kind: str, task_id: str, record_date: date) -> str:
+    if not task_id:
+        return ""
+    query = urlencode({"id": task_id, "date": record_date.isoformat()})
+    return f"{(base_url or DEFAULT_PLATFORM_URL).rstrip('/')}/{kind}?{query}"
 
 
 class IntegrationDataFetcher:
     """
     数据获取器类，根据配置中的各个 ID 获取指标数据。
     如果获取失败，数值部分返回 None。
+    未配置数据平台地址时生成模拟数据；配置后通过 MetricHttpClient 请求数据平台。
     """
 
-    def __init__(self, config):
+    def __init__(self, config, client: Optional["MetricHttpClient"] = None):
         self.config = config
+        self.client = client
         self.record_date = date.today()
 
     def set_date(self, record_date: date):
@@ -18,39 +67,59 @@ class IntegrationDataFetcher:
         return self
 
     def _get_url(self, kind: str, task_id: str) -> str:
-        if not task_id:
-            return ""
-        return f"https://dataplatform.example.com/{kind}?id={task_id}&date={self.record_date.isoformat()}"
+        base_url = self.client.base_url if self.client else ""
+        return build_metric_url(base_url, kind, task_id, self.record_date)
 
     def fetch_metrics(self) -> Dict[str, Tuple[Optional[float], str]]:
         """
         获取所有指标。
         返回字典: { key: (value_number, detail_url) }
         """
-        # 设置随机种子，保证同一天同一个项目的数据一致性（模拟真实数据）
-        seed = f"{self.config.id}-{self.record_date.isoformat()}"
-        random.seed(seed)
+        if self.client is None:
+            return self._mock_metrics()
+        results = {}
+        for kind in METRIC_SOURCES:
+            results.update(self.fetch_kind(kind))
+        return results
+
+    def fetch_kind(self, kind: str) -> Dict[str, Tuple[Optional[float], str]]:
+        """请求单个数据平台接口，返回该接口对应的全部指标"""
+        id_field, fields = METRIC_SOURCES[kind]
+        task_id = getattr(self.config, id_field)
+        url = self._get_url(kind, task_id)
+        if not task_id:
+            return {key: (None, "") for key in fields}
+
+        data = self.client.get_json(url)
+        if data is None:
+            return {key: (None, url) for key in fields}
+        detail_url = data.get("detail_url") or url
+        return {key: (_to_float(data.get(field)), detail_url) for key, field in fields.items()}
+
+    def _mock_metrics(self) -> Dict[str, Tuple[Optional[float], str]]:
+        # 独立的随机数生成器，保证同一天同一个项目的数据一致性（模拟真实数据），并发采集时互不干扰
+        rng = random.Random(f"{self.config.id}-{self.record_date.isoformat()}")
 
         results = {}
 
         # 1. Code Check
-        results["codecheck_error_num"] = self._fetch_single_metric(
-            self.config.code_check_task_id, "codecheck", lambda: float(random.choice([0, 0, 0, random.randint(1, 5)]))
+        results["codecheck_error_num"] = self._mock_single_metric(
+            rng, self.config.code_check_task_id, "codecheck", lambda: float(rng.choice([0, 0, 0, rng.randint(1, 5)]))
         )
 
         # 2. Bin Scope
-        results["bin_scope_error_num"] = self._fetch_single_metric(
-            self.config.bin_scope_task_id, "bin-scope", lambda: float(random.choice([0, 0, random.randint(1, 3)]))
+        results["bin_scope_error_num"] = self._mock_single_metric(
+            rng, self.config.bin_scope_task_id, "bin-scope", lambda: float(rng.choice([0, 0, rng.randint(1, 3)]))
         )
 
         # 3. Build Check
-        results["build_check_error_num"] = self._fetch_single_metric(
-            self.config.build_check_task_id, "build-check", lambda: float(random.choice([0, 0, random.randint(1, 2)]))
+        results["build_check_error_num"] = self._mock_single_metric(
+            rng, self.config.build_check_task_id, "build-check", lambda: float(rng.choice([0, 0, rng.randint(1, 2)]))
         )
 
         # 4. Compile Check
-        results["compile_error_num"] = self._fetch_single_metric(
-            self.config.compile_check_task_id, "compile-check", lambda: float(random.choice([0, random.randint(1, 2)]))
+        results["compile_error_num"] = self._mock_single_metric(
+            rng, self.config.compile_check_task_id, "compile-check", lambda: float(rng.choice([0, rng.randint(1, 2)]))
         )
 
         # 5. DT Metrics
@@ -64,7 +133,7 @@ class IntegrationDataFetcher:
             })
         else:
             # 模拟偶尔获取失败
-            if random.random() < 0.05:  # 5% 概率失败
+            if rng.random() < 0.05:  # 5% 概率失败
                 results.update({
                     "dt_pass_rate": (None, dt_url),
                     "dt_pass_num": (None, dt_url),
@@ -73,24 +142,127 @@ class IntegrationDataFetcher:
                 })
             else:
                 results.update({
-                    "dt_pass_rate": (round(random.uniform(85, 100), 2), dt_url),
-                    "dt_pass_num": (float(random.randint(20, 300)), dt_url),
-                    "dt_line_coverage": (round(random.uniform(55, 95), 2), dt_url),
-                    "dt_method_coverage": (round(random.uniform(50, 92), 2), dt_url),
+                    "dt_pass_rate": (round(rng.uniform(85, 100), 2), dt_url),
+                    "dt_pass_num": (float(rng.randint(20, 300)), dt_url),
+                    "dt_line_coverage": (round(rng.uniform(55, 95), 2), dt_url),
+                    "dt_method_coverage": (round(rng.uniform(50, 92), 2), dt_url),
                 })
 
         return results
 
-    def _fetch_single_metric(self, task_id: str, kind: str, generator) -> Tuple[Optional[float], str]:
+    def _mock_single_metric(self, rng: random.Random, task_id: str, kind: str, generator) -> Tuple[Optional[float], str]:
         url = self._get_url(kind, task_id)
         if not task_id:
             return None, ""
-        
+
         # 模拟偶尔获取失败
-        if random.random() < 0.05:  # 5% 概率失败
+        if rng.random() < 0.05:  # 5% 概率失败
             return None, url
-        
+
         try:
             return generator(), url
         except Exception:
             return None, url
+
+
+def _to_float(value) -> Optional[float]:
+    try:
+        return None if value is None else float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class MetricHttpClient:
+    """
+    数据平台 HTTP 客户端
+    - 共享 Session，按主机复用连接（连接池大小与单主机并发上限一致）
+    - 连接/读取超时，5xx/429 及连接错误按指数退避重试
+    - 单主机并发上限，避免压垮数据平台
+    """
+
+    def __init__(self, base_url: str = "", timeout: float = 10, retries: int = 2, per_host_limit: int = 8):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.per_host_limit = per_host_limit
+        self._host_slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+        retry = Retry(
+            total=retries,
+            backoff_factor=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(["GET"]),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=per_host_limit, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _slot(self, url: str) -> threading.BoundedSemaphore:
+        host = urlsplit(url).netloc
+        with self._lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = self._host_slots[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return slot
+
+    def get_json(self, url: str) -> Optional[dict]:
+        """GET 请求并解析 JSON，失败返回 None"""
+        with self._slot(url):
+            try:
+                response = self.session.get(url, timeout=self.timeout)
+                response.raise_for_status()
+                data = response.json()
+                return data if isinstance(data, dict) else None
+            except (requests.RequestException, ValueError) as e:
+                logger.error(f"获取集成指标失败 {url}: {e}")
+                return None
+
+    def close(self):
+        self.session.close()
+
+
+class ConcurrentMetricCollector:
+    """
+    并发指标采集器
+    每个 配置 × 数据平台接口 作为一个请求任务，在线程池中并发执行，结果按配置汇总
+    """
+
+    def __init__(self, client: Optional[MetricHttpClient] = None, max_workers: int = 16):
+        self.client = client
+        self.max_workers = max_workers
+
+    @classmethod
+    def from_settings(cls) -> "ConcurrentMetricCollector":
+        options = get_platform_settings()
+        client = None
+        if options["BASE_URL"]:
+            client = MetricHttpClient(
+                base_url=options["BASE_URL"],
+                timeout=options["TIMEOUT"],
+                retries=options["RETRIES"],
+                per_host_limit=options["PER_HOST_LIMIT"],
+            )
+        return cls(client, options["MAX_WORKERS"])
+
+    def collect(self, configs: Iterable, record_date: date) -> Dict[str, Dict[str, Tuple[Optional[float], str]]]:
+        """
+        采集多个配置的指标
+        返回字典: { config_id: { key: (value_number, detail_url) } }
+        """
+        fetchers = [IntegrationDataFetcher(cfg, self.client).set_date(record_date) for cfg in configs]
+        if self.client is None:
+            # 模拟数据无网络请求，直接串行生成
+            return {str(f.config.id): f.fetch_metrics() for f in fetchers}
+
+        results: Dict[str, Dict[str, Tuple[Optional[float], str]]] = {str(f.config.id): {} for f in fetchers}
+        tasks: List[Tuple[IntegrationDataFetcher, str]] = [(f, kind) for f in fetchers for kind in METRIC_SOURCES]
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="integration-fetch") as pool:
+            for (fetcher, _kind), metrics in zip(tasks, pool.map(lambda task: task[0].fetch_kind(task[1]), tasks)):
+                results[str(fetcher.config.id)].update(metrics)
+        return results
+
+    def close(self):
+        if self.client is not None:
+            self.client.close()
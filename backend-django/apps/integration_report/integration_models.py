@@ -27,6 +27,9 @@ class IntegrationProjectConfig(RootModel):
     compile_check_task_id = models.CharField(max_length=128, blank=True, default="", verbose_name="编译检测任务ID")
     dt_project_id = models.CharField(max_length=128, blank=True, default="", verbose_name="DT项目ID")
 
+    # 最新指标日期快照，由指标采集写入时维护，列表页据此一次查询取出所有配置的最新指标
+    latest_record_date = models.DateField(null=True, blank=True, verbose_name="最新指标日期")
+
     class Meta:
         db_table = "ir_project_config"
         verbose_name = "每日集成报告项目配置"
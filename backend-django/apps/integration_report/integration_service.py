@@ -3,7 +3,8 @@ from datetime import date, timedelta
 from typing import Dict, List, Optional
 
 from django.db import transaction
-from django.db.models import Max
+from django.db.models import F, Q
+from django.utils import timezone
 
 from apps.project_manager.project.project_model import Project
 from core.user.user_model import User
@@ -15,9 +16,9 @@ from .integration_models import (
     IntegrationProjectConfig,
     IntegrationProjectMetricValue,
 )
-from .integration_fetcher import IntegrationDataFetcher
+from .integration_fetcher import ConcurrentMetricCollector
 from .integration_schema import MetricCell, ProjectConfigOut
-from .integration_email import build_daily_email_html, send_html_email
+from .integration_email import compose_daily_email_html, render_project_rows, send_html_emails
 
 
 CODE_KEYS = [
@@ -81,11 +82,14 @@ def ensure_default_metric_definitions():
         )
 
 
-@transaction.atomic
+METRIC_UPSERT_BATCH_SIZE = 200
+
+
 def collect_daily_metrics(record_date: Optional[date] = None, config_ids: Optional[List[str]] = None):
     """
     采集每日指标数据。
-    使用 IntegrationDataFetcher 根据配置中的各个 ID 获取数据。
+    使用 ConcurrentMetricCollector 并发获取各配置的数据，获取完成后按批批量写入。
+    网络请求不在数据库事务内进行，每批写入一个短事务。
     """
     ensure_default_metric_definitions()
     if record_date is None:
@@ -94,26 +98,66 @@ def collect_daily_metrics(record_date: Optional[date] = None, config_ids: Option
     configs = IntegrationProjectConfig.objects.select_related("project").filter(is_deleted=False, enabled=True)
     if config_ids:
         configs = configs.filter(id__in=config_ids)
+    configs = list(configs)
     def_map = {d.key: d for d in IntegrationMetricDefinition.objects.filter(is_deleted=False, enabled=True)}
 
-    for cfg in configs:
-        fetcher = IntegrationDataFetcher(cfg).set_date(record_date)
-        payload = fetcher.fetch_metrics()
+    collector = ConcurrentMetricCollector.from_settings()
+    try:
+        for start in range(0, len(configs), METRIC_UPSERT_BATCH_SIZE):
+            batch = configs[start:start + METRIC_UPSERT_BATCH_SIZE]
+            payloads = collector.collect(batch, record_date)
+            _bulk_upsert_metric_values(record_date, payloads, def_map)
+    finally:
+        collector.close()
+
 
+@transaction.atomic
+def _bulk_upsert_metric_values(record_date: date, payloads: Dict[str, Dict], def_map: Dict[str, IntegrationMetricDefinition]):
+    """一次查询已有记录，已存在的 bulk_update，不存在的 bulk_create"""
+    now = timezone.now()
+    existing = {
+        (str(row.config_id), row.metric_id): row
+        for row in IntegrationProjectMetricValue.objects.filter(
+            config_id__in=list(payloads.keys()), record_date=record_date
+        )
+    }
+
+    to_create: List[IntegrationProjectMetricValue] = []
+    to_update: List[IntegrationProjectMetricValue] = []
+    for config_id, payload in payloads.items():
         for key, (val, url) in payload.items():
             defn = def_map.get(key)
             if not defn:
                 continue
-            IntegrationProjectMetricValue.objects.update_or_create(
-                config=cfg,
-                record_date=record_date,
-                metric=defn,
-                defaults={
-                    "value_number": val,
-                    "value_text": "error" if val is None else "",
-                    "detail_url": url,
-                },
-            )
+            value_text = "error" if val is None else ""
+            row = existing.get((config_id, defn.id))
+            if row is None:
+                to_create.append(IntegrationProjectMetricValue(
+                    config_id=config_id,
+                    record_date=record_date,
+                    metric=defn,
+                    value_number=val,
+                    value_text=value_text,
+                    detail_url=url,
+                ))
+            elif (row.value_number, row.value_text, row.detail_url) != (val, value_text, url):
+                row.value_number = val
+                row.value_text = value_text
+                row.detail_url = url
+                row.sys_update_datetime = now
+                to_update.append(row)
+
+    if to_create:
+        IntegrationProjectMetricValue.objects.bulk_create(to_create, batch_size=500)
+    if to_update:
+        IntegrationProjectMetricValue.objects.bulk_update(
+            to_update, ["value_number", "value_text", "detail_url", "sys_update_datetime"], batch_size=500
+        )
+
+    # 维护最新指标日期快照（补采历史日期时不回退）
+    IntegrationProjectConfig.objects.filter(id__in=list(payloads.keys())).filter(
+        Q(latest_record_date__isnull=True) | Q(latest_record_date__lt=record_date)
+    ).update(latest_record_date=record_date)
 
 
 # 保持兼容性，指向新函数
@@ -121,58 +165,41 @@ mock_collect_daily = collect_daily_metrics
 
 
 def list_configs_with_latest(user: User) -> List[ProjectConfigOut]:
+    """
+    配置列表及各自最新一天的指标。
+    查询次数固定，与配置数量无关：最新日期取自配置上的快照字段，
+    所有配置的最新指标值一次联表查询取出，负责人通过 prefetch 批量加载。
+    """
     ensure_default_metric_definitions()
 
-    configs = (
+    configs = list(
         IntegrationProjectConfig.objects.select_related("project")
+        .prefetch_related("managers", "project__managers")
         .filter(is_deleted=False)
         .order_by("-sys_update_datetime")
     )
+
     subscribed_ids = set(
         IntegrationEmailSubscription.objects.filter(is_deleted=False, user=user, enabled=True).values_list("config_id", flat=True)
     )
-    latest_dates = (
-        IntegrationProjectMetricValue.objects.filter(is_deleted=False)
-        .values("config_id")
-        .annotate(latest=Max("record_date"))
-    )
-    latest_map = {row["config_id"]: row["latest"] for row in latest_dates}
-
     def_map = {d.key: d for d in IntegrationMetricDefinition.objects.filter(is_deleted=False, enabled=True)}
 
+    values_by_config: Dict[str, List[IntegrationProjectMetricValue]] = defaultdict(list)
+    for v in (
+        IntegrationProjectMetricValue.objects.select_related("metric")
+        .filter(
+            is_deleted=False,
+            config__is_deleted=False,
+            record_date=F("config__latest_record_date"),
+            metric__enabled=True,
+        )
+    ):
+        values_by_config[str(v.config_id)].append(v)
+
     result = []
     for cfg in configs:
         proj = cfg.project
-        latest_date = latest_map.get(str(cfg.id))
-        values = []
-        if latest_date:
-            values = list(
-                IntegrationProjectMetricValue.objects.select_related("metric")
-                .filter(is_deleted=False, config=cfg, record_date=latest_date, metric__enabled=True)
-            )
-        cell_by_key: Dict[str, MetricCell] = {}
-        for v in values:
-            defn = v.metric
-            val = v.value_number
-            unit = defn.unit
-            cell_by_key[defn.key] = MetricCell(
-                key=defn.key,
-                name=defn.name,
-                value=val,
-                text=v.value_text,
-                unit=unit,
-                url=v.detail_url or "",
-                level=_eval_level(defn, val),
-            )
-
-        def make_cells(keys: List[str]) -> List[MetricCell]:
-            cells = []
-            for k in keys:
-                d = def_map.get(k)
-                if not d:
-                    continue
-                cells.append(cell_by_key.get(k) or MetricCell(key=k, name=d.name, unit=d.unit))
-            return cells
+        code_cells, dt_cells = _build_metric_cells(values_by_config.get(str(cfg.id), []), def_map)
 
         proj_managers_str = ",".join([m.name or m.username for m in proj.managers.all()]) if proj else ""
         config_managers_str = ",".join([u.name or u.username for u in cfg.managers.all()])
@@ -188,9 +215,9 @@ def list_configs_with_latest(user: User) -> List[ProjectConfigOut]:
                 managers=config_managers_str,
                 enabled=cfg.enabled,
                 subscribed=str(cfg.id) in subscribed_ids,
-                latest_date=latest_date,
-                code_metrics=make_cells(CODE_KEYS),
-                dt_metrics=make_cells(DT_KEYS),
+                latest_date=cfg.latest_record_date,
+                code_metrics=code_cells,
+                dt_metrics=dt_cells,
             )
         )
     return result
@@ -206,7 +233,37 @@ def toggle_subscription(user: User, config_id: str, enabled: bool) -> bool:
     return sub.enabled
 
 
+def _build_metric_cells(values: List[IntegrationProjectMetricValue], def_map: Dict[str, IntegrationMetricDefinition]):
+    """由某个配置的指标值构建 (code_cells, dt_cells)，缺失的指标显示为空"""
+    cell_by_key = {}
+    for v in values:
+        defn = v.metric
+        val = v.value_number
+        cell_by_key[defn.key] = MetricCell(
+            key=defn.key,
+            name=defn.name,
+            value=val,
+            text=v.value_text,
+            unit=defn.unit,
+            url=v.detail_url or "",
+            level=_eval_level(defn, val),
+        )
+
+    code_cells = [cell_by_key.get(k) or MetricCell(key=k, name=def_map[k].name, unit=def_map[k].unit) for k in CODE_KEYS if k in def_map]
+    dt_cells = [cell_by_key.get(k) or MetricCell(key=k, name=def_map[k].name, unit=def_map[k].unit) for k in DT_KEYS if k in def_map]
+    return code_cells, dt_cells
+
+
+EMAIL_SEND_BATCH_SIZE = 200
+
+
 def send_daily_emails(record_date: Optional[date] = None) -> int:
+    """
+    按订阅发送每日集成报告邮件。
+    - 当天所有订阅配置的指标值一次查询加载
+    - 每个项目的表格行只渲染一次，各用户的邮件由缓存的行片段拼装
+    - 复用 SMTP 连接批量发送，投递记录按批 bulk_create
+    """
     if record_date is None:
         record_date = date.today()
 
@@ -214,72 +271,66 @@ def send_daily_emails(record_date: Optional[date] = None) -> int:
     subs = (
         IntegrationEmailSubscription.objects.select_related("user", "config", "config__project")
         .filter(is_deleted=False, enabled=True, user__is_active=True)
+        .exclude(user__email__isnull=True)
+        .exclude(user__email="")
         .order_by("user_id")
     )
     by_user: Dict[str, List[IntegrationProjectConfig]] = defaultdict(list)
+    users: Dict[str, User] = {}
     for s in subs:
-        by_user[str(s.user_id)].append(s.config)
+        user_id = str(s.user_id)
+        users[user_id] = s.user
+        by_user[user_id].append(s.config)
 
     if not by_user:
         return 0
 
     def_map = {d.key: d for d in IntegrationMetricDefinition.objects.filter(is_deleted=False, enabled=True)}
-    sent = 0
-    for user_id, configs in by_user.items():
-        user = User.objects.filter(id=user_id, is_active=True).first()
-        if not user:
-            continue
-        to_email = user.email or ""
-        if not to_email:
-            continue
-
-        project_rows = []
-        for cfg in configs:
-            qs = (
-                IntegrationProjectMetricValue.objects.select_related("metric")
-                .filter(is_deleted=False, config=cfg, record_date=record_date)
-            )
-            cell_by_key = {}
-            for v in qs:
-                defn = v.metric
-                val = v.value_number
-                cell_by_key[defn.key] = MetricCell(
-                    key=defn.key,
-                    name=defn.name,
-                    value=val,
-                    text=v.value_text,
-                    unit=defn.unit,
-                    url=v.detail_url or "",
-                    level=_eval_level(defn, val),
-                )
-
-            code_cells = [cell_by_key.get(k) or MetricCell(key=k, name=def_map[k].name, unit=def_map[k].unit) for k in CODE_KEYS if k in def_map]
-            dt_cells = [cell_by_key.get(k) or MetricCell(key=k, name=def_map[k].name, unit=def_map[k].unit) for k in DT_KEYS if k in def_map]
-            project_rows.append(
-                {
-                    "project_name": cfg.name,  # Use Config Name as Display Name
-                    "project_domain": (cfg.project.domain or "") if cfg.project else "",
-                    "code_metrics": code_cells,
-                    "dt_metrics": dt_cells,
-                }
-            )
 
-        subject = f"每日集成报告 {record_date.isoformat()}"
-        html = build_daily_email_html(record_date, project_rows)
-        delivery = IntegrationEmailDelivery.objects.create(
-            record_date=record_date,
-            user_id=user_id,
-            to_email=to_email,
-            subject=subject,
-            status="pending",
+    # 一次加载全部订阅配置的当天指标值
+    configs = {str(cfg.id): cfg for cfg_list in by_user.values() for cfg in cfg_list}
+    values_by_config: Dict[str, List[IntegrationProjectMetricValue]] = defaultdict(list)
+    for v in (
+        IntegrationProjectMetricValue.objects.select_related("metric")
+        .filter(is_deleted=False, config_id__in=list(configs.keys()), record_date=record_date)
+    ):
+        values_by_config[str(v.config_id)].append(v)
+
+    # 每个项目只渲染一次
+    rendered_rows = {}
+    for config_id, cfg in configs.items():
+        code_cells, dt_cells = _build_metric_cells(values_by_config.get(config_id, []), def_map)
+        rendered_rows[config_id] = render_project_rows(
+            {
+                "project_name": cfg.name,  # Use Config Name as Display Name
+                "project_domain": (cfg.project.domain or "") if cfg.project else "",
+                "code_metrics": code_cells,
+                "dt_metrics": dt_cells,
+            }
         )
-        try:
-            send_html_email(to_email, subject, html)
-            delivery.status = "sent"
-            delivery.save(update_fields=["status"])
-            sent += 1
-        except Exception as e:
-            delivery.status = "failed"
-            delivery.error_message = str(e)
-            delivery.save(update_fields=["status", "error_message"])
+
+    subject = f"每日集成报告 {record_date.isoformat()}"
+    outbox = []
+    for user_id, cfg_list in by_user.items():
+        rows = [rendered_rows[str(cfg.id)] for cfg in cfg_list]
+        html = compose_daily_email_html(record_date, [r[0] for r in rows], [r[1] for r in rows])
+        outbox.append((user_id, users[user_id].email, html))
+
+    sent = 0
+    for start in range(0, len(outbox), EMAIL_SEND_BATCH_SIZE):
+        batch = outbox[start:start + EMAIL_SEND_BATCH_SIZE]
+        errors = send_html_emails([(to_email, subject, html) for _user_id, to_email, html in batch])
+        deliveries = []
+        for (user_id, to_email, _html), error in zip(batch, errors):
+            deliveries.append(IntegrationEmailDelivery(
+                record_date=record_date,
+                user_id=user_id,
+                to_email=to_email,
+                subject=subject,
+                status="failed" if error else "sent",
+                error_message=error or "",
+            ))
+            if not error:
+                sent += 1
+        IntegrationEmailDelivery.objects.bulk_create(deliveries)
     return sent
@@ -0,0 +1,134 @@
+import random
+import socketserver
+import threading
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from apps.integration_report.integration_models import (
+    IntegrationEmailDelivery,
+    IntegrationEmailSubscription,
+    IntegrationProjectConfig,
+)
+from apps.integration_report.integration_service import collect_daily_metrics, send_daily_emails
+from core.user.user_model import User
+
+
+class _SMTPSink(socketserver.ThreadingTCPServer):
+    """本地 SMTP 桩：接受所有邮件并丢弃，统计连接数和邮件数"""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _SMTPHandler)
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.messages = 0
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def _reply(self, line: str):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        self._reply("220 sink")
+        in_data = False
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            if in_data:
+                if line in (b".\r\n", b".\n"):
+                    in_data = False
+                    with server.lock:
+                        server.messages += 1
+                    self._reply("250 ok")
+                continue
+            command = line.decode(errors="ignore").strip().upper()
+            if command.startswith("EHLO"):
+                self._reply("250-sink")
+                self._reply("250 8BITMIME")
+            elif command.startswith("HELO"):
+                self._reply("250 sink")
+            elif command == "DATA":
+                in_data = True
+                self._reply("354 go ahead")
+            elif command == "QUIT":
+                self._reply("221 bye")
+                return
+            else:
+                self._reply("250 ok")
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark send_daily_emails against a local SMTP sink "
+        "(test users, configs and subscriptions are created in a transaction that is rolled back)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000, help="Number of subscribed users")
+        parser.add_argument("--configs", type=int, default=30, help="Number of project configs")
+        parser.add_argument("--subscriptions", type=int, default=5, help="Subscriptions per user")
+
+    def handle(self, *args, **options):
+        sink = _SMTPSink()
+        threading.Thread(target=sink.serve_forever, daemon=True).start()
+        email_settings = {
+            "EMAIL_BACKEND": "django.core.mail.backends.smtp.EmailBackend",
+            "EMAIL_HOST": "127.0.0.1",
+            "EMAIL_PORT": sink.server_address[1],
+            "EMAIL_HOST_USER": "",
+            "EMAIL_HOST_PASSWORD": "",
+            "EMAIL_USE_TLS": False,
+            "EMAIL_USE_SSL": False,
+            # 指标使用模拟数据
+            "INTEGRATION_DATA_PLATFORM": {"BASE_URL": ""},
+        }
+        try:
+            with override_settings(**email_settings), transaction.atomic():
+                self._run(sink, options)
+                transaction.set_rollback(True)
+        finally:
+            sink.shutdown()
+            sink.server_close()
+
+    def _run(self, sink: _SMTPSink, options):
+        user_count = options["users"]
+        configs = [
+            IntegrationProjectConfig.objects.create(
+                name=f"bench-{i}", code_check_task_id=f"code-{i}", dt_project_id=f"dt-{i}"
+            )
+            for i in range(options["configs"])
+        ]
+        users = User.objects.bulk_create([
+            User(username=f"bench-mail-{i}", email=f"bench-mail-{i}@example.com", is_active=True)
+            for i in range(user_count)
+        ])
+        per_user = min(options["subscriptions"], len(configs))
+        rng = random.Random(1)
+        IntegrationEmailSubscription.objects.bulk_create([
+            IntegrationEmailSubscription(user=user, config=config)
+            for user in users
+            for config in rng.sample(configs, per_user)
+        ])
+        record_date = date.today()
+        collect_daily_metrics(record_date, [str(config.id) for config in configs])
+
+        started = time.perf_counter()
+        with CaptureQueriesContext(connection) as queries:
+            sent = send_daily_emails(record_date)
+        elapsed = time.perf_counter() - started
+        deliveries = IntegrationEmailDelivery.objects.filter(record_date=record_date).count()
+        # 数据库中已有的订阅也会投递到本地 SMTP 桩
+        self.stdout.write(
+            f"{user_count} subscribers x {per_user} projects: sent {sent} in {elapsed:.2f}s, "
+            f"{len(queries)} queries, {sink.connections} SMTP connections, "
+            f"{sink.messages} messages, {deliveries} delivery rows"
+        )
@@ -0,0 +1,125 @@
+import json
+import threading
+import time
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from apps.integration_report.integration_models import IntegrationProjectConfig, IntegrationProjectMetricValue
+from apps.integration_report.integration_service import collect_daily_metrics
+
+
+class _StubPlatform(ThreadingHTTPServer):
+    """本地数据平台桩：固定延迟返回指标，记录请求数和并发峰值，任务 ID 含 fail 的请求第一次返回 503"""
+
+    daemon_threads = True
+
+    def __init__(self, latency: float):
+        super().__init__(("127.0.0.1", 0), _StubHandler)
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.active = 0
+        self.peak = 0
+        self.failed_once = set()
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            server.active += 1
+            server.peak = max(server.peak, server.active)
+            fail = "fail" in self.path and self.path not in server.failed_once
+            if fail:
+                server.failed_once.add(self.path)
+        time.sleep(server.latency)
+        with server.lock:
+            server.active -= 1
+
+        if fail:
+            code, body = 503, {}
+        elif "/dt" in self.path:
+            code, body = 200, {"pass_rate": 99.5, "pass_num": 10, "line_coverage": 80, "method_coverage": 70}
+        else:
+            code, body = 200, {"error_num": 3}
+        payload = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark collect_daily_metrics against a local stub data platform "
+        "(test configs are created in a transaction that is rolled back)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--configs", type=int, default=20, help="Number of project configs")
+        parser.add_argument("--latency", type=float, default=0.05, help="Stub response latency in seconds")
+        parser.add_argument("--per-host-limit", type=int, default=4, help="PER_HOST_LIMIT for the run")
+        parser.add_argument("--max-workers", type=int, default=16, help="MAX_WORKERS for the run")
+
+    def handle(self, *args, **options):
+        server = _StubPlatform(options["latency"])
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        platform = {
+            "BASE_URL": f"http://127.0.0.1:{server.server_port}",
+            "TIMEOUT": 5,
+            "RETRIES": 1,
+            "MAX_WORKERS": options["max_workers"],
+            "PER_HOST_LIMIT": options["per_host_limit"],
+        }
+        try:
+            with override_settings(INTEGRATION_DATA_PLATFORM=platform), transaction.atomic():
+                self._run(server, options["configs"])
+                transaction.set_rollback(True)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def _run(self, server: _StubPlatform, count: int):
+        configs = [
+            IntegrationProjectConfig.objects.create(
+                name=f"bench-{i}",
+                code_check_task_id="fail" if i == 0 else f"code-{i}",
+                bin_scope_task_id=f"bin-{i}",
+                dt_project_id=f"dt-{i}",
+            )
+            for i in range(count)
+        ]
+        config_ids = [str(config.id) for config in configs]
+        record_date = date.today()
+
+        started = time.perf_counter()
+        with CaptureQueriesContext(connection) as queries:
+            collect_daily_metrics(record_date, config_ids)
+        elapsed = time.perf_counter() - started
+        values = IntegrationProjectMetricValue.objects.filter(config_id__in=config_ids, record_date=record_date)
+        self.stdout.write(
+            f"first run: {count} configs, {elapsed:.2f}s, {server.requests} requests "
+            f"(peak concurrency {server.peak}), {len(queries)} queries, {values.count()} metric values"
+        )
+
+        requests_before = server.requests
+        with CaptureQueriesContext(connection) as queries:
+            collect_daily_metrics(record_date, config_ids)
+        table = IntegrationProjectMetricValue._meta.db_table
+        writes = [
+            q["sql"] for q in queries.captured_queries
+            if table in q["sql"] and q["sql"].lstrip().upper().startswith(("INSERT", "UPDATE"))
+        ]
+        self.stdout.write(
+            f"second run (unchanged values): {server.requests - requests_before} requests, "
+            f"{len(queries)} queries, {len(writes)} metric value writes"
+        )
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:10
+
+from django.db import migrations, models
+from django.db.models import Max, OuterRef, Subquery
+
+
+def backfill_latest_record_date(apps, schema_editor):
+    """快照字段上线前采集的数据：按已有指标值补齐各配置的最新指标日期"""
+    IntegrationProjectConfig = apps.get_model('integration_report', 'IntegrationProjectConfig')
+    IntegrationProjectMetricValue = apps.get_model('integration_report', 'IntegrationProjectMetricValue')
+
+    latest = (
+        IntegrationProjectMetricValue.objects.filter(is_deleted=False, config_id=OuterRef('pk'))
+        .values('config_id')
+        .annotate(latest=Max('record_date'))
+        .values('latest')[:1]
+    )
+    IntegrationProjectConfig.objects.filter(latest_record_date__isnull=True).update(
+        latest_record_date=Subquery(latest)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('integration_report', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='integrationprojectconfig',
+            name='latest_record_date',
+            field=models.DateField(blank=True, null=True, verbose_name='最新指标日期'),
+        ),
+        migrations.RunPython(backfill_latest_record_date, migrations.RunPython.noop),
+    ]
@@ -4,7 +4,12 @@ JWT 鉴权和权限校验
 基于 Core 模块的权限结构重新设计
 """
 import re
+import time
+import uuid
+import hashlib
 import logging
+import threading
+from collections import OrderedDict
 from datetime import timedelta, datetime, timezone
 
 import jwt
@@ -24,13 +29,41 @@ logger = logging.getLogger(__name__)
 class LoginAttemptProtection:
     """
     登录尝试保护机制，防止暴力破解
+
+    - 按用户名和 IP 分别计数登录失败，使用 Redis 原子计数器实现滑动窗口：
+      每个窗口一个计数键，当前窗口计数加上一窗口按剩余时间比例折算的计数即为滑动窗口内的失败次数
+    - 记录失败时 INCR + EXPIRE 及读取上一窗口计数在一次管道请求中完成，失败登录不再统计登录日志表
+    - 同一用户名失败次数达到锁定阈值时由调用方锁定账户，达到限流阈值时拒绝登录；
+      同一 IP 失败次数达到阈值时锁定该 IP 一段时间
     """
-    FAILED_ATTEMPT_KEY = "login_attempt_{}"  # username 或 ip
-    FAILED_ATTEMPT_LIMIT = 15  # 最多15次失败
-    FAILED_ATTEMPT_TIMEOUT = 5 * 60  # 5分钟内
-    IP_LOCKOUT_KEY = "login_lockout_ip_{}"
-    IP_LOCKOUT_DURATION = 15 * 60  # IP锁定15分钟
-    
+    KEY_PREFIX = "login_guard"
+    USER_WINDOW = getattr(settings, "LOGIN_USER_FAILURE_WINDOW", 60 * 60)  # 用户名计数窗口1小时
+    USER_LOCK_THRESHOLD = getattr(settings, "LOGIN_USER_LOCK_THRESHOLD", 5)  # 密码错误5次锁定账户
+    FAILED_ATTEMPT_LIMIT = getattr(settings, "LOGIN_USER_FAILURE_LIMIT", 15)  # 同一用户名最多15次失败
+    IP_WINDOW = getattr(settings, "LOGIN_IP_FAILURE_WINDOW", 5 * 60)  # IP计数窗口5分钟
+    IP_FAILURE_LIMIT = getattr(settings, "LOGIN_IP_FAILURE_LIMIT", 30)  # 同一IP最多30次失败
+    IP_LOCKOUT_DURATION = getattr(settings, "LOGIN_IP_LOCKOUT_DURATION", 15 * 60)  # IP锁定15分钟
+
+    @staticmethod
+    def _get_redis():
+        from django_redis import get_redis_connection
+        return get_redis_connection('default')
+
+    @classmethod
+    def _window_keys(cls, scope: str, identifier: str, window: int, now: float) -> tuple[str, str, float]:
+        """当前窗口键、上一窗口键，以及上一窗口计数的折算比例"""
+        bucket, offset = divmod(now, window)
+        prefix = f"{cls.KEY_PREFIX}:{scope}:{identifier}"
+        return f"{prefix}:{int(bucket)}", f"{prefix}:{int(bucket) - 1}", 1 - offset / window
+
+    @staticmethod
+    def _sliding_count(current, previous, weight: float) -> int:
+        return int(int(current or 0) + int(previous or 0) * weight)
+
+    @classmethod
+    def _lockout_key(cls, ip_address: str) -> str:
+        return f"{cls.KEY_PREFIX}:lockout:{ip_address}"
+
     @classmethod
     def check_login_attempt(cls, username: str, ip_address: str) -> tuple[bool, str]:
         """
@@ -38,78 +71,179 @@ class LoginAttemptProtection:
         
         返回: (is_allowed, message)
         """
-        # 检查IP是否被锁定
-        ip_lockout_key = cls.IP_LOCKOUT_KEY.format(ip_address)
-        if cache.get(ip_lockout_key):
-            return False, "登录尝试过多，请稍后再试"
-        
-        # 检查用户名失败次数
-        attempt_key = cls.FAILED_ATTEMPT_KEY.format(f"user_{username}")
-        attempts = cache.get(attempt_key, 0)
-        
-        if attempts >= cls.FAILED_ATTEMPT_LIMIT:
-            # 锁定IP
-            cache.set(ip_lockout_key, True, cls.IP_LOCKOUT_DURATION)
+        user_key, user_prev_key, weight = cls._window_keys("user", username, cls.USER_WINDOW, time.time())
+        lockout, current, previous = cls._get_redis().mget(cls._lockout_key(ip_address), user_key, user_prev_key)
+        # IP 被锁定或用户名失败次数过多
+        if lockout or cls._sliding_count(current, previous, weight) >= cls.FAILED_ATTEMPT_LIMIT:
             return False, "登录尝试过多，请稍后再试"
-        
         return True, ""
-    
+
     @classmethod
-    def record_login_failure(cls, username: str, ip_address: str):
-        """记录登录失败"""
-        attempt_key = cls.FAILED_ATTEMPT_KEY.format(f"user_{username}")
-        attempts = cache.get(attempt_key, 0)
-        cache.set(attempt_key, attempts + 1, cls.FAILED_ATTEMPT_TIMEOUT)
-        logger.warning(f"登录失败记录: {username} from {ip_address}, 尝试次数: {attempts + 1}")
-    
+    def record_login_failure(cls, username: str, ip_address: str) -> int:
+        """
+        记录登录失败
+
+        :return: 用户名在滑动窗口内的失败次数（用于判断是否锁定账户）
+        """
+        now = time.time()
+        user_key, user_prev_key, user_weight = cls._window_keys("user", username, cls.USER_WINDOW, now)
+        ip_key, ip_prev_key, ip_weight = cls._window_keys("ip", ip_address, cls.IP_WINDOW, now)
+        redis_conn = cls._get_redis()
+        pipe = redis_conn.pipeline(transaction=False)
+        pipe.incr(user_key)
+        # 计数键保留两个窗口，供下一窗口折算
+        pipe.expire(user_key, cls.USER_WINDOW * 2)
+        pipe.get(user_prev_key)
+        pipe.incr(ip_key)
+        pipe.expire(ip_key, cls.IP_WINDOW * 2)
+        pipe.get(ip_prev_key)
+        user_current, _, user_previous, ip_current, _, ip_previous = pipe.execute()
+
+        user_failures = cls._sliding_count(user_current, user_previous, user_weight)
+        ip_failures = cls._sliding_count(ip_current, ip_previous, ip_weight)
+        if ip_failures >= cls.IP_FAILURE_LIMIT:
+            redis_conn.set(cls._lockout_key(ip_address), 1, ex=cls.IP_LOCKOUT_DURATION)
+            logger.warning(f"IP {ip_address} 登录失败次数过多，已锁定 {cls.IP_LOCKOUT_DURATION} 秒")
+        logger.warning(f"登录失败记录: {username} from {ip_address}, 尝试次数: {user_failures}")
+        return user_failures
+
+    @classmethod
+    def get_failure_count(cls, username: str) -> int:
+        """用户名在滑动窗口内的失败次数"""
+        user_key, user_prev_key, weight = cls._window_keys("user", username, cls.USER_WINDOW, time.time())
+        current, previous = cls._get_redis().mget(user_key, user_prev_key)
+        return cls._sliding_count(current, previous, weight)
+
     @classmethod
     def record_login_success(cls, username: str):
         """记录登录成功，清除失败计数"""
-        attempt_key = cls.FAILED_ATTEMPT_KEY.format(f"user_{username}")
-        cache.delete(attempt_key)
+        user_key, user_prev_key, _ = cls._window_keys("user", username, cls.USER_WINDOW, time.time())
+        cls._get_redis().delete(user_key, user_prev_key)
 
 
 # ===================== Token 黑名单管理 =====================
 class TokenBlacklist:
     """
     Token 黑名单管理，用于登出和密码修改后撤销 token
+
+    - 单个 token 按 jti（旧 token 无 jti 时使用 token 的 SHA-256）独立存储，过期时间为该 token 的剩余有效期
+    - 撤销用户全部 token 时只记录一个时间水位线，签发时间不晚于水位线的 token 全部失效
+    - 校验时一次 MGET 同时读取两个键，开销与用户已撤销的 token 数量无关
     """
-    BLACKLIST_KEY = "token_blacklist_{}"
-    
+    REVOKED_KEY = "token_revoked_{}"
+    USER_WATERMARK_KEY = "token_revoked_before_{}"
+
+    @staticmethod
+    def get_token_id(token: str, payload: dict = None) -> str:
+        """token 的唯一标识"""
+        if payload and payload.get("jti"):
+            return payload["jti"]
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    @staticmethod
+    def _get_payload(token: str) -> dict:
+        """读取 token 载荷（签名已由调用方校验，这里只读取 jti/iat）"""
+        try:
+            return jwt.decode(token, options={"verify_signature": False, "verify_exp": False})
+        except jwt.InvalidTokenError:
+            return {}
+
     @classmethod
-    def add_to_blacklist(cls, token: str, user_id: str, exp_time: int):
+    def add_to_blacklist(cls, token: str, user_id: str, exp_time: int, payload: dict = None):
         """
         将 token 加入黑名单
         
         :param token: JWT token
         :param user_id: 用户ID
         :param exp_time: token过期时间戳
+        :param payload: 已解码的 token 载荷
         """
-        key = cls.BLACKLIST_KEY.format(user_id)
-        blacklist = cache.get(key, {})
-        
         # 计算剩余有效期
         remaining_time = exp_time - int(datetime.now(timezone.utc).timestamp())
         if remaining_time > 0:
-            blacklist[token] = exp_time
-            cache.set(key, blacklist, remaining_time)
+            if payload is None:
+                payload = cls._get_payload(token)
+            cache.set(cls.REVOKED_KEY.format(cls.get_token_id(token, payload)), 1, remaining_time)
             logger.info(f"令牌已加入黑名单: 用户 {user_id}")
-    
+
     @classmethod
-    def is_blacklisted(cls, token: str, user_id: str) -> bool:
+    def is_blacklisted(cls, token: str, user_id: str, payload: dict = None) -> bool:
         """检查 token 是否在黑名单中"""
-        key = cls.BLACKLIST_KEY.format(user_id)
-        blacklist = cache.get(key, {})
-        return token in blacklist
-    
+        if payload is None:
+            payload = cls._get_payload(token)
+        revoked_key = cls.REVOKED_KEY.format(cls.get_token_id(token, payload))
+        watermark_key = cls.USER_WATERMARK_KEY.format(user_id)
+        values = cache.get_many([revoked_key, watermark_key])
+        if values.get(revoked_key):
+            return True
+        watermark = values.get(watermark_key)
+        return watermark is not None and float(payload.get("iat") or 0) <= watermark
+
     @classmethod
     def revoke_user_tokens(cls, user_id: str):
-        """撤销用户的所有 token"""
-        key = cls.BLACKLIST_KEY.format(user_id)
-        cache.delete(key)
+        """撤销用户的所有 token（此刻之前签发的 token 全部失效）"""
+        # 水位线保留到最长的 refresh token 也已过期
+        refresh_minutes = settings.JWT_REFRESH_TOKEN_EXPIRE_MINUTES or 7 * 24 * 60
+        cache.set(
+            cls.USER_WATERMARK_KEY.format(user_id),
+            datetime.now(timezone.utc).timestamp(),
+            refresh_minutes * 60,
+        )
         logger.info(f"已撤销用户 {user_id} 的所有令牌")
 
 
+# ===================== 已验证 Token 缓存 =====================
+class VerifiedTokenCache:
+    """
+    已验证 token 载荷的进程内缓存，所有认证入口共用
+
+    - 以 token 类型 + token 的 SHA-256 为键，只缓存签名校验通过的载荷，篡改后的 token 摘要不同，不会命中
+    - 条目在 token 的 exp 时刻失效，超过容量时淘汰最久未使用的条目
+    - 只省去签名校验，黑名单仍在每个请求中检查，撤销立即生效
+    """
+
+    def __init__(self, max_size: int = 1024):
+        self.max_size = max_size
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token: str, token_type: str) -> tuple:
+        return token_type, hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str, token_type: str):
+        """读取未过期的载荷，不存在或已过期返回 None"""
+        key = self._key(token, token_type)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            payload, exp = entry
+            if exp <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return payload
+
+    def set(self, token: str, token_type: str, payload: dict):
+        exp = payload.get("exp")
+        if not exp or self.max_size <= 0:
+            return
+        key = self._key(token, token_type)
+        with self._lock:
+            self._entries[key] = (payload, float(exp))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+verified_token_cache = VerifiedTokenCache(getattr(settings, 'JWT_VERIFY_CACHE_SIZE', 1024))
+
+
 # HTTP 方法映射
 HTTP_METHOD_MAP = {
     'GET': 0,
@@ -179,7 +313,7 @@ class ApiKey(APIKeyQuery):
 
     def authenticate(self, request, key):
         """验证 API Key"""
-        verify_token(key)
+        verify_token(key, request=request)
         path = request.path
         # 文件流等特殊接口直接返回
         if path.startswith('/api/core/file_manager/stream/'):
@@ -206,7 +340,7 @@ class BearerAuth(HttpBearer):
             method = request.method
             
             # 1. 验证 token
-            payload = verify_token(token, token_type="access")
+            payload = verify_token(token, token_type="access", request=request)
             if not payload:
                 raise HttpError(401, "令牌无效或已过期")
             
@@ -370,12 +504,15 @@ def create_token(data: dict):
     # 计算过期时间
     access_token_expire = datetime.utcnow() + timedelta(minutes=access_token_timeout)
     refresh_token_expire = datetime.utcnow() + timedelta(minutes=refresh_token_timeout)
+    # 签发时间保留小数，撤销水位线可精确区分同一秒内撤销前后签发的 token
+    issued_at = datetime.now(timezone.utc).timestamp()
     
     # 生成 access token 数据
     access_token_data = data.copy()
     access_token_data.update({
         "exp": access_token_expire,
-        "iat": datetime.utcnow(),
+        "iat": issued_at,
+        "jti": uuid.uuid4().hex,
         "type": "access",
     })
     
@@ -384,7 +521,8 @@ def create_token(data: dict):
         "id": data.get("id"),
         "username": data.get("username"),
         "exp": refresh_token_expire,
-        "iat": datetime.utcnow(),
+        "iat": issued_at,
+        "jti": uuid.uuid4().hex,
         "type": "refresh",
     }
     
@@ -426,7 +564,7 @@ def get_user_by_token(request, token_type="access"):
         token = parts[1]
         
         # 验证 token
-        payload = verify_token(token, token_type)
+        payload = verify_token(token, token_type, request=request)
         if not payload:
             logger.warning("令牌验证失败")
             return None
@@ -456,27 +594,54 @@ def get_user_by_token(request, token_type="access"):
         return None
 
 
-def verify_token(token, token_type="access"):
+def verify_token(token, token_type="access", request=None):
     """
     验证 token
+
+    同一请求内的结果缓存在 request 上，认证和日志中间件等多个入口只校验一次；
+    签名校验结果由 verified_token_cache 跨请求缓存至 token 过期
     
     :param token: token string
     :param token_type: token 类型 (access 或 refresh)
+    :param request: 当前请求，传入时按请求缓存校验结果
     :return: 解密后的 token 数据 或 None
     """
+    if request is None:
+        return _verify_token(token, token_type)
+    verified = getattr(request, '_verified_tokens', None)
+    if verified is None:
+        verified = request._verified_tokens = {}
+    key = (token_type, token)
+    if key not in verified:
+        verified[key] = _verify_token(token, token_type)
+    return verified[key]
+
+
+def _decode_token(token, token_type):
+    """校验签名并解码，命中已验证缓存时跳过签名校验"""
+    payload = verified_token_cache.get(token, token_type)
+    if payload is not None:
+        return payload
+
+    # 选择对应的密钥
+    if token_type == "refresh":
+        secret_key = settings.JWT_REFRESH_SECRET_KEY
+    else:
+        secret_key = settings.JWT_ACCESS_SECRET_KEY
+
+    payload = jwt.decode(token, secret_key, algorithms=[settings.JWT_ALGORITHM])
+    verified_token_cache.set(token, token_type, payload)
+    return payload
+
+
+def _verify_token(token, token_type="access"):
     try:
         if not token:
             logger.error("令牌为空")
             return None
         
-        # 选择对应的密钥
-        if token_type == "refresh":
-            secret_key = settings.JWT_REFRESH_SECRET_KEY
-        else:
-            secret_key = settings.JWT_ACCESS_SECRET_KEY
-        
         # 解码 token
-        payload = jwt.decode(token, secret_key, algorithms=[settings.JWT_ALGORITHM])
+        payload = _decode_token(token, token_type)
         
         # 验证 token 类型
         if payload.get("type") != token_type:
@@ -486,7 +651,7 @@ def verify_token(token, token_type="access"):
         # 检查黑名单（仅对 access token）
         if token_type == "access":
             user_id = payload.get('id')
-            if user_id and TokenBlacklist.is_blacklisted(token, user_id):
+            if user_id and TokenBlacklist.is_blacklisted(token, user_id, payload):
                 logger.warning(f"令牌已被撤销: 用户 {user_id}")
                 return None
         
@@ -10,6 +10,7 @@
 4. 锁定机制 - 防暴力破解
 5. 临时数据 - 验证码、临时令牌
 """
+import json
 import logging
 from typing import Any, Optional, Callable
 from functools import wraps
@@ -477,6 +478,32 @@ class RateLimitManager:
 class MenuCacheManager:
     """菜单缓存管理，专门处理菜单树和用户菜单的缓存"""
     
+    MENU_VERSION_KEY = f"{CacheKeyPrefix.MENU}:version"
+    
+    @staticmethod
+    def get_menu_version() -> int:
+        """菜单数据版本号（菜单变更时递增）"""
+        return cache.get(MenuCacheManager.MENU_VERSION_KEY, 0)
+    
+    @staticmethod
+    def bump_menu_version() -> None:
+        """递增菜单数据版本号，使所有进程的菜单索引失效"""
+        cache.add(MenuCacheManager.MENU_VERSION_KEY, 0, None)
+        try:
+            cache.incr(MenuCacheManager.MENU_VERSION_KEY)
+        except ValueError:
+            cache.set(MenuCacheManager.MENU_VERSION_KEY, 1, None)
+    
+    @staticmethod
+    def get_menu_rows(version: int):
+        """获取缓存的菜单数据（菜单索引的数据源）"""
+        return CacheManager.get(f"{CacheKeyPrefix.MENU}:rows:v{version}")
+    
+    @staticmethod
+    def set_menu_rows(version: int, rows) -> None:
+        """缓存菜单数据"""
+        CacheManager.set(f"{CacheKeyPrefix.MENU}:rows:v{version}", rows, CacheStrategy.MENU_CACHE)
+    
     @staticmethod
     def get_all_menus():
         """获取缓存的所有菜单"""
@@ -533,46 +560,88 @@ class MenuCacheManager:
         CacheManager.set(cache_key, menus, CacheStrategy.PERMISSION_CACHE)
         logger.debug(f"用户菜单已缓存: {user_id} ({len(menus)} 个)")
     
+    ROUTE_SIGNATURES_KEY = f"{CacheKeyPrefix.MENU}:signatures"
+    
     @staticmethod
-    def get_user_menu_route(user_id: str):
-        """获取缓存的用户菜单路由"""
-        # 使用版本控制，确保权限变更时缓存失效
+    def _role_route_key(signature: str) -> str:
+        # 菜单版本 + 全局权限版本：菜单变更或角色菜单/状态变更后自动失效
+        menu_version = MenuCacheManager.get_menu_version()
+        global_version = cache.get(PermissionCacheManager.GLOBAL_VERSION_KEY, 0)
+        return f"{CacheKeyPrefix.MENU}:route:role:{signature}:m{menu_version}_g{global_version}"
+    
+    @staticmethod
+    def get_role_route(signature: str):
+        """获取缓存的角色组合路由树"""
+        return CacheManager.get(MenuCacheManager._role_route_key(signature))
+    
+    @staticmethod
+    def set_role_route(signature: str, route) -> None:
+        """缓存角色组合路由树"""
+        CacheManager.set(MenuCacheManager._role_route_key(signature), route, CacheStrategy.MENU_CACHE)
+        logger.debug(f"角色组合路由已缓存: {signature}")
+    
+    @staticmethod
+    def get_user_route_signature(user_id: str):
+        """获取缓存的用户角色组合 (signature, role_ids)"""
         version_key = PermissionCacheManager.get_cache_version_key(user_id)
-        cache_key = f"{CacheKeyPrefix.MENU}:route:{user_id}:{version_key}"
-        return CacheManager.get(cache_key)
+        return CacheManager.get(f"{CacheKeyPrefix.MENU}:route:user:{user_id}:{version_key}")
     
     @staticmethod
-    def set_user_menu_route(user_id: str, route):
-        """缓存用户菜单路由"""
+    def set_user_route_signature(user_id: str, signature: str, role_ids: list) -> None:
+        """缓存用户角色组合"""
         version_key = PermissionCacheManager.get_cache_version_key(user_id)
-        cache_key = f"{CacheKeyPrefix.MENU}:route:{user_id}:{version_key}"
-        CacheManager.set(cache_key, route, CacheStrategy.PERMISSION_CACHE)
-        logger.debug(f"用户菜单路由已缓存: {user_id}")
+        cache_key = f"{CacheKeyPrefix.MENU}:route:user:{user_id}:{version_key}"
+        CacheManager.set(cache_key, (signature, role_ids), CacheStrategy.PERMISSION_CACHE)
+    
+    @staticmethod
+    def get_route_signatures() -> dict:
+        """已知的角色组合 {signature: role_ids}，菜单变更时按此预先重建路由树"""
+        from django_redis import get_redis_connection
+
+        redis_conn = get_redis_connection('default')
+        signatures = redis_conn.hgetall(MenuCacheManager.ROUTE_SIGNATURES_KEY)
+        return {
+            (signature.decode() if isinstance(signature, bytes) else signature): json.loads(role_ids)
+            for signature, role_ids in signatures.items()
+        }
+    
+    @staticmethod
+    def register_route_signature(signature: str, role_ids: Optional[list]) -> None:
+        """
+        登记角色组合
+        
+        保存在 Redis 哈希中，每个组合一个字段（HSETNX），并发登记不同组合时互不覆盖
+        """
+        from django_redis import get_redis_connection
+
+        redis_conn = get_redis_connection('default')
+        pipe = redis_conn.pipeline()
+        pipe.hsetnx(MenuCacheManager.ROUTE_SIGNATURES_KEY, signature, json.dumps(role_ids))
+        pipe.expire(MenuCacheManager.ROUTE_SIGNATURES_KEY, CacheStrategy.DATA_CACHE_VERY_LONG)
+        pipe.execute()
     
     @staticmethod
     def invalidate_menu_cache() -> None:
         """清除所有菜单相关缓存"""
+        # 菜单索引按版本号失效
+        MenuCacheManager.bump_menu_version()
+        
         # 清除菜单缓存
         CacheManager.delete(f"{CacheKeyPrefix.MENU}:all")
         CacheManager.delete(f"{CacheKeyPrefix.MENU}:tree")
         CacheManager.delete(f"{CacheKeyPrefix.MENU}:root")
         
-        # 清除所有用户菜单缓存
+        # 清除所有用户菜单缓存和旧版本的角色组合路由树（用户与角色组合的对应关系不受菜单变更影响）
         CacheManager.clear_by_prefix(f"{CacheKeyPrefix.USER_MENUS}")
-        CacheManager.clear_by_prefix(f"{CacheKeyPrefix.MENU}:route")
+        CacheManager.clear_by_prefix(f"{CacheKeyPrefix.MENU}:route:role")
         
         logger.info("所有菜单缓存已清除")
     
     @staticmethod
     def invalidate_user_menu_cache(user_id: str) -> None:
         """清除特定用户的菜单缓存"""
-        keys_to_delete = [
-            f"{CacheKeyPrefix.USER_MENUS}:{user_id}",
-            f"{CacheKeyPrefix.MENU}:route:{user_id}",
-        ]
-        
-        for key in keys_to_delete:
-            CacheManager.delete(key)
+        CacheManager.delete(f"{CacheKeyPrefix.USER_MENUS}:{user_id}")
+        CacheManager.clear_by_prefix(f"{CacheKeyPrefix.MENU}:route:user:{user_id}:")
         
         logger.info(f"用户菜单缓存已清除: {user_id}")
 
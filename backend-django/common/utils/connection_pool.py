@@ -0,0 +1,390 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+监控连接池
+
+为数据库监控、Redis监控等需要频繁访问外部目标的收集器提供长连接复用：
+
+- ConnectionPool：通用的 DB-API 连接池，支持最大连接数、空闲超时、最大存活时间、借出前健康检查
+- ConnectionPoolRegistry：按目标（类型+地址+账号+库）注册连接池，WebSocket 采样器与 HTTP 接口共用；
+  Redis 目标直接复用 redis-py 自带的 BlockingConnectionPool，池满时同样等待后报错
+- 后台清理线程定期关闭空闲超时的连接，并提供连接池使用指标
+"""
+import hashlib
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PoolExhaustedError(Exception):
+    """连接池已满且等待超时"""
+
+
+class _PooledConnection:
+    """连接池中的连接及其元数据"""
+
+    __slots__ = ('connection', 'created_at', 'last_used', 'last_checked')
+
+    def __init__(self, connection: Any):
+        now = time.time()
+        self.connection = connection
+        self.created_at = now
+        self.last_used = now
+        self.last_checked = now
+
+
+class ConnectionPool:
+    """通用 DB-API 连接池"""
+
+    def __init__(self, name: str, factory: Callable[[], Any],
+                 health_check: Optional[Callable[[Any], bool]] = None,
+                 reset: Optional[Callable[[Any], None]] = None,
+                 max_size: int = 5, idle_timeout: float = 300,
+                 max_lifetime: float = 3600, health_check_interval: float = 30):
+        """
+        :param name: 连接池名称（用于日志和指标，不包含密码）
+        :param factory: 创建新连接的函数
+        :param health_check: 健康检查函数，返回 False 或抛出异常表示连接不可用
+        :param reset: 归还连接时执行的重置函数（如回滚未结束的事务）
+        :param max_size: 最大连接数（借出 + 空闲）
+        :param idle_timeout: 空闲超时（秒），超过后由清理线程关闭
+        :param max_lifetime: 连接最大存活时间（秒）
+        :param health_check_interval: 连接空闲超过该时间（秒）后借出前做健康检查
+        """
+        self.name = name
+        self.factory = factory
+        self.health_check = health_check
+        self.reset = reset
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.max_lifetime = max_lifetime
+        self.health_check_interval = health_check_interval
+
+        self._idle: Deque[_PooledConnection] = deque()
+        self._in_use: Dict[int, _PooledConnection] = {}
+        self._condition = threading.Condition()
+        self.last_used = time.time()
+
+        # 指标
+        self.created_count = 0
+        self.reused_count = 0
+        self.discarded_count = 0
+        self.health_check_failures = 0
+        self.wait_count = 0
+        self.timeout_count = 0
+
+    @staticmethod
+    def _close(pooled: _PooledConnection):
+        try:
+            pooled.connection.close()
+        except Exception:
+            pass
+
+    def _is_healthy(self, pooled: _PooledConnection, now: float) -> bool:
+        """判断空闲连接是否可以继续使用（健康检查会访问网络，调用方不能持有锁）"""
+        if now - pooled.created_at > self.max_lifetime:
+            return False
+        if self.health_check and now - pooled.last_used > self.health_check_interval:
+            try:
+                healthy = self.health_check(pooled.connection)
+            except Exception:
+                healthy = False
+            pooled.last_checked = now
+            if not healthy:
+                self.health_check_failures += 1
+                return False
+        return True
+
+    def acquire(self, timeout: float = 10) -> Any:
+        """借出一个连接，池满时最多等待 timeout 秒"""
+        deadline = time.time() + timeout
+        while True:
+            # 预占名额后在锁外做健康检查或创建连接
+            placeholder = object()
+            pooled = self._reserve(placeholder, deadline)
+            if pooled is None:
+                break
+
+            now = time.time()
+            healthy = self._is_healthy(pooled, now)
+            with self._condition:
+                self._in_use.pop(id(placeholder), None)
+                if healthy:
+                    pooled.last_used = now
+                    self._in_use[id(pooled.connection)] = pooled
+                    self.reused_count += 1
+                    return pooled.connection
+                self.discarded_count += 1
+                self._condition.notify()
+            self._close(pooled)
+
+        try:
+            connection = self.factory()
+        except Exception:
+            with self._condition:
+                self._in_use.pop(id(placeholder), None)
+                self._condition.notify()
+            raise
+
+        with self._condition:
+            self._in_use.pop(id(placeholder), None)
+            self._in_use[id(connection)] = _PooledConnection(connection)
+            self.created_count += 1
+        return connection
+
+    def _reserve(self, placeholder: object, deadline: float) -> Optional[_PooledConnection]:
+        """
+        等待可用名额并用 placeholder 占位：有空闲连接时取出返回，否则返回 None 表示需要新建连接
+
+        取出的空闲连接在健康检查完成前由占位计入借出数，也不在 _idle 中，清理线程不会关闭它。
+        """
+        with self._condition:
+            while True:
+                now = time.time()
+                self.last_used = now
+                if self._idle:
+                    self._in_use[id(placeholder)] = None
+                    return self._idle.pop()  # 后进先出，优先复用最热的连接
+                if len(self._in_use) < self.max_size:
+                    self._in_use[id(placeholder)] = None
+                    return None
+
+                remaining = deadline - now
+                if remaining <= 0:
+                    self.timeout_count += 1
+                    raise PoolExhaustedError(f"连接池 {self.name} 已满（{self.max_size}）")
+                self.wait_count += 1
+                self._condition.wait(remaining)
+
+    def release(self, connection: Any, discard: bool = False):
+        """归还连接；discard=True 或重置失败时直接关闭"""
+        with self._condition:
+            pooled = self._in_use.pop(id(connection), None)
+            self._condition.notify()
+        if pooled is None:
+            # 不属于本池的连接，直接关闭
+            self._close(_PooledConnection(connection))
+            return
+
+        if not discard and self.reset:
+            try:
+                self.reset(connection)
+            except Exception:
+                discard = True
+
+        if discard:
+            self.discarded_count += 1
+            self._close(pooled)
+            return
+
+        pooled.last_used = time.time()
+        with self._condition:
+            self._idle.append(pooled)
+            self._condition.notify()
+
+    @contextmanager
+    def connection(self, timeout: float = 10):
+        """上下文管理器方式借用连接，出现异常时丢弃连接"""
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+        except Exception:
+            self.release(conn, discard=True)
+            raise
+        else:
+            self.release(conn)
+
+    def reap_idle(self) -> int:
+        """关闭空闲超时或超过最大存活时间的连接，返回关闭数量"""
+        now = time.time()
+        expired: List[_PooledConnection] = []
+        with self._condition:
+            keep: Deque[_PooledConnection] = deque()
+            for pooled in self._idle:
+                if now - pooled.last_used > self.idle_timeout or now - pooled.created_at > self.max_lifetime:
+                    expired.append(pooled)
+                else:
+                    keep.append(pooled)
+            self._idle = keep
+        for pooled in expired:
+            self._close(pooled)
+        self.discarded_count += len(expired)
+        return len(expired)
+
+    def close_all(self):
+        """关闭所有空闲连接（借出中的连接归还时关闭）"""
+        with self._condition:
+            idle = list(self._idle)
+            self._idle.clear()
+        for pooled in idle:
+            self._close(pooled)
+
+    def stats(self) -> Dict[str, Any]:
+        """连接池使用指标"""
+        with self._condition:
+            in_use = sum(1 for pooled in self._in_use.values() if pooled is not None)
+            idle = len(self._idle)
+        return {
+            'name': self.name,
+            'kind': 'database',
+            'max_size': self.max_size,
+            'in_use': in_use,
+            'idle': idle,
+            'created': self.created_count,
+            'reused': self.reused_count,
+            'discarded': self.discarded_count,
+            'health_check_failures': self.health_check_failures,
+            'waits': self.wait_count,
+            'timeouts': self.timeout_count,
+            'last_used': self.last_used,
+        }
+
+
+class ConnectionPoolRegistry:
+    """按目标注册的连接池中心（进程内单例）"""
+
+    def __init__(self, reap_interval: float = 30, pool_idle_timeout: float = 600):
+        """
+        :param reap_interval: 清理线程运行间隔（秒）
+        :param pool_idle_timeout: 整个连接池长时间无人使用时关闭其全部空闲连接（秒）
+        """
+        self.reap_interval = reap_interval
+        self.pool_idle_timeout = pool_idle_timeout
+        self._pools: Dict[str, ConnectionPool] = {}
+        self._redis_pools: Dict[str, Any] = {}
+        self._redis_meta: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._reaper: Optional[threading.Thread] = None
+
+    @staticmethod
+    def build_key(kind: str, host: str, port: Any, user: str, password: Optional[str], database: Any) -> str:
+        """生成连接池键（密码只以摘要形式参与）"""
+        password_digest = hashlib.sha256((password or '').encode('utf-8')).hexdigest()[:12]
+        return f"{kind}://{user or ''}@{host}:{port}/{database}#{password_digest}"
+
+    def get_pool(self, key: str, name: str, factory: Callable[[], Any], **options) -> ConnectionPool:
+        """获取或创建数据库连接池"""
+        pool = self._pools.get(key)
+        if pool is None:
+            with self._lock:
+                pool = self._pools.get(key)
+                if pool is None:
+                    pool = ConnectionPool(name, factory, **options)
+                    self._pools[key] = pool
+                    logger.info(f"已创建监控连接池: {name}")
+            self._ensure_reaper()
+        return pool
+
+    def get_redis_pool(self, host: str, port: int, password: Optional[str], db: int,
+                       max_connections: int = 10, health_check_interval: int = 30, timeout: float = 10):
+        """
+        获取或创建 redis-py 阻塞连接池
+
+        池满时最多等待 timeout 秒，超时后 redis-py 抛出 ConnectionError("No connection available.")
+        """
+        import redis
+
+        key = self.build_key('redis', host, port, '', password, db)
+        pool = self._redis_pools.get(key)
+        if pool is None:
+            with self._lock:
+                pool = self._redis_pools.get(key)
+                if pool is None:
+                    pool = redis.BlockingConnectionPool(
+                        host=host,
+                        port=port,
+                        password=password,
+                        db=db,
+                        decode_responses=True,
+                        socket_timeout=5,
+                        socket_connect_timeout=5,
+                        max_connections=max_connections,
+                        timeout=timeout,
+                        health_check_interval=health_check_interval,
+                    )
+                    self._redis_pools[key] = pool
+                    self._redis_meta[key] = {'name': f"redis://{host}:{port}/{db}", 'last_used': time.time()}
+                    logger.info(f"已创建Redis监控连接池: redis://{host}:{port}/{db}")
+            self._ensure_reaper()
+        self._redis_meta[key]['last_used'] = time.time()
+        return pool
+
+    def _ensure_reaper(self):
+        """启动后台清理线程"""
+        if self._reaper is not None and self._reaper.is_alive():
+            return
+        with self._lock:
+            if self._reaper is None or not self._reaper.is_alive():
+                self._reaper = threading.Thread(
+                    target=self._reap_loop, name='monitor-pool-reaper', daemon=True
+                )
+                self._reaper.start()
+
+    def _reap_loop(self):
+        while True:
+            time.sleep(self.reap_interval)
+            try:
+                self.reap()
+            except Exception as e:
+                logger.error(f"清理监控连接池失败: {e}")
+
+    def reap(self):
+        """关闭空闲超时的连接"""
+        now = time.time()
+        for pool in list(self._pools.values()):
+            closed = pool.reap_idle()
+            if closed:
+                logger.info(f"监控连接池 {pool.name} 关闭空闲连接 {closed} 个")
+        for key, pool in list(self._redis_pools.items()):
+            meta = self._redis_meta.get(key, {})
+            if now - meta.get('last_used', now) > self.pool_idle_timeout:
+                self._disconnect_idle_redis(pool)
+
+    @staticmethod
+    def _idle_redis_connections(pool) -> List[Any]:
+        """BlockingConnectionPool 队列中的空闲连接（None 为尚未创建的名额）"""
+        with pool.pool.mutex:
+            return [connection for connection in pool.pool.queue if connection is not None]
+
+    @staticmethod
+    def _disconnect_idle_redis(pool):
+        """只断开空闲连接，正在使用的连接不受影响（持有队列锁，断开期间不会被借出）"""
+        with pool.pool.mutex:
+            for connection in pool.pool.queue:
+                if connection is not None:
+                    connection.disconnect()
+
+    def stats(self, kind: Optional[str] = None) -> List[Dict[str, Any]]:
+        """所有连接池的使用指标"""
+        result = []
+        if kind in (None, 'database'):
+            result.extend(pool.stats() for pool in list(self._pools.values()))
+        if kind in (None, 'redis'):
+            for key, pool in list(self._redis_pools.items()):
+                meta = self._redis_meta.get(key, {})
+                created = len(pool._connections)
+                idle = len(self._idle_redis_connections(pool))
+                result.append({
+                    'name': meta.get('name', ''),
+                    'kind': 'redis',
+                    'max_size': pool.max_connections,
+                    'in_use': created - idle,
+                    'idle': idle,
+                    'created': created,
+                    'reused': None,
+                    'discarded': None,
+                    'health_check_failures': None,
+                    'waits': None,
+                    'timeouts': None,
+                    'last_used': meta.get('last_used'),
+                })
+        return result
+
+
+# 全局连接池中心
+pool_registry = ConnectionPoolRegistry()
@@ -5,6 +5,7 @@
 从 User-Agent 字符串中提取浏览器、操作系统、设备类型等信息
 """
 import logging
+from functools import lru_cache
 from typing import Tuple, Optional
 
 logger = logging.getLogger(__name__)
@@ -17,9 +18,10 @@ except ImportError:
     HAS_USER_AGENTS = False
 
 
+@lru_cache(maxsize=4096)
 def extract_device_info(user_agent: str) -> Tuple[Optional[str], Optional[str], Optional[str]]:
     """
-    从 User-Agent 字符串提取浏览器、操作系统、设备类型
+    从 User-Agent 字符串提取浏览器、操作系统、设备类型（按 User-Agent 缓存解析结果，客户端种类有限）
     
     Args:
         user_agent: User-Agent 字符串
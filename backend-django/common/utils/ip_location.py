@@ -0,0 +1,206 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+IP 属地离线查询
+基于本地二进制 IP 段数据库，内存映射加载（每个进程只打开一次），二分查找定位 IP 所在区间，
+热点 IP 的查询结果保存在 LRU 中，无网络依赖
+
+数据库格式（小端序）：
+- 文件头：魔数 b"FUIP"、版本号、IP 段数量、地区数量（各 4 字节）
+- IP 段：按起始地址排序的 (起始IP, 结束IP, 地区序号)，每条 12 字节
+- 地区偏移表：地区数量 + 1 个 4 字节偏移
+- 地区字符串：UTF-8，格式为 "国家|省份|城市|运营商"
+
+数据库由 `python manage.py build_ip_database <csv>` 从 CSV（起始IP,结束IP,地区）生成
+"""
+import bisect
+import ipaddress
+import logging
+import mmap
+import os
+import socket
+import struct
+import threading
+from functools import lru_cache
+from typing import Iterable, Optional, Tuple
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"FUIP"
+VERSION = 1
+HEADER = struct.Struct("<4sIII")
+RANGE = struct.Struct("<III")
+OFFSET = struct.Struct("<I")
+IPV4 = struct.Struct("!I")
+
+# 内网/保留地址的属地
+LOCAL_REGION = "内网IP"
+# IPv4 内网/回环/链路本地/保留地址段（含运营商级 NAT 共享地址 100.64.0.0/10）
+LOCAL_NETWORKS = tuple(
+    (int(network.network_address), int(network.broadcast_address))
+    for network in map(ipaddress.ip_network, (
+        "0.0.0.0/8", "10.0.0.0/8", "100.64.0.0/10", "127.0.0.0/8", "169.254.0.0/16", "172.16.0.0/12",
+        "192.0.0.0/24", "192.0.2.0/24", "192.168.0.0/16", "198.18.0.0/15", "198.51.100.0/24",
+        "203.0.113.0/24", "240.0.0.0/4",
+    ))
+)
+
+
+def _ip_to_int(ip: str) -> Optional[int]:
+    try:
+        return IPV4.unpack(socket.inet_aton(ip))[0] if ip.count(".") == 3 else _parse_ip(ip)
+    except OSError:
+        return _parse_ip(ip)
+
+
+def _parse_ip(ip: str) -> Optional[int]:
+    try:
+        address = ipaddress.ip_address(ip)
+    except ValueError:
+        return None
+    if address.version == 6:
+        mapped = address.ipv4_mapped
+        if mapped is None:
+            return None
+        address = mapped
+    return int(address)
+
+
+def build_ip_database(ranges: Iterable[Tuple[str, str, str]], path: str) -> int:
+    """
+    生成 IP 段数据库
+
+    :param ranges: (起始IP, 结束IP, 地区) 序列
+    :param path: 输出文件路径
+    :return: 写入的 IP 段数量
+    """
+    regions = {}
+    records = []
+    for start_ip, end_ip, region in ranges:
+        start, end = _ip_to_int(start_ip), _ip_to_int(end_ip)
+        if start is None or end is None or start > end:
+            continue
+        records.append((start, end, regions.setdefault(region, len(regions))))
+    records.sort()
+
+    encoded = [region.encode("utf-8") for region in sorted(regions, key=regions.get)]
+    offsets, position = [], 0
+    for item in encoded:
+        offsets.append(position)
+        position += len(item)
+    offsets.append(position)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(records), len(encoded)))
+        for record in records:
+            f.write(RANGE.pack(*record))
+        for offset in offsets:
+            f.write(OFFSET.pack(offset))
+        for item in encoded:
+            f.write(item)
+    # 原子替换，正在读取旧文件的进程不受影响
+    os.replace(tmp_path, path)
+    return len(records)
+
+
+class IpLocator:
+    """IP 段数据库查询器"""
+
+    def __init__(self, path: str, cache_size: int = 10000):
+        self.path = path
+        with open(path, "rb") as f:
+            self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.range_count, self.region_count = HEADER.unpack_from(self._data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"IP 数据库格式不正确: {path}")
+        self._ranges_offset = HEADER.size
+        self._offsets_offset = self._ranges_offset + self.range_count * RANGE.size
+        self._strings_offset = self._offsets_offset + (self.region_count + 1) * OFFSET.size
+        # 区间表按 3 个 uint32 一组排列，步长为 3 的视图即起始地址数组，直接在内存映射上二分查找
+        self._ranges = memoryview(self._data)[self._ranges_offset:self._offsets_offset].cast("I")
+        self._starts = self._ranges[::3]
+        self.lookup = lru_cache(maxsize=cache_size)(self._lookup)
+
+    def _region(self, index: int) -> str:
+        start, end = struct.unpack_from("<II", self._data, self._offsets_offset + index * OFFSET.size)
+        return self._data[self._strings_offset + start:self._strings_offset + end].decode("utf-8")
+
+    def _lookup(self, ip: str) -> str:
+        """查询地区字符串，内网地址返回 LOCAL_REGION，未收录返回空字符串"""
+        value = _ip_to_int(ip)
+        if value is None:
+            return LOCAL_REGION if _is_local(ip) else ""
+        if _is_local(ip, value):
+            return LOCAL_REGION
+        position = bisect.bisect_right(self._starts, value) - 1
+        if position < 0:
+            return ""
+        _, end, region_index = RANGE.unpack_from(self._data, self._ranges_offset + position * RANGE.size)
+        if value > end:
+            return ""
+        return self._region(region_index)
+
+    def close(self):
+        self._starts.release()
+        self._ranges.release()
+        self._data.close()
+
+
+_locator: Optional[IpLocator] = None
+_locator_loaded = False
+_lock = threading.Lock()
+
+
+def get_ip_locator() -> Optional[IpLocator]:
+    """进程内单例，数据库不存在时返回 None"""
+    global _locator, _locator_loaded
+    if _locator_loaded:
+        return _locator
+    with _lock:
+        if not _locator_loaded:
+            path = str(getattr(settings, "IP_LOCATION_DB", ""))
+            if path and os.path.exists(path):
+                try:
+                    _locator = IpLocator(path, getattr(settings, "IP_LOCATION_CACHE_SIZE", 10000))
+                except (OSError, ValueError) as e:
+                    logger.error(f"加载 IP 数据库失败: {e}")
+            else:
+                logger.warning(f"IP 数据库不存在，IP 属地将为空: {path}")
+            _locator_loaded = True
+    return _locator
+
+
+def _is_local(ip: str, value: Optional[int] = None) -> bool:
+    if value is not None:
+        return any(start <= value <= end for start, end in LOCAL_NETWORKS)
+    try:
+        address = ipaddress.ip_address(ip)
+    except ValueError:
+        return False
+    return address.is_private or address.is_loopback or address.is_link_local
+
+
+def lookup_region(ip: Optional[str]) -> str:
+    """IP 地区字符串（国家|省份|城市|运营商），未知返回空字符串"""
+    if not ip or ip == "unknown":
+        return ""
+    locator = get_ip_locator()
+    if locator is None:
+        return LOCAL_REGION if _is_local(ip) else ""
+    return locator.lookup(ip)
+
+
+def get_ip_location(ip: Optional[str]) -> str:
+    """
+    IP 属地显示文本，例如 "中国 广东省 深圳市"
+    省略空字段和 0 占位字段，运营商不显示
+    """
+    region = lookup_region(ip)
+    if not region or region == LOCAL_REGION:
+        return region
+    parts = [part for part in region.split("|")[:3] if part and part != "0"]
+    # 去除重复（例如直辖市的省份与城市相同）
+    return " ".join(dict.fromkeys(parts))
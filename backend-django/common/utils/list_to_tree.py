@@ -4,32 +4,120 @@
 # @File    : list_to_tree.py
 # @Software: PyCharm
 # @qq: 939589097
-import re
-
-
-
-def add_node(p, node):
-    # ⼦节点list
-    p["children"] = []
-    for n in node:
-        if n.get("parent_id") == p.get("id"):
-            p["children"].append(n)
-    # 递归⼦节点，查找⼦节点的节点
-    for t in p["children"]:
-        if not t.get("children"):
-            t["children"] = []
-        t["children"].append(add_node(t, node))
-    # 退出递归的条件
-    if len(p["children"]) == 0:
-        p.pop('children')
-        p["choice"] = 1
-        return
+from typing import Any, Callable, Iterable, List, Optional, Union
+
+# 菜单 meta 字段
+ROUTE_META_FIELDS = (
+    'activeIcon', 'activePath', 'affixTab', 'affixTabOrder', 'badge',
+    'badgeType', 'badgeVariants', 'hideChildrenInMenu', 'hideInBreadcrumb',
+    'hideInMenu', 'hideInTab', 'icon', 'iframeSrc', 'keepAlive',
+    'link', 'maxNumOfOpenTab', 'noBasicLayout', 'openInNewWindow',
+    'order', 'query', 'title'
+)
+
+
+def _get(item, key: str):
+    if isinstance(item, dict):
+        return item.get(key)
+    return getattr(item, key, None)
+
+
+def _set(item, key: str, value):
+    if isinstance(item, dict):
+        item[key] = value
+    else:
+        setattr(item, key, value)
+
+
+def _node_id(value) -> Optional[str]:
+    """统一 ID 类型（UUID/int/str 混用时也能匹配）"""
+    return None if value is None else str(value)
+
+
+def build_tree(
+        items: Iterable[Any],
+        id_key: str = 'id',
+        parent_key: str = 'parent_id',
+        children_key: str = 'children',
+        sort_key: Union[str, Callable[[Any], Any], None] = None,
+        reverse: bool = False,
+        root_id: Any = None,
+        exclude_id: Any = None,
+        max_depth: Optional[int] = None,
+        keep_empty_children: bool = False,
+        on_node: Optional[Callable[[Any, list], None]] = None,
+) -> List[Any]:
+    """
+    通用树构建（字典或对象均可）
+
+    一次遍历建立 ID → 子节点索引，再从根节点迭代展开，时间复杂度 O(n)，不受递归深度限制
+
+    :param items: 节点列表
+    :param id_key: ID 字段
+    :param parent_key: 父节点 ID 字段；父节点为空或不在列表中的节点作为根节点
+    :param children_key: 子节点列表写入的字段
+    :param sort_key: 同级节点排序字段或函数（稳定排序，空值按 0 处理），为空时保持输入顺序
+    :param reverse: 是否倒序
+    :param root_id: 只返回以该节点为根的子树
+    :param exclude_id: 排除该节点及其全部子孙
+    :param max_depth: 最大层数（根节点为第 1 层），超出的子节点不再展开
+    :param keep_empty_children: 叶子节点是否保留空的子节点列表
+    :param on_node: 节点挂载子节点后的回调 on_node(node, children)
+    :return: 根节点列表
+    """
+    items = list(items)
+    index = {}
+    for item in items:
+        index[_node_id(_get(item, id_key))] = item
+
+    roots = []
+    children_map = {}
+    for item in items:
+        node_id = _node_id(_get(item, id_key))
+        parent_id = _node_id(_get(item, parent_key))
+        if parent_id is None or parent_id == node_id or parent_id not in index:
+            roots.append(item)
+        else:
+            children_map.setdefault(parent_id, []).append(item)
+
+    if isinstance(sort_key, str):
+        field = sort_key
+        sort_key = lambda node: _get(node, field) or 0  # noqa: E731
+
+    def arrange(nodes: list) -> list:
+        if exclude_id is not None:
+            nodes = [node for node in nodes if _node_id(_get(node, id_key)) != _node_id(exclude_id)]
+        if sort_key is not None:
+            nodes = sorted(nodes, key=sort_key, reverse=reverse)
+        return nodes
+
+    if root_id is not None:
+        root = index.get(_node_id(root_id))
+        roots = [root] if root is not None else []
+    roots = arrange(roots)
+
+    stack = [(node, 1) for node in reversed(roots)]
+    while stack:
+        node, depth = stack.pop()
+        children = []
+        if max_depth is None or depth < max_depth:
+            children = arrange(children_map.get(_node_id(_get(node, id_key)), []))
+        if children or keep_empty_children:
+            _set(node, children_key, children)
+        elif isinstance(node, dict):
+            node.pop(children_key, None)
+        if on_node is not None:
+            on_node(node, children)
+        stack.extend((child, depth + 1) for child in reversed(children))
+    return roots
+
+
+def _mark_choice(node: dict, children: list):
+    # 叶子节点 choice=1
+    node["choice"] = 0 if children else 1
 
 
 def list_to_route(data):
-    root = []
-    node = []
-    # 初始化数据，获取根节点和其他子节点list
     for d in data:
         d['meta'] = {
             'title': d.pop('title'),
@@ -40,74 +128,23 @@ def list_to_route(data):
         }
         if d.get("type") == 2:
             d["meta"]["frameSrc"] = d.pop("frame_src")
+    return build_tree(data, on_node=_mark_choice)
 
-        d["choice"] = 0
-        if d.get("parent_id") is None:
-            root.append(d)
-        else:
-            node.append(d)
-    # print("root----",root)
-    # print("node----",node)
-    # 查找子节点
-    for p in root:
-        add_node(p, node)
-    # 无子节点
-    if len(root) == 0:
-        return node
-
-    return root
-
-
-def list_to_tree(data):
-    root = []
-    node = []
-    # 初始化数据，获取根节点和其他子节点list
-
-    for d in data:
-        d["choice"] = 0
-        if d.get("parent_id") is None:
-            root.append(d)
-        else:
-            node.append(d)
-    # print("root----",root)
-    # print("node----",node)
-    # 查找子节点
-    for p in root:
-        add_node(p, node)
-    # 无子节点
-    if len(root) == 0:
-        return node
 
-    return root
+def list_to_tree(data, sort_key=None, max_depth=None):
+    return build_tree(data, sort_key=sort_key, max_depth=max_depth, on_node=_mark_choice)
 
 
 def list_to_route_v5(menus: list) -> list:
     """
     从菜单列表构建菜单树（已读取所有菜单数据的情况）
     """
-
-    # 创建 ID 到菜单数据的映射
-    menu_map = {menu['id']: menu for menu in menus}
-
-    # 构建树结构
-    root_menus = []
+    # 先按 parent_id 建树（下面会移除 *_id 字段）
+    root_menus = build_tree(menus, sort_key='order')
 
     for menu in menus:
-        pid = menu['parent_id']
-
         # 添加 meta 字段
-        meta = {}
-        for field in [
-            'activeIcon', 'activePath', 'affixTab', 'affixTabOrder', 'badge',
-            'badgeType', 'badgeVariants', 'hideChildrenInMenu', 'hideInBreadcrumb',
-            'hideInMenu', 'hideInTab', 'icon', 'iframeSrc', 'keepAlive',
-            'link', 'maxNumOfOpenTab', 'noBasicLayout', 'openInNewWindow',
-            'order', 'query', 'title'
-        ]:
-            if field in menu and menu[field] is not None:
-                meta[field] = menu[field]
-
-
+        meta = {field: menu[field] for field in ROUTE_META_FIELDS if menu.get(field) is not None}
         if meta:
             menu['meta'] = meta
 
@@ -116,24 +153,4 @@ def list_to_route_v5(menus: list) -> list:
             if key.endswith('_id') and key != 'id' and key != 'parentId':
                 menu.pop(key)
 
-        # 找到父节点
-        if pid in menu_map:
-            parent = menu_map[pid]
-            if 'children' not in parent:
-                parent['children'] = []
-            parent['children'].append(menu)
-        else:
-            # 根节点
-            root_menus.append(menu)
-
-    # 对子菜单排序
-    def sort_children(node):
-        if 'children' in node:
-            node['children'].sort(key=lambda x: x.get('order', 0))
-            for child in node['children']:
-                sort_children(child)
-
-    for root in root_menus:
-        sort_children(root)
-
-    return root_menus
\ No newline at end of file
+    return root_menus
@@ -3,11 +3,11 @@ Request工具类
 """
 import json
 
-import requests
 from django.conf import settings
 from django.urls.resolvers import ResolverMatch
 from user_agents import parse
 from common.fu_auth import get_user_by_token
+from common.utils.ip_location import LOCAL_REGION, lookup_region
 
 def get_request_ip(request):
     """
@@ -193,13 +193,13 @@ def get_ip_analysis(ip):
         "longitude": "",
         "latitude": ""
     }
-    if ip != 'unknown' and ip:
-        if getattr(settings, 'ENABLE_LOGIN_ANALYSIS_LOG', True):
-            res = requests.get(url='https://ip.django-vue-admin.com/ip/analysis', params={"ip": ip}, verify=False)
-
-            if res.status_code == 200:
-                res_data = res.json()
-                if res_data.get('code') == 0:
-                    data = res_data.get('data')
-            return data
+    if getattr(settings, 'ENABLE_LOGIN_ANALYSIS_LOG', True):
+        region = lookup_region(ip)
+        if region == LOCAL_REGION:
+            data["country"] = region
+        elif region:
+            # 地区字符串格式：国家|省份|城市|运营商
+            fields = (region.split("|") + [""] * 4)[:4]
+            fields = ["" if field == "0" else field for field in fields]
+            data["country"], data["province"], data["city"], data["isp"] = fields
     return data
@@ -19,9 +19,8 @@ from common.fu_auth import (
     TokenBlacklist
 )
 from common.fu_crud import get_or_none
-from common.utils.device_util import extract_device_info
 from core.user.user_model import User
-from core.login_log.login_log_service import LoginLogService
+from core.login_log.login_log_recorder import login_log_recorder
 
 logger = logging.getLogger(__name__)
 
@@ -61,16 +60,13 @@ class AuthService:
         is_allowed, message = LoginAttemptProtection.check_login_attempt(identifier, ip_address)
         if not is_allowed:
             # 记录被限制的登录尝试
-            try:
-                LoginLogService.record_failed_login(
-                    username=login_username,
-                    login_ip=ip_address,
-                    failure_reason=7,  # 其他错误
-                    failure_message="登录尝试过于频繁，已被限制",
-                    user_agent=user_agent,
-                )
-            except Exception as e:
-                logger.warning(f"记录被限制登录失败: {str(e)}")
+            login_log_recorder.record_failure(
+                username=login_username,
+                login_ip=ip_address,
+                failure_reason=7,  # 其他错误
+                failure_message="登录尝试过于频繁，已被限制",
+                user_agent=user_agent,
+            )
             raise ValueError(message)
         
         # 查找用户
@@ -83,89 +79,70 @@ class AuthService:
         if user is None:
             LoginAttemptProtection.record_login_failure(identifier, ip_address)
             # 记录失败登录：用户不存在
-            try:
-                LoginLogService.record_failed_login(
-                    username=login_username,
-                    login_ip=ip_address,
-                    failure_reason=1,  # 用户不存在
-                    failure_message="用户不存在",
-                    user_agent=user_agent,
-                )
-            except Exception as e:
-                logger.warning(f"记录登录失败日志出错: {str(e)}")
+            login_log_recorder.record_failure(
+                username=login_username,
+                login_ip=ip_address,
+                failure_reason=1,  # 用户不存在
+                failure_message="用户不存在",
+                user_agent=user_agent,
+            )
             raise ValueError("用户名或密码错误")
         
         # 账户被禁用
         if not user.is_active:
             LoginAttemptProtection.record_login_failure(identifier, ip_address)
             # 记录失败登录：用户不激活
-            try:
-                LoginLogService.record_failed_login(
-                    username=login_username,
-                    login_ip=ip_address,
-                    failure_reason=5,  # 用户不激活
-                    failure_message="账户已被禁用",
-                    user_agent=user_agent,
-                )
-            except Exception as e:
-                logger.warning(f"记录登录失败日志出错: {str(e)}")
+            login_log_recorder.record_failure(
+                username=login_username,
+                login_ip=ip_address,
+                failure_reason=5,  # 用户不激活
+                failure_message="账户已被禁用",
+                user_agent=user_agent,
+            )
             raise ValueError("账户已被禁用")
         
         # 检查用户状态（禁用、锁定）
         if user.user_status == 0:  # 禁用
             LoginAttemptProtection.record_login_failure(identifier, ip_address)
             # 记录失败登录：用户已禁用
-            try:
-                LoginLogService.record_failed_login(
-                    username=login_username,
-                    login_ip=ip_address,
-                    failure_reason=3,  # 用户已禁用
-                    failure_message="用户已禁用",
-                    user_agent=user_agent,
-                )
-            except Exception as e:
-                logger.warning(f"记录登录失败日志出错: {str(e)}")
+            login_log_recorder.record_failure(
+                username=login_username,
+                login_ip=ip_address,
+                failure_reason=3,  # 用户已禁用
+                failure_message="用户已禁用",
+                user_agent=user_agent,
+            )
             raise ValueError("账户已被禁用")
         
         if user.user_status == 2:  # 锁定
             LoginAttemptProtection.record_login_failure(identifier, ip_address)
             # 记录失败登录：用户已锁定
-            try:
-                LoginLogService.record_failed_login(
-                    username=login_username,
-                    login_ip=ip_address,
-                    failure_reason=4,  # 用户已锁定
-                    failure_message="用户已锁定",
-                    user_agent=user_agent,
-                )
-            except Exception as e:
-                logger.warning(f"记录登录失败日志出错: {str(e)}")
+            login_log_recorder.record_failure(
+                username=login_username,
+                login_ip=ip_address,
+                failure_reason=4,  # 用户已锁定
+                failure_message="用户已锁定",
+                user_agent=user_agent,
+            )
             raise ValueError("账户已被锁定，请联系管理员")
         
         # 密码错误
         if not user.check_password(password):
-            LoginAttemptProtection.record_login_failure(identifier, ip_address)
+            failures = LoginAttemptProtection.record_login_failure(identifier, ip_address)
+            # 检查是否应该锁定账户（防止暴力破解）
+            if failures >= LoginAttemptProtection.USER_LOCK_THRESHOLD:
+                user.user_status = 2  # 锁定用户
+                user.save(update_fields=['user_status'])
+                TokenBlacklist.revoke_user_tokens(str(user.id))
+                logger.warning(f"用户 {login_username} 因多次失败登录已被锁定")
             # 记录失败登录：密码错误
-            try:
-                LoginLogService.record_failed_login(
-                    username=login_username,
-                    login_ip=ip_address,
-                    failure_reason=2,  # 密码错误
-                    failure_message="密码验证失败",
-                    user_agent=user_agent,
-                )
-                
-                # 检查是否应该锁定账户（防止暴力破解）
-                if LoginLogService.check_user_locked(
-                    username=login_username,
-                    failed_threshold=5,
-                    hours=1
-                ):
-                    user.user_status = 2  # 锁定用户
-                    user.save(update_fields=['user_status'])
-                    logger.warning(f"用户 {login_username} 因多次失败登录已被锁定")
-            except Exception as e:
-                logger.warning(f"记录登录失败日志出错: {str(e)}")
+            login_log_recorder.record_failure(
+                username=login_username,
+                login_ip=ip_address,
+                failure_reason=2,  # 密码错误
+                failure_message="密码验证失败",
+                user_agent=user_agent,
+            )
             raise ValueError("用户名或密码错误")
         
         # 认证成功，清除失败记录
@@ -211,29 +188,17 @@ class AuthService:
             user_agent: 用户代理字符串
             login_type: 登录方式 (password/code/qrcode/gitee/github/qq/google/wechat/microsoft)
         """
-        try:
-            # 提取设备信息
-            browser_type, os_type, device_type = extract_device_info(user_agent)
-            
-            # 记录成功登录到登录日志系统
-            LoginLogService.record_success_login(
-                username=username,
-                user_id=str(user.id),
-                login_ip=ip_address,
-                user_agent=user_agent,
-                browser_type=browser_type,
-                os_type=os_type,
-                device_type=device_type,
-                login_type=login_type,  # 传递登录方式
-            )
-            
-            # 更新用户最后登录时间、IP 和登录方式
-            user.last_login = timezone.now()
-            user.last_login_ip = ip_address
-            user.last_login_type = login_type
-            user.save(update_fields=['last_login', 'last_login_ip', 'last_login_type'])
-        except Exception as e:
-            logger.warning(f"记录登录会话失败: {str(e)}")
+        # 登录日志和最后登录信息由后台线程批量写入，不阻塞登录请求
+        login_log_recorder.record_success(
+            username=username,
+            user_id=str(user.id),
+            login_ip=ip_address,
+            user_agent=user_agent,
+            login_type=login_type,  # 传递登录方式
+        )
+        user.last_login = timezone.now()
+        user.last_login_ip = ip_address
+        user.last_login_type = login_type
     
     @staticmethod
     def refresh_access_token(request) -> Tuple[User, str, str, int]:
@@ -318,7 +283,7 @@ class AuthService:
                 exp_time = payload.get('exp', 0)
 
                 # 将 token 加入黑名单
-                TokenBlacklist.add_to_blacklist(token, user_id, exp_time)
+                TokenBlacklist.add_to_blacklist(token, user_id, exp_time, payload)
                 logger.info(f"用户 {user_id} 的令牌已加入黑名单")
             except jwt.ExpiredSignatureError:
                 logger.info(f"用户 {user_id} 的令牌已过期")
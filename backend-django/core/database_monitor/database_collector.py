@@ -9,6 +9,9 @@ import time
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any, Union
 import logging
+import threading
+
+from common.utils.connection_pool import pool_registry
 
 logger = logging.getLogger(__name__)
 
@@ -58,43 +61,131 @@ def serialize_data(data: Any) -> Any:
         return data
 
 
+class _SectionCache:
+    """按 (目标, 数据段) 缓存的慢变化采集结果，进程内共享"""
+    
+    def __init__(self):
+        self._data: Dict[Any, Any] = {}
+        self._lock = threading.Lock()
+    
+    def get(self, key) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+        if item is None or item[0] < time.time():
+            return None
+        return item[1]
+    
+    def set(self, key, value: Any, ttl: float):
+        with self._lock:
+            self._data[key] = (time.time() + ttl, value)
+
+
+_section_cache = _SectionCache()
+
+
 class DatabaseCollector:
     """数据库信息收集器基类"""
     
+    SUPPORTED_TYPES = ('POSTGRESQL', 'MYSQL', 'SQLSERVER')
+    
+    # 各数据段的刷新周期（秒），未列出的连接数、性能计数器每次采集都实时查询
+    SECTION_TTL = {
+        'static': 600,       # 版本、时区、字符集、最大连接数、启动时间
+        'size': 30,          # 数据库大小
+        'tablespaces': 300,  # 表空间大小
+        'tables': 120,       # 表统计
+    }
+    
     def __init__(self, db_type: str, host: str, port: int, 
-                 user: str, password: str, database: str, **kwargs):
+                 user: str, password: str, database: str, use_pool: bool = True, **kwargs):
         self.db_type = db_type.upper()
         self.host = host
         self.port = port
         self.user = user
         self.password = password
         self.database = database
+        self.use_pool = use_pool
         self.kwargs = kwargs
         self.connection = None
+        # 当前连接是否借自连接池（决定 disconnect 时归还还是关闭）
+        self._connection_pooled = False
+        # 本次采集的动态指标快照，disconnect 时清空
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._target_key = pool_registry.build_key(
+            self.db_type.lower(), host, port, user, password, database
+        )
         
-    def connect(self) -> bool:
-        """连接数据库"""
+    def connect(self, use_pool: Optional[bool] = None) -> bool:
+        """
+        连接数据库
+        
+        默认从按目标共享的连接池借用长连接，disconnect 时归还；use_pool=False 时建立独立连接。
+        """
+        if self.connection is not None:
+            return True
+        if self.db_type not in self.SUPPORTED_TYPES:
+            logger.error(f"Unsupported database type: {self.db_type}")
+            return False
+        
+        use_pool = self.use_pool if use_pool is None else use_pool
         try:
-            if self.db_type == 'POSTGRESQL':
-                return self._connect_postgresql()
-            elif self.db_type == 'MYSQL':
-                return self._connect_mysql()
-            elif self.db_type == 'SQLSERVER':
-                return self._connect_sqlserver()
+            if use_pool:
+                self.connection = self._get_pool().acquire()
             else:
-                logger.error(f"Unsupported database type: {self.db_type}")
-                return False
+                self.connection = self._create_connection()
+            self._connection_pooled = use_pool
+            return True
         except Exception as e:
             logger.error(f"Failed to connect to {self.db_type} database: {e}")
+            self.connection = None
+            return False
+    
+    def _get_pool(self):
+        """获取当前目标的连接池"""
+        return pool_registry.get_pool(
+            self._target_key,
+            name=f"{self.db_type.lower()}://{self.user}@{self.host}:{self.port}/{self.database}",
+            factory=self._create_connection,
+            health_check=self._check_connection,
+            reset=self._reset_connection,
+        )
+    
+    def _create_connection(self):
+        """创建一个新的数据库连接"""
+        if self.db_type == 'POSTGRESQL':
+            return self._connect_postgresql()
+        elif self.db_type == 'MYSQL':
+            return self._connect_mysql()
+        elif self.db_type == 'SQLSERVER':
+            return self._connect_sqlserver()
+        raise ValueError(f"Unsupported database type: {self.db_type}")
+    
+    def _check_connection(self, connection) -> bool:
+        """连接池健康检查"""
+        if self.db_type == 'POSTGRESQL' and connection.closed:
             return False
+        if self.db_type == 'MYSQL':
+            connection.ping(reconnect=False)
+            return True
+        cursor = connection.cursor()
+        try:
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+        finally:
+            cursor.close()
+        return True
+    
+    @staticmethod
+    def _reset_connection(connection):
+        """归还连接池前结束未提交的事务，避免下次使用时处于失败事务中"""
+        connection.rollback()
     
-    def _connect_postgresql(self) -> bool:
+    def _connect_postgresql(self):
         """连接PostgreSQL"""
         if not PSYCOPG2_AVAILABLE:
-            logger.error("psycopg2 not available")
-            return False
+            raise RuntimeError("psycopg2 not available")
         
-        self.connection = psycopg2.connect(
+        return psycopg2.connect(
             host=self.host,
             port=self.port,
             user=self.user,
@@ -102,15 +193,13 @@ class DatabaseCollector:
             database=self.database,
             connect_timeout=5
         )
-        return True
     
-    def _connect_mysql(self) -> bool:
+    def _connect_mysql(self):
         """连接MySQL"""
         if not PYMYSQL_AVAILABLE:
-            logger.error("pymysql not available")
-            return False
+            raise RuntimeError("pymysql not available")
         
-        self.connection = pymysql.connect(
+        return pymysql.connect(
             host=self.host,
             port=self.port,
             user=self.user,
@@ -119,13 +208,11 @@ class DatabaseCollector:
             charset='utf8mb4',
             connect_timeout=5
         )
-        return True
     
-    def _connect_sqlserver(self) -> bool:
+    def _connect_sqlserver(self):
         """连接SQL Server"""
         if not PYODBC_AVAILABLE:
-            logger.error("pyodbc not available")
-            return False
+            raise RuntimeError("pyodbc not available")
         
         connection_string = (
             f"DRIVER={{ODBC Driver 17 for SQL Server}};"
@@ -135,24 +222,29 @@ class DatabaseCollector:
             f"PWD={self.password};"
             f"Timeout=5;"
         )
-        self.connection = pyodbc.connect(connection_string)
-        return True
+        return pyodbc.connect(connection_string)
     
-    def disconnect(self):
-        """断开连接"""
+    def disconnect(self, discard: bool = False):
+        """断开连接（借自连接池的连接归还到池中，discard=True 时直接关闭）"""
         if self.connection:
             try:
-                self.connection.close()
+                if self._connection_pooled:
+                    self._get_pool().release(self.connection, discard=discard)
+                else:
+                    self.connection.close()
             except Exception as e:
                 logger.error(f"Error disconnecting from database: {e}")
             finally:
                 self.connection = None
+                self._connection_pooled = False
+        self._snapshot = None
     
     def test_connection(self) -> Dict[str, Any]:
         """测试数据库连接"""
         start_time = time.time()
         try:
-            if self.connect():
+            # 测试连接使用独立连接，真实反映建连耗时
+            if self.connect(use_pool=False):
                 response_time = (time.time() - start_time) * 1000
                 version = self._get_version()
                 self.disconnect()
@@ -198,6 +290,177 @@ class DatabaseCollector:
             logger.error(f"Error getting database version: {e}")
             return 'Unknown'
     
+    def _cached_section(self, section: str, loader):
+        """按数据段刷新周期缓存查询结果，周期内直接复用"""
+        cache_key = (self._target_key, section)
+        value = _section_cache.get(cache_key)
+        if value is None:
+            value = loader()
+            _section_cache.set(cache_key, value, self.SECTION_TTL[section])
+        return value
+    
+    def _get_snapshot(self) -> Dict[str, Any]:
+        """
+        获取本次采集的动态指标快照
+        
+        每个引擎用一次组合查询取回连接数和性能计数器，同一次采集中的连接信息、性能统计共用该快照。
+        """
+        if self._snapshot is None:
+            if self.db_type == 'POSTGRESQL':
+                self._snapshot = self._query_postgresql_snapshot()
+            elif self.db_type == 'MYSQL':
+                self._snapshot = self._query_mysql_snapshot()
+            elif self.db_type == 'SQLSERVER':
+                self._snapshot = self._query_sqlserver_snapshot()
+            else:
+                self._snapshot = {}
+        return self._snapshot
+    
+    def _query_postgresql_snapshot(self) -> Dict[str, Any]:
+        """PostgreSQL动态指标快照（连接、数据库统计、锁、索引合并为一次查询）"""
+        cursor = self.connection.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        cursor.execute("""
+            SELECT 
+                a.total_connections,
+                a.active_connections,
+                a.idle_connections,
+                d.numbackends as total_backends,
+                d.xact_commit as transactions_commit,
+                d.xact_rollback as transactions_rollback,
+                d.blks_read as blocks_read,
+                d.blks_hit as blocks_hit,
+                d.tup_returned as tuples_returned,
+                d.tup_fetched as tuples_fetched,
+                d.tup_inserted as tuples_inserted,
+                d.tup_updated as tuples_updated,
+                d.tup_deleted as tuples_deleted,
+                d.temp_files,
+                d.temp_bytes,
+                d.deadlocks,
+                d.checksum_failures,
+                d.blk_read_time as block_read_time,
+                d.blk_write_time as block_write_time,
+                d.session_time,
+                d.active_time,
+                d.idle_in_transaction_time,
+                (
+                    SELECT json_object_agg(l.mode, l.lock_count)
+                    FROM (
+                        SELECT mode, count(*) as lock_count
+                        FROM pg_locks
+                        WHERE database = d.datid
+                        GROUP BY mode
+                    ) l
+                ) as lock_stats,
+                i.total_index_scans,
+                i.total_index_tuples_read,
+                i.total_index_tuples_fetched
+            FROM pg_stat_database d
+            CROSS JOIN (
+                SELECT 
+                    count(*) as total_connections,
+                    count(*) FILTER (WHERE state = 'active') as active_connections,
+                    count(*) FILTER (WHERE state = 'idle') as idle_connections
+                FROM pg_stat_activity
+            ) a
+            CROSS JOIN (
+                SELECT 
+                    sum(idx_scan) as total_index_scans,
+                    sum(idx_tup_read) as total_index_tuples_read,
+                    sum(idx_tup_fetch) as total_index_tuples_fetched
+                FROM pg_stat_user_indexes
+            ) i
+            WHERE d.datname = %s
+        """, (self.database,))
+        row = cursor.fetchone()
+        return dict(row) if row else {}
+    
+    # MySQL 快照需要的全局状态变量
+    MYSQL_STATUS_VARIABLES = (
+        'Threads_connected', 'Threads_running', 'Uptime', 'Queries', 'Connections',
+        'Slow_queries', 'Bytes_received', 'Bytes_sent',
+        'Innodb_buffer_pool_reads', 'Innodb_buffer_pool_read_requests',
+    )
+    
+    def _query_mysql_snapshot(self) -> Dict[str, Any]:
+        """MySQL动态指标快照（一次 SHOW GLOBAL STATUS 取回所有状态变量）"""
+        cursor = self.connection.cursor()
+        placeholders = ', '.join(['%s'] * len(self.MYSQL_STATUS_VARIABLES))
+        cursor.execute(
+            f"SHOW GLOBAL STATUS WHERE Variable_name IN ({placeholders})",
+            self.MYSQL_STATUS_VARIABLES
+        )
+        status = {name: 0 for name in self.MYSQL_STATUS_VARIABLES}
+        for name, value in cursor.fetchall():
+            try:
+                status[name] = int(value)
+            except (TypeError, ValueError):
+                status[name] = 0
+        return status
+    
+    def _query_sqlserver_snapshot(self) -> Dict[str, Any]:
+        """SQL Server动态指标快照（会话数与性能计数器合并为一次查询）"""
+        cursor = self.connection.cursor()
+        cursor.execute("""
+            SELECT 
+                (SELECT COUNT(*) FROM sys.dm_exec_sessions WHERE is_user_process = 1),
+                (SELECT COUNT(*) FROM sys.dm_exec_requests),
+                (SELECT TOP 1 cntr_value FROM sys.dm_os_performance_counters 
+                 WHERE counter_name = 'Batch Requests/sec'),
+                (SELECT TOP 1 cntr_value FROM sys.dm_os_performance_counters 
+                 WHERE counter_name = 'Page life expectancy'),
+                (SELECT TOP 1 cntr_value FROM sys.dm_os_performance_counters 
+                 WHERE counter_name = 'Buffer cache hit ratio')
+        """)
+        row = cursor.fetchone()
+        return {
+            'total_connections': row[0] or 0,
+            'active_connections': row[1] or 0,
+            'batch_requests': row[2] or 0,
+            'page_life_expectancy': row[3] or 0,
+            'buffer_hit_ratio': row[4] or 0,
+        }
+    
+    def _get_static_facts(self) -> Dict[str, Any]:
+        """获取版本、时区、字符集、最大连接数、启动时间等静态信息（按 static 周期缓存）"""
+        return self._cached_section('static', self._query_static_facts)
+    
+    def _query_static_facts(self) -> Dict[str, Any]:
+        """一次查询取回静态信息，组合查询不受支持时逐项查询"""
+        cursor = self.connection.cursor()
+        try:
+            if self.db_type == 'POSTGRESQL':
+                cursor.execute("""
+                    SELECT version(), current_setting('TimeZone'), pg_encoding_to_char(encoding),
+                           current_setting('max_connections')::int, pg_postmaster_start_time()
+                    FROM pg_database WHERE datname = %s
+                """, (self.database,))
+            elif self.db_type == 'MYSQL':
+                cursor.execute("SELECT VERSION(), @@global.time_zone, @@character_set_database, @@max_connections, NULL")
+            elif self.db_type == 'SQLSERVER':
+                cursor.execute("""
+                    SELECT @@VERSION, CURRENT_TIMEZONE(), CAST(DATABASEPROPERTYEX(DB_NAME(), 'Collation') AS nvarchar(128)),
+                           @@MAX_CONNECTIONS, (SELECT sqlserver_start_time FROM sys.dm_os_sys_info)
+                """)
+            row = cursor.fetchone()
+            return {
+                'version': row[0],
+                'timezone': row[1],
+                'charset': row[2],
+                'max_connections': int(row[3] or 0),
+                'start_time': row[4],
+            }
+        except Exception as e:
+            logger.error(f"Error getting static facts in one query, falling back: {e}")
+            self.connection.rollback()
+            return {
+                'version': self._get_version(),
+                'timezone': self._get_timezone(),
+                'charset': self._get_charset(),
+                'max_connections': self._get_max_connections(),
+                'start_time': None,
+            }
+    
     def get_basic_info(self) -> Dict[str, Any]:
         """获取数据库基本信息"""
         if not self.connection:
@@ -205,57 +468,45 @@ class DatabaseCollector:
                 return {}
         
         try:
+            facts = self._get_static_facts()
             info = {
                 'db_type': self.db_type,
                 'host': self.host,
                 'port': self.port,
                 'database': self.database,
-                'version': self._get_version(),
-                'uptime': self._get_uptime(),
-                'timezone': self._get_timezone(),
-                'charset': self._get_charset(),
+                'version': facts['version'],
+                'uptime': self._get_uptime(facts.get('start_time')),
+                'timezone': facts['timezone'],
+                'charset': facts['charset'],
             }
             return serialize_data(info)
         except Exception as e:
             logger.error(f"Error getting basic info: {e}")
             return {}
     
-    def _get_uptime(self) -> str:
-        """获取数据库运行时间"""
+    def _get_uptime(self, start_time: Optional[datetime] = None) -> str:
+        """获取数据库运行时间（PostgreSQL/SQL Server 使用缓存的启动时间，MySQL 使用快照中的 Uptime）"""
         try:
-            cursor = self.connection.cursor()
-            if self.db_type == 'POSTGRESQL':
-                cursor.execute("SELECT pg_postmaster_start_time()")
-                start_time = cursor.fetchone()[0]
-                # 确保两个datetime都是offset-aware或都是offset-naive
-                from django.utils import timezone
-                current_time = timezone.now()
-                if start_time.tzinfo is None:
-                    start_time = timezone.make_aware(start_time)
-                elif current_time.tzinfo is None:
-                    current_time = timezone.make_aware(current_time)
-                uptime = current_time - start_time
-                return str(uptime)
-            elif self.db_type == 'MYSQL':
-                cursor.execute("SHOW GLOBAL STATUS LIKE 'Uptime'")
-                result = cursor.fetchone()
-                if result:
-                    uptime_seconds = int(result[1])
-                    uptime = timedelta(seconds=uptime_seconds)
-                    return str(uptime)
-            elif self.db_type == 'SQLSERVER':
-                cursor.execute("SELECT sqlserver_start_time FROM sys.dm_os_sys_info")
+            if self.db_type == 'MYSQL':
+                return str(timedelta(seconds=self._get_snapshot().get('Uptime', 0)))
+            if start_time is None:
+                cursor = self.connection.cursor()
+                if self.db_type == 'POSTGRESQL':
+                    cursor.execute("SELECT pg_postmaster_start_time()")
+                elif self.db_type == 'SQLSERVER':
+                    cursor.execute("SELECT sqlserver_start_time FROM sys.dm_os_sys_info")
+                else:
+                    return 'Unknown'
                 start_time = cursor.fetchone()[0]
-                # 确保时区一致性
-                from django.utils import timezone
-                current_time = timezone.now()
-                if start_time.tzinfo is None:
-                    start_time = timezone.make_aware(start_time)
-                elif current_time.tzinfo is None:
-                    current_time = timezone.make_aware(current_time)
-                uptime = current_time - start_time
-                return str(uptime)
-            return 'Unknown'
+            # 确保两个datetime都是offset-aware或都是offset-naive
+            from django.utils import timezone
+            current_time = timezone.now()
+            if start_time.tzinfo is None:
+                start_time = timezone.make_aware(start_time)
+            elif current_time.tzinfo is None:
+                current_time = timezone.make_aware(current_time)
+            uptime = current_time - start_time
+            return str(uptime)
         except Exception as e:
             logger.error(f"Error getting uptime: {e}")
             return 'Unknown'
@@ -276,6 +527,7 @@ class DatabaseCollector:
             return 'Unknown'
         except Exception as e:
             logger.error(f"Error getting timezone: {e}")
+            self.connection.rollback()
             return 'Unknown'
     
     def _get_charset(self) -> str:
@@ -294,8 +546,27 @@ class DatabaseCollector:
             return 'Unknown'
         except Exception as e:
             logger.error(f"Error getting charset: {e}")
+            self.connection.rollback()
             return 'Unknown'
     
+    def _get_max_connections(self) -> int:
+        """获取最大连接数"""
+        try:
+            cursor = self.connection.cursor()
+            if self.db_type == 'POSTGRESQL':
+                cursor.execute("SELECT current_setting('max_connections')::int")
+            elif self.db_type == 'MYSQL':
+                cursor.execute("SELECT @@max_connections")
+            elif self.db_type == 'SQLSERVER':
+                cursor.execute("SELECT @@MAX_CONNECTIONS")
+            else:
+                return 0
+            return int(cursor.fetchone()[0] or 0)
+        except Exception as e:
+            logger.error(f"Error getting max connections: {e}")
+            self.connection.rollback()
+            return 0
+    
     def get_connection_info(self) -> Dict[str, Any]:
         """获取连接信息"""
         if not self.connection:
@@ -303,115 +574,47 @@ class DatabaseCollector:
                 return {}
         
         try:
+            snapshot = self._get_snapshot()
+            max_connections = self._get_static_facts()['max_connections']
             if self.db_type == 'POSTGRESQL':
-                return self._get_postgresql_connections()
+                total_connections = snapshot['total_connections']
+                active_connections = snapshot['active_connections']
+                idle_connections = snapshot['idle_connections']
             elif self.db_type == 'MYSQL':
-                return self._get_mysql_connections()
+                total_connections = snapshot['Threads_connected']
+                active_connections = snapshot['Threads_running']
+                idle_connections = total_connections - active_connections
             elif self.db_type == 'SQLSERVER':
-                return self._get_sqlserver_connections()
-            return {}
+                total_connections = snapshot['total_connections']
+                active_connections = snapshot['active_connections']
+                idle_connections = total_connections - active_connections
+            else:
+                return {}
+            
+            return {
+                'total_connections': total_connections,
+                'max_connections': max_connections,
+                'active_connections': active_connections,
+                'idle_connections': idle_connections,
+                'connection_usage_percent': round((total_connections / max_connections) * 100, 2) if max_connections > 0 else 0.0
+            }
         except Exception as e:
             logger.error(f"Error getting connection info: {e}")
             return {}
     
-    def _get_postgresql_connections(self) -> Dict[str, Any]:
-        """获取PostgreSQL连接信息"""
-        cursor = self.connection.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-        
-        # 总连接数
-        cursor.execute("SELECT count(*) as total_connections FROM pg_stat_activity")
-        total_connections = cursor.fetchone()['total_connections']
-        
-        # 最大连接数
-        cursor.execute("SHOW max_connections")
-        max_conn_result = cursor.fetchone()
-        if max_conn_result:
-            # RealDictRow对象，通过字段名访问
-            max_connections = int(max_conn_result['max_connections'])
-        else:
-            max_connections = 0
-        
-        # 活跃连接数
-        cursor.execute("SELECT count(*) as active_connections FROM pg_stat_activity WHERE state = 'active'")
-        active_connections = cursor.fetchone()['active_connections']
-        
-        # 空闲连接数
-        cursor.execute("SELECT count(*) as idle_connections FROM pg_stat_activity WHERE state = 'idle'")
-        idle_connections = cursor.fetchone()['idle_connections']
-        
-        return {
-            'total_connections': total_connections,
-            'max_connections': max_connections,
-            'active_connections': active_connections,
-            'idle_connections': idle_connections,
-            'connection_usage_percent': round((total_connections / max_connections) * 100, 2) if max_connections > 0 else 0.0
-        }
-    
-    def _get_mysql_connections(self) -> Dict[str, Any]:
-        """获取MySQL连接信息"""
-        cursor = self.connection.cursor()
-        
-        # 总连接数
-        cursor.execute("SHOW STATUS LIKE 'Threads_connected'")
-        total_connections = int(cursor.fetchone()[1])
-        
-        # 最大连接数
-        cursor.execute("SHOW VARIABLES LIKE 'max_connections'")
-        max_connections = int(cursor.fetchone()[1])
-        
-        # 运行中的连接数
-        cursor.execute("SHOW STATUS LIKE 'Threads_running'")
-        active_connections = int(cursor.fetchone()[1])
-        
-        idle_connections = total_connections - active_connections
-        
-        return {
-            'total_connections': total_connections,
-            'max_connections': max_connections,
-            'active_connections': active_connections,
-            'idle_connections': idle_connections,
-            'connection_usage_percent': round((total_connections / max_connections) * 100, 2) if max_connections > 0 else 0.0
-        }
-    
-    def _get_sqlserver_connections(self) -> Dict[str, Any]:
-        """获取SQL Server连接信息"""
-        cursor = self.connection.cursor()
-        
-        # 总连接数
-        cursor.execute("SELECT COUNT(*) FROM sys.dm_exec_sessions WHERE is_user_process = 1")
-        total_connections = cursor.fetchone()[0]
-        
-        # 最大连接数（SQL Server默认为32767，实际受内存限制）
-        cursor.execute("SELECT @@MAX_CONNECTIONS")
-        max_connections = cursor.fetchone()[0]
-        
-        # 活跃连接数
-        cursor.execute("SELECT COUNT(*) FROM sys.dm_exec_requests")
-        active_connections = cursor.fetchone()[0]
-        
-        idle_connections = total_connections - active_connections
-        
-        return {
-            'total_connections': total_connections,
-            'max_connections': max_connections,
-            'active_connections': active_connections,
-            'idle_connections': idle_connections,
-            'connection_usage_percent': round((total_connections / max_connections) * 100, 2) if max_connections > 0 else 0
-        }
-    
     def get_database_size(self) -> Dict[str, Any]:
-        """获取数据库大小信息"""
+        """获取数据库大小信息（按 size 周期缓存）"""
         if not self.connection:
             if not self.connect():
                 return {}
         
         try:
             if self.db_type == 'POSTGRESQL':
-                return self._get_postgresql_size()
+                return self._cached_section('size', self._get_postgresql_size)
             elif self.db_type == 'MYSQL':
-                return self._get_mysql_size()
+                return self._cached_section('size', self._get_mysql_size)
             elif self.db_type == 'SQLSERVER':
-                return self._get_sqlserver_size()
+                return self._cached_section('size', self._get_sqlserver_size)
             return {}
         except Exception as e:
             logger.error(f"Error getting database size: {e}")
@@ -482,69 +685,11 @@ class DatabaseCollector:
     
     def _get_postgresql_performance(self) -> Dict[str, Any]:
         """获取PostgreSQL性能统计"""
-        cursor = self.connection.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-        
-        # 查询数据库级别性能统计
-        cursor.execute("""
-            SELECT 
-                sum(numbackends) as total_backends,
-                sum(xact_commit) as transactions_commit,
-                sum(xact_rollback) as transactions_rollback,
-                sum(blks_read) as blocks_read,
-                sum(blks_hit) as blocks_hit,
-                sum(tup_returned) as tuples_returned,
-                sum(tup_fetched) as tuples_fetched,
-                sum(tup_inserted) as tuples_inserted,
-                sum(tup_updated) as tuples_updated,
-                sum(tup_deleted) as tuples_deleted,
-                sum(temp_files) as temp_files,
-                sum(temp_bytes) as temp_bytes,
-                sum(deadlocks) as deadlocks,
-                sum(checksum_failures) as checksum_failures,
-                sum(blk_read_time) as block_read_time,
-                sum(blk_write_time) as block_write_time,
-                sum(session_time) as session_time,
-                sum(active_time) as active_time,
-                sum(idle_in_transaction_time) as idle_in_transaction_time
-            FROM pg_stat_database
-            WHERE datname = %s
-        """, (self.database,))
-        
-        stats = cursor.fetchone()
+        stats = self._get_snapshot()
+        lock_stats = stats.get('lock_stats') or {}
         
-        # 获取锁统计
-        cursor.execute("""
-            SELECT 
-                mode,
-                count(*) as lock_count
-            FROM pg_locks
-            WHERE database = (SELECT oid FROM pg_database WHERE datname = %s)
-            GROUP BY mode
-        """, (self.database,))
-        
-        locks = cursor.fetchall()
-        lock_stats = {lock['mode']: lock['lock_count'] for lock in locks}
-        
-        # 获取索引使用统计
-        cursor.execute("""
-            SELECT 
-                sum(idx_scan) as total_index_scans,
-                sum(idx_tup_read) as total_index_tuples_read,
-                sum(idx_tup_fetch) as total_index_tuples_fetched
-            FROM pg_stat_user_indexes
-        """)
-        
-        index_stats = cursor.fetchone()
-        
-        # 获取表空间使用情况
-        cursor.execute("""
-            SELECT 
-                spcname as tablespace_name,
-                pg_size_pretty(pg_tablespace_size(spcname)) as tablespace_size
-            FROM pg_tablespace
-        """)
-        
-        tablespaces = cursor.fetchall()
+        # 表空间大小变化缓慢，按 tablespaces 周期缓存
+        tablespaces = self._cached_section('tablespaces', self._get_postgresql_tablespaces)
         
         # 计算各种比率
         total_reads = stats['blocks_read'] + stats['blocks_hit']
@@ -594,92 +739,66 @@ class DatabaseCollector:
             'total_locks': sum(lock_stats.values()),
             
             # 索引统计
-            'total_index_scans': index_stats['total_index_scans'] or 0,
-            'total_index_tuples_read': index_stats['total_index_tuples_read'] or 0,
-            'total_index_tuples_fetched': index_stats['total_index_tuples_fetched'] or 0,
+            'total_index_scans': stats['total_index_scans'] or 0,
+            'total_index_tuples_read': stats['total_index_tuples_read'] or 0,
+            'total_index_tuples_fetched': stats['total_index_tuples_fetched'] or 0,
             
             # 表空间信息
-            'tablespaces': [dict(ts) for ts in tablespaces]
+            'tablespaces': tablespaces
         }
     
+    def _get_postgresql_tablespaces(self) -> List[Dict[str, Any]]:
+        """获取PostgreSQL表空间使用情况"""
+        cursor = self.connection.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        cursor.execute("""
+            SELECT 
+                spcname as tablespace_name,
+                pg_size_pretty(pg_tablespace_size(spcname)) as tablespace_size
+            FROM pg_tablespace
+        """)
+        return [dict(ts) for ts in cursor.fetchall()]
+    
     def _get_mysql_performance(self) -> Dict[str, Any]:
         """获取MySQL性能统计"""
-        cursor = self.connection.cursor()
-        
-        # 获取各种统计信息
-        stats = {}
-        status_queries = [
-            ('queries', 'Queries'),
-            ('connections', 'Connections'),
-            ('slow_queries', 'Slow_queries'),
-            ('bytes_received', 'Bytes_received'),
-            ('bytes_sent', 'Bytes_sent'),
-            ('innodb_buffer_pool_reads', 'Innodb_buffer_pool_reads'),
-            ('innodb_buffer_pool_read_requests', 'Innodb_buffer_pool_read_requests')
-        ]
-        
-        for stat_name, mysql_var in status_queries:
-            cursor.execute(f"SHOW GLOBAL STATUS LIKE '{mysql_var}'")
-            result = cursor.fetchone()
-            stats[stat_name] = int(result[1]) if result else 0
+        status = self._get_snapshot()
+        read_requests = status['Innodb_buffer_pool_read_requests']
         
         # 计算缓存命中率
-        total_reads = stats['innodb_buffer_pool_reads'] + stats['innodb_buffer_pool_read_requests']
-        cache_hit_ratio = ((stats['innodb_buffer_pool_read_requests'] - stats['innodb_buffer_pool_reads']) / stats['innodb_buffer_pool_read_requests'] * 100) if stats['innodb_buffer_pool_read_requests'] > 0 else 0
+        cache_hit_ratio = ((read_requests - status['Innodb_buffer_pool_reads']) / read_requests * 100) if read_requests > 0 else 0
         
         return {
-            'total_queries': stats['queries'],
-            'total_connections': stats['connections'],
-            'slow_queries': stats['slow_queries'],
-            'bytes_received': stats['bytes_received'],
-            'bytes_sent': stats['bytes_sent'],
+            'total_queries': status['Queries'],
+            'total_connections': status['Connections'],
+            'slow_queries': status['Slow_queries'],
+            'bytes_received': status['Bytes_received'],
+            'bytes_sent': status['Bytes_sent'],
             'cache_hit_ratio': round(cache_hit_ratio, 2)
         }
     
     def _get_sqlserver_performance(self) -> Dict[str, Any]:
         """获取SQL Server性能统计"""
-        cursor = self.connection.cursor()
-        
-        # 获取批处理请求/秒
-        cursor.execute("""
-            SELECT cntr_value FROM sys.dm_os_performance_counters 
-            WHERE counter_name = 'Batch Requests/sec'
-        """)
-        batch_requests = cursor.fetchone()[0] if cursor.rowcount > 0 else 0
-        
-        # 获取页生存期
-        cursor.execute("""
-            SELECT cntr_value FROM sys.dm_os_performance_counters 
-            WHERE counter_name = 'Page life expectancy'
-        """)
-        page_life_expectancy = cursor.fetchone()[0] if cursor.rowcount > 0 else 0
-        
-        # 获取缓冲区命中率
-        cursor.execute("""
-            SELECT cntr_value FROM sys.dm_os_performance_counters 
-            WHERE counter_name = 'Buffer cache hit ratio'
-        """)
-        buffer_hit_ratio = cursor.fetchone()[0] if cursor.rowcount > 0 else 0
+        snapshot = self._get_snapshot()
+        buffer_hit_ratio = snapshot['buffer_hit_ratio']
         
         return {
-            'batch_requests_per_sec': batch_requests,
-            'page_life_expectancy': page_life_expectancy,
+            'batch_requests_per_sec': snapshot['batch_requests'],
+            'page_life_expectancy': snapshot['page_life_expectancy'],
             'buffer_cache_hit_ratio': buffer_hit_ratio / 100 if buffer_hit_ratio else 0
         }
     
     def get_table_stats(self) -> List[Dict[str, Any]]:
-        """获取表统计信息"""
+        """获取表统计信息（按 tables 周期缓存）"""
         if not self.connection:
             if not self.connect():
                 return []
         
         try:
             if self.db_type == 'POSTGRESQL':
-                return self._get_postgresql_tables()
+                return self._cached_section('tables', self._get_postgresql_tables)
             elif self.db_type == 'MYSQL':
-                return self._get_mysql_tables()
+                return self._cached_section('tables', self._get_mysql_tables)
             elif self.db_type == 'SQLSERVER':
-                return self._get_sqlserver_tables()
+                return self._cached_section('tables', self._get_sqlserver_tables)
             return []
         except Exception as e:
             logger.error(f"Error getting table stats: {e}")
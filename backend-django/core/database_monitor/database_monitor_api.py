@@ -11,12 +11,15 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+from common.utils.connection_pool import pool_registry
+from core.monitor_history.monitor_history_service import record_monitor_sample
 from .database_collector import DatabaseCollector
 from .database_monitor_schema import (
     DatabaseOverviewSchema,
     DatabaseRealtimeStatsSchema,
     DatabaseConnectionTestSchema,
-    DatabaseConfigSchema
+    DatabaseConfigSchema,
+    ConnectionPoolStatsSchema
 )
 
 router = Router()
@@ -183,6 +186,12 @@ def get_database_monitor_configs(request):
     ) for config in configs]
 
 
+@router.get("/database_monitor/pool_stats", response=List[ConnectionPoolStatsSchema])
+def get_database_pool_stats(request):
+    """获取数据库监控连接池使用指标"""
+    return pool_registry.stats('database')
+
+
 @router.get("/database_monitor/{db_name}/overview", response=DatabaseOverviewSchema)
 def get_database_overview(request, db_name: str):
     """获取数据库概览信息"""
@@ -224,6 +233,7 @@ def get_database_realtime_stats(request, db_name: str):
     )
     
     data = collector.get_realtime_stats(db_name)
+    record_monitor_sample('database', data, db_name)
     return DatabaseRealtimeStatsSchema(**data)
 
 
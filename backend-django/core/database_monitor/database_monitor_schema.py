@@ -132,4 +132,19 @@ class DatabaseConfigSchema(BaseModel):
     port: int
     database: str
     user: str
-    has_password: bool 
\ No newline at end of file
+    has_password: bool 
+
+class ConnectionPoolStatsSchema(BaseModel):
+    """监控连接池使用指标Schema"""
+    name: str
+    kind: str
+    max_size: int
+    in_use: int
+    idle: int
+    created: int
+    reused: Optional[int]
+    discarded: Optional[int]
+    health_check_failures: Optional[int]
+    waits: Optional[int]
+    timeouts: Optional[int]
+    last_used: Optional[float]
@@ -15,8 +15,8 @@ from ninja.pagination import paginate
 from common.fu_crud import create, delete, update, batch_delete
 from common.fu_pagination import MyPagination
 from common.fu_schema import response_success
-from common.utils.list_to_tree import list_to_tree
-from core.dept.dept_model import Dept
+from common.utils.list_to_tree import build_tree, list_to_tree
+from core.dept.dept_model import Dept, DeptHierarchy
 from core.dept.dept_schema import (
     DeptSchemaOut,
     DeptSchemaIn,
@@ -45,6 +45,42 @@ def remove_dept_cache():
     cache.delete(DEPT_CACHE_KEY)
 
 
+def dept_to_dict(dept: Dept, child_count: int = None) -> dict:
+    """部门转字典（dept 需由 Dept.with_counts 查询，避免逐个统计）"""
+    return {
+        'id': str(dept.id),
+        'name': dept.name,
+        'code': dept.code,
+        'status': dept.status,
+        'level': dept.level,
+        'path': dept.path,
+        'parent_id': str(dept.parent_id) if dept.parent_id else None,
+        'sort': dept.sort,
+        'child_count': dept.get_child_count() if child_count is None else child_count,
+        'user_count': dept.get_user_count(),
+    }
+
+
+def build_dept_subtree(dept_ids: set, hierarchy: DeptHierarchy) -> List[dict]:
+    """
+    构建包含指定部门及其全部祖先的树
+    child_count 为结果中包含的子部门数量
+    """
+    include_ids = set(dept_ids)
+    for dept_id in dept_ids:
+        include_ids.update(hierarchy.ancestor_ids(dept_id))
+
+    included_children = {}
+    for dept_id in include_ids:
+        parent_id = hierarchy.parent_map.get(dept_id)
+        if parent_id in include_ids:
+            included_children[parent_id] = included_children.get(parent_id, 0) + 1
+
+    depts = Dept.with_counts(Dept.objects.filter(id__in=include_ids))
+    dept_list = [dept_to_dict(dept, included_children.get(str(dept.id), 0)) for dept in depts]
+    return [node for node in build_tree(dept_list) if node['parent_id'] is None]
+
+
 @router.post("/dept", response=DeptSchemaOut, summary="创建部门")
 def create_dept(request, data: DeptSchemaIn):
     """
@@ -144,7 +180,7 @@ def update_dept(request, dept_id: str, data: DeptSchemaIn):
         
         # 检查是否会形成循环引用
         parent = get_object_or_404(Dept, id=data.parent_id)
-        if dept in parent.get_ancestors():
+        if DeptHierarchy.load().is_ancestor(dept.id, parent.id):
             raise HttpError(400, "不能将子部门设置为父部门，会形成循环引用")
     
     instance = update(request, dept_id, data, Dept)
@@ -184,7 +220,7 @@ def patch_dept(request, dept_id: str, data: DeptSchemaPatch):
         
         # 检查是否会形成循环引用
         parent = get_object_or_404(Dept, id=update_data['parent_id'])
-        if dept in parent.get_ancestors():
+        if DeptHierarchy.load().is_ancestor(dept.id, parent.id):
             raise HttpError(400, "不能将子部门设置为父部门，会形成循环引用")
     
     # 更新字段
@@ -212,27 +248,11 @@ def list_dept_tree(request, use_cache: bool = Query(True)):
         if cached_tree:
             return cached_tree
     
-    # 从数据库查询
-    dept_queryset = Dept.objects.all()
-    
-    # 构建部门字典列表
-    dept_list = []
-    for dept in dept_queryset:
-        dept_dict = {
-            'id': str(dept.id),
-            'name': dept.name,
-            'code': dept.code,
-            'status': dept.status,
-            'level': dept.level,
-            'parent_id': str(dept.parent_id) if dept.parent_id else None,
-            'sort': dept.sort,
-            'child_count': dept.get_child_count(),
-            'user_count': dept.get_user_count(),
-        }
-        dept_list.append(dept_dict)
+    # 从数据库查询（子部门数量和用户数量在同一条查询中统计）
+    dept_list = [dept_to_dict(dept) for dept in Dept.with_counts()]
     
     # 转换为树形结构
-    dept_tree = list_to_tree(dept_list)
+    dept_tree = list_to_tree(dept_list, sort_key='sort')
     
     # 缓存结果
     if use_cache:
@@ -290,25 +310,8 @@ def get_dept_by_parent(request, parent_id: str):
     if parent_id == "null":
         parent_id = None
     
-    query_set = Dept.objects.filter(parent_id=parent_id)
-    
-    result = []
-    for dept in query_set:
-        dept_dict = {
-            'id': str(dept.id),
-            'name': dept.name,
-            'code': dept.code,
-            'status': dept.status,
-            'level': dept.level,
-            'path': dept.path,
-            'parent_id': str(dept.parent_id) if dept.parent_id else None,
-            'sort': dept.sort,
-            'child_count': dept.get_child_count(),
-            'user_count': dept.get_user_count(),
-        }
-        result.append(dept_dict)
-    
-    return result
+    query_set = Dept.with_counts(Dept.objects.filter(parent_id=parent_id))
+    return [dept_to_dict(dept) for dept in query_set]
 
 
 @router.get("/dept/search", response=List[dict], summary="搜索部门")
@@ -323,56 +326,11 @@ def search_dept(request, keyword: str):
     if not keyword:
         return []
     
-    # 搜索部门
-    matched_depts = Dept.objects.filter(
+    # 搜索部门，祖先部门从层级索引中获取
+    matched_ids = Dept.objects.filter(
         Q(name__icontains=keyword) | Q(code__icontains=keyword)
-    )
-    
-    # 收集所有需要的部门ID（包括匹配部门和其所有祖先）
-    dept_ids_to_include = set()
-    
-    for dept in matched_depts:
-        dept_ids_to_include.add(dept.id)
-        # 添加所有祖先
-        for ancestor in dept.get_ancestors():
-            dept_ids_to_include.add(ancestor.id)
-    
-    # 获取所有需要的部门
-    all_depts = Dept.objects.filter(id__in=dept_ids_to_include)
-    
-    # 构建部门字典
-    dept_dict_map = {}
-    for dept in all_depts:
-        dept_dict = {
-            'id': str(dept.id),
-            'name': dept.name,
-            'code': dept.code,
-            'status': dept.status,
-            'level': dept.level,
-            'path': dept.path,
-            'parent_id': str(dept.parent_id) if dept.parent_id else None,
-            'sort': dept.sort,
-            'child_count': Dept.objects.filter(
-                parent_id=dept.id,
-                id__in=dept_ids_to_include
-            ).count(),
-            'user_count': dept.get_user_count(),
-        }
-        dept_dict_map[str(dept.id)] = dept_dict
-    
-    # 构建树形结构
-    roots = []
-    for dept_id, dept in dept_dict_map.items():
-        parent_id = dept['parent_id']
-        if parent_id is None:
-            roots.append(dept)
-        elif parent_id in dept_dict_map:
-            parent = dept_dict_map[parent_id]
-            if 'children' not in parent:
-                parent['children'] = []
-            parent['children'].append(dept)
-    
-    return roots
+    ).values_list('id', flat=True)
+    return build_dept_subtree({str(dept_id) for dept_id in matched_ids}, DeptHierarchy.load())
 
 
 @router.get("/dept/by/ids", response=List[dict], summary="根据ID列表获取部门")
@@ -390,48 +348,8 @@ def get_depts_by_ids(request, ids: str):
     if not dept_ids:
         return []
     
-    # 收集所有需要的部门ID
-    dept_ids_to_include = set()
-    target_depts = Dept.objects.filter(id__in=dept_ids)
-    
-    for dept in target_depts:
-        dept_ids_to_include.add(str(dept.id))
-        for ancestor in dept.get_ancestors():
-            dept_ids_to_include.add(str(ancestor.id))
-    
-    # 获取所有需要的部门
-    all_depts = Dept.objects.filter(id__in=dept_ids_to_include)
-    
-    # 构建字典和树形结构（同 search_dept）
-    dept_dict_map = {}
-    for dept in all_depts:
-        dept_dict = {
-            'id': str(dept.id),
-            'name': dept.name,
-            'code': dept.code,
-            'status': dept.status,
-            'level': dept.level,
-            'parent_id': str(dept.parent_id) if dept.parent_id else None,
-            'child_count': Dept.objects.filter(
-                parent_id=dept.id,
-                id__in=dept_ids_to_include
-            ).count(),
-            'user_count': dept.get_user_count(),
-        }
-        dept_dict_map[str(dept.id)] = dept_dict
-    
-    roots = []
-    for dept_id, dept in dept_dict_map.items():
-        parent_id = dept['parent_id']
-        if parent_id is None:
-            roots.append(dept)
-        elif parent_id in dept_dict_map:
-            parent = dept_dict_map[parent_id]
-            if 'children' not in parent:
-                parent['children'] = []
-            parent['children'].append(dept)
-    
-    return roots
+    hierarchy = DeptHierarchy.load()
+    return build_dept_subtree({dept_id for dept_id in dept_ids if dept_id in hierarchy.parent_map}, hierarchy)
 
 
 @router.get("/dept/path/{dept_id}", response=DeptPathOut, summary="获取部门路径")
@@ -444,9 +362,9 @@ def get_dept_path(request, dept_id: str):
     """
     dept = get_object_or_404(Dept, id=dept_id)
     
-    # 获取所有祖先
+    # 获取所有祖先（从根开始）
     path = []
-    for ancestor in reversed(dept.get_ancestors()):
+    for ancestor in dept.get_ancestors():
         path.append(DeptSchemaSimple(
             id=str(ancestor.id),
             name=ancestor.name,
@@ -626,7 +544,7 @@ def move_dept(request, dept_id: str, new_parent_id: str = None):
         new_parent = get_object_or_404(Dept, id=new_parent_id)
         
         # 防止循环引用
-        if dept in new_parent.get_ancestors() or dept.id == new_parent.id:
+        if dept.id == new_parent.id or DeptHierarchy.load().is_ancestor(dept.id, new_parent.id):
             raise HttpError(400, "不能移动到自己或子部门下")
         
         dept.parent = new_parent
@@ -4,7 +4,13 @@
 Dept Model - 部门模型
 用于管理组织架构中的部门信息
 """
+from collections import deque
+from typing import Dict, Iterable, List, Optional
+
 from django.db import models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
 from common.fu_model import RootModel
 
 
@@ -80,16 +86,20 @@ class Dept(RootModel):
 
     def get_child_count(self):
         """获取子部门数量"""
+        if hasattr(self, 'child_count'):
+            return self.child_count
         return self.children.count()
 
     def get_user_count(self):
         """获取用户数量"""
+        if hasattr(self, 'user_count'):
+            return self.user_count
         # User模型中dept字段的related_name为core_users
         return self.core_users.count()
 
     def is_leaf(self):
         """是否是叶子节点"""
-        return not self.children.exists()
+        return self.get_child_count() == 0
 
     def can_delete(self):
         """是否可以删除"""
@@ -97,10 +107,81 @@ class Dept(RootModel):
         return self.is_leaf() and self.get_user_count() == 0
 
     def get_ancestors(self):
-        """获取所有祖先部门"""
+        """获取所有祖先部门（从根到直接父部门）"""
+        ancestor_ids = DeptHierarchy.load().ancestor_ids(self.id)
+        depts = Dept.objects.in_bulk(ancestor_ids)
+        return [depts[dept_id] for dept_id in ancestor_ids if dept_id in depts]
+
+    def get_descendants(self):
+        """获取所有子孙部门"""
+        return Dept.objects.filter(id__in=DeptHierarchy.load().descendant_ids(self.id))
+
+    @classmethod
+    def with_counts(cls, queryset=None):
+        """附带子部门数量 child_count 和用户数量 user_count（相关子查询，一次查询完成）"""
+        from core.user.user_model import User
+
+        if queryset is None:
+            queryset = cls.objects.all()
+        children = (
+            cls.objects.filter(parent_id=OuterRef('pk')).order_by()
+            .values('parent_id').annotate(total=Count('pk')).values('total')
+        )
+        users = (
+            User.objects.filter(dept_id=OuterRef('pk')).order_by()
+            .values('dept_id').annotate(total=Count('pk')).values('total')
+        )
+        return queryset.annotate(
+            child_count=Coalesce(Subquery(children, output_field=IntegerField()), 0),
+            user_count=Coalesce(Subquery(users, output_field=IntegerField()), 0),
+        )
+
+
+class DeptHierarchy:
+    """
+    部门层级索引
+    一次查询加载全部部门的 id/parent_id，祖先、子孙在内存中计算，查询次数与层级深度和部门数量无关
+    """
+
+    def __init__(self, pairs: Iterable):
+        self.parent_map: Dict[str, Optional[str]] = {
+            str(dept_id): (str(parent_id) if parent_id else None) for dept_id, parent_id in pairs
+        }
+        self._children: Optional[Dict[str, List[str]]] = None
+
+    @classmethod
+    def load(cls) -> "DeptHierarchy":
+        return cls(Dept.objects.order_by().values_list('id', 'parent_id'))
+
+    def ancestor_ids(self, dept_id) -> List[str]:
+        """祖先部门ID（从根到直接父部门），数据存在环时在环上停止"""
         ancestors = []
-        current = self
-        while current.parent:
-            ancestors.append(current.parent)
-            current = current.parent
+        seen = {str(dept_id)}
+        parent_id = self.parent_map.get(str(dept_id))
+        while parent_id is not None and parent_id not in seen:
+            seen.add(parent_id)
+            ancestors.append(parent_id)
+            parent_id = self.parent_map.get(parent_id)
         return ancestors[::-1]
+
+    def descendant_ids(self, dept_id) -> List[str]:
+        """子孙部门ID（广度优先）"""
+        if self._children is None:
+            self._children = {}
+            for child_id, parent_id in self.parent_map.items():
+                if parent_id is not None:
+                    self._children.setdefault(parent_id, []).append(child_id)
+        result = []
+        seen = {str(dept_id)}
+        queue = deque([str(dept_id)])
+        while queue:
+            for child_id in self._children.get(queue.popleft(), []):
+                if child_id not in seen:
+                    seen.add(child_id)
+                    result.append(child_id)
+                    queue.append(child_id)
+        return result
+
+    def is_ancestor(self, ancestor_id, dept_id) -> bool:
+        """ancestor_id 是否为 dept_id 的祖先"""
+        return str(ancestor_id) in self.ancestor_ids(dept_id)
@@ -21,6 +21,7 @@ from ninja.pagination import paginate
 from common.fu_crud import retrieve
 from common.fu_pagination import MyPagination
 from common.fu_schema import response_success
+from common.utils.list_to_tree import build_tree
 from core.file_manager.file_manager_model import FileManager
 from core.file_manager.file_manager_schema import (
     FileManagerSchemaOut,
@@ -136,11 +137,14 @@ def list_files(request, filters: FileManagerFilters = Query(...)):
     return query_set
 
 
-@router.get("/file_manager/tree", response=List[FileManagerSchemaOut])
+@router.get("/file_manager/tree", response=List[dict])
 def get_folder_tree(request):
     """获取文件夹树结构"""
-    folders = FileManager.objects.filter(type='folder').order_by('name')
-    return folders
+    folders = list(FileManager.objects.filter(type='folder').order_by('name').values('id', 'name', 'path', 'parent_id'))
+    for folder in folders:
+        folder['id'] = str(folder['id'])
+        folder['parent_id'] = str(folder['parent_id']) if folder['parent_id'] else None
+    return build_tree(folders)
 
 
 @router.put("/file_manager/{file_id}/rename", response=FileManagerSchemaOut)
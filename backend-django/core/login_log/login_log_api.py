@@ -12,6 +12,7 @@ from ninja.errors import HttpError
 from ninja.pagination import paginate
 from django.utils import timezone
 
+from common.fu_auth import LoginAttemptProtection
 from common.fu_crud import retrieve
 from common.fu_pagination import MyPagination
 from common.fu_schema import response_success
@@ -345,17 +346,15 @@ def get_failed_attempts(
         sys_create_datetime__gte=start_time,
     ).count()
     
-    should_lock = LoginLogService.check_user_locked(
-        username=username,
-        failed_threshold=5,
-        hours=hours,
-    )
+    should_lock = failed_count >= LoginAttemptProtection.USER_LOCK_THRESHOLD
     
     return response_success(
         "获取成功",
         data={
             "username": username,
             "failed_attempts": failed_count,
+            # 登录保护滑动窗口内的失败次数（决定是否限流/锁定）
+            "window_failed_attempts": LoginAttemptProtection.get_failure_count(username),
             "should_lock": should_lock,
         }
     )
@@ -217,3 +217,98 @@ class LoginLog(RootModel):
         type_map = dict(self.LOGIN_TYPE_CHOICES)
         return type_map.get(self.login_type, '未知方式')
 
+
+
+class LoginLogHourlyStat(RootModel):
+    """
+    登录日志小时汇总
+    
+    特性：
+    1. 按 小时 + 用户 + IP + 设备/浏览器/操作系统 汇总成功和失败次数
+    2. 由后台汇总线程按水位线增量生成，已汇总的小时不再扫描原始日志
+    3. 统计接口读取汇总数据，只扫描水位线之后尚未汇总的日志
+    4. 原始日志按保留期清理后，历史统计仍然保留
+    """
+    
+    # 统计小时（整点）
+    hour = models.DateTimeField(
+        help_text="统计小时",
+        db_index=True,
+    )
+    
+    user_id = models.CharField(
+        max_length=36,
+        null=True,
+        blank=True,
+        help_text="用户ID",
+    )
+    
+    username = models.CharField(
+        max_length=150,
+        help_text="用户名",
+    )
+    
+    login_ip = models.GenericIPAddressField(
+        help_text="登录IP地址",
+    )
+    
+    ip_location = models.CharField(
+        max_length=100,
+        null=True,
+        blank=True,
+        help_text="IP属地（地区）",
+    )
+    
+    device_type = models.CharField(
+        max_length=20,
+        null=True,
+        blank=True,
+        help_text="设备类型",
+    )
+    
+    browser_type = models.CharField(
+        max_length=50,
+        null=True,
+        blank=True,
+        help_text="浏览器类型",
+    )
+    
+    os_type = models.CharField(
+        max_length=50,
+        null=True,
+        blank=True,
+        help_text="操作系统类型",
+    )
+    
+    success_count = models.IntegerField(
+        default=0,
+        help_text="成功次数",
+    )
+    
+    failed_count = models.IntegerField(
+        default=0,
+        help_text="失败次数",
+    )
+    
+    last_login_time = models.DateTimeField(
+        help_text="最后登录时间",
+    )
+    
+    last_success_time = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="最后成功登录时间",
+    )
+    
+    class Meta:
+        db_table = "core_login_log_hourly_stat"
+        ordering = ("-hour",)
+        verbose_name = "登录日志小时汇总"
+        verbose_name_plural = verbose_name
+        indexes = [
+            models.Index(fields=['login_ip', 'hour']),
+            models.Index(fields=['user_id', 'hour']),
+        ]
+    
+    def __str__(self):
+        return f"{self.hour} - {self.username} - {self.login_ip}"
@@ -0,0 +1,326 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+登录日志记录器 - Login Log Recorder
+登录请求只把登录事件放入内存队列，由后台写入线程批量落库，登录耗时只剩密码校验
+
+- 登录日志使用 bulk_create 批量写入，User-Agent 解析和 IP 属地查询在写入线程中完成
+- 最后登录时间/IP/方式按用户合并，每批每个用户只更新一次
+- 账户锁定仍在登录请求中同步执行（只在失败次数达到阈值时发生一次），锁定立即生效
+- 队列已满、数据库不可用或进程退出时仍未写入的事件转存到 Redis 列表，下次启动时补写
+- 整批写入遇到数据错误时改为逐条写入，只丢弃出错的事件
+"""
+import atexit
+import json
+import logging
+import queue
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+PENDING_QUEUE_KEY = "login_log:pending"
+
+# 写入时间晚于事件时间超过该值的事件（从 Redis 补写）保留原始登录时间
+LATE_EVENT_THRESHOLD = timedelta(minutes=1)
+
+
+@dataclass
+class LoginEvent:
+    """一次登录尝试（请求线程内构建，不访问数据库）"""
+    username: str
+    status: int  # 0-失败，1-成功
+    login_ip: str
+    user_id: Optional[str] = None
+    failure_reason: Optional[int] = None
+    failure_message: Optional[str] = None
+    user_agent: Optional[str] = None
+    login_type: str = 'password'
+    login_time: datetime = field(default_factory=timezone.now)
+    update_last_login: bool = False  # 更新用户最后登录信息
+
+    def to_json(self) -> str:
+        data = asdict(self)
+        data['login_time'] = self.login_time.isoformat()
+        return json.dumps(data)
+
+    @classmethod
+    def from_json(cls, value) -> "LoginEvent":
+        data = json.loads(value)
+        data['login_time'] = datetime.fromisoformat(data['login_time'])
+        return cls(**data)
+
+
+class LoginLogRecorder:
+    """登录事件的异步批量写入器"""
+
+    def __init__(self, batch_size: int = 500, flush_interval: float = 0.5, max_queue_size: int = 10000):
+        """
+        :param batch_size: 单批最多写入的事件数
+        :param flush_interval: 攒批的最长等待时间（秒）
+        :param max_queue_size: 队列上限，写入跟不上时新事件转存到 Redis
+        """
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue[LoginEvent]" = queue.Queue(maxsize=max_queue_size)
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._atexit_registered = False
+
+    def start(self):
+        """启动写入线程（首次提交事件时自动启动）"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name='login-log-recorder', daemon=True)
+            self._thread.start()
+            if not self._atexit_registered:
+                atexit.register(self.stop)
+                self._atexit_registered = True
+        logger.info("登录日志写入线程已启动")
+
+    def stop(self, timeout: float = 5):
+        """停止写入线程，退出前写完队列中剩余的事件，超时未写完的转存到 Redis"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+        remaining = self._drain()
+        if remaining:
+            self._save_pending(remaining)
+
+    def record(self, event: LoginEvent):
+        """提交一条登录事件（非阻塞）"""
+        if self._stop_event.is_set() and self._thread is None:
+            # 进程退出过程中提交的事件直接转存
+            self._save_pending([event])
+            return
+        if self._thread is None or not self._thread.is_alive():
+            self.start()
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            logger.error(f"登录日志队列已满，转存到 Redis: {event.username}")
+            self._save_pending([event])
+
+    def record_success(self, username: str, user_id: str, login_ip: str, user_agent: Optional[str] = None,
+                       login_type: str = 'password'):
+        """记录成功登录，同时更新用户最后登录信息"""
+        self.record(LoginEvent(
+            username=username,
+            status=1,
+            login_ip=login_ip,
+            user_id=user_id,
+            user_agent=user_agent,
+            login_type=login_type,
+            update_last_login=True,
+        ))
+
+    def record_failure(self, username: str, login_ip: str, failure_reason: int, failure_message: str,
+                       user_agent: Optional[str] = None):
+        """记录失败登录"""
+        self.record(LoginEvent(
+            username=username,
+            status=0,
+            login_ip=login_ip,
+            failure_reason=failure_reason,
+            failure_message=failure_message,
+            user_agent=user_agent,
+        ))
+
+    def _run(self):
+        # 先补写上次退出时转存的事件
+        self._replay_pending()
+        while not (self._stop_event.is_set() and self._queue.empty()):
+            batch = self._take_batch()
+            if batch:
+                self._flush(batch)
+
+    def _drain(self) -> List[LoginEvent]:
+        events = []
+        while True:
+            try:
+                events.append(self._queue.get_nowait())
+            except queue.Empty:
+                return events
+
+    def _take_batch(self) -> List[LoginEvent]:
+        """取出一批事件：等待第一条，然后在 flush_interval 内攒满 batch_size"""
+        try:
+            first = self._queue.get(timeout=self.flush_interval)
+        except queue.Empty:
+            return []
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or self._stop_event.is_set():
+                # 停止时不再等待，直接取完已有的事件
+                remaining = 0
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _flush(self, batch: List[LoginEvent]) -> bool:
+        """
+        写入一批事件
+
+        数据库连接异常时重连重试一次，仍失败则转存到 Redis；
+        数据错误时改为逐条写入，只丢弃出错的事件，避免一条坏数据拖垮整批（以及之后的每次补写）
+        """
+        from django.db import connection, close_old_connections
+
+        for attempt in range(2):
+            close_old_connections()
+            try:
+                self._refresh_late_hours(self._persist(batch))
+                return True
+            except Exception as e:
+                logger.error(f"写入登录日志失败（第 {attempt + 1} 次）: {e}")
+                if not self._is_connection_error(e):
+                    return self._flush_each(batch)
+                try:
+                    connection.close()
+                except Exception:
+                    pass
+        self._save_pending(batch)
+        return False
+
+    def _flush_each(self, batch: List[LoginEvent]) -> bool:
+        """逐条写入，丢弃数据错误的事件，连接异常的事件转存到 Redis"""
+        pending = []
+        late_times = []
+        for event in batch:
+            try:
+                late_time = self._persist([event])
+            except Exception as e:
+                if self._is_connection_error(e):
+                    pending.append(event)
+                else:
+                    logger.error(f"丢弃无法写入的登录事件 {event.username} {event.login_time}: {e}")
+                continue
+            if late_time:
+                late_times.append(late_time)
+        self._refresh_late_hours(min(late_times) if late_times else None)
+        if pending:
+            self._save_pending(pending)
+            return False
+        return True
+
+    @staticmethod
+    def _is_connection_error(error: Exception) -> bool:
+        from django.db import InterfaceError, OperationalError
+        return isinstance(error, (InterfaceError, OperationalError))
+
+    @staticmethod
+    def _refresh_late_hours(since: Optional[datetime]):
+        """已汇总的小时补入了新日志，重新汇总（失败时日志已写入，只记录错误）"""
+        if since is None:
+            return
+        from core.login_log.login_log_rollup import refresh_rolled_hours
+        try:
+            refresh_rolled_hours(since)
+        except Exception as e:
+            logger.error(f"重新汇总补写的登录日志失败: {e}")
+
+    def _persist(self, batch: List[LoginEvent]) -> Optional[datetime]:
+        """
+        在一个事务中写入登录日志和用户最后登录信息
+
+        :return: 补写事件中最早的登录时间（没有补写事件时为 None），其所在小时之后的汇总需要刷新
+        """
+        from django.db import transaction
+        from django.db.models import Q
+        from core.login_log.login_log_model import LoginLog
+        from core.login_log.login_log_service import LoginLogService, normalize_ip
+        from core.user.user_model import User
+
+        logs = []
+        last_logins: Dict[str, LoginEvent] = {}
+        for event in batch:
+            logs.append(LoginLogService.build_login_log(
+                username=event.username,
+                status=event.status,
+                login_ip=event.login_ip,
+                user_id=event.user_id,
+                failure_reason=event.failure_reason,
+                failure_message=event.failure_message,
+                user_agent=event.user_agent,
+                login_type=event.login_type,
+            ))
+            if event.update_last_login and event.user_id:
+                last = last_logins.get(event.user_id)
+                if last is None or event.login_time >= last.login_time:
+                    last_logins[event.user_id] = event
+
+        now = timezone.now()
+        late_logs = [
+            (log, event.login_time) for log, event in zip(logs, batch)
+            if now - event.login_time > LATE_EVENT_THRESHOLD
+        ]
+        with transaction.atomic():
+            LoginLog.objects.bulk_create(logs, batch_size=self.batch_size)
+            if late_logs:
+                # bulk_create 按写入时间填充创建时间，补写的事件改回原始登录时间
+                for log, login_time in late_logs:
+                    log.sys_create_datetime = login_time
+                LoginLog.objects.bulk_update([log for log, _ in late_logs], ['sys_create_datetime'])
+            for user_id, event in last_logins.items():
+                # 补写的旧事件不覆盖更新的登录信息
+                User.objects.filter(
+                    Q(last_login__isnull=True) | Q(last_login__lte=event.login_time), id=user_id,
+                ).update(
+                    last_login=event.login_time,
+                    last_login_ip=normalize_ip(event.login_ip),
+                    last_login_type=event.login_type,
+                )
+        return min((login_time for _, login_time in late_logs), default=None)
+
+    @staticmethod
+    def _get_redis():
+        from django_redis import get_redis_connection
+        return get_redis_connection('default')
+
+    def _save_pending(self, events: List[LoginEvent]):
+        """事件转存到 Redis，等待下次启动时补写"""
+        try:
+            self._get_redis().rpush(PENDING_QUEUE_KEY, *[event.to_json() for event in events])
+            logger.warning(f"{len(events)} 条登录事件已转存到 Redis")
+        except Exception as e:
+            logger.error(f"转存登录事件失败，丢弃 {len(events)} 条: {e}")
+
+    def _replay_pending(self):
+        """补写 Redis 中转存的事件（每批先取出再删除，写入失败的重新转存）"""
+        try:
+            redis_conn = self._get_redis()
+            while not self._stop_event.is_set():
+                pipe = redis_conn.pipeline()
+                pipe.lrange(PENDING_QUEUE_KEY, 0, self.batch_size - 1)
+                pipe.ltrim(PENDING_QUEUE_KEY, self.batch_size, -1)
+                values, _ = pipe.execute()
+                if not values:
+                    break
+                logger.info(f"补写 {len(values)} 条转存的登录事件")
+                events = []
+                for value in values:
+                    try:
+                        events.append(LoginEvent.from_json(value))
+                    except (KeyError, TypeError, ValueError) as e:
+                        logger.error(f"丢弃无法解析的转存登录事件: {e}")
+                if events and not self._flush(events):
+                    break
+        except Exception as e:
+            logger.error(f"补写转存的登录事件失败: {e}")
+
+
+# 全局登录日志记录器
+login_log_recorder = LoginLogRecorder()
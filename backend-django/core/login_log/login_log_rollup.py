@@ -0,0 +1,275 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+登录日志汇总 - Login Log Rollup
+按小时增量汇总登录日志，供统计接口读取
+
+- 水位线为已汇总的最后一个小时的下一个整点，水位线之前的小时不再扫描原始日志
+- 只汇总已结束且超过延迟时间的小时，延迟用于等待尚未写入的日志
+- 每个小时的汇总先删除再写入，在一个事务中完成，重复执行结果一致
+- 统计接口读取汇总数据，只扫描起始不足一小时的部分和水位线之后尚未汇总的日志
+- 后台汇总线程运行在调度器进程中，集群模式下只由排序最靠前的节点执行
+- 补写延迟到达的日志后登记需要重新汇总的起始小时，由持有汇总锁的进程分批重新汇总，不与汇总线程并发执行
+"""
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max, Min, Q, QuerySet
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from core.login_log.login_log_model import LoginLog, LoginLogHourlyStat
+
+logger = logging.getLogger(__name__)
+
+HOUR = timedelta(hours=1)
+ROLLUP_LOCK_KEY = "login_log:rollup:lock"
+ROLLUP_LOCK_TIMEOUT = 3600
+# 待重新汇总的起始小时（补写了延迟到达的日志），Redis 有序集合，由持有汇总锁的进程取最早的一个处理
+REFRESH_SINCE_KEY = "login_log:rollup:refresh_since"
+
+# 汇总维度
+GROUP_FIELDS = ('user_id', 'username', 'login_ip', 'device_type', 'browser_type', 'os_type')
+
+
+def get_rollup_settings() -> dict:
+    """登录日志汇总配置"""
+    return {
+        'interval': getattr(settings, 'LOGIN_STAT_ROLLUP_INTERVAL', 300),
+        'delay': getattr(settings, 'LOGIN_STAT_ROLLUP_DELAY', 300),
+        'chunk_hours': getattr(settings, 'LOGIN_STAT_ROLLUP_CHUNK_HOURS', 24),
+        'retention_days': getattr(settings, 'LOGIN_STAT_RETENTION_DAYS', 365),
+    }
+
+
+def floor_hour(value: datetime) -> datetime:
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def ceil_hour(value: datetime) -> datetime:
+    hour = floor_hour(value)
+    return hour if hour == value else hour + HOUR
+
+
+def get_watermark() -> Optional[datetime]:
+    """汇总水位线（尚未汇总的第一个整点），没有汇总数据时返回 None"""
+    last_hour = LoginLogHourlyStat.objects.aggregate(last_hour=Max('hour'))['last_hour']
+    return last_hour + HOUR if last_hour else None
+
+
+def aggregate_hours(start: datetime, end: datetime) -> int:
+    """
+    汇总 [start, end) 内的登录日志
+
+    :return: 写入的汇总行数
+    """
+    rows = LoginLog.objects.filter(
+        sys_create_datetime__gte=start,
+        sys_create_datetime__lt=end,
+    ).annotate(
+        hour=TruncHour('sys_create_datetime'),
+    ).values('hour', *GROUP_FIELDS).annotate(
+        location=Max('ip_location'),
+        success_count=Count('id', filter=Q(status=1)),
+        failed_count=Count('id', filter=Q(status=0)),
+        last_login_time=Max('sys_create_datetime'),
+        last_success_time=Max('sys_create_datetime', filter=Q(status=1)),
+    ).order_by()
+    stats = [LoginLogHourlyStat(ip_location=row.pop('location'), **row) for row in rows]
+
+    with transaction.atomic():
+        LoginLogHourlyStat.objects.filter(hour__gte=start, hour__lt=end).delete()
+        LoginLogHourlyStat.objects.bulk_create(stats, batch_size=1000)
+    return len(stats)
+
+
+def _aggregate_range(start: datetime, end: datetime, chunk_hours: int, stop_event: threading.Event) -> Tuple[int, datetime]:
+    """
+    分批汇总 [start, end)，每批 chunk_hours 小时一个事务
+
+    :return: (写入的汇总行数, 下一个未汇总的整点)，设置停止信号时提前返回
+    """
+    total = 0
+    while start < end and not stop_event.is_set():
+        chunk_end = min(start + HOUR * chunk_hours, end)
+        total += aggregate_hours(start, chunk_end)
+        start = chunk_end
+    return total, start
+
+
+def rollup_login_logs(stop_event: Optional[threading.Event] = None) -> int:
+    """
+    从水位线开始汇总已结束的小时，每批 chunk_hours 小时一个事务，然后处理登记的重新汇总
+
+    :param stop_event: 停止信号，设置后在当前批次完成后退出
+    :return: 写入的汇总行数
+    """
+    options = get_rollup_settings()
+    stop_event = stop_event or threading.Event()
+    now = timezone.now()
+    cutoff = floor_hour(now - timedelta(seconds=options['delay']))
+
+    # 防止多个进程（后台线程与手动触发、补写后的重新汇总）同时汇总
+    if not cache.add(ROLLUP_LOCK_KEY, 1, ROLLUP_LOCK_TIMEOUT):
+        return 0
+    total = 0
+    try:
+        start = get_watermark()
+        if start is None:
+            first_time = LoginLog.objects.aggregate(first_time=Min('sys_create_datetime'))['first_time']
+            start = floor_hour(first_time) if first_time else cutoff
+
+        count, _ = _aggregate_range(start, cutoff, options['chunk_hours'], stop_event)
+        total += count
+        total += _refresh_pending(options['chunk_hours'], stop_event)
+
+        LoginLogHourlyStat.objects.filter(hour__lt=now - timedelta(days=options['retention_days'])).delete()
+    finally:
+        cache.delete(ROLLUP_LOCK_KEY)
+    # 持锁期间登记的重新汇总（登记方取锁失败）在释放锁后处理
+    if not stop_event.is_set():
+        total += _drain_refresh(stop_event)
+    return total
+
+
+def _get_redis():
+    from django_redis import get_redis_connection
+
+    return get_redis_connection('default')
+
+
+def _mark_refresh(start: datetime):
+    """登记需要重新汇总的起始小时（ZADD，并发登记互不覆盖，处理时取最早的一个）"""
+    _get_redis().zadd(REFRESH_SINCE_KEY, {start.isoformat(): start.timestamp()})
+
+
+def _pop_refresh() -> Optional[datetime]:
+    """取出登记的最早起始小时并清空登记（一个事务内完成）"""
+    pipe = _get_redis().pipeline()
+    pipe.zrange(REFRESH_SINCE_KEY, 0, 0)
+    pipe.delete(REFRESH_SINCE_KEY)
+    earliest, _ = pipe.execute()
+    if not earliest:
+        return None
+    value = earliest[0]
+    return datetime.fromisoformat(value.decode() if isinstance(value, bytes) else value)
+
+
+def _refresh_pending(chunk_hours: int, stop_event: threading.Event) -> int:
+    """重新汇总登记的起始小时到水位线之间已汇总的小时（需持有汇总锁）"""
+    total = 0
+    while not stop_event.is_set():
+        start = _pop_refresh()
+        if start is None:
+            break
+        watermark = get_watermark()
+        if watermark is None:
+            continue
+        count, start = _aggregate_range(start, watermark, chunk_hours, stop_event)
+        total += count
+        if start < watermark:
+            # 中途停止，剩余部分留待下次
+            _mark_refresh(start)
+    return total
+
+
+def _drain_refresh(stop_event: threading.Event) -> int:
+    """取得汇总锁后处理登记的重新汇总；取锁失败时由当前持锁方在释放锁前后处理"""
+    chunk_hours = get_rollup_settings()['chunk_hours']
+    total = 0
+    while not stop_event.is_set() and _get_redis().exists(REFRESH_SINCE_KEY):
+        if not cache.add(ROLLUP_LOCK_KEY, 1, ROLLUP_LOCK_TIMEOUT):
+            break
+        try:
+            total += _refresh_pending(chunk_hours, stop_event)
+        finally:
+            cache.delete(ROLLUP_LOCK_KEY)
+    return total
+
+
+def refresh_rolled_hours(since: datetime) -> int:
+    """
+    重新汇总 since 所在小时到水位线之间已汇总的小时（补写了延迟到达的日志时调用）
+
+    先登记起始小时再尝试取汇总锁，汇总线程正在执行时由其处理，不会并发重复汇总
+
+    :return: 本次调用写入的汇总行数
+    """
+    _mark_refresh(floor_hour(since))
+    return _drain_refresh(threading.Event())
+
+
+def get_stat_sources(start: datetime) -> Tuple[QuerySet, QuerySet]:
+    """
+    统计 start 之后登录日志的数据来源
+
+    :return: (汇总查询集, 原始日志查询集)，两者覆盖的时间段互不重叠
+    """
+    rollup_start = ceil_hour(start)
+    watermark = get_watermark()
+    if watermark is None or watermark <= rollup_start:
+        return LoginLogHourlyStat.objects.none(), LoginLog.objects.filter(sys_create_datetime__gte=start)
+
+    rollup = LoginLogHourlyStat.objects.filter(hour__gte=rollup_start, hour__lt=watermark)
+    raw = LoginLog.objects.filter(
+        Q(sys_create_datetime__gte=start, sys_create_datetime__lt=rollup_start)
+        | Q(sys_create_datetime__gte=watermark)
+    )
+    return rollup, raw
+
+
+class LoginLogRollupWorker:
+    """登录日志后台汇总线程"""
+
+    def __init__(self, cluster=None):
+        """
+        :param cluster: 集群模式下的调度节点，只有排序最靠前的节点执行汇总
+        """
+        self.cluster = cluster
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """启动汇总线程"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='login-log-rollup', daemon=True)
+        self._thread.start()
+        logger.info("登录日志汇总线程已启动")
+
+    def stop(self, timeout: float = 10):
+        """停止汇总线程（当前批次完成后退出）"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def _is_leader(self) -> bool:
+        if self.cluster is None:
+            return True
+        return bool(self.cluster.nodes) and self.cluster.nodes[0] == self.cluster.node_id
+
+    def _run(self):
+        from django.db import close_old_connections
+
+        # 启动后稍作等待，避开调度器启动时的任务加载高峰
+        wait_seconds = 30
+        while not self._stop_event.wait(wait_seconds):
+            wait_seconds = get_rollup_settings()['interval']
+            if not self._is_leader():
+                continue
+            close_old_connections()
+            try:
+                count = rollup_login_logs(self._stop_event)
+                if count:
+                    logger.info(f"登录日志汇总完成，写入 {count} 条小时汇总")
+            except Exception as e:
+                logger.error(f"登录日志汇总失败: {e}")
+            finally:
+                close_old_connections()
@@ -4,17 +4,86 @@
 登录日志服务层 - Login Log Service
 处理登录日志的业务逻辑
 """
+import ipaddress
 from datetime import datetime, timedelta
 from typing import Optional, List, Dict
-from django.db.models import Q, Count, Max, Min
+from django.db import models
+from django.db.models import Q, Count, Max, Min, Sum
+from django.db.models.functions import TruncDate
 from django.utils import timezone
 
+from common.utils.device_util import extract_device_info
+from common.utils.ip_location import get_ip_location
 from core.login_log.login_log_model import LoginLog
+from core.login_log.login_log_rollup import get_stat_sources
+
+
+# 无法识别客户端 IP 时记录的地址（login_ip 不允许为空，且必须是合法 IP）
+UNKNOWN_IP = '0.0.0.0'
+
+# 有长度限制的文本字段 (属性名, 最大长度)
+_LIMITED_FIELDS = [
+    (field.attname, field.max_length)
+    for field in LoginLog._meta.concrete_fields
+    if isinstance(field, models.CharField) and field.max_length
+]
+
+
+def normalize_ip(value: Optional[str]) -> str:
+    """规范化客户端 IP：取代理链中的第一个地址，非法地址（如 'unknown'）记为 UNKNOWN_IP"""
+    value = (value or '').split(',')[0].strip()
+    try:
+        return str(ipaddress.ip_address(value))
+    except ValueError:
+        return UNKNOWN_IP
 
 
 class LoginLogService:
     """登录日志服务类 - 提供登录日志的业务操作"""
     
+    @staticmethod
+    def build_login_log(
+        username: str,
+        status: int,
+        login_ip: str,
+        ip_location: Optional[str] = None,
+        user_agent: Optional[str] = None,
+        browser_type: Optional[str] = None,
+        os_type: Optional[str] = None,
+        device_type: Optional[str] = None,
+        **kwargs,
+    ) -> LoginLog:
+        """
+        构建登录日志对象（不保存）
+        
+        未传入的 IP 属地按本地 IP 数据库查询，未传入的设备信息从用户代理解析；
+        非法 IP 记为 UNKNOWN_IP，超长文本按字段长度截断，保证批量写入时不会因单条数据出错
+        
+        Returns:
+            LoginLog: 未保存的登录日志对象
+        """
+        login_ip = normalize_ip(login_ip)
+        if ip_location is None:
+            ip_location = get_ip_location(login_ip) if login_ip != UNKNOWN_IP else ''
+        if user_agent and not (browser_type or os_type or device_type):
+            browser_type, os_type, device_type = extract_device_info(user_agent)
+        log = LoginLog(
+            username=username,
+            status=status,
+            login_ip=login_ip,
+            ip_location=ip_location,
+            user_agent=user_agent,
+            browser_type=browser_type,
+            os_type=os_type,
+            device_type=device_type,
+            **kwargs,
+        )
+        for attname, max_length in _LIMITED_FIELDS:
+            value = getattr(log, attname)
+            if isinstance(value, str) and len(value) > max_length:
+                setattr(log, attname, value[:max_length])
+        return log
+    
     @staticmethod
     def record_login(
         username: str,
@@ -42,9 +111,9 @@ class LoginLogService:
             user_id: 用户ID
             failure_reason: 失败原因
             failure_message: 失败信息
-            ip_location: IP属地
+            ip_location: IP属地（未传入时按本地 IP 数据库查询）
             user_agent: 用户代理
-            browser_type: 浏览器类型
+            browser_type: 浏览器类型（未传入设备信息时从用户代理解析）
             os_type: 操作系统
             device_type: 设备类型
             session_id: 会话ID
@@ -54,7 +123,7 @@ class LoginLogService:
         Returns:
             LoginLog: 创建的登录日志对象
         """
-        login_log = LoginLog(
+        login_log = LoginLogService.build_login_log(
             username=username,
             status=status,
             login_ip=login_ip,
@@ -307,12 +376,59 @@ class LoginLogService:
         
         return list(suspicious)
     
+    @staticmethod
+    def _merge_rows(row_groups, key_fields, sum_fields=(), max_fields=()) -> List[Dict]:
+        """按分组字段合并汇总数据与原始日志的分组统计（计数相加，时间等取最大值）"""
+        merged = {}
+        for rows in row_groups:
+            for row in rows:
+                key = tuple(row[field] for field in key_fields)
+                target = merged.get(key)
+                if target is None:
+                    merged[key] = dict(row)
+                    continue
+                for field in sum_fields:
+                    target[field] = (target[field] or 0) + (row[field] or 0)
+                for field in max_fields:
+                    values = [value for value in (target[field], row[field]) if value is not None]
+                    target[field] = max(values) if values else None
+        return list(merged.values())
+    
+    @staticmethod
+    def _merge_top(rollup_rows, raw_rows, key_fields, lookup_field, order_field, limit, sum_fields, max_fields):
+        """
+        合并汇总数据与原始日志后取 TOP N
+        
+        候选为汇总数据的前 N 名加上原始日志中出现的分组（补充其汇总数据），
+        其余分组没有新日志且汇总值不超过第 N 名，不会进入合并后的前 N 名
+        """
+        raw_rows = list(raw_rows)
+        candidates = list(rollup_rows.order_by(f'-{order_field}')[:limit])
+        top_keys = {tuple(row[field] for field in key_fields) for row in candidates}
+        missing = {tuple(row[field] for field in key_fields) for row in raw_rows} - top_keys
+        lookup_index = key_fields.index(lookup_field)
+        lookup_values = list({key[lookup_index] for key in missing})
+        for offset in range(0, len(lookup_values), 500):
+            candidates.extend(
+                row for row in rollup_rows.filter(**{f'{lookup_field}__in': lookup_values[offset:offset + 500]})
+                if tuple(row[field] for field in key_fields) in missing
+            )
+        merged = LoginLogService._merge_rows([candidates, raw_rows], key_fields, sum_fields, max_fields)
+        merged.sort(key=lambda row: row[order_field] or 0, reverse=True)
+        return merged[:limit]
+    
+    @staticmethod
+    def _count_distinct(rollup, raw, field: str) -> int:
+        """汇总数据与原始日志合并后的去重数量"""
+        # 没有汇总数据时 union 直接返回原始日志查询集，因此两边都需要去重
+        return rollup.values(field).distinct().order_by().union(raw.values(field).distinct().order_by()).count()
+    
     @staticmethod
     def get_login_stats(
         days: int = 30,
     ) -> Dict:
         """
-        获取登录统计信息
+        获取登录统计信息（读取小时汇总，只扫描尚未汇总的日志）
         
         Args:
             days: 天数范围
@@ -321,14 +437,18 @@ class LoginLogService:
             Dict: 统计信息
         """
         start_date = timezone.now() - timedelta(days=days)
+        rollup, raw = get_stat_sources(start_date)
         
-        query = LoginLog.objects.filter(sys_create_datetime__gte=start_date)
-        
-        total = query.count()
-        success = query.filter(status=1).count()
-        failed = query.filter(status=0).count()
-        unique_users = query.values('user_id').distinct().count()
-        unique_ips = query.values('login_ip').distinct().count()
+        rollup_totals = rollup.aggregate(success=Sum('success_count'), failed=Sum('failed_count'))
+        raw_totals = raw.aggregate(
+            success=Count('id', filter=Q(status=1)),
+            failed=Count('id', filter=Q(status=0)),
+        )
+        success = (rollup_totals['success'] or 0) + raw_totals['success']
+        failed = (rollup_totals['failed'] or 0) + raw_totals['failed']
+        total = success + failed
+        unique_users = LoginLogService._count_distinct(rollup, raw, 'user_id')
+        unique_ips = LoginLogService._count_distinct(rollup, raw, 'login_ip')
         
         success_rate = (success / total * 100) if total > 0 else 0
         
@@ -357,16 +477,30 @@ class LoginLogService:
             List[Dict]: IP统计信息
         """
         start_date = timezone.now() - timedelta(days=days)
+        rollup, raw = get_stat_sources(start_date)
         
-        stats = LoginLog.objects.filter(
-            sys_create_datetime__gte=start_date,
-        ).values('login_ip', 'ip_location').annotate(
+        rollup_rows = rollup.values('login_ip').annotate(
+            location=Max('ip_location'),
+            login_count=Sum('success_count'),
+            failed_count=Sum('failed_count'),
+            last_login_time=Max('last_login_time'),
+        )
+        raw_rows = raw.values('login_ip').annotate(
+            location=Max('ip_location'),
             login_count=Count('id', filter=Q(status=1)),
             failed_count=Count('id', filter=Q(status=0)),
             last_login_time=Max('sys_create_datetime'),
-        ).order_by('-login_count')[:limit]
+        ).order_by()
+        stats = LoginLogService._merge_top(
+            rollup_rows, raw_rows, ('login_ip',), 'login_ip', 'login_count', limit,
+            sum_fields=('login_count', 'failed_count'),
+            max_fields=('location', 'last_login_time'),
+        )
         
-        return list(stats)
+        # 历史日志未记录属地时按本地 IP 数据库补齐
+        for item in stats:
+            item['ip_location'] = item.pop('location') or get_ip_location(item['login_ip'])
+        return stats
     
     @staticmethod
     def get_device_stats(
@@ -382,16 +516,24 @@ class LoginLogService:
             List[Dict]: 设备统计信息
         """
         start_date = timezone.now() - timedelta(days=days)
-        
-        stats = LoginLog.objects.filter(
-            status=1,
-            sys_create_datetime__gte=start_date,
-        ).values('device_type', 'browser_type', 'os_type').annotate(
+        rollup, raw = get_stat_sources(start_date)
+        
+        device_fields = ('device_type', 'browser_type', 'os_type')
+        rollup_rows = rollup.filter(success_count__gt=0).values(*device_fields).annotate(
+            login_count=Sum('success_count'),
+            last_login_time=Max('last_success_time'),
+        ).order_by()
+        raw_rows = raw.filter(status=1).values(*device_fields).annotate(
             login_count=Count('id'),
             last_login_time=Max('sys_create_datetime'),
-        ).order_by('-login_count')
-        
-        return list(stats)
+        ).order_by()
+        stats = LoginLogService._merge_rows(
+            [rollup_rows, raw_rows], device_fields,
+            sum_fields=('login_count',),
+            max_fields=('last_login_time',),
+        )
+        stats.sort(key=lambda row: row['login_count'], reverse=True)
+        return stats
     
     @staticmethod
     def get_user_stats(
@@ -409,20 +551,49 @@ class LoginLogService:
             List[Dict]: 用户统计信息
         """
         start_date = timezone.now() - timedelta(days=days)
+        rollup, raw = get_stat_sources(start_date)
         
-        stats = LoginLog.objects.filter(
-            sys_create_datetime__gte=start_date,
-        ).values('user_id', 'username').annotate(
+        rollup_rows = rollup.values('user_id', 'username').annotate(
+            total_logins=Sum('success_count'),
+            failed_logins=Sum('failed_count'),
+            last_login_time=Max('last_success_time'),
+        )
+        raw_rows = raw.values('user_id', 'username').annotate(
             total_logins=Count('id', filter=Q(status=1)),
             failed_logins=Count('id', filter=Q(status=0)),
             last_login_time=Max('sys_create_datetime', filter=Q(status=1)),
-            last_login_ip=Max(
-                'login_ip',
-                filter=Q(status=1),
-            ),
-        ).order_by('-total_logins')[:limit]
+        ).order_by()
         
-        return list(stats)
+        stats = LoginLogService._merge_top(
+            rollup_rows, raw_rows, ('user_id', 'username'), 'username', 'total_logins', limit,
+            sum_fields=('total_logins', 'failed_logins'),
+            max_fields=('last_login_time',),
+        )
+        LoginLogService._fill_last_login_ip(rollup, raw, stats)
+        return stats
+    
+    @staticmethod
+    def _fill_last_login_ip(rollup, raw, stats: List[Dict]) -> None:
+        """最近登录 IP 取最近一次成功登录所在的汇总行或原始日志的 IP"""
+        rollup_filter, raw_filter = Q(), Q()
+        for row in stats:
+            if row['last_login_time'] is None:
+                continue
+            user = Q(user_id=row['user_id'], username=row['username'])
+            rollup_filter |= user & Q(last_success_time=row['last_login_time'])
+            raw_filter |= user & Q(sys_create_datetime=row['last_login_time'])
+        ips = {}
+        if rollup_filter:
+            for user_id, username, login_ip in rollup.filter(rollup_filter).values_list(
+                'user_id', 'username', 'login_ip'
+            ):
+                ips[(user_id, username)] = login_ip
+            for user_id, username, login_ip in raw.filter(raw_filter, status=1).values_list(
+                'user_id', 'username', 'login_ip'
+            ):
+                ips[(user_id, username)] = login_ip
+        for row in stats:
+            row['last_login_ip'] = ips.get((row['user_id'], row['username']))
     
     @staticmethod
     def get_daily_stats(
@@ -437,22 +608,44 @@ class LoginLogService:
         Returns:
             List[Dict]: 每日统计信息
         """
-        from django.db.models.functions import TruncDate
-        
         start_date = timezone.now() - timedelta(days=days)
+        rollup, raw = get_stat_sources(start_date)
         
-        stats = LoginLog.objects.filter(
-            sys_create_datetime__gte=start_date,
-        ).annotate(
+        rollup_rows = rollup.annotate(
+            date=TruncDate('hour')
+        ).values('date').annotate(
+            success_logins=Sum('success_count'),
+            failed_logins=Sum('failed_count'),
+            unique_users=Count('user_id', distinct=True),
+        ).order_by()
+        raw_rows = raw.annotate(
             date=TruncDate('sys_create_datetime')
         ).values('date').annotate(
-            total_logins=Count('id'),
             success_logins=Count('id', filter=Q(status=1)),
             failed_logins=Count('id', filter=Q(status=0)),
             unique_users=Count('user_id', distinct=True),
-        ).order_by('date')
+        ).order_by()
         
-        return list(stats)
+        rollup_rows, raw_rows = list(rollup_rows), list(raw_rows)
+        overlap_dates = {row['date'] for row in rollup_rows} & {row['date'] for row in raw_rows}
+        stats = LoginLogService._merge_rows(
+            [rollup_rows, raw_rows], ('date',),
+            sum_fields=('success_logins', 'failed_logins'),
+        )
+        for item in stats:
+            item['total_logins'] = item['success_logins'] + item['failed_logins']
+            # 同一天既有汇总数据又有原始日志时（起始日和当天），用户数需合并去重
+            if item['date'] in overlap_dates:
+                day_start = datetime.combine(item['date'], datetime.min.time())
+                day_end = day_start + timedelta(days=1)
+                item['unique_users'] = LoginLogService._count_distinct(
+                    rollup.filter(hour__gte=day_start, hour__lt=day_end, user_id__isnull=False),
+                    raw.filter(sys_create_datetime__gte=day_start, sys_create_datetime__lt=day_end,
+                               user_id__isnull=False),
+                    'user_id',
+                )
+        stats.sort(key=lambda row: row['date'])
+        return stats
     
     @staticmethod
     def clean_old_logs(
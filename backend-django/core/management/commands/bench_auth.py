@@ -0,0 +1,74 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from django.test.utils import override_settings
+
+from common.fu_auth import create_token, verified_token_cache, verify_token
+
+LOCMEM_CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+VERIFY_FAILED = "Token verification failed, check the cache connection or run with --locmem"
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark JWT verification overhead per request: the bearer auth and the logging "
+        "middleware each verify the token, with and without the verified-token cache"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=20000, help="Number of simulated requests")
+        parser.add_argument("--tokens", type=int, default=20, help="Number of distinct tokens (users)")
+        parser.add_argument(
+            "--locmem", action="store_true",
+            help="Use an in-process cache for the blacklist checks instead of the configured cache",
+        )
+
+    def handle(self, *args, **options):
+        if options["locmem"]:
+            with override_settings(CACHES=LOCMEM_CACHES):
+                self._run(options["requests"], options["tokens"])
+        else:
+            self._run(options["requests"], options["tokens"])
+
+    def _run(self, count: int, token_count: int):
+        tokens = [create_token({"id": f"bench-{i}", "username": f"bench-{i}"})[0] for i in range(token_count)]
+        factory = RequestFactory()
+
+        def build_request(i):
+            token = tokens[i % token_count]
+            return token, factory.get("/api/bench", HTTP_AUTHORIZATION=f"Bearer {token}")
+
+        # 只构造请求的耗时，从两组结果中扣除
+        started = time.perf_counter()
+        for i in range(count):
+            build_request(i)
+        request_cost = time.perf_counter() - started
+
+        # 不缓存：每个入口各自校验签名
+        max_size = verified_token_cache.max_size
+        verified_token_cache.max_size = 0
+        verified_token_cache.clear()
+        try:
+            started = time.perf_counter()
+            for i in range(count):
+                token, _request = build_request(i)
+                if not (verify_token(token, "access") and verify_token(token, "access")):
+                    raise CommandError(VERIFY_FAILED)
+            uncached = time.perf_counter() - started - request_cost
+        finally:
+            verified_token_cache.max_size = max_size
+
+        # 缓存：跨请求复用已验证载荷，同一请求内只校验一次
+        started = time.perf_counter()
+        for i in range(count):
+            token, request = build_request(i)
+            auth_payload = verify_token(token, "access", request=request)
+            if not (auth_payload and verify_token(token, "access", request=request)):
+                raise CommandError(VERIFY_FAILED)
+        cached = time.perf_counter() - started - request_cost
+
+        self.stdout.write(
+            f"{count} requests, {token_count} tokens: "
+            f"uncached {uncached / count * 1e6:.1f} us/request, cached {cached / count * 1e6:.1f} us/request"
+        )
@@ -0,0 +1,61 @@
+import random
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+from common.utils.list_to_tree import build_tree, list_to_tree
+
+
+def generate_nodes(count: int, chain: bool = False, seed: int = 1) -> list:
+    """生成节点列表：默认随机挂到之前的节点下，chain 时每个节点挂在上一个节点下（最深的树）"""
+    rng = random.Random(seed)
+    nodes = []
+    for i in range(count):
+        if i < 5:
+            parent_id = None
+        elif chain:
+            parent_id = f"n{i - 1}"
+        else:
+            parent_id = f"n{rng.randrange(0, i)}"
+        nodes.append({"id": f"n{i}", "parent_id": parent_id, "name": str(i), "sort": rng.randint(0, 5)})
+    return nodes
+
+
+def count_nodes(tree: list) -> int:
+    count = 0
+    stack = list(tree)
+    while stack:
+        node = stack.pop()
+        count += 1
+        stack.extend(node.get("children", ()))
+    return count
+
+
+class Command(BaseCommand):
+    help = "Benchmark list_to_tree / build_tree on generated node lists (random parents and a single deep chain)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--nodes", type=int, nargs="+", default=[5000, 20000, 50000], help="Node counts to benchmark",
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"recursion limit: {sys.getrecursionlimit()}")
+        for count in options["nodes"]:
+            for chain in (False, True):
+                nodes = generate_nodes(count, chain=chain)
+                started = time.perf_counter()
+                tree = list_to_tree(nodes, sort_key="sort")
+                elapsed = time.perf_counter() - started
+
+                nodes = generate_nodes(count, chain=chain)
+                started = time.perf_counter()
+                build_tree(nodes, max_depth=3)
+                depth_elapsed = time.perf_counter() - started
+
+                shape = "chain" if chain else "random"
+                self.stdout.write(
+                    f"{count} nodes ({shape}): list_to_tree {elapsed:.3f}s "
+                    f"({count_nodes(tree)} nodes in tree), build_tree max_depth=3 {depth_elapsed:.3f}s"
+                )
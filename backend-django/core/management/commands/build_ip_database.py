@@ -0,0 +1,27 @@
+import csv
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from common.utils.ip_location import build_ip_database
+
+
+class Command(BaseCommand):
+    help = "Build the offline IP location database from a CSV file (start_ip,end_ip,region)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("csv_file", help="CSV rows: start_ip,end_ip,region (region: country|province|city|isp)")
+        parser.add_argument("--output", default=str(settings.IP_LOCATION_DB), help="Output database path")
+
+    def handle(self, *args, **options):
+        csv_file = options["csv_file"]
+        output = options["output"]
+        if not os.path.exists(csv_file):
+            raise CommandError(f"CSV file not found: {csv_file}")
+
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(csv_file, newline="", encoding="utf-8") as f:
+            rows = (row[:3] for row in csv.reader(f) if len(row) >= 3 and not row[0].startswith("#"))
+            count = build_ip_database(rows, output)
+        self.stdout.write(f"IP location database written: {output} ({count} ranges)")
@@ -10,6 +10,7 @@ import logging
 from django.shortcuts import get_object_or_404
 from django.db.models import Q, Sum
 from django.core.cache import cache
+from django.db import transaction
 from ninja import Router, Query
 from ninja.errors import HttpError
 from ninja.pagination import paginate
@@ -17,9 +18,18 @@ from ninja.pagination import paginate
 from common.fu_crud import create, delete, update
 from common.fu_pagination import MyPagination
 from common.fu_schema import response_success
-from common.utils.list_to_tree import list_to_route_v5
+from common.utils.list_to_tree import build_tree, list_to_route_v5
 from common.fu_cache import MenuCacheManager, CacheManager, CacheKeyPrefix
 from core.menu.menu_model import Menu
+from core.menu.menu_index import (
+    MENU_TYPE_NAMES,
+    SUPERUSER_SIGNATURE,
+    get_menu_index,
+    get_route_tree,
+    build_route_tree,
+    rebuild_route_trees_async,
+    role_set_signature,
+)
 
 logger = logging.getLogger(__name__)
 from core.menu.menu_schema import (
@@ -42,9 +52,18 @@ from core.menu.menu_schema import (
 router = Router()
 
 
-def remove_menu_cache():
-    """清除菜单缓存（使用新的缓存管理器）"""
+def _invalidate_and_rebuild():
     MenuCacheManager.invalidate_menu_cache()
+    rebuild_route_trees_async()
+
+
+def remove_menu_cache():
+    """
+    清除菜单缓存（使用新的缓存管理器），并在后台重建各角色组合的路由树
+
+    在当前数据库事务提交后执行（ATOMIC_REQUESTS 下请求结束才提交），避免按未提交的数据重建后缓存到新版本号下
+    """
+    transaction.on_commit(_invalidate_and_rebuild)
 
 
 @router.post("/menu", response=MenuSchemaOut, summary="创建菜单")
@@ -163,7 +182,7 @@ def update_menu(request, menu_id: str, data: MenuSchemaIn):
         
         # 检查是否会形成循环引用
         parent = get_object_or_404(Menu, id=data.parent_id)
-        if menu in parent.get_ancestors():
+        if get_menu_index().is_ancestor(menu.id, parent.id):
             raise HttpError(400, "不能将子菜单设置为父菜单，会形成循环引用")
     
     instance = update(request, menu_id, data, Menu)
@@ -209,7 +228,7 @@ def patch_menu(request, menu_id: str, data: MenuSchemaPatch):
         
         # 检查是否会形成循环引用
         parent = get_object_or_404(Menu, id=update_data['parent_id'])
-        if menu in parent.get_ancestors():
+        if get_menu_index().is_ancestor(menu.id, parent.id):
             raise HttpError(400, "不能将子菜单设置为父菜单，会形成循环引用")
     
     # 更新字段
@@ -238,14 +257,8 @@ def list_menu_tree(request, use_cache: bool = Query(True)):
         logger.debug("从缓存返回菜单树")
         return cached_tree
     
-    # 从数据库查询
-    from common.fu_crud import retrieve
-    menu_list = list(retrieve(request, Menu, MenuFilters()).values())
-    
-    # 为每个菜单添加额外信息
-    for menu in menu_list:
-        menu_obj = Menu.objects.get(id=menu['id'])
-        menu['child_count'] = menu_obj.get_child_count()
+    # 从菜单索引获取（含子菜单数量）
+    menu_list = get_menu_index().rows()
     
     # 转换为树形结构
     menu_tree = list_to_route_v5(menu_list)
@@ -277,35 +290,32 @@ def route_menu_tree(request, use_cache: bool = Query(True)):
     from core.user.user_model import User
     
     try:
-        user = User.objects.get(id=user_info.id)
+        # BearerAuth 已加载用户对象时直接使用
+        user = user_info if isinstance(user_info, User) else User.objects.get(id=user_info.id)
     except User.DoesNotExist:
         raise HttpError(404, f"用户不存在 (ID: {user_info.id})")
     except AttributeError:
         raise HttpError(401, "认证信息无效")
     
-    # 尝试从缓存获取用户菜单路由
-    cached_route = MenuCacheManager.get_user_menu_route(str(user.id)) if use_cache else None
-    if cached_route is not None:
-        logger.debug(f"从缓存返回用户路由菜单: {user.username}")
-        return cached_route
-    
-    # 从数据库查询
-    if user.is_superuser:
+    # 用户 → 角色组合签名（按用户权限版本缓存，角色变更时失效）
+    cached_signature = MenuCacheManager.get_user_route_signature(str(user.id)) if use_cache else None
+    if cached_signature is not None:
+        signature, role_ids = cached_signature
+    elif user.is_superuser:
         # 超级管理员获取所有菜单
-        queryset = Menu.objects.all().values()
+        signature, role_ids = SUPERUSER_SIGNATURE, None
     else:
-        # 普通用户获取其角色关联的菜单
-        menu_ids = user.core_roles.filter(status=True).values_list("menu__id", flat=True)
-        queryset = Menu.objects.filter(id__in=menu_ids).values()
+        # 普通用户获取其启用角色关联的菜单
+        role_ids = sorted(str(role_id) for role_id in user.core_roles.filter(status=True).values_list("id", flat=True))
+        signature = role_set_signature(role_ids)
     
-    menu_tree = list_to_route_v5(list(queryset))
+    if not use_cache:
+        return build_route_tree(role_ids)
+    if cached_signature is None:
+        MenuCacheManager.set_user_route_signature(str(user.id), signature, role_ids)
     
-    # 缓存用户的路由菜单（仅在开启缓存时）
-    if use_cache:
-        MenuCacheManager.set_user_menu_route(str(user.id), menu_tree)
-        logger.debug(f"用户路由菜单已缓存: {user.username}")
-    
-    return menu_tree
+    # 相同角色组合的用户共享同一棵路由树
+    return get_route_tree(signature, role_ids)
 
 
 @router.get("/menu/list", response=List[MenuSchemaOut], summary="获取菜单列表（分页）")
@@ -357,25 +367,8 @@ def get_menu_by_parent(request, parent_id: str):
     if parent_id == "null":
         parent_id = None
     
-    query_set = Menu.objects.filter(parent_id=parent_id)
-    
-    result = []
-    for menu in query_set:
-        menu_dict = {
-            'id': str(menu.id),
-            'name': menu.name,
-            'title': menu.title,
-            'path': menu.path,
-            'type': menu.type,
-            'icon': menu.icon,
-            'order': menu.order,
-            'level': menu.get_level(),
-            'parent_id': str(menu.parent_id) if menu.parent_id else None,
-            'child_count': menu.get_child_count(),
-        }
-        result.append(menu_dict)
-    
-    return result
+    index = get_menu_index()
+    return [index.to_simple_dict(menu_id) for menu_id in index.children.get(parent_id, [])]
 
 
 @router.get("/menu/search", response=List[dict], summary="搜索菜单")
@@ -390,56 +383,24 @@ def search_menu(request, keyword: str):
     if not keyword:
         return []
     
-    # 搜索菜单
-    matched_menus = Menu.objects.filter(
-        Q(name__icontains=keyword) | Q(title__icontains=keyword)
-    )
-    
-    # 收集所有需要的菜单ID（包括匹配菜单和其所有祖先）
+    # 搜索菜单，并补齐所有祖先
+    index = get_menu_index()
     menu_ids_to_include = set()
+    for menu_id in index.search(keyword):
+        menu_ids_to_include.add(menu_id)
+        menu_ids_to_include.update(index.ancestor_ids(menu_id))
+    
+    # child_count 为结果中包含的子菜单数量
+    menu_list = []
+    for menu_id in index.menus:
+        if menu_id in menu_ids_to_include:
+            menu_dict = index.to_simple_dict(menu_id)
+            menu_dict['child_count'] = sum(
+                1 for child_id in index.children.get(menu_id, []) if child_id in menu_ids_to_include
+            )
+            menu_list.append(menu_dict)
     
-    for menu in matched_menus:
-        menu_ids_to_include.add(str(menu.id))
-        # 添加所有祖先
-        for ancestor in menu.get_ancestors():
-            menu_ids_to_include.add(str(ancestor.id))
-    
-    # 获取所有需要的菜单
-    all_menus = Menu.objects.filter(id__in=menu_ids_to_include)
-    
-    # 构建菜单字典
-    menu_dict_map = {}
-    for menu in all_menus:
-        menu_dict = {
-            'id': str(menu.id),
-            'name': menu.name,
-            'title': menu.title,
-            'path': menu.path,
-            'type': menu.type,
-            'icon': menu.icon,
-            'order': menu.order,
-            'level': menu.get_level(),
-            'parent_id': str(menu.parent_id) if menu.parent_id else None,
-            'child_count': Menu.objects.filter(
-                parent_id=menu.id,
-                id__in=menu_ids_to_include
-            ).count(),
-        }
-        menu_dict_map[str(menu.id)] = menu_dict
-    
-    # 构建树形结构
-    roots = []
-    for menu_id, menu in menu_dict_map.items():
-        parent_id = menu['parent_id']
-        if parent_id is None:
-            roots.append(menu)
-        elif parent_id in menu_dict_map:
-            parent = menu_dict_map[parent_id]
-            if 'children' not in parent:
-                parent['children'] = []
-            parent['children'].append(menu)
-    
-    return roots
+    return [node for node in build_tree(menu_list) if node['parent_id'] is None]
 
 
 @router.get("/menu/path/{menu_id}", response=MenuPathOut, summary="获取菜单路径")
@@ -450,35 +411,29 @@ def get_menu_path(request, menu_id: str):
     改进点：
     - 返回完整的路径信息
     """
-    menu = get_object_or_404(Menu, id=menu_id)
+    index = get_menu_index()
+    menu_id = str(menu_id)
+    if menu_id not in index.menus:
+        raise HttpError(404, "菜单不存在")
     
-    # 获取所有祖先
+    # 从根到当前菜单
     path = []
-    for ancestor in reversed(menu.get_ancestors()):
+    for item_id in index.ancestor_ids(menu_id) + [menu_id]:
+        item = index.to_simple_dict(item_id)
         path.append(MenuSchemaSimple(
-            id=str(ancestor.id),
-            name=ancestor.name,
-            title=ancestor.title,
-            path=ancestor.path,
-            type=ancestor.type,
-            parent_id=str(ancestor.parent_id) if ancestor.parent_id else None,
-            level=ancestor.get_level(),
+            id=item['id'],
+            name=item['name'],
+            title=item['title'],
+            path=item['path'],
+            type=item['type'],
+            parent_id=item['parent_id'],
+            level=item['level'],
         ))
     
-    # 添加当前菜单
-    path.append(MenuSchemaSimple(
-        id=str(menu.id),
-        name=menu.name,
-        title=menu.title,
-        path=menu.path,
-        type=menu.type,
-        parent_id=str(menu.parent_id) if menu.parent_id else None,
-        level=menu.get_level(),
-    ))
-    
+    menu = index.menus[menu_id]
     return MenuPathOut(
-        menu_id=str(menu.id),
-        menu_name=menu.title or menu.name,
+        menu_id=menu_id,
+        menu_name=menu['title'] or menu['name'],
         path=path
     )
 
@@ -491,30 +446,15 @@ def get_menu_stats(request):
     改进点：
     - 提供全局统计数据
     """
-    total_count = Menu.objects.count()
+    index = get_menu_index()
     
     # 按类型统计
-    type_stats = {}
-    type_choices = [
-        ('catalog', '目录'),
-        ('menu', '菜单'),
-        ('external', '外部链接'),
-    ]
-    for type_code, type_name in type_choices:
-        count = Menu.objects.filter(type=type_code).count()
-        type_stats[type_name] = count
-    
-    # 计算最大层级
-    max_level = 0
-    for menu in Menu.objects.all():
-        level = menu.get_level()
-        if level > max_level:
-            max_level = level
+    type_stats = {type_name: index.type_counts.get(type_code, 0) for type_code, type_name in MENU_TYPE_NAMES.items()}
     
     return MenuStatsOut(
-        total_count=total_count,
+        total_count=len(index.menus),
         type_stats=type_stats,
-        max_level=max_level,
+        max_level=index.max_level,
     )
 
 
@@ -574,7 +514,7 @@ def move_menu(request, menu_id: str, new_parent_id: str = None):
         new_parent = get_object_or_404(Menu, id=new_parent_id)
         
         # 防止循环引用
-        if menu in new_parent.get_ancestors() or menu.id == new_parent.id:
+        if menu.id == new_parent.id or get_menu_index().is_ancestor(menu.id, new_parent.id):
             raise HttpError(400, "不能移动到自己或子菜单下")
         
         menu.parent = new_parent
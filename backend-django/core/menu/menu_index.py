@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Menu Index - 菜单索引
+一次查询加载全部菜单，在内存中计算子菜单、层级、祖先路径和类型统计，
+供菜单树、统计、搜索和路径接口使用
+
+- 菜单数据缓存在 Redis 中，键带版本号，菜单变更时递增版本号即可使所有进程的索引失效
+- 进程内保留最近一次构建的索引，版本号不变时直接复用，不再反序列化和重建
+- 路由树按角色组合缓存，拥有相同角色的用户共享，菜单变更后在后台按已登记的角色组合重建
+"""
+import hashlib
+import logging
+import threading
+from collections import Counter
+from typing import Dict, List, Optional
+
+from common.fu_cache import MenuCacheManager
+
+logger = logging.getLogger(__name__)
+
+# 菜单类型名称
+MENU_TYPE_NAMES = {
+    'catalog': '目录',
+    'menu': '菜单',
+    'external': '外部链接',
+}
+
+
+class MenuIndex:
+    """菜单索引（只读，各接口使用前需复制返回的字典）"""
+
+    def __init__(self, rows: List[dict]):
+        # 按 order 排序后的菜单行（Menu.objects.values()），ID 统一为字符串
+        self.menus: Dict[str, dict] = {}
+        self.children: Dict[Optional[str], List[str]] = {}
+        for row in rows:
+            menu_id = str(row['id'])
+            parent_id = str(row['parent_id']) if row.get('parent_id') else None
+            self.menus[menu_id] = row
+            self.children.setdefault(parent_id, []).append(menu_id)
+        self.type_counts = Counter(row.get('type') for row in rows)
+        self.levels = self._compute_levels()
+
+    def _compute_levels(self) -> Dict[str, int]:
+        """从根菜单逐层计算层级（父菜单不存在的菜单视为根菜单）"""
+        levels = {}
+        roots = [
+            menu_id for menu_id in self.menus
+            if self.parent_id(menu_id) is None or self.parent_id(menu_id) not in self.menus
+        ]
+        stack = [(menu_id, 0) for menu_id in roots]
+        while stack:
+            menu_id, level = stack.pop()
+            if menu_id in levels:
+                continue
+            levels[menu_id] = level
+            stack.extend((child_id, level + 1) for child_id in self.children.get(menu_id, []))
+        return levels
+
+    def parent_id(self, menu_id: str) -> Optional[str]:
+        parent_id = self.menus[menu_id].get('parent_id')
+        return str(parent_id) if parent_id else None
+
+    def child_count(self, menu_id: str) -> int:
+        return len(self.children.get(str(menu_id), []))
+
+    def level(self, menu_id: str) -> int:
+        return self.levels.get(str(menu_id), 0)
+
+    @property
+    def max_level(self) -> int:
+        return max(self.levels.values(), default=0)
+
+    def ancestor_ids(self, menu_id) -> List[str]:
+        """祖先菜单ID（从根到直接父菜单）"""
+        ancestors = []
+        seen = {str(menu_id)}
+        parent_id = self.parent_id(str(menu_id)) if str(menu_id) in self.menus else None
+        while parent_id is not None and parent_id in self.menus and parent_id not in seen:
+            seen.add(parent_id)
+            ancestors.append(parent_id)
+            parent_id = self.parent_id(parent_id)
+        return ancestors[::-1]
+
+    def is_ancestor(self, ancestor_id, menu_id) -> bool:
+        return str(ancestor_id) in self.ancestor_ids(menu_id)
+
+    def search(self, keyword: str) -> List[str]:
+        """名称或标题包含关键字（不区分大小写）的菜单ID"""
+        keyword = keyword.lower()
+        return [
+            menu_id for menu_id, row in self.menus.items()
+            if keyword in (row.get('name') or '').lower() or keyword in (row.get('title') or '').lower()
+        ]
+
+    def to_simple_dict(self, menu_id: str) -> dict:
+        """菜单简要信息（含层级和子菜单数量）"""
+        row = self.menus[menu_id]
+        return {
+            'id': menu_id,
+            'name': row['name'],
+            'title': row['title'],
+            'path': row['path'],
+            'type': row['type'],
+            'icon': row['icon'],
+            'order': row['order'],
+            'level': self.level(menu_id),
+            'parent_id': self.parent_id(menu_id),
+            'child_count': self.child_count(menu_id),
+        }
+
+    def rows(self) -> List[dict]:
+        """全部菜单行的副本（附带子菜单数量）"""
+        return [dict(row, child_count=self.child_count(menu_id)) for menu_id, row in self.menus.items()]
+
+
+_lock = threading.Lock()
+_latest: Dict[str, object] = {'version': None, 'index': None}
+
+
+def load_menu_rows() -> List[dict]:
+    from core.menu.menu_model import Menu
+
+    return list(Menu.objects.order_by('order').values())
+
+
+def get_menu_index() -> MenuIndex:
+    """获取当前版本的菜单索引"""
+    version = MenuCacheManager.get_menu_version()
+    with _lock:
+        if _latest['version'] == version:
+            return _latest['index']
+
+    rows = MenuCacheManager.get_menu_rows(version)
+    if rows is None:
+        rows = load_menu_rows()
+        MenuCacheManager.set_menu_rows(version, rows)
+    index = MenuIndex(rows)
+    with _lock:
+        _latest['version'], _latest['index'] = version, index
+    return index
+
+
+# ===================== 角色组合路由树 =====================
+SUPERUSER_SIGNATURE = "superuser"
+
+
+def role_set_signature(role_ids) -> str:
+    """角色组合签名（排序后的角色ID哈希），拥有相同角色组合的用户共享同一棵路由树"""
+    joined = ",".join(sorted(str(role_id) for role_id in role_ids))
+    return hashlib.sha1(joined.encode()).hexdigest()
+
+
+def build_route_tree(role_ids: Optional[List[str]]) -> list:
+    """
+    构建路由树
+    :param role_ids: 角色ID列表，None 表示超级管理员（全部菜单）
+    """
+    from common.utils.list_to_tree import list_to_route_v5
+    from core.role.role_model import Role
+
+    index = get_menu_index()
+    if role_ids is None:
+        menu_ids = None
+    else:
+        menu_ids = {
+            str(menu_id) for menu_id in
+            Role.menu.through.objects.filter(role_id__in=role_ids).values_list('menu_id', flat=True)
+        }
+    # list_to_route_v5 会修改字典，使用副本
+    rows = [dict(row) for menu_id, row in index.menus.items() if menu_ids is None or menu_id in menu_ids]
+    return list_to_route_v5(rows)
+
+
+def get_route_tree(signature: str, role_ids: Optional[List[str]]) -> list:
+    """获取角色组合的路由树（缓存未命中时构建）"""
+    route = MenuCacheManager.get_role_route(signature)
+    if route is None:
+        route = build_route_tree(role_ids)
+        MenuCacheManager.set_role_route(signature, route)
+        MenuCacheManager.register_route_signature(signature, role_ids)
+    return route
+
+
+def rebuild_route_trees():
+    """按已登记的角色组合重建全部路由树"""
+    from django.db import close_old_connections
+
+    try:
+        signatures = MenuCacheManager.get_route_signatures()
+        for signature, role_ids in signatures.items():
+            MenuCacheManager.set_role_route(signature, build_route_tree(role_ids))
+        logger.info(f"已重建 {len(signatures)} 个角色组合的路由树")
+    except Exception as e:
+        logger.error(f"重建路由树失败: {e}")
+    finally:
+        close_old_connections()
+
+
+def rebuild_route_trees_async():
+    """菜单变更后在后台线程中预先重建路由树，避免用户请求时集中重建"""
+    threading.Thread(target=rebuild_route_trees, name='menu-route-rebuild', daemon=True).start()
@@ -0,0 +1,6 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Monitor History 模块 - 监控历史
+服务器 / Redis / 数据库监控采样的时序存储与范围查询
+"""
@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# file: monitor_history_api.py
+
+from typing import List, Optional
+
+from ninja import Router, Query
+from ninja.errors import HttpError
+
+from .monitor_history_schema import MonitorHistorySchema
+from .monitor_history_service import get_history_store, query_monitor_history
+
+router = Router()
+
+
+@router.get("/monitor_history/series", response=List[str])
+def list_monitor_history_series(request):
+    """获取已有历史数据的序列列表"""
+    return get_history_store().list_series()
+
+
+@router.get("/monitor_history/{source_type}", response=MonitorHistorySchema)
+def get_monitor_history(
+    request,
+    source_type: str,
+    series_id: str = Query('', description="数据源标识，服务器为主机名（留空为当前主机），Redis为连接ID，数据库为db_name"),
+    start: Optional[float] = Query(None, description="开始时间戳(秒)，默认最近1小时"),
+    end: Optional[float] = Query(None, description="结束时间戳(秒)，默认当前时间"),
+    resolution: str = Query('auto', description="分辨率：raw/1m/5m/1h/auto"),
+    max_points: int = Query(1000, description="auto模式下的最大点数"),
+):
+    """按时间范围查询监控历史（用于趋势图）"""
+    try:
+        return query_monitor_history(
+            source_type,
+            series_id=series_id,
+            start=start,
+            end=end,
+            resolution=resolution,
+            max_points=max(1, min(max_points, 10000)),
+        )
+    except ValueError as e:
+        raise HttpError(status_code=400, message=str(e))
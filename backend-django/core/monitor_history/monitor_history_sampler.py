@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Monitor History Sampler - 监控历史采样线程
+运行在调度器进程中，按固定间隔采集服务器、项目 Redis 和 Django 配置的数据库指标写入监控历史，
+没有打开监控页面时趋势数据也是连续的
+
+- 每轮采样后把已结束的桶汇总为 1m / 5m / 1h 记录，聚合记录只由本线程写入
+- 集群模式下只由排序最靠前的节点采样和汇总
+"""
+import logging
+import socket
+import threading
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+
+from core.monitor_history.monitor_history_service import record_monitor_sample, rollup_monitor_history
+
+logger = logging.getLogger(__name__)
+
+
+class MonitorHistorySampler:
+    """监控历史后台采样线程"""
+
+    def __init__(self, cluster=None):
+        """
+        :param cluster: 集群模式下的调度节点，只有排序最靠前的节点采样
+        """
+        self.cluster = cluster
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # 采集器在线程内复用，速率类指标依赖上一次采集的结果
+        self._server_collector = None
+        self._redis_collector = None
+        self._database_collectors: Optional[Dict[str, Any]] = None
+
+    def start(self):
+        """启动采样线程"""
+        if not getattr(settings, 'MONITOR_HISTORY_ENABLED', True):
+            return
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='monitor-history-sampler', daemon=True)
+        self._thread.start()
+        logger.info("监控历史采样线程已启动")
+
+    def stop(self, timeout: float = 10):
+        """停止采样线程"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def _is_leader(self) -> bool:
+        if self.cluster is None:
+            return True
+        return bool(self.cluster.nodes) and self.cluster.nodes[0] == self.cluster.node_id
+
+    def _run(self):
+        from django.db import close_old_connections
+
+        interval = getattr(settings, 'MONITOR_HISTORY_SAMPLE_INTERVAL', 10)
+        while not self._stop_event.wait(interval):
+            if not self._is_leader():
+                continue
+            close_old_connections()
+            try:
+                self.sample()
+                rollup_monitor_history()
+            except Exception as e:
+                logger.error(f"监控历史采样失败: {e}")
+            finally:
+                close_old_connections()
+
+    def sample(self):
+        """采集一轮所有数据源，单个数据源失败不影响其它数据源"""
+        try:
+            record_monitor_sample(
+                'server', self._get_server_collector().get_realtime_stats(), socket.gethostname()
+            )
+        except Exception as e:
+            logger.error(f"采集服务器监控历史失败: {e}")
+
+        try:
+            record_monitor_sample(
+                'redis', self._get_redis_collector().get_realtime_stats('project_redis'), 'project_redis'
+            )
+        except Exception as e:
+            logger.error(f"采集 Redis 监控历史失败: {e}")
+
+        try:
+            database_collectors = self._get_database_collectors()
+        except Exception as e:
+            logger.error(f"获取数据库监控配置失败: {e}")
+            database_collectors = {}
+        for db_name, collector in database_collectors.items():
+            if self._stop_event.is_set():
+                break
+            try:
+                record_monitor_sample('database', collector.get_realtime_stats(db_name), db_name)
+            except Exception as e:
+                logger.error(f"采集数据库监控历史失败 {db_name}: {e}")
+
+    def _get_server_collector(self):
+        if self._server_collector is None:
+            from core.server_monitor.server_info import ServerInfoCollector
+            self._server_collector = ServerInfoCollector()
+        return self._server_collector
+
+    def _get_redis_collector(self):
+        if self._redis_collector is None:
+            from core.redis_monitor.redis_collector import RedisInfoCollector
+            from core.redis_monitor.redis_monitor_api import get_redis_config
+            host, port, password, db = get_redis_config()
+            self._redis_collector = RedisInfoCollector(host=host, port=port, password=password, db=db)
+        return self._redis_collector
+
+    def _get_database_collectors(self) -> Dict[str, Any]:
+        """Django 配置中的数据库（不含服务器上的其它数据库）"""
+        if self._database_collectors is None:
+            from core.database_monitor.database_collector import DatabaseCollector
+            from core.database_monitor.database_monitor_api import get_database_configs
+
+            configs: List[dict] = [config for config in get_database_configs() if config['is_configured']]
+            self._database_collectors = {
+                config['db_name']: DatabaseCollector(
+                    db_type=config['db_type'],
+                    host=config['host'],
+                    port=config['port'],
+                    user=config['user'],
+                    password=config['password'],
+                    database=config['database'],
+                )
+                for config in configs
+            }
+        return self._database_collectors
@@ -0,0 +1,26 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# file: monitor_history_schema.py
+
+from typing import Dict, List, Optional
+from ninja import Schema, Field
+
+
+class MonitorHistoryPointSchema(Schema):
+    """监控历史数据点Schema"""
+    timestamp: float = Field(..., description="时间戳(秒)，聚合分辨率为桶起始时间")
+    count: Optional[int] = Field(None, description="聚合桶内样本数，raw分辨率为空")
+    values: Dict[str, float] = Field(..., description="字段值，聚合分辨率为平均值")
+    max_values: Optional[Dict[str, float]] = Field(None, description="聚合桶内最大值，raw分辨率为空")
+
+
+class MonitorHistorySchema(Schema):
+    """监控历史查询结果Schema"""
+    source_type: str = Field(..., description="数据源类型")
+    series_id: str = Field(..., description="数据源标识")
+    resolution: str = Field(..., description="实际使用的分辨率")
+    step: int = Field(..., description="分辨率步长(秒)")
+    fields: List[str] = Field(..., description="字段列表")
+    start: float = Field(..., description="开始时间戳(秒)")
+    end: float = Field(..., description="结束时间戳(秒)")
+    points: List[MonitorHistoryPointSchema] = Field(..., description="数据点")
@@ -0,0 +1,189 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# file: monitor_history_service.py
+# 监控历史记录与查询服务
+
+import hashlib
+import logging
+import os
+import re
+import socket
+import time
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+
+from .timeseries_store import RAW, RESOLUTIONS, TimeSeriesStore
+
+logger = logging.getLogger(__name__)
+
+# 各类数据源记录的字段（顺序即存储列顺序，新字段只能追加在末尾，旧段文件缺少的字段读取为 0）
+SOURCE_FIELDS: Dict[str, List[str]] = {
+    'server': [
+        'cpu_percent',
+        'memory_percent',
+        'disk_read_speed',
+        'disk_write_speed',
+        'net_upload_speed',
+        'net_download_speed',
+        'load_1min',
+    ],
+    'redis': [
+        'used_memory',
+        'memory_usage_percent',
+        'connected_clients',
+        'ops_per_sec',
+        'hit_rate',
+    ],
+    'database': [
+        'connections_used',
+        'connection_usage_percent',
+        'database_size_mb',
+        'cache_hit_ratio',
+        'active_connections',
+    ],
+}
+
+_store: Optional[TimeSeriesStore] = None
+
+
+def get_history_store() -> TimeSeriesStore:
+    """获取进程内共享的时序存储实例"""
+    global _store
+    if _store is None:
+        root_dir = getattr(
+            settings, 'MONITOR_HISTORY_DIR',
+            os.path.join(settings.BASE_DIR, 'monitor_history')
+        )
+        _store = TimeSeriesStore(root_dir, getattr(settings, 'MONITOR_HISTORY_RETENTION', None))
+    return _store
+
+
+def build_series_name(source_type: str, series_id: str = '') -> str:
+    """生成序列名（同时作为目录名，仅保留安全字符）"""
+    if not series_id:
+        return source_type
+    safe_id = re.sub(r'[^0-9A-Za-z_.-]', '_', series_id)
+    if safe_id != series_id:
+        safe_id = f"{safe_id}_{hashlib.md5(series_id.encode('utf-8')).hexdigest()[:8]}"
+    return f"{source_type}.{safe_id}"
+
+
+def _extract_values(source_type: str, data: Dict[str, Any]) -> List[float]:
+    """从采集结果中提取需要记录的字段"""
+    if source_type == 'server':
+        disk_io = data.get('disk_io') or {}
+        network_io = data.get('network_io') or {}
+        system_load = data.get('system_load') or {}
+        flat = {
+            'cpu_percent': data.get('cpu_percent'),
+            'memory_percent': data.get('memory_percent'),
+            'disk_read_speed': disk_io.get('read_speed'),
+            'disk_write_speed': disk_io.get('write_speed'),
+            'net_upload_speed': network_io.get('upload_speed'),
+            'net_download_speed': network_io.get('download_speed'),
+            'load_1min': system_load.get('load_1min'),
+        }
+    else:
+        flat = data
+    return [flat.get(field) or 0 for field in SOURCE_FIELDS[source_type]]
+
+
+def record_monitor_sample(source_type: str, data: Dict[str, Any], series_id: str = '') -> bool:
+    """
+    记录一次监控采样结果，采集方（HTTP 接口、WebSocket 采样器、调度器进程中的历史采样线程）调用
+
+    同一序列 5 秒内的重复样本会被丢弃，记录失败不会影响调用方。
+    """
+    if not getattr(settings, 'MONITOR_HISTORY_ENABLED', True) or not data:
+        return False
+    try:
+        values = _extract_values(source_type, data)
+        return get_history_store().append(build_series_name(source_type, series_id), values)
+    except Exception as e:
+        logger.error(f"记录监控历史失败 {source_type}/{series_id}: {e}")
+        return False
+
+
+def rollup_monitor_history() -> int:
+    """
+    把所有序列已结束的桶汇总为 1m / 5m / 1h 记录
+
+    只由调度器进程中的历史采样线程调用（集群模式下只有排序最靠前的节点），保证聚合记录只有一个写入方。
+
+    :return: 写入的聚合记录数
+    """
+    if not getattr(settings, 'MONITOR_HISTORY_ENABLED', True):
+        return 0
+    store = get_history_store()
+    total = 0
+    for series in store.list_series():
+        fields = SOURCE_FIELDS.get(series.split('.', 1)[0])
+        if not fields:
+            continue
+        try:
+            total += store.rollup(series, len(fields))
+        except Exception as e:
+            logger.error(f"汇总监控历史失败 {series}: {e}")
+    return total
+
+
+def query_monitor_history(source_type: str, series_id: str = '', start: Optional[float] = None,
+                          end: Optional[float] = None, resolution: str = 'auto',
+                          max_points: int = 1000) -> Dict[str, Any]:
+    """
+    查询监控历史
+
+    :param source_type: 数据源类型 server / redis / database
+    :param series_id: 数据源标识，如服务器主机名、Redis 连接ID、数据库 db_name，服务器留空时为当前主机
+    :param start: 开始时间戳（秒），默认结束时间前 1 小时
+    :param end: 结束时间戳（秒），默认当前时间
+    :param resolution: raw / 1m / 5m / 1h / auto（按 max_points 自动选择）
+    :param max_points: auto 模式下的最大点数
+    """
+    if source_type not in SOURCE_FIELDS:
+        raise ValueError(f"不支持的数据源类型: {source_type}")
+    if resolution != 'auto' and resolution not in RESOLUTIONS:
+        raise ValueError(f"不支持的分辨率: {resolution}")
+
+    end = end or time.time()
+    start = start or end - 3600
+    if start > end:
+        raise ValueError("开始时间不能晚于结束时间")
+
+    if source_type == 'server' and not series_id:
+        series_id = socket.gethostname()
+
+    store = get_history_store()
+    if resolution == 'auto':
+        resolution = store.choose_resolution(start, end, max_points)
+
+    fields = SOURCE_FIELDS[source_type]
+    field_count = len(fields)
+    rows = store.query(build_series_name(source_type, series_id), field_count, start, end, resolution)
+
+    points = []
+    for row in rows:
+        if resolution == RAW:
+            points.append({
+                'timestamp': row[0],
+                'values': dict(zip(fields, row[1:])),
+            })
+        else:
+            points.append({
+                'timestamp': row[0],
+                'count': int(row[1]),
+                'values': dict(zip(fields, row[2:2 + field_count])),
+                'max_values': dict(zip(fields, row[2 + field_count:])),
+            })
+
+    return {
+        'source_type': source_type,
+        'series_id': series_id,
+        'resolution': resolution,
+        'step': RESOLUTIONS[resolution],
+        'fields': fields,
+        'start': start,
+        'end': end,
+        'points': points,
+    }
@@ -0,0 +1,400 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# file: timeseries_store.py
+# 监控历史时序存储引擎
+
+"""
+监控历史时序存储引擎
+
+每条序列（如 server、redis.project_redis、database.<db_name>）在磁盘上按分辨率、按时间段
+切分为定长二进制段文件，记录为连续的 float64 数组：
+
+- raw 分辨率：    [timestamp, v1, ..., vn]
+- 聚合分辨率：    [timestamp, count, avg1..avgn, max1..maxn]
+
+采集方只追加 raw 记录；聚合记录（1m / 5m / 1h）由单个进程调用 rollup 从 raw 汇总已结束的桶后写入，
+查询聚合分辨率时，尚未汇总的部分从 raw 实时聚合补齐。
+段文件名为 "<段编号>-<字段数>.bin"，数据源追加字段后写入新文件，旧文件按原字段数读取，缺少的字段补 0。
+读取时通过 mmap 映射段文件并按时间戳二分查找，无需把整个文件读入内存。
+段文件按保留时间整体删除，磁盘占用有上界。
+"""
+import bisect
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+RAW = 'raw'
+
+# 分辨率（秒）
+RESOLUTIONS: Dict[str, int] = {
+    RAW: 5,
+    '1m': 60,
+    '5m': 300,
+    '1h': 3600,
+}
+
+# 每个段文件覆盖的时间跨度（秒）
+SEGMENT_SPANS: Dict[str, int] = {
+    RAW: 86400,
+    '1m': 86400 * 7,
+    '5m': 86400 * 30,
+    '1h': 86400 * 365,
+}
+
+# 默认保留时间（秒）
+DEFAULT_RETENTION: Dict[str, int] = {
+    RAW: 86400 * 7,
+    '1m': 86400 * 30,
+    '5m': 86400 * 90,
+    '1h': 86400 * 365,
+}
+
+FLOAT_SIZE = 8
+
+
+class _TimestampView(Sequence):
+    """把定长记录数组的时间戳列包装成可二分查找的序列"""
+
+    def __init__(self, values: memoryview, record_width: int):
+        self.values = values
+        self.record_width = record_width
+
+    def __len__(self):
+        return len(self.values) // self.record_width
+
+    def __getitem__(self, index):
+        return self.values[index * self.record_width]
+
+
+class _Bucket:
+    """聚合桶：累加一个时间窗口内的样本"""
+
+    __slots__ = ('start', 'count', 'sums', 'maxs')
+
+    def __init__(self, start: float, field_count: int):
+        self.start = start
+        self.count = 0
+        self.sums = [0.0] * field_count
+        self.maxs = [float('-inf')] * field_count
+
+    def add(self, values: List[float]):
+        self.count += 1
+        for i, value in enumerate(values):
+            self.sums[i] += value
+            if value > self.maxs[i]:
+                self.maxs[i] = value
+
+    def to_record(self) -> List[float]:
+        avgs = [s / self.count for s in self.sums]
+        return [self.start, float(self.count)] + avgs + list(self.maxs)
+
+
+def aggregate_rows(rows: List[List[float]], step: int) -> List[List[float]]:
+    """把按时间排序的 raw 记录按 step 对齐的桶聚合为 [ts, count, avg.., max..]"""
+    records = []
+    bucket: Optional[_Bucket] = None
+    for row in rows:
+        bucket_start = row[0] - row[0] % step
+        if bucket is None or bucket.start != bucket_start:
+            if bucket is not None:
+                records.append(bucket.to_record())
+            bucket = _Bucket(bucket_start, len(row) - 1)
+        bucket.add(row[1:])
+    if bucket is not None:
+        records.append(bucket.to_record())
+    return records
+
+
+class TimeSeriesStore:
+    """定长数组段文件时序存储"""
+
+    def __init__(self, root_dir: str, retention: Optional[Dict[str, int]] = None):
+        self.root_dir = root_dir
+        self.retention = dict(DEFAULT_RETENTION, **(retention or {}))
+        self._lock = threading.Lock()
+        # series -> 最近写入的原始时间戳，用于按最小步长去重
+        self._last_raw_ts: Dict[str, float] = {}
+        # (series, resolution) -> 最近一次清理的段编号
+        self._pruned_segment: Dict[Tuple[str, str], int] = {}
+
+    # ------------------------------------------------------------------
+    # 路径与记录格式
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def record_width(resolution: str, field_count: int) -> int:
+        """每条记录包含的 float64 数量"""
+        if resolution == RAW:
+            return 1 + field_count
+        return 2 + field_count * 2
+
+    @staticmethod
+    def field_count(resolution: str, record_width: int) -> int:
+        """记录宽度对应的字段数"""
+        if resolution == RAW:
+            return record_width - 1
+        return (record_width - 2) // 2
+
+    def _series_dir(self, series: str, resolution: str) -> str:
+        return os.path.join(self.root_dir, series, resolution)
+
+    def _segment_path(self, series: str, resolution: str, segment_id: int, field_count: int) -> str:
+        return os.path.join(self._series_dir(series, resolution), f"{segment_id}-{field_count}.bin")
+
+    def _list_segments(self, series: str, resolution: str) -> List[Tuple[int, int, str]]:
+        """
+        列出段文件，按段编号排序
+
+        :return: (段编号, 字段数, 文件路径) 列表
+        """
+        directory = self._series_dir(series, resolution)
+        if not os.path.isdir(directory):
+            return []
+        segments = []
+        for name in os.listdir(directory):
+            if not name.endswith('.bin'):
+                continue
+            segment_id, _, field_count = name[:-4].partition('-')
+            try:
+                segments.append((int(segment_id), int(field_count), os.path.join(directory, name)))
+            except ValueError:
+                continue
+        segments.sort(key=lambda item: item[0])
+        return segments
+
+    # ------------------------------------------------------------------
+    # 写入
+    # ------------------------------------------------------------------
+
+    def append(self, series: str, values: List[float], timestamp: Optional[float] = None) -> bool:
+        """
+        追加一个 raw 样本（聚合记录由 rollup 生成）
+
+        :param series: 序列名
+        :param values: 字段值（新增字段只能追加在末尾）
+        :param timestamp: 时间戳（秒），默认当前时间
+        :return: 样本是否被写入（与上一样本间隔小于 raw 分辨率时丢弃）
+        """
+        timestamp = time.time() if timestamp is None else float(timestamp)
+        values = [float(v or 0) for v in values]
+
+        with self._lock:
+            last_ts = self._last_raw_ts.get(series)
+            if last_ts is not None and timestamp - last_ts < RESOLUTIONS[RAW]:
+                return False
+            self._last_raw_ts[series] = timestamp
+
+        return self._write_record(series, RAW, [timestamp] + values)
+
+    def rollup(self, series: str, field_count: int, now: Optional[float] = None) -> int:
+        """
+        把 raw 中已结束的桶汇总为 1m / 5m / 1h 记录，每个分辨率从已写入的最后一个桶之后继续
+
+        同一序列只能由一个进程汇总，桶结束后再等待两个 raw 周期，以便其它进程写完桶内的样本。
+
+        :return: 写入的聚合记录数
+        """
+        now = time.time() if now is None else now
+        settled = now - RESOLUTIONS[RAW] * 2
+        written = 0
+        for resolution, step in RESOLUTIONS.items():
+            if resolution == RAW:
+                continue
+            cutoff = settled - settled % step
+            last_ts = self.last_timestamp(series, resolution)
+            start = 0.0 if last_ts is None else last_ts + step
+            if start >= cutoff:
+                continue
+            rows = [row for row in self.query(series, field_count, start, cutoff, RAW) if row[0] < cutoff]
+            for record in aggregate_rows(rows, step):
+                written += self._write_record(series, resolution, record)
+        return written
+
+    def _write_record(self, series: str, resolution: str, record: List[float]) -> bool:
+        """把一条记录追加到对应段文件，时间戳不大于文件末条记录时丢弃（多进程去重）"""
+        timestamp = record[0]
+        segment_id = int(timestamp // SEGMENT_SPANS[resolution])
+        path = self._segment_path(series, resolution, segment_id, self.field_count(resolution, len(record)))
+        record_size = len(record) * FLOAT_SIZE
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'a+b') as f:
+                if FCNTL_AVAILABLE:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+                try:
+                    size = f.seek(0, os.SEEK_END)
+                    if size % record_size:
+                        # 半条记录（进程崩溃残留），截断到整条记录边界
+                        size -= size % record_size
+                        f.truncate(size)
+                    if size >= record_size:
+                        f.seek(size - record_size)
+                        last_ts = struct.unpack('d', f.read(FLOAT_SIZE))[0]
+                        if timestamp <= last_ts:
+                            return False
+                    f.seek(0, os.SEEK_END)
+                    f.write(struct.pack(f'{len(record)}d', *record))
+                finally:
+                    if FCNTL_AVAILABLE:
+                        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        except OSError as e:
+            logger.error(f"写入监控历史失败 {series}/{resolution}: {e}")
+            return False
+
+        self._prune(series, resolution, segment_id)
+        return True
+
+    def _prune(self, series: str, resolution: str, current_segment: int):
+        """进入新段时删除超过保留时间的段文件"""
+        key = (series, resolution)
+        if self._pruned_segment.get(key) == current_segment:
+            return
+        self._pruned_segment[key] = current_segment
+
+        span = SEGMENT_SPANS[resolution]
+        cutoff = time.time() - self.retention[resolution]
+        for segment_id, _, path in self._list_segments(series, resolution):
+            # 段的结束时间早于保留截止时间才整体删除
+            if (segment_id + 1) * span <= cutoff:
+                try:
+                    os.remove(path)
+                    logger.info(f"已清理过期监控历史段 {series}/{resolution}/{segment_id}")
+                except OSError:
+                    pass
+
+    # ------------------------------------------------------------------
+    # 读取
+    # ------------------------------------------------------------------
+
+    def choose_resolution(self, start: float, end: float, max_points: int) -> str:
+        """选择点数不超过 max_points 且仍在保留期内的最细分辨率"""
+        now = time.time()
+        for resolution, step in RESOLUTIONS.items():
+            if now - start > self.retention[resolution]:
+                continue
+            if (end - start) / step <= max_points:
+                return resolution
+        return '1h'
+
+    def query(self, series: str, field_count: int, start: float, end: float,
+              resolution: str = RAW) -> List[List[float]]:
+        """
+        查询 [start, end] 范围内的记录，聚合分辨率中尚未汇总的桶从 raw 实时聚合
+
+        :param field_count: 当前字段数，字段较少的旧段文件缺少的字段补 0
+        :return: 记录列表，raw 为 [ts, v1..vn]，聚合为 [ts, count, avg.., max..]
+        """
+        rows = self._query_stored(series, field_count, start, end, resolution)
+        if resolution != RAW:
+            step = RESOLUTIONS[resolution]
+            last_ts = self.last_timestamp(series, resolution)
+            tail_start = max(start + (-start % step), last_ts + step if last_ts is not None else 0.0)
+            if tail_start <= end:
+                rows.extend(aggregate_rows(self._query_stored(series, field_count, tail_start, end, RAW), step))
+        return rows
+
+    def _query_stored(self, series: str, field_count: int, start: float, end: float,
+                      resolution: str) -> List[List[float]]:
+        """读取段文件中 [start, end] 范围内的记录，按时间排序"""
+        span = SEGMENT_SPANS[resolution]
+        first_segment = int(start // span)
+        last_segment = int(end // span)
+
+        rows: List[List[float]] = []
+        for segment_id, stored_count, path in self._list_segments(series, resolution):
+            if segment_id < first_segment or segment_id > last_segment:
+                continue
+            width = self.record_width(resolution, stored_count)
+            flat = self._read_segment(path, width, start, end)
+            rows.extend(
+                self._resize_record(resolution, flat[i:i + width], stored_count, field_count)
+                for i in range(0, len(flat), width)
+            )
+        # 同一段编号可能有多个字段数不同的文件
+        rows.sort(key=lambda row: row[0])
+        return rows
+
+    @staticmethod
+    def _resize_record(resolution: str, record: List[float], stored_count: int,
+                       field_count: int) -> List[float]:
+        """把按 stored_count 个字段写入的记录转换为 field_count 个字段，缺少的字段补 0"""
+        if stored_count == field_count:
+            return record
+        padding = [0.0] * max(field_count - stored_count, 0)
+        if resolution == RAW:
+            return record[:1 + field_count] + padding
+        avgs = record[2:2 + stored_count] + padding
+        maxs = record[2 + stored_count:2 + stored_count * 2] + padding
+        return record[:2] + avgs[:field_count] + maxs[:field_count]
+
+    def last_timestamp(self, series: str, resolution: str) -> Optional[float]:
+        """序列在该分辨率下最后一条记录的时间戳，没有记录时返回 None"""
+        segments = self._list_segments(series, resolution)
+        if not segments:
+            return None
+        last_segment = segments[-1][0]
+        last_ts = None
+        for segment_id, stored_count, path in segments:
+            if segment_id != last_segment:
+                continue
+            record_size = self.record_width(resolution, stored_count) * FLOAT_SIZE
+            try:
+                with open(path, 'rb') as f:
+                    size = os.fstat(f.fileno()).st_size
+                    size -= size % record_size
+                    if size < record_size:
+                        continue
+                    f.seek(size - record_size)
+                    timestamp = struct.unpack('d', f.read(FLOAT_SIZE))[0]
+            except OSError as e:
+                logger.error(f"读取监控历史段失败 {path}: {e}")
+                continue
+            if last_ts is None or timestamp > last_ts:
+                last_ts = timestamp
+        return last_ts
+
+    @staticmethod
+    def _read_segment(path: str, width: int, start: float, end: float) -> List[float]:
+        """mmap 映射段文件，二分定位时间范围后只解码命中的记录"""
+        try:
+            with open(path, 'rb') as f:
+                size = os.fstat(f.fileno()).st_size
+                usable = size - size % (width * FLOAT_SIZE)
+                if usable <= 0:
+                    return []
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    buffer = memoryview(mm)
+                    values = buffer[:usable].cast('d')
+                    try:
+                        timestamps = _TimestampView(values, width)
+                        lo = bisect.bisect_left(timestamps, start)
+                        hi = bisect.bisect_right(timestamps, end)
+                        return values[lo * width:hi * width].tolist()
+                    finally:
+                        # mmap 关闭前必须释放所有导出的 buffer
+                        values.release()
+                        buffer.release()
+        except (OSError, ValueError) as e:
+            logger.error(f"读取监控历史段失败 {path}: {e}")
+            return []
+
+    def list_series(self) -> List[str]:
+        """列出已有数据的序列"""
+        if not os.path.isdir(self.root_dir):
+            return []
+        return sorted(
+            name for name in os.listdir(self.root_dir)
+            if os.path.isdir(os.path.join(self.root_dir, name))
+        )
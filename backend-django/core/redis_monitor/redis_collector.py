@@ -36,26 +36,41 @@ class RedisInfoCollector:
     """Redis信息收集器"""
     
     def __init__(self, host: str = 'localhost', port: int = 6379, 
-                 password: Optional[str] = None, db: int = 0):
+                 password: Optional[str] = None, db: int = 0, use_pool: bool = True):
         self.host = host
         self.port = port
         self.password = password
         self.db = db
+        self.use_pool = use_pool
         self.client = None
         
-    def connect(self) -> bool:
-        """连接Redis"""
+    def connect(self, use_pool: Optional[bool] = None) -> bool:
+        """
+        连接Redis
+        
+        默认复用按目标共享的连接池，use_pool=False 时建立独立连接。
+        """
+        use_pool = self.use_pool if use_pool is None else use_pool
         try:
-            self.client = redis.Redis(
-                host=self.host,
-                port=self.port,
-                password=self.password,
-                db=self.db,
-                decode_responses=True,
-                socket_timeout=5,
-                socket_connect_timeout=5
-            )
-            # 测试连接
+            if use_pool:
+                from common.utils.connection_pool import pool_registry
+                
+                self.client = redis.Redis(
+                    connection_pool=pool_registry.get_redis_pool(
+                        self.host, self.port, self.password, self.db
+                    )
+                )
+            else:
+                self.client = redis.Redis(
+                    host=self.host,
+                    port=self.port,
+                    password=self.password,
+                    db=self.db,
+                    decode_responses=True,
+                    socket_timeout=5,
+                    socket_connect_timeout=5
+                )
+            # 测试连接（使用连接池时复用已有连接，只有一次往返）
             self.client.ping()
             return True
         except Exception as e:
@@ -63,7 +78,7 @@ class RedisInfoCollector:
             return False
     
     def disconnect(self):
-        """断开连接"""
+        """断开连接（使用连接池时只释放客户端，连接留在池中复用）"""
         if self.client:
             try:
                 self.client.close()
@@ -76,7 +91,8 @@ class RedisInfoCollector:
         """测试Redis连接"""
         start_time = time.time()
         try:
-            if self.connect():
+            # 测试连接使用独立连接，真实反映建连耗时
+            if self.connect(use_pool=False):
                 response_time = (time.time() - start_time) * 1000
                 info = self.client.info('server')
                 redis_version = info.get('redis_version', 'unknown')
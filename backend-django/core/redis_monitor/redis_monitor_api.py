@@ -4,9 +4,13 @@
 # file: redis_monitor_api.py
 # author: AI Assistant
 
+from typing import List
+
 from ninja import Router
 from django.conf import settings
 
+from common.utils.connection_pool import pool_registry
+from core.database_monitor.database_monitor_schema import ConnectionPoolStatsSchema
 from core.redis_monitor.redis_monitor_schema import (
     RedisMonitorOverviewSchema,
     RedisRealtimeStatsSchema,
@@ -14,6 +18,7 @@ from core.redis_monitor.redis_monitor_schema import (
     RedisConfigSchema,
 )
 from core.redis_monitor.redis_collector import RedisInfoCollector
+from core.monitor_history.monitor_history_service import record_monitor_sample
 
 router = Router()
 
@@ -61,6 +66,7 @@ def get_redis_realtime_stats(request):
     )
     
     data = collector.get_realtime_stats('project_redis')
+    record_monitor_sample('redis', data, 'project_redis')
     return RedisRealtimeStatsSchema(**data)
 
 
@@ -92,3 +98,9 @@ def get_redis_config_info(request):
         has_password=bool(redis_password),
         redis_url=getattr(settings, 'REDIS_URL', '')
     )
+
+
+@router.get("/redis_monitor/pool_stats", response=List[ConnectionPoolStatsSchema])
+def get_redis_pool_stats(request):
+    """获取Redis监控连接池使用指标"""
+    return pool_registry.stats('redis')
@@ -158,13 +158,17 @@ def update_role(request, role_id: str, data: RoleSchemaIn):
     permission_changed = False
     for attr, value in data.dict().items():
         if attr == "menu":
+            # 角色菜单变更后，包含该角色的路由树需要失效
             role.menu.set(value)
+            permission_changed = True
         elif attr == "permission":
             role.permission.set(value)
             permission_changed = True
         elif attr == "dept":
             role.dept.set(value)
         else:
+            if attr == "status" and value != role.status:
+                permission_changed = True
             setattr(role, attr, value)
     
     role.save()
@@ -213,13 +217,17 @@ def patch_role(request, role_id: str, data: RoleSchemaPatch):
     permission_changed = False
     for attr, value in update_data.items():
         if attr == "menu":
+            # 角色菜单变更后，包含该角色的路由树需要失效
             role.menu.set(value)
+            permission_changed = True
         elif attr == "permission":
             role.permission.set(value)
             permission_changed = True
         elif attr == "dept":
             role.dept.set(value)
         else:
+            if attr == "status" and value != role.status:
+                permission_changed = True
             setattr(role, attr, value)
     
     role.save()
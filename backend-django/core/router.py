@@ -21,6 +21,7 @@ from core.server_monitor.server_monitor_api import router as server_monitor_rout
 from core.redis_monitor.redis_monitor_api import router as redis_monitor_router
 from core.redis_manager.redis_manager_api import router as redis_manager_router
 from core.database_monitor.database_monitor_api import router as database_monitor_router
+from core.monitor_history.monitor_history_api import router as monitor_history_router
 from core.database_manager.database_manager_api import router as database_manager_router
 from core.file_manager.file_manager_api import router as file_manager_router
 from core.oauth.oauth_api import router as oauth_router
@@ -45,6 +46,7 @@ core_router.add_router("", server_monitor_router, tags=["Core-ServerMonitor"])
 core_router.add_router("", redis_monitor_router, tags=["Core-RedisMonitor"])
 core_router.add_router("", redis_manager_router, tags=["Core-RedisManager"])
 core_router.add_router("", database_monitor_router, tags=["Core-DatabaseMonitor"])
+core_router.add_router("", monitor_history_router, tags=["Core-MonitorHistory"])
 core_router.add_router("", database_manager_router, tags=["Core-DatabaseManager"])
 core_router.add_router("", file_manager_router, tags=["Core-FileManager"])
 core_router.add_router("/oauth", oauth_router, tags=["Core-OAuth"])
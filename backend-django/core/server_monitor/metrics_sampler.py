@@ -0,0 +1,426 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# file: metrics_sampler.py
+# 服务器指标后台采样器
+
+"""
+服务器指标后台采样器
+
+后台线程按固定节奏读取 psutil 的累计计数器（CPU 时间、网络/磁盘 IO），
+将原始样本保存在环形缓冲区中，CPU 使用率与 IO 速率均由相邻样本的差值计算，
+调用方读取快照时无需任何 sleep，立即返回。
+
+采集节奏：
+- 快速区（CPU / 内存 / 网络 / 磁盘 / 负载）：每 fast_interval 秒
+- 进程列表：每 process_interval 秒
+- 网络监听连接：每 connection_interval 秒
+
+长时间无人读取时线程自动退出，下次读取时重新启动。
+"""
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, NamedTuple, Optional
+
+import psutil
+
+logger = logging.getLogger(__name__)
+
+# 进程列表阈值：实时监控按较低阈值取前 15 个，进程信息接口按原阈值取前 20 个
+REALTIME_PROCESS_THRESHOLD = 0.5
+REALTIME_PROCESS_LIMIT = 15
+PROCESS_INFO_THRESHOLD = 1.0
+PROCESS_INFO_LIMIT = 20
+
+
+class CounterSample(NamedTuple):
+    """一次计数器采样的原始数据"""
+    timestamp: float
+    cpu_times: Any
+    cpu_times_per_core: List[Any]
+    net_io: Any
+    disk_io: Any
+
+
+def calc_cpu_percent(prev, curr) -> float:
+    """根据两次 cpu_times 的差值计算 CPU 使用率（与 psutil 的算法一致）"""
+    def _busy_and_total(times):
+        total = sum(times)
+        # guest 时间已经计入 user/nice，避免重复计算
+        total -= getattr(times, 'guest', 0) or 0
+        total -= getattr(times, 'guest_nice', 0) or 0
+        idle = times.idle + (getattr(times, 'iowait', 0) or 0)
+        return total - idle, total
+
+    prev_busy, prev_total = _busy_and_total(prev)
+    curr_busy, curr_total = _busy_and_total(curr)
+    total_delta = curr_total - prev_total
+    if total_delta <= 0:
+        return 0.0
+    percent = (curr_busy - prev_busy) / total_delta * 100
+    return round(min(max(percent, 0.0), 100.0), 2)
+
+
+class ServerMetricsSampler:
+    """基于计数器差值的服务器指标后台采样器（进程内单例）"""
+
+    def __init__(self, fast_interval: float = 1.0, process_interval: float = 10.0,
+                 connection_interval: float = 30.0, history_size: int = 300,
+                 idle_timeout: float = 300.0):
+        self.fast_interval = fast_interval
+        self.process_interval = process_interval
+        self.connection_interval = connection_interval
+        self.idle_timeout = idle_timeout
+
+        # 原始计数器样本环形缓冲区
+        self._samples: Deque[CounterSample] = deque(maxlen=history_size)
+
+        # 各区块最新结果
+        self._memory = None
+        self._load_avg = None
+        self._cpu_freq = None
+        self._process_info: Dict[str, Any] = {
+            'total_processes': 0,
+            'top_processes': [],
+            'running_processes': 0,
+            'sleeping_processes': 0,
+        }
+        self._connections: List[Dict[str, Any]] = []
+        self._last_process_time = 0.0
+        self._last_connection_time = 0.0
+
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+        self._last_access = time.time()
+
+    # ------------------------------------------------------------------
+    # 线程生命周期
+    # ------------------------------------------------------------------
+
+    def ensure_started(self, wait: float = 0.5):
+        """确保后台线程运行；冷启动时最多等待 wait 秒以获得第一组差值数据"""
+        self._last_access = time.time()
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._ready.clear()
+                    self._thread = threading.Thread(
+                        target=self._run, name='server-metrics-sampler', daemon=True
+                    )
+                    self._thread.start()
+        self._ready.wait(wait)
+
+    def _run(self):
+        """采样线程主循环"""
+        logger.info("服务器指标采样线程已启动")
+        try:
+            # 先采两次快速样本，尽快得到第一组差值
+            self._sample_fast()
+            time.sleep(0.2)
+            self._sample_fast()
+            self._sample_processes()
+            self._sample_connections()
+            self._ready.set()
+
+            while time.time() - self._last_access < self.idle_timeout:
+                time.sleep(self.fast_interval)
+                now = time.time()
+                self._sample_fast()
+                if now - self._last_process_time >= self.process_interval:
+                    self._sample_processes()
+                if now - self._last_connection_time >= self.connection_interval:
+                    self._sample_connections()
+        except Exception as e:
+            logger.error(f"服务器指标采样线程异常: {e}")
+        finally:
+            self._ready.set()
+            logger.info("服务器指标采样线程已退出")
+
+    # ------------------------------------------------------------------
+    # 采样
+    # ------------------------------------------------------------------
+
+    def _sample_fast(self):
+        """采集快速区：计数器、内存、负载、频率"""
+        try:
+            sample = CounterSample(
+                timestamp=time.time(),
+                cpu_times=psutil.cpu_times(),
+                cpu_times_per_core=psutil.cpu_times(percpu=True),
+                net_io=psutil.net_io_counters(),
+                disk_io=psutil.disk_io_counters(),
+            )
+        except Exception as e:
+            logger.error(f"采集计数器失败: {e}")
+            return
+
+        memory = psutil.virtual_memory()
+        load_avg = None
+        if hasattr(psutil, 'getloadavg'):
+            try:
+                load_avg = psutil.getloadavg()
+            except Exception:
+                load_avg = None
+        try:
+            cpu_freq = psutil.cpu_freq()
+        except (FileNotFoundError, OSError, NotImplementedError):
+            # macOS等系统可能不支持CPU频率获取
+            cpu_freq = None
+
+        with self._lock:
+            self._samples.append(sample)
+            self._memory = memory
+            self._load_avg = load_avg
+            self._cpu_freq = cpu_freq
+
+    def _sample_processes(self):
+        """采集进程列表（慢节奏，依赖 psutil 缓存的 Process 对象计算 CPU 差值）"""
+        processes = []
+        total_processes = 0
+        running_processes = 0
+        sleeping_processes = 0
+
+        try:
+            for proc in psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_percent', 'status', 'create_time']):
+                try:
+                    process_info = proc.info
+                    total_processes += 1
+
+                    # 统计进程状态
+                    status = process_info.get('status', '')
+                    if status == psutil.STATUS_RUNNING:
+                        running_processes += 1
+                    elif status == psutil.STATUS_SLEEPING:
+                        sleeping_processes += 1
+
+                    cpu_percent = process_info.get('cpu_percent') or 0.0
+                    memory_percent = process_info.get('memory_percent') or 0.0
+
+                    # 按实时监控的较低阈值采集，进程信息接口读取时再按原阈值过滤
+                    if cpu_percent > REALTIME_PROCESS_THRESHOLD or memory_percent > REALTIME_PROCESS_THRESHOLD:
+                        create_time = process_info.get('create_time')
+                        if create_time:
+                            create_time_str = datetime.fromtimestamp(create_time).isoformat()
+                        else:
+                            create_time_str = datetime.now().isoformat()
+
+                        processes.append({
+                            'pid': process_info.get('pid', 0),
+                            'name': process_info.get('name', 'Unknown'),
+                            'cpu_percent': round(float(cpu_percent), 2),
+                            'memory_percent': round(float(memory_percent), 2),
+                            'status': status or 'Unknown',
+                            'create_time': create_time_str,
+                        })
+                except (psutil.NoSuchProcess, psutil.AccessDenied, TypeError, ValueError):
+                    continue
+
+            processes.sort(key=lambda x: x['cpu_percent'], reverse=True)
+        except Exception as e:
+            logger.error(f"采集进程信息失败: {e}")
+
+        with self._lock:
+            self._process_info = {
+                'total_processes': total_processes,
+                'top_processes': processes,
+                'running_processes': running_processes,
+                'sleeping_processes': sleeping_processes,
+            }
+            self._last_process_time = time.time()
+
+    def _sample_connections(self):
+        """采集监听中的网络连接（慢节奏）"""
+        connections = []
+        try:
+            for conn in psutil.net_connections():
+                if conn.status == 'LISTEN':
+                    connections.append({
+                        'local_address': f"{conn.laddr.ip}:{conn.laddr.port}" if conn.laddr else "",
+                        'status': conn.status,
+                        'pid': conn.pid
+                    })
+                    if len(connections) >= 50:  # 限制连接数量
+                        break
+        except Exception:
+            pass
+
+        with self._lock:
+            self._connections = connections
+            self._last_connection_time = time.time()
+
+    # ------------------------------------------------------------------
+    # 读取
+    # ------------------------------------------------------------------
+
+    def _latest_pair(self):
+        """返回最近两次样本 (prev, curr)，不足两次时 prev 为 None"""
+        if not self._samples:
+            return None, None
+        if len(self._samples) == 1:
+            return None, self._samples[-1]
+        return self._samples[-2], self._samples[-1]
+
+    def get_cpu_percent(self) -> Dict[str, Any]:
+        """获取总体与每核 CPU 使用率"""
+        self.ensure_started()
+        with self._lock:
+            prev, curr = self._latest_pair()
+        return self._cpu_from_pair(prev, curr)
+
+    @staticmethod
+    def _cpu_from_pair(prev: Optional[CounterSample], curr: Optional[CounterSample]) -> Dict[str, Any]:
+        """根据两次样本计算 CPU 使用率"""
+        if prev is None or curr is None:
+            return {'cpu_percent': 0.0, 'cpu_percent_per_core': []}
+        per_core = [
+            calc_cpu_percent(p, c)
+            for p, c in zip(prev.cpu_times_per_core, curr.cpu_times_per_core)
+        ]
+        return {
+            'cpu_percent': calc_cpu_percent(prev.cpu_times, curr.cpu_times),
+            'cpu_percent_per_core': per_core,
+        }
+
+    def get_load_info(self) -> Dict[str, float]:
+        """获取系统负载；没有 load average 的系统（Windows）用 CPU 使用率估算"""
+        self.ensure_started()
+        with self._lock:
+            load_avg = self._load_avg
+        if load_avg:
+            return {
+                'load_1min': round(load_avg[0], 2),
+                'load_5min': round(load_avg[1], 2),
+                'load_15min': round(load_avg[2], 2),
+            }
+        cpu_percent = self.get_cpu_percent()['cpu_percent']
+        cpu_count = psutil.cpu_count() or 1
+        estimated = round(cpu_percent / 100 * cpu_count, 2)
+        return {
+            'load_1min': estimated,
+            'load_5min': estimated,
+            'load_15min': estimated,
+        }
+
+    def get_process_info(self) -> Dict[str, Any]:
+        """获取最近一次采集的进程信息（CPU 或内存使用率超过 1% 的前 20 个进程）"""
+        self.ensure_started()
+        with self._lock:
+            process_info = dict(self._process_info)
+        process_info['top_processes'] = [
+            proc for proc in process_info['top_processes']
+            if proc['cpu_percent'] > PROCESS_INFO_THRESHOLD or proc['memory_percent'] > PROCESS_INFO_THRESHOLD
+        ][:PROCESS_INFO_LIMIT]
+        return process_info
+
+    def get_connections(self) -> List[Dict[str, Any]]:
+        """获取最近一次采集的监听连接"""
+        self.ensure_started()
+        with self._lock:
+            return list(self._connections)
+
+    def get_realtime_snapshot(self) -> Dict[str, Any]:
+        """获取实时统计快照（结构与 ServerInfoCollector.get_realtime_stats 一致）"""
+        self.ensure_started()
+        with self._lock:
+            prev, curr = self._latest_pair()
+            memory = self._memory
+            cpu_freq = self._cpu_freq
+            process_info = dict(self._process_info)
+            connections = list(self._connections)
+
+        upload_speed = download_speed = 0.0
+        read_speed = write_speed = 0.0
+        if prev is not None and curr is not None:
+            time_diff = curr.timestamp - prev.timestamp
+            if time_diff > 0:
+                if prev.net_io and curr.net_io:
+                    upload_speed = max(0, (curr.net_io.bytes_sent - prev.net_io.bytes_sent) / time_diff)
+                    download_speed = max(0, (curr.net_io.bytes_recv - prev.net_io.bytes_recv) / time_diff)
+                if prev.disk_io and curr.disk_io:
+                    read_speed = max(0, (curr.disk_io.read_bytes - prev.disk_io.read_bytes) / time_diff)
+                    write_speed = max(0, (curr.disk_io.write_bytes - prev.disk_io.write_bytes) / time_diff)
+
+        cpu = self._cpu_from_pair(prev, curr)
+        net_io = curr.net_io if curr else None
+        disk_io = curr.disk_io if curr else None
+        memory = memory or psutil.virtual_memory()
+
+        per_interface_stats = {}
+        for name, stats in psutil.net_io_counters(pernic=True).items():
+            per_interface_stats[name] = {
+                'bytes_sent': stats.bytes_sent,
+                'bytes_recv': stats.bytes_recv,
+                'packets_sent': stats.packets_sent,
+                'packets_recv': stats.packets_recv,
+                'errin': stats.errin,
+                'errout': stats.errout,
+                'dropin': stats.dropin,
+                'dropout': stats.dropout,
+            }
+
+        top_processes = process_info['top_processes'][:REALTIME_PROCESS_LIMIT]
+
+        return {
+            'cpu_percent': cpu['cpu_percent'],
+            'memory_percent': round(memory.percent, 2),
+            'disk_io': {
+                'read_speed': read_speed,
+                'write_speed': write_speed,
+            },
+            'network_io': {
+                'upload_speed': upload_speed,
+                'download_speed': download_speed,
+            },
+            # 网络累计统计信息
+            'network_total': {
+                'bytes_sent': net_io.bytes_sent if net_io else 0,
+                'bytes_recv': net_io.bytes_recv if net_io else 0,
+                'packets_sent': net_io.packets_sent if net_io else 0,
+                'packets_recv': net_io.packets_recv if net_io else 0,
+            },
+            # 磁盘累计统计信息
+            'disk_total': {
+                'read_bytes': disk_io.read_bytes if disk_io else 0,
+                'write_bytes': disk_io.write_bytes if disk_io else 0,
+                'read_count': disk_io.read_count if disk_io else 0,
+                'write_count': disk_io.write_count if disk_io else 0,
+            },
+            # CPU详细信息
+            'cpu_details': {
+                'current_frequency': round(cpu_freq.current, 2) if cpu_freq and cpu_freq.current else 0,
+                'cpu_percent_per_core': cpu['cpu_percent_per_core'],
+            },
+            # 内存详细信息
+            'memory_details': {
+                'total': round(memory.total / (1024 ** 3), 2),
+                'available': round(memory.available / (1024 ** 3), 2),
+                'used': round(memory.used / (1024 ** 3), 2),
+                'free': round(memory.free / (1024 ** 3), 2),
+            },
+            # 系统负载信息
+            'system_load': self.get_load_info(),
+            # 进程统计信息和详细进程信息
+            'process_stats': {
+                'total_processes': process_info['total_processes'],
+                'running_processes': process_info['running_processes'],
+                'sleeping_processes': process_info['sleeping_processes'],
+            },
+            'process_info': {
+                'total_processes': process_info['total_processes'],
+                'top_processes': top_processes,
+                'running_processes': process_info['running_processes'],
+                'sleeping_processes': process_info['sleeping_processes'],
+            },
+            # 网络接口详细统计
+            'network_interfaces': per_interface_stats,
+            # 网络连接
+            'network_connections': connections,
+            'timestamp': datetime.now().isoformat()
+        }
+
+
+# 全局采样器实例
+server_metrics_sampler = ServerMetricsSampler()
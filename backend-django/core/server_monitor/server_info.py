@@ -13,6 +13,8 @@ from datetime import datetime
 from typing import Dict, List, Any, Optional
 import json
 
+from .metrics_sampler import server_metrics_sampler
+
 
 class ServerInfoCollector:
     """服务器信息收集器，支持Linux、Windows、macOS"""
@@ -23,21 +25,8 @@ class ServerInfoCollector:
         self.is_linux = self.system_name == 'Linux'
         self.is_macos = self.system_name == 'Darwin'
         
-        # 用于计算实时速度的缓存数据
-        self._last_network_io = None
-        self._last_network_time = None
-        self._last_disk_io = None
-        self._last_disk_time = None
-        
-        # 用于CPU使用率的缓存数据
-        self._last_cpu_times = None
-        self._last_cpu_time = None
-        
-        # 初始化CPU使用率监控
-        try:
-            psutil.cpu_percent(interval=None)  # 第一次调用初始化
-        except:
-            pass
+        # 后台差值采样器：CPU使用率、IO速率、进程列表、连接均从采样快照读取，不阻塞调用方
+        self.sampler = server_metrics_sampler
     
     def get_all_info(self) -> Dict[str, Any]:
         """获取所有服务器监控信息"""
@@ -96,9 +85,10 @@ class ServerInfoCollector:
     def get_cpu_info(self) -> Dict[str, Any]:
         """获取CPU信息"""
         try:
-            # 使用阻塞方式获取CPU信息（用于初始加载，可以等待）
-            cpu_percent = psutil.cpu_percent(interval=1, percpu=True)
-            overall_cpu_percent = psutil.cpu_percent(interval=1)
+            # 从后台采样器读取基于差值计算的CPU使用率，无需阻塞等待
+            cpu_usage = self.sampler.get_cpu_percent()
+            cpu_percent = cpu_usage['cpu_percent_per_core']
+            overall_cpu_percent = cpu_usage['cpu_percent']
             
             try:
                 cpu_freq = psutil.cpu_freq()
@@ -208,18 +198,8 @@ class ServerInfoCollector:
         network_io = psutil.net_io_counters()
         per_nic = psutil.net_io_counters(pernic=True)
         
-        # 获取网络连接
-        connections = []
-        try:
-            for conn in psutil.net_connections():
-                if conn.status == 'LISTEN':
-                    connections.append({
-                        'local_address': f"{conn.laddr.ip}:{conn.laddr.port}" if conn.laddr else "",
-                        'status': conn.status,
-                        'pid': conn.pid
-                    })
-        except:
-            pass
+        # 获取网络连接（由后台采样器低频采集）
+        connections = self.sampler.get_connections()
         
         # 获取网络接口地址
         addresses = psutil.net_if_addrs()
@@ -278,66 +258,8 @@ class ServerInfoCollector:
         }
     
     def get_process_info(self) -> Dict[str, Any]:
-        """获取进程信息"""
-        processes = []
-        total_processes = 0
-        running_processes = 0
-        sleeping_processes = 0
-        
-        try:
-            for proc in psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_percent', 'status', 'create_time']):
-                try:
-                    process_info = proc.info
-                    total_processes += 1
-                    
-                    # 统计进程状态
-                    status = process_info.get('status', '')
-                    if status == psutil.STATUS_RUNNING:
-                        running_processes += 1
-                    elif status == psutil.STATUS_SLEEPING:
-                        sleeping_processes += 1
-                    
-                    # 获取CPU和内存使用率，处理空值情况
-                    cpu_percent = process_info.get('cpu_percent', 0.0)
-                    memory_percent = process_info.get('memory_percent', 0.0)
-                    
-                    # 确保值不为None
-                    if cpu_percent is None:
-                        cpu_percent = 0.0
-                    if memory_percent is None:
-                        memory_percent = 0.0
-                    
-                    # 只保留CPU或内存使用率较高的进程
-                    if cpu_percent > 1.0 or memory_percent > 1.0:
-                        create_time = process_info.get('create_time')
-                        if create_time:
-                            create_time_str = datetime.fromtimestamp(create_time).isoformat()
-                        else:
-                            create_time_str = datetime.now().isoformat()
-                            
-                        processes.append({
-                            'pid': process_info.get('pid', 0),
-                            'name': process_info.get('name', 'Unknown'),
-                            'cpu_percent': round(float(cpu_percent), 2),
-                            'memory_percent': round(float(memory_percent), 2),
-                            'status': status or 'Unknown',
-                            'create_time': create_time_str,
-                        })
-                except (psutil.NoSuchProcess, psutil.AccessDenied, TypeError, ValueError):
-                    continue
-            
-            # 按CPU使用率排序，取前20个
-            processes.sort(key=lambda x: x['cpu_percent'], reverse=True)
-            
-        except Exception as e:
-            print(f"Error getting process info: {e}")
-        
-        return {
-            'total_processes': total_processes,
-            'top_processes': processes[:20],
-            'running_processes': running_processes,
-            'sleeping_processes': sleeping_processes,
-        }
+        """获取进程信息（由后台采样器低频采集）"""
+        return self.sampler.get_process_info()
     
     def get_system_load(self) -> Dict[str, Any]:
         """获取系统负载信息"""
@@ -355,15 +277,9 @@ class ServerInfoCollector:
                 except:
                     pass
             
-            # Windows系统没有load average，用CPU使用率代替
+            # Windows系统没有load average，用采样器的CPU使用率代替
             if not load_info:
-                cpu_percent = psutil.cpu_percent(interval=1)
-                cpu_count = psutil.cpu_count() or 1
-                load_info = {
-                    'load_1min': round(cpu_percent / 100 * cpu_count, 2),
-                    'load_5min': round(cpu_percent / 100 * cpu_count, 2),
-                    'load_15min': round(cpu_percent / 100 * cpu_count, 2),
-                }
+                load_info = self.sampler.get_load_info()
             
             load_info['cpu_count'] = psutil.cpu_count() or 1
             
@@ -470,248 +386,5 @@ class ServerInfoCollector:
         return round(bytes_value / (1024 ** 2), 2)
     
     def get_realtime_stats(self) -> Dict[str, Any]:
-        """获取实时统计信息（用于实时更新）"""
-        current_time = time.time()
-        
-        # 获取当前网络IO统计
-        current_network_io = psutil.net_io_counters()
-        upload_speed = 0.0
-        download_speed = 0.0
-        
-        if (self._last_network_io is not None and 
-            self._last_network_time is not None and 
-            current_network_io is not None):
-            time_diff = current_time - self._last_network_time
-            if time_diff > 0:
-                bytes_sent_diff = current_network_io.bytes_sent - self._last_network_io.bytes_sent
-                bytes_recv_diff = current_network_io.bytes_recv - self._last_network_io.bytes_recv
-                
-                upload_speed = max(0, bytes_sent_diff / time_diff)
-                download_speed = max(0, bytes_recv_diff / time_diff)
-        
-        # 更新网络IO缓存
-        if current_network_io:
-            self._last_network_io = current_network_io
-            self._last_network_time = current_time
-        
-        # 获取当前磁盘IO统计
-        current_disk_io = psutil.disk_io_counters()
-        read_speed = 0.0
-        write_speed = 0.0
-        
-        if (self._last_disk_io is not None and 
-            self._last_disk_time is not None and 
-            current_disk_io is not None):
-            time_diff = current_time - self._last_disk_time
-            if time_diff > 0:
-                read_bytes_diff = current_disk_io.read_bytes - self._last_disk_io.read_bytes
-                write_bytes_diff = current_disk_io.write_bytes - self._last_disk_io.write_bytes
-                
-                read_speed = max(0, read_bytes_diff / time_diff)
-                write_speed = max(0, write_bytes_diff / time_diff)
-        
-        # 更新磁盘IO缓存
-        if current_disk_io:
-            self._last_disk_io = current_disk_io
-            self._last_disk_time = current_time
-        
-        # 获取CPU详细信息
-        # 使用非阻塞方式获取CPU使用率，如果结果为0则使用阻塞方式重新获取
-        cpu_percent_per_core = psutil.cpu_percent(interval=None, percpu=True)
-        overall_cpu_percent = psutil.cpu_percent(interval=None)
-        
-        # 如果总体CPU使用率为0但核心使用率不全为0，使用核心使用率的平均值
-        if overall_cpu_percent == 0.0 and cpu_percent_per_core and not all(core == 0.0 for core in cpu_percent_per_core):
-            overall_cpu_percent = sum(cpu_percent_per_core) / len(cpu_percent_per_core)
-        
-        # 如果CPU使用率为0且所有核心都为0，可能是测量问题，使用短时间间隔重新测量
-        elif overall_cpu_percent == 0.0 and all(core == 0.0 for core in cpu_percent_per_core):
-            try:
-                # 使用短时间间隔重新测量
-                overall_cpu_percent = psutil.cpu_percent(interval=0.1)
-                cpu_percent_per_core = psutil.cpu_percent(interval=0.1, percpu=True)
-            except:
-                # 如果仍然失败，保持原值
-                pass
-        
-        try:
-            cpu_freq = psutil.cpu_freq()
-        except (FileNotFoundError, OSError):
-            # macOS等系统可能不支持CPU频率获取
-            cpu_freq = None
-        
-        # 获取内存详细信息
-        virtual_mem = psutil.virtual_memory()
-        
-        # 获取系统负载
-        load_info = {}
-        try:
-            if hasattr(psutil, 'getloadavg'):
-                try:
-                    load_avg = psutil.getloadavg()
-                    load_info = {
-                        'load_1min': round(load_avg[0], 2),
-                        'load_5min': round(load_avg[1], 2),
-                        'load_15min': round(load_avg[2], 2),
-                    }
-                except:
-                    pass
-            
-            # Windows系统没有load average，用CPU使用率代替
-            if not load_info:
-                cpu_percent = psutil.cpu_percent(interval=0.1)
-                cpu_count = psutil.cpu_count() or 1
-                load_info = {
-                    'load_1min': round(cpu_percent / 100 * cpu_count, 2),
-                    'load_5min': round(cpu_percent / 100 * cpu_count, 2),
-                    'load_15min': round(cpu_percent / 100 * cpu_count, 2),
-                }
-        except:
-            load_info = {
-                'load_1min': 0.0,
-                'load_5min': 0.0,
-                'load_15min': 0.0,
-            }
-        
-        # 获取进程统计信息和详细进程信息
-        total_processes = 0
-        running_processes = 0
-        sleeping_processes = 0
-        top_processes = []
-        
-        try:
-            for proc in psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_percent', 'status', 'create_time']):
-                try:
-                    process_info = proc.info
-                    total_processes += 1
-                    
-                    # 统计进程状态
-                    status = process_info.get('status', '')
-                    if status == psutil.STATUS_RUNNING:
-                        running_processes += 1
-                    elif status == psutil.STATUS_SLEEPING:
-                        sleeping_processes += 1
-                    
-                    # 获取CPU和内存使用率，处理空值情况
-                    cpu_percent = process_info.get('cpu_percent', 0.0)
-                    memory_percent = process_info.get('memory_percent', 0.0)
-                    
-                    # 确保值不为None
-                    if cpu_percent is None:
-                        cpu_percent = 0.0
-                    if memory_percent is None:
-                        memory_percent = 0.0
-                    
-                    # 只保留CPU或内存使用率较高的进程（实时监控中降低阈值以获取更多数据）
-                    if cpu_percent > 0.5 or memory_percent > 0.5:
-                        create_time = process_info.get('create_time')
-                        if create_time:
-                            create_time_str = datetime.fromtimestamp(create_time).isoformat()
-                        else:
-                            create_time_str = datetime.now().isoformat()
-                            
-                        top_processes.append({
-                            'pid': process_info.get('pid', 0),
-                            'name': process_info.get('name', 'Unknown'),
-                            'cpu_percent': round(float(cpu_percent), 2),
-                            'memory_percent': round(float(memory_percent), 2),
-                            'status': status or 'Unknown',
-                            'create_time': create_time_str,
-                        })
-                except (psutil.NoSuchProcess, psutil.AccessDenied, TypeError, ValueError):
-                    continue
-            
-            # 按CPU使用率排序，取前15个（实时监控中减少数量以提高性能）
-            top_processes.sort(key=lambda x: x['cpu_percent'], reverse=True)
-            top_processes = top_processes[:15]
-            
-        except Exception as e:
-            print(f"Error getting process info in realtime: {e}")
-        
-        # 获取网络接口详细统计
-        per_nic = psutil.net_io_counters(pernic=True)
-        per_interface_stats = {}
-        for name, stats in per_nic.items():
-            per_interface_stats[name] = {
-                'bytes_sent': stats.bytes_sent,
-                'bytes_recv': stats.bytes_recv,
-                'packets_sent': stats.packets_sent,
-                'packets_recv': stats.packets_recv,
-                'errin': stats.errin,
-                'errout': stats.errout,
-                'dropin': stats.dropin,
-                'dropout': stats.dropout,
-            }
-        
-        # 获取网络连接（限制数量以提高性能）
-        connections = []
-        try:
-            for conn in psutil.net_connections():
-                if conn.status == 'LISTEN':
-                    connections.append({
-                        'local_address': f"{conn.laddr.ip}:{conn.laddr.port}" if conn.laddr else "",
-                        'status': conn.status,
-                        'pid': conn.pid
-                    })
-                    if len(connections) >= 50:  # 限制连接数量
-                        break
-        except:
-            pass
-        
-        return {
-            'cpu_percent': round(overall_cpu_percent, 2),
-            'memory_percent': round(virtual_mem.percent, 2),
-            'disk_io': {
-                'read_speed': read_speed,
-                'write_speed': write_speed,
-            },
-            'network_io': {
-                'upload_speed': upload_speed,
-                'download_speed': download_speed,
-            },
-            # 网络累计统计信息
-            'network_total': {
-                'bytes_sent': current_network_io.bytes_sent if current_network_io else 0,
-                'bytes_recv': current_network_io.bytes_recv if current_network_io else 0,
-                'packets_sent': current_network_io.packets_sent if current_network_io else 0,
-                'packets_recv': current_network_io.packets_recv if current_network_io else 0,
-            },
-            # 磁盘累计统计信息
-            'disk_total': {
-                'read_bytes': current_disk_io.read_bytes if current_disk_io else 0,
-                'write_bytes': current_disk_io.write_bytes if current_disk_io else 0,
-                'read_count': current_disk_io.read_count if current_disk_io else 0,
-                'write_count': current_disk_io.write_count if current_disk_io else 0,
-            },
-            # CPU详细信息
-            'cpu_details': {
-                'current_frequency': round(cpu_freq.current, 2) if cpu_freq and cpu_freq.current else 0,
-                'cpu_percent_per_core': [round(x, 2) for x in cpu_percent_per_core] if cpu_percent_per_core else [],
-            },
-            # 内存详细信息
-            'memory_details': {
-                'total': self._bytes_to_gb(virtual_mem.total),
-                'available': self._bytes_to_gb(virtual_mem.available),
-                'used': self._bytes_to_gb(virtual_mem.used),
-                'free': self._bytes_to_gb(virtual_mem.free),
-            },
-            # 系统负载信息
-            'system_load': load_info,
-            # 进程统计信息和详细进程信息
-            'process_stats': {
-                'total_processes': total_processes,
-                'running_processes': running_processes,
-                'sleeping_processes': sleeping_processes,
-            },
-            'process_info': {
-                'total_processes': total_processes,
-                'top_processes': top_processes,
-                'running_processes': running_processes,
-                'sleeping_processes': sleeping_processes,
-            },
-            # 网络接口详细统计
-            'network_interfaces': per_interface_stats,
-            # 网络连接
-            'network_connections': connections,
-            'timestamp': datetime.now().isoformat()
-        } 
\ No newline at end of file
+        """获取实时统计信息（用于实时更新，直接返回后台采样器的最新快照）"""
+        return self.sampler.get_realtime_snapshot()
@@ -4,9 +4,12 @@
 # file: server_monitor_api.py
 # author: AI Assistant
 
+import socket
+
 from ninja import Router
 from typing import Dict, Any
 
+from core.monitor_history.monitor_history_service import record_monitor_sample
 from .server_info import ServerInfoCollector
 from .server_monitor_schema import (
     ServerMonitorResponseSchema,
@@ -127,7 +130,9 @@ def get_server_overview(request):
 def get_realtime_stats(request):
     """获取实时统计信息"""
     try:
-        return server_collector.get_realtime_stats()
+        data = server_collector.get_realtime_stats()
+        record_monitor_sample('server', data, socket.gethostname())
+        return data
     except Exception as e:
         print(f"Error in get_realtime_stats: {e}")
         return {
@@ -13,6 +13,7 @@ from ninja.errors import HttpError
 from ninja.pagination import paginate
 
 from application.settings import DEFAULT_PASSWORD
+from common.fu_auth import TokenBlacklist
 from common.fu_crud import create, retrieve, delete, batch_delete
 from common.fu_pagination import MyPagination
 from common.fu_schema import response_success
@@ -41,6 +42,12 @@ from core.user.user_schema import (
 router = Router()
 
 
+def _revoke_tokens_if_disabled(user: User, was_enabled: bool):
+    """用户由正常变为禁用、锁定或取消激活时，撤销已签发的 token"""
+    if was_enabled and not (user.user_status == 1 and user.is_active):
+        TokenBlacklist.revoke_user_tokens(str(user.id))
+
+
 @router.post("/user", response=UserSchemaOut, summary="创建用户")
 def create_user(request, data: UserSchemaIn):
     """
@@ -204,11 +211,15 @@ def batch_update_user_status(request, data: UserBatchUpdateStatusIn):
     # 过滤掉系统用户、超级管理员和当前用户
     users = User.objects.filter(
         id__in=data.ids,
-        user_type__ne=0,
         is_superuser=False
-    ).exclude(id=current_user_id)
-    
-    count = users.update(user_status=data.user_status)
+    ).exclude(user_type=0).exclude(id=current_user_id)
+    
+    user_ids = list(users.values_list('id', flat=True))
+    count = User.objects.filter(id__in=user_ids).update(user_status=data.user_status)
+    # 禁用或锁定后撤销已签发的 token
+    if data.user_status != 1:
+        for user_id in user_ids:
+            TokenBlacklist.revoke_user_tokens(str(user_id))
     return UserBatchUpdateStatusOut(count=count)
 
 
@@ -297,6 +308,8 @@ def change_password(request, data: UserPasswordResetIn):
     # 设置新密码
     user.set_password(data.new_password)
     user.save()
+    # 撤销修改前签发的 token，需重新登录
+    TokenBlacklist.revoke_user_tokens(str(user.id))
     
     # TODO: 记录密码修改日志
     
@@ -427,6 +440,7 @@ def reset_password(request, user_id: str):
     user = get_object_or_404(User, id=user_id)
     user.set_password(DEFAULT_PASSWORD)
     user.save()
+    TokenBlacklist.revoke_user_tokens(str(user.id))
     
     # TODO: 记录密码重置日志
     
@@ -488,6 +502,7 @@ def update_user(request, user_id: str, data: UserSchemaIn):
     
     # 更新用户信息
     role_changed = False
+    was_enabled = user.user_status == 1 and user.is_active
     user_data = data.dict()
     
     # 处理 manager/manager_id 字段
@@ -520,6 +535,7 @@ def update_user(request, user_id: str, data: UserSchemaIn):
                 setattr(user, attr, value)
     
     user.save()
+    _revoke_tokens_if_disabled(user, was_enabled)
     
     # 如果角色发生变更，清除权限缓存
     if role_changed:
@@ -570,6 +586,7 @@ def patch_user(request, user_id: str, data: UserSchemaPatch):
     
     # 更新字段
     role_changed = False
+    was_enabled = user.user_status == 1 and user.is_active
     
     # 处理 manager/manager_id
     # 只要其中一个在 update_data 中，就说明需要更新
@@ -599,6 +616,7 @@ def patch_user(request, user_id: str, data: UserSchemaPatch):
             setattr(user, attr, value)
     
     user.save()
+    _revoke_tokens_if_disabled(user, was_enabled)
     
     # 如果角色发生变更，清除权限缓存
     if role_changed:
@@ -2,6 +2,7 @@
 import json
 import logging
 import asyncio
+import socket
 from typing import Optional, Dict, Any
 from datetime import datetime
 from urllib.parse import parse_qs
@@ -11,6 +12,8 @@ from asgiref.sync import sync_to_async
 import jwt
 from django.conf import settings
 
+from core.websocket.monitor_hub import MonitorSampler, monitor_hub
+
 logger = logging.getLogger(__name__)
 
 
@@ -114,6 +117,11 @@ class TokenAuthWebSocketConsumer(AsyncWebsocketConsumer):
         """发送错误消息"""
         await self.send_message('error', error_message)
 
+    # 处理监控采样器广播的消息
+    async def monitor_sample(self, event):
+        """转发共享采样器广播的监控数据"""
+        await self.send_message(event['message_type'], event['message'], event.get('data'))
+
 
 class TestWebSocketConsumer(TokenAuthWebSocketConsumer):
     """测试WebSocket消费者"""
@@ -181,17 +189,49 @@ class NotificationConsumer(TokenAuthWebSocketConsumer):
         await self.send_message('notification', event['message'], event.get('data'))
 
 
+
+
+def _build_project_redis_collector():
+    """根据项目Redis配置创建收集器"""
+    from core.redis_monitor.redis_collector import RedisInfoCollector
+    from core.redis_monitor.redis_monitor_api import get_redis_config
+
+    redis_host, redis_port, redis_password, redis_db = get_redis_config()
+    return RedisInfoCollector(
+        host=redis_host,
+        port=redis_port,
+        password=redis_password,
+        db=redis_db
+    )
+
+
+def _build_database_collector(db_config: Dict[str, Any]):
+    """根据数据库配置创建收集器"""
+    from core.database_monitor.database_collector import DatabaseCollector
+
+    return DatabaseCollector(
+        db_type=db_config['db_type'],
+        host=db_config['host'],
+        port=db_config['port'],
+        user=db_config['user'],
+        password=db_config['password'],
+        database=db_config['database']
+    )
+
+
 class ServerMonitorConsumer(TokenAuthWebSocketConsumer):
     """服务器监控WebSocket消费者"""
     
+    # 服务器指标按主机区分：集群模式下各主机分别采样，不同主机的订阅者不共享租约和组
+    monitor_key = f'server:{socket.gethostname()}'
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.monitor_task = None
         self.is_monitoring = False
         self.monitor_interval = 2  # 固定2秒更新一次
-        # 创建持久的收集器实例以保持缓存数据
-        from core.server_monitor.server_info import ServerInfoCollector
-        self.server_collector = ServerInfoCollector()
+        # 使用进程内共享的收集器实例以保持缓存数据
+        from core.server_monitor.server_monitor_api import server_collector
+        self.server_collector = server_collector
         
     async def connect(self):
         """连接并开始监控"""
@@ -205,9 +245,9 @@ class ServerMonitorConsumer(TokenAuthWebSocketConsumer):
 
     async def disconnect(self, close_code):
         """断开连接并停止监控"""
-        self.is_monitoring = False
-        if self.monitor_task:
-            self.monitor_task.cancel()
+        if self.is_monitoring:
+            self.is_monitoring = False
+            await monitor_hub.unsubscribe(self.monitor_key, self.channel_name)
             
         if hasattr(self, 'user_id'):
             await self.channel_layer.group_discard(
@@ -231,22 +271,33 @@ class ServerMonitorConsumer(TokenAuthWebSocketConsumer):
         else:
             await self.send_error(f'未知的监控命令: {message_type}')
 
+    def _create_sampler(self) -> MonitorSampler:
+        """创建服务器监控采样器"""
+        return MonitorSampler(
+            key=self.monitor_key,
+            collect_func=self.server_collector.get_realtime_stats,
+            message_type='realtime_stats',
+            message='实时统计信息',
+            error_message='获取监控数据失败',
+            interval=self.monitor_interval,
+            history=('server', socket.gethostname()),
+        )
+
     async def start_monitoring(self):
-        """开始监控"""
+        """开始监控（订阅共享采样器）"""
         if self.is_monitoring:
             await self.send_message('monitor_status', '监控已在运行')
             return
             
         self.is_monitoring = True
-        self.monitor_task = asyncio.create_task(self.monitor_loop())
+        await monitor_hub.subscribe(self.monitor_key, self.channel_name, self._create_sampler)
         await self.send_message('monitor_started', f'开始监控，间隔{self.monitor_interval}秒')
 
     async def stop_monitoring(self):
-        """停止监控"""
-        self.is_monitoring = False
-        if self.monitor_task:
-            self.monitor_task.cancel()
-            self.monitor_task = None
+        """停止监控（取消订阅共享采样器）"""
+        if self.is_monitoring:
+            self.is_monitoring = False
+            await monitor_hub.unsubscribe(self.monitor_key, self.channel_name)
         await self.send_message('monitor_stopped', '监控已停止')
 
     async def restart_monitoring(self):
@@ -255,28 +306,6 @@ class ServerMonitorConsumer(TokenAuthWebSocketConsumer):
         await asyncio.sleep(0.1)  # 短暂延迟
         await self.start_monitoring()
 
-    async def monitor_loop(self):
-        """监控循环"""
-        try:
-            while self.is_monitoring:
-                try:
-                    await self.send_realtime_stats()
-                except Exception as e:
-                    logger.error(f"发送实时数据失败: {str(e)}")
-                    # 发送错误消息但不停止监控循环
-                    try:
-                        await self.send_error(f'获取监控数据失败: {str(e)}')
-                    except:
-                        pass
-                
-                # 等待下一次监控间隔
-                await asyncio.sleep(self.monitor_interval)
-        except asyncio.CancelledError:
-            logger.info("监控循环被取消")
-        except Exception as e:
-            logger.error(f"监控循环严重错误: {str(e)}")
-            self.is_monitoring = False
-
     async def send_server_overview(self):
         """发送服务器概览信息"""
         try:
@@ -301,9 +330,10 @@ class ServerMonitorConsumer(TokenAuthWebSocketConsumer):
 class RedisMonitorConsumer(TokenAuthWebSocketConsumer):
     """Redis监控WebSocket消费者"""
     
+    monitor_key = 'redis'
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.monitor_task = None
         self.is_monitoring = False
         self.monitor_interval = 2  # 固定2秒更新一次
         
@@ -319,9 +349,9 @@ class RedisMonitorConsumer(TokenAuthWebSocketConsumer):
 
     async def disconnect(self, close_code):
         """断开连接并停止监控"""
-        self.is_monitoring = False
-        if self.monitor_task:
-            self.monitor_task.cancel()
+        if self.is_monitoring:
+            self.is_monitoring = False
+            await monitor_hub.unsubscribe(self.monitor_key, self.channel_name)
             
         if hasattr(self, 'user_id'):
             await self.channel_layer.group_discard(
@@ -347,22 +377,34 @@ class RedisMonitorConsumer(TokenAuthWebSocketConsumer):
         else:
             await self.send_error(f'未知的Redis监控命令: {message_type}')
 
+    def _create_sampler(self) -> MonitorSampler:
+        """创建Redis监控采样器，采样器生命周期内复用同一个收集器"""
+        collector = _build_project_redis_collector()
+        return MonitorSampler(
+            key=self.monitor_key,
+            collect_func=lambda: collector.get_realtime_stats('project_redis'),
+            message_type='redis_realtime',
+            message='Redis实时统计',
+            error_message='获取Redis监控数据失败',
+            interval=self.monitor_interval,
+            history=('redis', 'project_redis'),
+        )
+
     async def start_monitoring(self):
-        """开始监控"""
+        """开始监控（订阅共享采样器）"""
         if self.is_monitoring:
             await self.send_message('monitor_status', 'Redis监控已在运行')
             return
             
         self.is_monitoring = True
-        self.monitor_task = asyncio.create_task(self.monitor_loop())
+        await monitor_hub.subscribe(self.monitor_key, self.channel_name, self._create_sampler)
         await self.send_message('monitor_started', f'开始Redis监控，间隔{self.monitor_interval}秒')
 
     async def stop_monitoring(self):
-        """停止监控"""
-        self.is_monitoring = False
-        if self.monitor_task:
-            self.monitor_task.cancel()
-            self.monitor_task = None
+        """停止监控（取消订阅共享采样器）"""
+        if self.is_monitoring:
+            self.is_monitoring = False
+            await monitor_hub.unsubscribe(self.monitor_key, self.channel_name)
         await self.send_message('monitor_stopped', 'Redis监控已停止')
 
     async def restart_monitoring(self):
@@ -371,50 +413,10 @@ class RedisMonitorConsumer(TokenAuthWebSocketConsumer):
         await asyncio.sleep(0.1)  # 短暂延迟
         await self.start_monitoring()
 
-    async def monitor_loop(self):
-        """监控循环"""
-        try:
-            while self.is_monitoring:
-                try:
-                    await self.send_realtime_stats()
-                except Exception as e:
-                    logger.error(f"发送Redis实时数据失败: {str(e)}")
-                    # 发送错误消息但不停止监控循环
-                    try:
-                        await self.send_error(f'获取Redis监控数据失败: {str(e)}')
-                    except:
-                        pass
-                
-                # 等待下一次监控间隔
-                await asyncio.sleep(self.monitor_interval)
-        except asyncio.CancelledError:
-            logger.info("Redis监控循环被取消")
-        except Exception as e:
-            logger.error(f"Redis监控循环严重错误: {str(e)}")
-            self.is_monitoring = False
-
     async def send_redis_overview(self):
         """发送Redis概览信息"""
         try:
-            from core.redis_monitor import RedisInfoCollector
-            from django.conf import settings
-            
-            # 从Django设置中获取Redis配置
-            redis_host = getattr(settings, 'REDIS_HOST', '127.0.0.1')
-            redis_port = 6379
-            redis_password = getattr(settings, 'REDIS_PASSWORD', None)
-            redis_db = int(getattr(settings, 'REDIS_DB', '0'))
-            
-            if redis_password == '':
-                redis_password = None
-            
-            collector = RedisInfoCollector(
-                host=redis_host,
-                port=redis_port,
-                password=redis_password,
-                db=redis_db
-            )
-            
+            collector = _build_project_redis_collector()
             overview_data = await sync_to_async(collector.get_all_info)('project_redis', '项目Redis')
             
             await self.send_message('redis_overview', 'Redis概览信息', overview_data)
@@ -425,25 +427,7 @@ class RedisMonitorConsumer(TokenAuthWebSocketConsumer):
     async def send_realtime_stats(self):
         """发送Redis实时统计信息"""
         try:
-            from core.redis_monitor import RedisInfoCollector
-            from django.conf import settings
-            
-            # 从Django设置中获取Redis配置
-            redis_host = getattr(settings, 'REDIS_HOST', '127.0.0.1')
-            redis_port = 6379
-            redis_password = getattr(settings, 'REDIS_PASSWORD', None)
-            redis_db = int(getattr(settings, 'REDIS_DB', '0'))
-            
-            if redis_password == '':
-                redis_password = None
-            
-            collector = RedisInfoCollector(
-                host=redis_host,
-                port=redis_port,
-                password=redis_password,
-                db=redis_db
-            )
-            
+            collector = _build_project_redis_collector()
             realtime_data = await sync_to_async(collector.get_realtime_stats)('project_redis')
             
             await self.send_message('redis_realtime', 'Redis实时统计', realtime_data)
@@ -454,25 +438,7 @@ class RedisMonitorConsumer(TokenAuthWebSocketConsumer):
     async def test_redis_connection(self):
         """测试Redis连接"""
         try:
-            from core.redis_monitor import RedisInfoCollector
-            from django.conf import settings
-            
-            # 从Django设置中获取Redis配置
-            redis_host = getattr(settings, 'REDIS_HOST', '127.0.0.1')
-            redis_port = 6379
-            redis_password = getattr(settings, 'REDIS_PASSWORD', None)
-            redis_db = int(getattr(settings, 'REDIS_DB', '0'))
-            
-            if redis_password == '':
-                redis_password = None
-            
-            collector = RedisInfoCollector(
-                host=redis_host,
-                port=redis_port,
-                password=redis_password,
-                db=redis_db
-            )
-            
+            collector = _build_project_redis_collector()
             test_result = await sync_to_async(collector.test_connection)()
             
             await self.send_message('connection_test', 'Redis连接测试结果', test_result)
@@ -486,10 +452,13 @@ class DatabaseMonitorConsumer(TokenAuthWebSocketConsumer):
     
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.monitor_task = None
         self.is_monitoring = False
         self.monitor_interval = 2  # 固定2秒更新一次
         self.current_db_name = None
+
+    @staticmethod
+    def _monitor_key(db_name: str) -> str:
+        return f'database:{db_name}'
         
     async def connect(self):
         """连接并开始监控"""
@@ -503,9 +472,9 @@ class DatabaseMonitorConsumer(TokenAuthWebSocketConsumer):
 
     async def disconnect(self, close_code):
         """断开连接并停止监控"""
-        self.is_monitoring = False
-        if self.monitor_task:
-            self.monitor_task.cancel()
+        if self.is_monitoring and self.current_db_name:
+            self.is_monitoring = False
+            await monitor_hub.unsubscribe(self._monitor_key(self.current_db_name), self.channel_name)
             
         if hasattr(self, 'user_id'):
             await self.channel_layer.group_discard(
@@ -549,59 +518,64 @@ class DatabaseMonitorConsumer(TokenAuthWebSocketConsumer):
         else:
             await self.send_error(f'未知的数据库监控命令: {message_type}')
 
+    async def _get_database_config(self, db_name: str) -> Optional[Dict[str, Any]]:
+        """按名称查找数据库配置，未找到时向客户端发送错误"""
+        from core.database_monitor.database_monitor_api import get_database_configs
+
+        configs = await sync_to_async(get_database_configs)()
+        db_config = next((config for config in configs if config['db_name'] == db_name), None)
+        if not db_config:
+            await self.send_error(f'数据库 {db_name} 未找到')
+        return db_config
+
     async def start_monitoring(self, db_name: str):
-        """开始监控"""
+        """开始监控（订阅该数据库的共享采样器）"""
         if self.is_monitoring:
             await self.send_message('monitor_status', '数据库监控已在运行')
             return
             
+        db_config = await self._get_database_config(db_name)
+        if not db_config:
+            return
+
+        def create_sampler() -> MonitorSampler:
+            collector = _build_database_collector(db_config)
+            return MonitorSampler(
+                key=self._monitor_key(db_name),
+                collect_func=lambda: collector.get_realtime_stats(db_name),
+                message_type='database_realtime',
+                message='数据库实时统计',
+                error_message='获取数据库监控数据失败',
+                interval=self.monitor_interval,
+                history=('database', db_name),
+            )
+
         self.current_db_name = db_name
         self.is_monitoring = True
-        self.monitor_task = asyncio.create_task(self.monitor_loop())
+        await monitor_hub.subscribe(self._monitor_key(db_name), self.channel_name, create_sampler)
         await self.send_message('monitor_started', f'开始数据库监控({db_name})，间隔{self.monitor_interval}秒')
 
     async def stop_monitoring(self):
-        """停止监控"""
+        """停止监控（取消订阅共享采样器）"""
+        if self.is_monitoring and self.current_db_name:
+            self.is_monitoring = False
+            await monitor_hub.unsubscribe(self._monitor_key(self.current_db_name), self.channel_name)
         self.is_monitoring = False
-        if self.monitor_task:
-            self.monitor_task.cancel()
-            self.monitor_task = None
         self.current_db_name = None
         await self.send_message('monitor_stopped', '数据库监控已停止')
 
     async def restart_monitoring(self):
         """重启监控"""
         if self.current_db_name:
+            db_name = self.current_db_name
             await self.stop_monitoring()
             await asyncio.sleep(0.1)  # 短暂延迟
-            await self.start_monitoring(self.current_db_name)
-
-    async def monitor_loop(self):
-        """监控循环"""
-        try:
-            while self.is_monitoring and self.current_db_name:
-                try:
-                    await self.send_realtime_stats(self.current_db_name)
-                except Exception as e:
-                    logger.error(f"发送数据库实时数据失败: {str(e)}")
-                    # 发送错误消息但不停止监控循环
-                    try:
-                        await self.send_error(f'获取数据库监控数据失败: {str(e)}')
-                    except:
-                        pass
-                
-                # 等待下一次监控间隔
-                await asyncio.sleep(self.monitor_interval)
-        except asyncio.CancelledError:
-            logger.info("数据库监控循环被取消")
-        except Exception as e:
-            logger.error(f"数据库监控循环严重错误: {str(e)}")
-            self.is_monitoring = False
+            await self.start_monitoring(db_name)
 
     async def send_database_configs(self):
         """发送数据库配置列表"""
         try:
-            from core.database_monitor import get_database_configs
+            from core.database_monitor.database_monitor_api import get_database_configs
             
             configs = await sync_to_async(get_database_configs)()
             
@@ -613,25 +587,11 @@ class DatabaseMonitorConsumer(TokenAuthWebSocketConsumer):
     async def send_database_overview(self, db_name: str):
         """发送数据库概览信息"""
         try:
-            from core.database_monitor import get_database_configs
-            from core.database_monitor import DatabaseCollector
-            
-            configs = await sync_to_async(get_database_configs)()
-            db_config = next((config for config in configs if config['db_name'] == db_name), None)
-            
+            db_config = await self._get_database_config(db_name)
             if not db_config:
-                await self.send_error(f'数据库 {db_name} 未找到')
                 return
             
-            collector = DatabaseCollector(
-                db_type=db_config['db_type'],
-                host=db_config['host'],
-                port=db_config['port'],
-                user=db_config['user'],
-                password=db_config['password'],
-                database=db_config['database']
-            )
-            
+            collector = _build_database_collector(db_config)
             overview_data = await sync_to_async(collector.get_all_info)(db_name, db_config['name'])
             
             await self.send_message('database_overview', '数据库概览信息', overview_data)
@@ -642,25 +602,11 @@ class DatabaseMonitorConsumer(TokenAuthWebSocketConsumer):
     async def send_realtime_stats(self, db_name: str):
         """发送数据库实时统计信息"""
         try:
-            from core.database_monitor import get_database_configs
-            from core.database_monitor import DatabaseCollector
-            
-            configs = await sync_to_async(get_database_configs)()
-            db_config = next((config for config in configs if config['db_name'] == db_name), None)
-            
+            db_config = await self._get_database_config(db_name)
             if not db_config:
-                await self.send_error(f'数据库 {db_name} 未找到')
                 return
             
-            collector = DatabaseCollector(
-                db_type=db_config['db_type'],
-                host=db_config['host'],
-                port=db_config['port'],
-                user=db_config['user'],
-                password=db_config['password'],
-                database=db_config['database']
-            )
-            
+            collector = _build_database_collector(db_config)
             realtime_data = await sync_to_async(collector.get_realtime_stats)(db_name)
             
             await self.send_message('database_realtime', '数据库实时统计', realtime_data)
@@ -671,25 +617,11 @@ class DatabaseMonitorConsumer(TokenAuthWebSocketConsumer):
     async def test_database_connection(self, db_name: str):
         """测试数据库连接"""
         try:
-            from core.database_monitor import get_database_configs
-            from core.database_monitor import DatabaseCollector
-            
-            configs = await sync_to_async(get_database_configs)()
-            db_config = next((config for config in configs if config['db_name'] == db_name), None)
-            
+            db_config = await self._get_database_config(db_name)
             if not db_config:
-                await self.send_error(f'数据库 {db_name} 未找到')
                 return
             
-            collector = DatabaseCollector(
-                db_type=db_config['db_type'],
-                host=db_config['host'],
-                port=db_config['port'],
-                user=db_config['user'],
-                password=db_config['password'],
-                database=db_config['database']
-            )
-            
+            collector = _build_database_collector(db_config)
             test_result = await sync_to_async(collector.test_connection)()
             
             await self.send_message('connection_test', '数据库连接测试结果', test_result)
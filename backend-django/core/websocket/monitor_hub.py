@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""
+监控采样中心
+
+同一进程内每个监控数据源（服务器 / Redis / 某个数据库）只运行一个后台采样器，
+按固定间隔采集一次数据，并通过 channel layer 的组广播推送给所有订阅者。
+
+- 订阅者引用计数：第一个订阅者加入时启动采样，最后一个订阅者离开时停止采样
+- 集群模式：多个进程通过缓存租约竞争同一数据源的采样权，只有持有租约的进程采集并广播，
+  其它进程的订阅者通过 channel layer 组同样能收到数据；持有者停止后租约过期，其它进程自动接管
+"""
+import asyncio
+import hashlib
+import logging
+import re
+import uuid
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+
+from asgiref.sync import sync_to_async
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.cache import cache
+
+from core.monitor_history.monitor_history_service import record_monitor_sample
+
+logger = logging.getLogger(__name__)
+
+MONITOR_GROUP_PREFIX = "monitor_"
+MONITOR_LEASE_PREFIX = "monitor_sampler_lease:"
+
+# 进程唯一标识，用于集群租约
+_PROCESS_ID = uuid.uuid4().hex
+
+
+def build_group_name(key: str) -> str:
+    """根据数据源标识生成合法的 channel layer 组名（仅允许字母数字、-、_、.，长度 < 100）"""
+    name = MONITOR_GROUP_PREFIX + re.sub(r'[^0-9A-Za-z_.-]', '_', key)
+    if len(name) > 90:
+        name = name[:60] + '_' + hashlib.md5(key.encode('utf-8')).hexdigest()
+    return name
+
+
+class MonitorSampler:
+    """单个数据源的后台采样器"""
+
+    def __init__(self, key: str, collect_func: Callable[[], Any], message_type: str,
+                 message: str, error_message: str, interval: float = 2,
+                 history: Optional[Tuple[str, str]] = None):
+        """
+        :param history: 记录监控历史使用的 (数据源类型, 数据源标识)，为空则不记录
+        """
+        self.key = key
+        self.group_name = build_group_name(key)
+        self.collect_func = collect_func
+        self.message_type = message_type
+        self.message = message
+        self.error_message = error_message
+        self.interval = interval
+        self.history = history
+        self.cluster_mode = getattr(settings, 'MONITOR_SAMPLER_CLUSTER_MODE', True)
+        self.lease_key = f"{MONITOR_LEASE_PREFIX}{key}"
+        self.lease_timeout = max(int(interval * 3), 5)
+        self.is_leader = False
+        self.task: Optional[asyncio.Task] = None
+        self.last_data: Any = None
+
+    def start(self):
+        """启动采样任务"""
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._run())
+            logger.info(f"监控采样器已启动: {self.key}")
+
+    async def stop(self):
+        """停止采样任务并释放租约"""
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self.task = None
+        if self.is_leader:
+            await sync_to_async(self._release_lease, thread_sensitive=False)()
+        logger.info(f"监控采样器已停止: {self.key}")
+
+    def _acquire_lease(self) -> bool:
+        """获取或续期集群采样租约"""
+        try:
+            if self.is_leader and cache.get(self.lease_key) == _PROCESS_ID:
+                cache.touch(self.lease_key, self.lease_timeout)
+                return True
+            self.is_leader = bool(cache.add(self.lease_key, _PROCESS_ID, self.lease_timeout))
+            return self.is_leader
+        except Exception as e:
+            # 缓存不可用时退化为进程内采样
+            logger.warning(f"获取监控采样租约失败，退化为本进程采样: {e}")
+            self.is_leader = True
+            return True
+
+    def _release_lease(self):
+        """释放集群采样租约"""
+        try:
+            if cache.get(self.lease_key) == _PROCESS_ID:
+                cache.delete(self.lease_key)
+        except Exception as e:
+            logger.warning(f"释放监控采样租约失败: {e}")
+        finally:
+            self.is_leader = False
+
+    async def _run(self):
+        """采样循环：每个间隔采集一次并广播到组"""
+        channel_layer = get_channel_layer()
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                started_at = loop.time()
+                should_collect = True
+                if self.cluster_mode:
+                    should_collect = await sync_to_async(self._acquire_lease, thread_sensitive=False)()
+
+                if should_collect:
+                    try:
+                        self.last_data = await sync_to_async(self.collect_func, thread_sensitive=False)()
+                        if self.history:
+                            await sync_to_async(record_monitor_sample, thread_sensitive=False)(
+                                self.history[0], self.last_data, self.history[1]
+                            )
+                        event = {
+                            'type': 'monitor.sample',
+                            'message_type': self.message_type,
+                            'message': self.message,
+                            'data': self.last_data,
+                        }
+                    except Exception as e:
+                        logger.error(f"监控采样失败 {self.key}: {str(e)}")
+                        event = {
+                            'type': 'monitor.sample',
+                            'message_type': 'error',
+                            'message': f'{self.error_message}: {str(e)}',
+                            'data': None,
+                        }
+                    try:
+                        await channel_layer.group_send(self.group_name, event)
+                    except Exception as e:
+                        logger.error(f"广播监控数据失败 {self.key}: {str(e)}")
+
+                # 扣除采集耗时，保持固定节奏
+                elapsed = loop.time() - started_at
+                await asyncio.sleep(max(self.interval - elapsed, 0.1))
+        except asyncio.CancelledError:
+            logger.info(f"监控采样循环被取消: {self.key}")
+            raise
+
+
+class MonitorHub:
+    """监控采样器注册中心（进程内单例），负责订阅者引用计数"""
+
+    def __init__(self):
+        self._samplers: Dict[str, MonitorSampler] = {}
+        self._subscribers: Dict[str, Set[str]] = {}
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _get_lock(self) -> asyncio.Lock:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    async def subscribe(self, key: str, channel_name: str,
+                        factory: Callable[[], MonitorSampler]) -> MonitorSampler:
+        """
+        订阅数据源：加入广播组并增加引用计数，首个订阅者负责启动采样器
+
+        :param key: 数据源标识，如 server、redis、database:<db_name>
+        :param channel_name: 订阅者的 channel 名称
+        :param factory: 采样器不存在时用于创建采样器的工厂函数
+        """
+        async with self._get_lock():
+            sampler = self._samplers.get(key)
+            if sampler is None:
+                sampler = factory()
+                self._samplers[key] = sampler
+            subscribers = self._subscribers.setdefault(key, set())
+            subscribers.add(channel_name)
+            await get_channel_layer().group_add(sampler.group_name, channel_name)
+            sampler.start()
+            return sampler
+
+    async def unsubscribe(self, key: str, channel_name: str):
+        """取消订阅：离开广播组并减少引用计数，没有订阅者时停止采样器"""
+        async with self._get_lock():
+            sampler = self._samplers.get(key)
+            subscribers = self._subscribers.get(key)
+            if sampler is None or subscribers is None or channel_name not in subscribers:
+                return
+            subscribers.discard(channel_name)
+            try:
+                await get_channel_layer().group_discard(sampler.group_name, channel_name)
+            except Exception as e:
+                logger.warning(f"离开监控广播组失败 {key}: {e}")
+            if not subscribers:
+                self._subscribers.pop(key, None)
+                self._samplers.pop(key, None)
+                await sampler.stop()
+
+    def get_subscriber_count(self, key: str) -> int:
+        """获取数据源当前订阅者数量"""
+        return len(self._subscribers.get(key, ()))
+
+
+# 全局采样中心实例
+monitor_hub = MonitorHub()
@@ -7,7 +7,8 @@ Scheduler API - 定时任务管理接口
 from typing import List
 from datetime import datetime, timedelta
 from django.shortcuts import get_object_or_404
-from django.db.models import Q, Count
+from django.db.models import Q, Count, Sum, Max
+from django.utils import timezone
 from ninja import Router, Query
 from ninja.errors import HttpError
 from ninja.pagination import paginate
@@ -15,7 +16,8 @@ from ninja.pagination import paginate
 from common.fu_crud import create, retrieve, delete
 from common.fu_pagination import MyPagination
 from common.fu_schema import response_success
-from scheduler.models import SchedulerJob, SchedulerLog
+from scheduler.models import SchedulerJob, SchedulerLog, SchedulerJobDailyStat
+from scheduler.retention import delete_in_batches
 from scheduler.schema import (
     SchedulerJobSchemaIn,
     SchedulerJobSchemaPatch,
@@ -30,6 +32,7 @@ from scheduler.schema import (
     SchedulerJobExecuteIn,
     SchedulerJobExecuteOut,
     SchedulerJobStatisticsOut,
+    SchedulerJobDailyStatOut,
     SchedulerLogSchemaOut,
     SchedulerLogFilters,
     SchedulerLogBatchDeleteIn,
@@ -38,6 +41,17 @@ from scheduler.schema import (
     SchedulerLogCleanOut,
 )
 from scheduler.service import scheduler_service
+from scheduler.commands import (
+    COMMAND_PAUSE,
+    COMMAND_RELOAD,
+    COMMAND_RESUME,
+    COMMAND_RUN,
+    send_scheduler_command,
+)
+from scheduler.change_feed import (
+    JOB_CHANGE_DELETE,
+    publish_job_changes_on_commit,
+)
 
 router = Router()
 
@@ -60,9 +74,8 @@ def create_scheduler_job(request, data: SchedulerJobSchemaIn):
     # 创建任务
     job = create(request, data.dict(), SchedulerJob)
     
-    # 如果任务是启用状态，添加到调度器
-    # if job.is_enabled() and scheduler_service.is_running():
-    #     scheduler_service.add_job(job)
+    # 通知调度器进程同步该任务
+    publish_job_changes_on_commit([job.code])
     
     return job
 
@@ -77,11 +90,10 @@ def delete_scheduler_job(request, job_id: str):
     """
     job = get_object_or_404(SchedulerJob, id=job_id)
     
-    # 从调度器移除
-    # if scheduler_service.is_running():
-    #     scheduler_service.remove_job(job.code)
-    
     instance = delete(job_id, SchedulerJob)
+    
+    # 通知调度器进程移除该任务
+    publish_job_changes_on_commit([job.code], JOB_CHANGE_DELETE)
     return instance
 
 
@@ -95,22 +107,22 @@ def delete_batch_scheduler_job(request, data: SchedulerJobBatchDeleteIn):
     """
     success_count = 0
     failed_ids = []
+    deleted_codes = []
     
     for job_id in data.ids:
         try:
             job = SchedulerJob.objects.get(id=job_id)
-            
-            # 从调度器移除
-            # if scheduler_service.is_running():
-            #     scheduler_service.remove_job(job.code)
-            
             job.delete()
+            deleted_codes.append(job.code)
             success_count += 1
         except SchedulerJob.DoesNotExist:
             failed_ids.append(job_id)
         except Exception as e:
             failed_ids.append(job_id)
     
+    # 通知调度器进程移除这些任务
+    publish_job_changes_on_commit(deleted_codes, JOB_CHANGE_DELETE)
+    
     return SchedulerJobBatchDeleteOut(count=success_count, failed_ids=failed_ids)
 
 
@@ -124,6 +136,7 @@ def update_scheduler_job(request, job_id: str, data: SchedulerJobSchemaIn):
     - 同步更新调度器中的任务
     """
     job = get_object_or_404(SchedulerJob, id=job_id)
+    old_code = job.code
     
     # 检查任务编码是否已存在（排除自身）
     if SchedulerJob.objects.filter(code=data.code).exclude(id=job_id).exists():
@@ -136,11 +149,8 @@ def update_scheduler_job(request, job_id: str, data: SchedulerJobSchemaIn):
     
     job.save()
     
-    # 同步更新调度器
-    # 注意：现在调度器进程会自动同步 DB 变更，这里其实不需要手动调用 modify_job
-    # 但为了兼容单进程模式，保留调用，或者可以移除
-    # if scheduler_service.is_running():
-    #     scheduler_service.modify_job(job)
+    # 通知调度器进程同步该任务（编码变更时旧编码对应的任务会被移除）
+    publish_job_changes_on_commit([old_code, job.code])
     
     return job
 
@@ -155,6 +165,7 @@ def patch_scheduler_job(request, job_id: str, data: SchedulerJobSchemaPatch):
     - 同步更新调度器
     """
     job = get_object_or_404(SchedulerJob, id=job_id)
+    old_code = job.code
     
     # 只更新提供的字段
     update_data = data.dict(exclude_unset=True)
@@ -170,9 +181,8 @@ def patch_scheduler_job(request, job_id: str, data: SchedulerJobSchemaPatch):
     
     job.save()
     
-    # 同步更新调度器
-    # if scheduler_service.is_running():
-    #    scheduler_service.modify_job(job)
+    # 通知调度器进程同步该任务（编码变更时旧编码对应的任务会被移除）
+    publish_job_changes_on_commit([old_code, job.code])
     
     return job
 
@@ -222,31 +232,23 @@ def batch_update_scheduler_job_status(request, data: SchedulerJobBatchUpdateStat
     - 同步更新调度器
     """
     jobs = SchedulerJob.objects.filter(id__in=data.ids)
-    count = jobs.update(status=data.status)
+    codes = list(jobs.values_list('code', flat=True))
+    # QuerySet.update 不会触发 auto_now，需显式刷新更新时间，供调度器按高水位同步和比对版本
+    count = jobs.update(status=data.status, sys_update_datetime=timezone.now())
     
-    # 同步更新调度器
-    if scheduler_service.is_running():
-        for job in jobs:
-            job.refresh_from_db()
-            if job.is_enabled():
-                scheduler_service.add_job(job)
-            elif job.is_paused():
-                scheduler_service.pause_job(job.code)
-            else:
-                scheduler_service.remove_job(job.code)
+    # 通知调度器进程同步这些任务
+    publish_job_changes_on_commit(codes)
     
     return SchedulerJobBatchUpdateStatusOut(count=count)
 
 
-from django.core.cache import cache
-
 @router.post("/job/execute", response=SchedulerJobExecuteOut, summary="立即执行任务")
 def execute_scheduler_job(request, data: SchedulerJobExecuteIn):
     """
     立即执行指定任务（不影响正常调度）
     
     改进点：
-    - 通过 Cache 发送命令给调度器进程
+    - 通过命令队列发送给调度器进程
     """
     job = get_object_or_404(SchedulerJob, id=data.job_id)
     
@@ -254,8 +256,7 @@ def execute_scheduler_job(request, data: SchedulerJobExecuteIn):
         raise HttpError(400, "调度器未运行")
     
     # 发送执行命令
-    cmd_key = f"scheduler_cmd_run_{job.code}"
-    cache.set(cmd_key, True, timeout=60)
+    send_scheduler_command(COMMAND_RUN, job.code)
     
     return SchedulerJobExecuteOut(
         success=True,
@@ -291,6 +292,8 @@ def get_scheduler_job_statistics(request):
     
     改进点：
     - 提供全局统计数据
+    - 执行次数读取任务的累计计数（写入线程原子累加，不随日志和每日统计清理而减少），不扫描执行日志
+    - 失败次数含超时，失败执行数 = 失败次数 - 超时次数，两者同为累计计数
     """
     # 任务统计
     job_stats = SchedulerJob.objects.aggregate(
@@ -298,18 +301,16 @@ def get_scheduler_job_statistics(request):
         enabled=Count('id', filter=Q(status=1)),
         disabled=Count('id', filter=Q(status=0)),
         paused=Count('id', filter=Q(status=2)),
-    )
-    
-    # 执行统计
-    exec_stats = SchedulerLog.objects.aggregate(
-        total=Count('id'),
-        success=Count('id', filter=Q(status='success')),
-        failed=Count('id', filter=Q(status='failed')),
+        total_exec=Sum('total_run_count'),
+        success_exec=Sum('success_count'),
+        failure_exec=Sum('failure_count'),
+        timeout_exec=Sum('timeout_count'),
     )
     
     # 计算成功率
-    total_exec = exec_stats['total'] or 0
-    success_exec = exec_stats['success'] or 0
+    total_exec = job_stats['total_exec'] or 0
+    success_exec = job_stats['success_exec'] or 0
+    timeout_exec = job_stats['timeout_exec'] or 0
     success_rate = round(success_exec / total_exec * 100, 2) if total_exec > 0 else 0
     
     return SchedulerJobStatisticsOut(
@@ -319,11 +320,48 @@ def get_scheduler_job_statistics(request):
         paused_jobs=job_stats['paused'],
         total_executions=total_exec,
         success_executions=success_exec,
-        failed_executions=exec_stats['failed'],
+        failed_executions=max((job_stats['failure_exec'] or 0) - timeout_exec, 0),
+        timeout_executions=timeout_exec,
         success_rate=success_rate,
     )
 
 
+@router.get("/job/statistics/daily", response=List[SchedulerJobDailyStatOut], summary="获取任务每日执行统计")
+def get_scheduler_job_daily_statistics(
+    request,
+    job_id: str = Query(None, description="任务ID，为空时统计全部任务"),
+    days: int = Query(30, ge=1, le=366, description="统计最近N天"),
+):
+    """获取每日执行统计（读取预聚合数据）"""
+    start_date = datetime.now().date() - timedelta(days=days - 1)
+    query_set = SchedulerJobDailyStat.objects.filter(date__gte=start_date)
+    if job_id:
+        query_set = query_set.filter(job_id=job_id)
+    
+    rows = query_set.values('date').annotate(
+        total=Sum('total_count'),
+        success=Sum('success_count'),
+        failure=Sum('failure_count'),
+        timeout=Sum('timeout_count'),
+        duration=Sum('total_duration'),
+        max_duration=Max('max_duration'),
+    ).order_by('date')
+    
+    return [
+        SchedulerJobDailyStatOut(
+            date=row['date'],
+            total_count=row['total'],
+            success_count=row['success'],
+            failure_count=row['failure'],
+            timeout_count=row['timeout'],
+            avg_duration=round(row['duration'] / row['total'], 3) if row['total'] else 0,
+            max_duration=row['max_duration'] or 0,
+            success_rate=round(row['success'] / row['total'] * 100, 2) if row['total'] else 0,
+        )
+        for row in rows
+    ]
+
+
 # ==================== SchedulerLog APIs ====================
 
 @router.get("/log", response=List[SchedulerLogSchemaOut], summary="获取任务执行日志列表（分页）")
@@ -369,15 +407,16 @@ def clean_scheduler_log(request, data: SchedulerLogCleanIn):
     改进点：
     - 支持按天数清理
     - 支持按状态清理
+    - 分批删除，避免大表上的长事务；每日统计不受影响
     """
     cutoff_date = datetime.now() - timedelta(days=data.days)
     
-    query_set = SchedulerLog.objects.filter(start_time__lt=cutoff_date)
+    query_set = SchedulerLog.objects.filter(start_time__lt=cutoff_date).order_by()
     
     if data.status:
         query_set = query_set.filter(status=data.status)
     
-    count = query_set.delete()[0]
+    count = delete_in_batches(query_set)
     
     return SchedulerLogCleanOut(count=count)
 
@@ -424,17 +463,34 @@ def pause_scheduler(request):
     if not scheduler_service.is_running():
         raise HttpError(400, "调度器未运行")
     
-    scheduler_service.pause()
+    # 独立调度进程模式下通过命令队列下发
+    if scheduler_service.is_scheduler_alive():
+        send_scheduler_command(COMMAND_PAUSE)
+    else:
+        scheduler_service.pause()
     return response_success("调度器已暂停")
 
 
 @router.post("/resume", summary="恢复调度器")
 def resume_scheduler(request):
     """恢复调度器"""
-    scheduler_service.resume()
+    if scheduler_service.is_scheduler_alive():
+        send_scheduler_command(COMMAND_RESUME)
+    else:
+        scheduler_service.resume()
     return response_success("调度器已恢复")
 
 
+@router.post("/reload", summary="重新加载任务")
+def reload_scheduler(request, job_code: str = Query(None, description="任务编码，为空时重新加载全部任务")):
+    """通知调度器进程从数据库重新加载任务"""
+    if not scheduler_service.is_running():
+        raise HttpError(400, "调度器未运行")
+    
+    send_scheduler_command(COMMAND_RELOAD, job_code or '')
+    return response_success("已通知调度器重新加载任务")
+
+
 @router.get("/status", summary="获取调度器状态")
 def get_scheduler_status(request):
     """获取调度器状态"""
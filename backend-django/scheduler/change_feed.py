@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Scheduler Change Feed - 定时任务变更流
+任务增删改时发布带版本号的变更事件，调度器进程只按变更增量同步任务
+
+- 基于 Redis Stream：Web 进程 XADD 变更事件，调度器进程 XREAD BLOCK 阻塞等待，变更近乎实时生效
+- Stream 消息 ID 单调递增，作为变更版本号；调度器记录已应用的最后 ID，重连后从断点继续读取
+- Redis 不可用时由调度器退化为按 sys_update_datetime 高水位查询增量，并通过慢周期全量对账兜底
+"""
+import logging
+import time
+from typing import Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_JOB_CHANGE_STREAM = "scheduler:job_changes"
+# Stream 最多保留的事件数（近似裁剪），调度器落后过多时依靠全量对账兜底
+SCHEDULER_JOB_CHANGE_MAXLEN = 10000
+
+JOB_CHANGE_UPSERT = "upsert"
+JOB_CHANGE_DELETE = "delete"
+
+
+def _get_redis():
+    from django_redis import get_redis_connection
+    return get_redis_connection('default')
+
+
+def publish_job_changes(codes: Iterable[str], action: str = JOB_CHANGE_UPSERT) -> bool:
+    """
+    发布任务变更事件
+
+    :param codes: 发生变更的任务编码
+    :param action: upsert（新增/修改/状态变更）或 delete（删除）
+    :return: 是否发布成功（失败时调度器会通过高水位查询或全量对账同步）
+    """
+    codes = [code for code in dict.fromkeys(codes) if code]
+    if not codes:
+        return True
+    try:
+        pipe = _get_redis().pipeline(transaction=False)
+        for code in codes:
+            pipe.xadd(
+                SCHEDULER_JOB_CHANGE_STREAM,
+                {'action': action, 'code': code, 'ts': str(time.time())},
+                maxlen=SCHEDULER_JOB_CHANGE_MAXLEN,
+                approximate=True,
+            )
+        pipe.execute()
+        return True
+    except Exception as e:
+        logger.error(f"发布任务变更事件失败: {e}")
+        return False
+
+
+def publish_job_changes_on_commit(codes: Iterable[str], action: str = JOB_CHANGE_UPSERT):
+    """在当前数据库事务提交后发布任务变更事件，避免调度器读到未提交的数据"""
+    from django.db import transaction
+
+    codes = list(codes)
+    transaction.on_commit(lambda: publish_job_changes(codes, action))
+
+
+class JobChangeFeed:
+    """调度器侧的变更流读取器"""
+
+    def __init__(self):
+        self.last_id: Optional[str] = None
+
+    def mark_position(self) -> bool:
+        """记录当前流的末尾位置（全量同步前调用，之后的变更都会被读取到）"""
+        try:
+            entries = _get_redis().xrevrange(SCHEDULER_JOB_CHANGE_STREAM, count=1)
+            self.last_id = self._decode(entries[0][0]) if entries else '0-0'
+            return True
+        except Exception as e:
+            logger.error(f"读取任务变更流位置失败: {e}")
+            self.last_id = None
+            return False
+
+    def wait_for_changes(self, timeout: float) -> Optional[List[Tuple[str, str]]]:
+        """
+        阻塞等待变更事件
+
+        :param timeout: 最长等待时间（秒）
+        :return: [(action, code), ...]；超时无变更返回空列表；变更流不可用返回 None
+        """
+        if self.last_id is None and not self.mark_position():
+            return None
+        try:
+            response = _get_redis().xread(
+                {SCHEDULER_JOB_CHANGE_STREAM: self.last_id},
+                count=1000,
+                block=max(int(timeout * 1000), 1),
+            )
+        except Exception as e:
+            logger.error(f"读取任务变更流失败: {e}")
+            self.last_id = None
+            return None
+
+        changes = []
+        for _stream, entries in response or []:
+            for entry_id, fields in entries:
+                self.last_id = self._decode(entry_id)
+                fields = {self._decode(k): self._decode(v) for k, v in fields.items()}
+                changes.append((fields.get('action', JOB_CHANGE_UPSERT), fields.get('code', '')))
+        return changes
+
+    @staticmethod
+    def _decode(value) -> str:
+        return value.decode('utf-8') if isinstance(value, bytes) else str(value)
+
+
+# 调度器进程使用的变更流读取器
+job_change_feed = JobChangeFeed()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Scheduler Cluster - 多节点调度集群
+多个调度器进程按一致性哈希分片任务，水平扩展执行能力，节点故障时自动接管
+
+- 节点成员：每个调度器进程在 Redis 有序集合中以心跳时间为分值注册，超过 SCHEDULER_NODE_TTL 未续期视为下线
+- 任务分片：使用最高随机权重（rendezvous）哈希计算任务归属节点，成员变化时只有下线/新增节点相关的任务迁移
+- 执行防重：集群模式下间隔任务以固定锚点计算触发时间，各节点对同一任务算出相同的计划执行时间；
+  执行前以 “任务编码 + 计划执行时间” 为键 SET NX 抢占，成员变化的过渡期内同一次执行也只会在一个节点运行
+"""
+import hashlib
+import logging
+import os
+import socket
+import time
+import uuid
+from typing import List, Optional
+
+from apscheduler.executors.pool import ThreadPoolExecutor
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_NODES_KEY = "scheduler:nodes"
+SCHEDULER_FENCE_PREFIX = "scheduler:fence:"
+# 防重键保留时间（秒），需大于任务错过执行的宽限时间
+SCHEDULER_FENCE_TTL = 300
+
+
+def _get_redis():
+    from django_redis import get_redis_connection
+    return get_redis_connection('default')
+
+
+def is_cluster_mode() -> bool:
+    """是否启用多节点调度集群"""
+    return getattr(settings, 'SCHEDULER_CLUSTER_MODE', False)
+
+
+def get_node_ttl() -> float:
+    return getattr(settings, 'SCHEDULER_NODE_TTL', 30)
+
+
+def get_live_nodes() -> List[str]:
+    """获取当前存活的调度节点（按节点ID排序）"""
+    redis_conn = _get_redis()
+    members = redis_conn.zrangebyscore(SCHEDULER_NODES_KEY, time.time() - get_node_ttl(), '+inf')
+    return sorted(m.decode('utf-8') if isinstance(m, bytes) else m for m in members)
+
+
+def get_job_owner(job_code: str, nodes: List[str]) -> Optional[str]:
+    """使用 rendezvous 哈希计算任务归属节点"""
+    if not nodes:
+        return None
+    return max(
+        nodes,
+        key=lambda node: hashlib.sha1(f"{node}|{job_code}".encode('utf-8')).digest()
+    )
+
+
+class SchedulerCluster:
+    """当前调度进程在集群中的节点"""
+
+    def __init__(self):
+        self.node_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.nodes: List[str] = [self.node_id]
+
+    def heartbeat(self) -> bool:
+        """
+        续期本节点并刷新成员列表（由调度器监控循环定期调用）
+
+        :return: 成员列表是否发生变化（变化时调度器需要全量同步任务归属）
+        """
+        try:
+            now = time.time()
+            pipe = _get_redis().pipeline(transaction=False)
+            pipe.zadd(SCHEDULER_NODES_KEY, {self.node_id: now})
+            # 清理心跳过期的节点
+            pipe.zremrangebyscore(SCHEDULER_NODES_KEY, '-inf', now - get_node_ttl())
+            pipe.zrange(SCHEDULER_NODES_KEY, 0, -1)
+            members = pipe.execute()[-1]
+        except Exception as e:
+            # Redis 不可用时保持原有成员视图
+            logger.error(f"调度节点心跳失败: {e}")
+            return False
+
+        nodes = sorted(m.decode('utf-8') if isinstance(m, bytes) else m for m in members)
+        if self.node_id not in nodes:
+            nodes = sorted(nodes + [self.node_id])
+        if nodes != self.nodes:
+            logger.info(f"调度集群成员变化: {self.nodes} -> {nodes}")
+            self.nodes = nodes
+            return True
+        return False
+
+    def leave(self):
+        """退出集群，其它节点在下一次心跳时接管本节点的任务"""
+        try:
+            _get_redis().zrem(SCHEDULER_NODES_KEY, self.node_id)
+        except Exception as e:
+            logger.error(f"调度节点退出集群失败: {e}")
+
+    def owns(self, job_code: str) -> bool:
+        """任务是否归属本节点"""
+        return get_job_owner(job_code, self.nodes) == self.node_id
+
+    def claim_run(self, job_code: str, run_time) -> bool:
+        """
+        抢占一次计划执行，同一任务的同一计划执行时间在集群内只有一个节点能抢占成功
+
+        Redis 不可用时放行，避免任务全部停止执行
+        """
+        key = f"{SCHEDULER_FENCE_PREFIX}{job_code}:{run_time.timestamp():.3f}"
+        try:
+            return bool(_get_redis().set(key, self.node_id, nx=True, ex=SCHEDULER_FENCE_TTL))
+        except Exception as e:
+            logger.error(f"抢占任务执行失败，本节点直接执行 {job_code}: {e}")
+            return True
+
+
+class FencedExecutorMixin:
+    """
+    执行器防重混入类：提交任务前按计划执行时间抢占，未抢到的执行直接跳过
+
+    用法：class FencedThreadPoolExecutor(FencedExecutorMixin, ThreadPoolExecutor)
+    """
+
+    cluster: Optional[SchedulerCluster] = None
+
+    def submit_job(self, job, run_times):
+        if self.cluster is not None:
+            run_times = [run_time for run_time in run_times if self.cluster.claim_run(job.id, run_time)]
+            if not run_times:
+                logger.info(f"任务 {job.id} 的本次执行已由其它节点抢占，跳过")
+                return
+        super().submit_job(job, run_times)
+
+
+class FencedThreadPoolExecutor(FencedExecutorMixin, ThreadPoolExecutor):
+    """带执行防重的线程池执行器"""
+
+    def __init__(self, cluster: SchedulerCluster, max_workers: int = 10, pool_kwargs=None):
+        super().__init__(max_workers, pool_kwargs)
+        self.cluster = cluster
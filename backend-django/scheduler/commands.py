@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Scheduler Commands - 调度器命令通道
+Web 进程向调度器进程下发立即执行、暂停、恢复、重新加载等命令
+
+- 基于 Redis 列表的可靠队列：发送方 LPUSH，调度器通过 BRPOPLPUSH 阻塞取出并同时放入处理中列表，
+  执行完成后从处理中列表删除（确认）；调度器异常退出时未确认的命令在下次启动时重新入队
+- 命令由调度器进程内的独立线程处理，毫秒级送达，开销与任务数量无关
+- 集群模式下每个节点有独立队列：立即执行发送到任务归属节点，其它命令广播到所有存活节点
+"""
+import json
+import logging
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_COMMAND_QUEUE = "scheduler:commands"
+
+COMMAND_RUN = "run"          # 立即执行任务（job_code 必填）
+COMMAND_PAUSE = "pause"      # 暂停调度器
+COMMAND_RESUME = "resume"    # 恢复调度器
+COMMAND_RELOAD = "reload"    # 重新加载任务（job_code 为空时全量同步）
+
+SCHEDULER_COMMANDS = (COMMAND_RUN, COMMAND_PAUSE, COMMAND_RESUME, COMMAND_RELOAD)
+
+
+def _get_redis():
+    from django_redis import get_redis_connection
+    return get_redis_connection('default')
+
+
+def get_node_command_queue(node_id: str) -> str:
+    """集群模式下节点的命令队列"""
+    return f"{SCHEDULER_COMMAND_QUEUE}:{node_id}"
+
+
+def _get_target_queues(command: str, job_code: str) -> List[str]:
+    """计算命令的目标队列"""
+    from scheduler.cluster import is_cluster_mode, get_live_nodes, get_job_owner
+
+    if not is_cluster_mode():
+        return [SCHEDULER_COMMAND_QUEUE]
+    nodes = get_live_nodes()
+    if not nodes:
+        return [SCHEDULER_COMMAND_QUEUE]
+    if command == COMMAND_RUN:
+        return [get_node_command_queue(get_job_owner(job_code, nodes))]
+    return [get_node_command_queue(node) for node in nodes]
+
+
+def send_scheduler_command(command: str, job_code: str = '') -> str:
+    """
+    发送调度器命令
+
+    :param command: 命令类型，见 SCHEDULER_COMMANDS
+    :param job_code: 任务编码
+    :return: 命令ID
+    """
+    if command not in SCHEDULER_COMMANDS:
+        raise ValueError(f"不支持的调度器命令: {command}")
+    if command == COMMAND_RUN and not job_code:
+        raise ValueError("立即执行命令必须指定任务编码")
+
+    command_id = uuid.uuid4().hex
+    payload = json.dumps({
+        'id': command_id,
+        'command': command,
+        'job_code': job_code,
+        'ts': time.time(),
+    })
+    pipe = _get_redis().pipeline(transaction=False)
+    for queue in _get_target_queues(command, job_code):
+        pipe.lpush(queue, payload)
+        if queue != SCHEDULER_COMMAND_QUEUE:
+            # 节点下线后其队列自动过期
+            pipe.expire(queue, 3600)
+    pipe.execute()
+    return command_id
+
+
+class SchedulerCommandWorker:
+    """调度器进程内的命令处理线程"""
+
+    def __init__(self, handler, queue: str = SCHEDULER_COMMAND_QUEUE, block_timeout: int = 5):
+        """
+        :param handler: 命令处理函数 handler(command, job_code)
+        :param queue: 监听的命令队列
+        :param block_timeout: 阻塞等待命令的超时时间（秒），用于响应停止信号
+        """
+        self.handler = handler
+        self.queue = queue
+        self.processing_queue = f"{queue}:processing"
+        self.block_timeout = block_timeout
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """启动命令处理线程"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._requeue_unacknowledged()
+        self._thread = threading.Thread(
+            target=self._run, name='scheduler-command-worker', daemon=True
+        )
+        self._thread.start()
+        logger.info("调度器命令处理线程已启动")
+
+    def stop(self):
+        """停止命令处理线程（最多等待一个阻塞超时周期）"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.block_timeout + 1)
+            self._thread = None
+
+    def _requeue_unacknowledged(self):
+        """将上次未确认的命令重新放回队列"""
+        try:
+            redis_conn = _get_redis()
+            count = 0
+            while redis_conn.rpoplpush(self.processing_queue, self.queue):
+                count += 1
+            if count:
+                logger.info(f"重新入队未确认的调度器命令 {count} 条")
+        except Exception as e:
+            logger.error(f"恢复未确认的调度器命令失败: {e}")
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                redis_conn = _get_redis()
+                raw = redis_conn.brpoplpush(self.queue, self.processing_queue, timeout=self.block_timeout)
+            except Exception as e:
+                logger.error(f"读取调度器命令失败: {e}")
+                self._stop_event.wait(1)
+                continue
+            if raw is None:
+                continue
+
+            try:
+                self._handle(raw)
+            finally:
+                # 无论执行成功与否都确认，避免异常命令反复执行
+                try:
+                    redis_conn.lrem(self.processing_queue, 1, raw)
+                except Exception as e:
+                    logger.error(f"确认调度器命令失败: {e}")
+
+    def _handle(self, raw: Any):
+        try:
+            message: Dict[str, Any] = json.loads(raw)
+        except (TypeError, ValueError):
+            logger.error(f"无法解析的调度器命令: {raw!r}")
+            return
+        command = message.get('command')
+        job_code = message.get('job_code') or ''
+        try:
+            logger.info(f"收到调度器命令: {command} {job_code}".rstrip())
+            self.handler(command, job_code)
+        except Exception as e:
+            logger.error(f"执行调度器命令失败 {command} {job_code}: {e}")
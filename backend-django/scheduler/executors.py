@@ -0,0 +1,286 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Scheduler Executors - 任务执行器
+按任务配置在线程池、进程池或独立子进程中执行任务，并采集每次执行的资源占用
+
+- thread：在调度器线程池中执行，采集线程 CPU 时间；线程无法被强制终止，超时的执行在结束后记为超时
+- process：在常驻工作进程中执行（进程复用，避免与调度器争抢 GIL），超时强制终止该工作进程并补充新进程；
+  内存峰值在 Linux 上每次执行前重置（/proc/self/clear_refs），其它系统只有工作进程的首次执行记录峰值
+- subprocess：每次执行启动独立子进程，执行结束即退出，资源完全隔离，超时强制终止
+- 工作进程使用 spawn 方式启动并独立初始化 Django，不继承调度器进程的线程和数据库连接
+"""
+import logging
+import multiprocessing
+import os
+import sys
+import threading
+import time
+import traceback
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+try:
+    import resource
+except ImportError:
+    # Windows 没有 resource 模块，工作进程不采集 CPU 时间和内存峰值
+    resource = None
+
+PROC_CLEAR_REFS = '/proc/self/clear_refs'
+PROC_STATUS = '/proc/self/status'
+
+logger = logging.getLogger(__name__)
+
+EXECUTOR_THREAD = "thread"
+EXECUTOR_PROCESS = "process"
+EXECUTOR_SUBPROCESS = "subprocess"
+
+
+@dataclass
+class ExecutionMetrics:
+    """一次执行的资源占用"""
+    cpu_time: Optional[float] = None  # 秒
+    max_rss: Optional[int] = None     # 字节，本次执行期间进程的内存峰值，无法区分到本次执行时为 None
+    process_id: Optional[int] = None
+
+
+class TaskResult:
+    """任务返回值及资源占用，作为 APScheduler 事件的 retval 传给监听器"""
+
+    def __init__(self, value: Any, metrics: ExecutionMetrics):
+        self.value = value
+        self.metrics = metrics
+
+    def __str__(self):
+        return str(self.value)
+
+
+class TaskExecutionError(Exception):
+    """工作进程中的任务执行失败"""
+
+    def __init__(self, message: str, remote_traceback: Optional[str] = None,
+                 metrics: Optional[ExecutionMetrics] = None):
+        super().__init__(message)
+        self.remote_traceback = remote_traceback
+        self.metrics = metrics
+
+
+class TaskTimeoutError(TaskExecutionError):
+    """任务执行超时（工作进程中的任务已被终止，线程中的任务执行完才会报告）"""
+
+
+def _rusage_cpu(usage) -> float:
+    return usage.ru_utime + usage.ru_stime
+
+
+def _rusage_max_rss(usage) -> int:
+    """ru_maxrss 转换为字节（macOS 单位为字节，Linux 等为 KB）"""
+    if sys.platform == 'darwin':
+        return usage.ru_maxrss
+    return usage.ru_maxrss * 1024
+
+
+def _reset_peak_rss() -> bool:
+    """重置当前进程的内存峰值（Linux 向 clear_refs 写入 5 清零 VmHWM），不支持时返回 False"""
+    try:
+        with open(PROC_CLEAR_REFS, 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _read_peak_rss() -> Optional[int]:
+    """读取当前进程自上次重置以来的内存峰值（VmHWM，字节）"""
+    try:
+        with open(PROC_STATUS) as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def run_in_thread(func, args, kwargs, timeout: Optional[int] = None) -> TaskResult:
+    """
+    在当前线程执行任务并采集线程 CPU 时间
+
+    线程无法被强制终止，执行时间超过 timeout 的任务会执行完，然后以 TaskTimeoutError 记为超时
+    """
+    cpu_start = time.thread_time()
+    started_at = time.monotonic()
+    metrics = ExecutionMetrics(process_id=os.getpid())
+    try:
+        value = func(*args, **kwargs)
+    except Exception as e:
+        metrics.cpu_time = time.thread_time() - cpu_start
+        try:
+            e.metrics = metrics
+        except AttributeError:
+            pass
+        raise
+    metrics.cpu_time = time.thread_time() - cpu_start
+
+    elapsed = time.monotonic() - started_at
+    if timeout and elapsed > timeout:
+        raise TaskTimeoutError(
+            f"任务执行超时（{elapsed:.1f}s > {timeout}s），线程池任务无法终止，已执行完成",
+            metrics=metrics,
+        )
+    return TaskResult(value, metrics)
+
+
+def _worker_main(conn):
+    """工作进程入口：初始化 Django 后循环接收并执行任务"""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'application.settings')
+    import django
+    django.setup()
+    from django.db import close_old_connections
+
+    # 首次执行前工作进程的峰值只包含启动开销，之后的峰值需要重置才能归属到单次执行
+    first_task = True
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        if message is None:
+            break
+
+        task_path, args, kwargs = message
+        peak_reset = _reset_peak_rss()
+        usage_start = resource.getrusage(resource.RUSAGE_SELF) if resource else None
+        try:
+            module_path, func_name = task_path.rsplit('.', 1)
+            module = __import__(module_path, fromlist=[func_name])
+            result = getattr(module, func_name)(*args, **kwargs)
+            status, value, error_traceback = 'ok', (None if result is None else str(result)), None
+        except Exception as e:
+            status, value, error_traceback = 'error', str(e), traceback.format_exc()
+        finally:
+            close_old_connections()
+        usage_end = resource.getrusage(resource.RUSAGE_SELF) if resource else None
+
+        if peak_reset:
+            max_rss = _read_peak_rss()
+        elif first_task and usage_end:
+            max_rss = _rusage_max_rss(usage_end)
+        else:
+            # ru_maxrss 是工作进程启动以来的峰值，无法归属到本次执行
+            max_rss = None
+        first_task = False
+
+        conn.send((
+            status,
+            value,
+            error_traceback,
+            _rusage_cpu(usage_end) - _rusage_cpu(usage_start) if usage_end else None,
+            max_rss,
+            os.getpid(),
+        ))
+    conn.close()
+
+
+class _WorkerProcess:
+    """单个工作进程"""
+
+    def __init__(self, context):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def is_alive(self) -> bool:
+        return self.process.is_alive()
+
+    def run(self, task_path: str, args, kwargs, timeout: Optional[int]) -> TaskResult:
+        self.conn.send((task_path, list(args), dict(kwargs)))
+        if not self.conn.poll(timeout):
+            self.kill()
+            raise TaskTimeoutError(
+                f"任务执行超时（{timeout}s），工作进程已终止",
+                metrics=ExecutionMetrics(process_id=self.process.pid),
+            )
+        try:
+            status, value, error_traceback, cpu_time, max_rss, pid = self.conn.recv()
+        except EOFError:
+            self.kill()
+            raise TaskExecutionError(
+                f"工作进程异常退出（exitcode={self.process.exitcode}）",
+                metrics=ExecutionMetrics(process_id=self.process.pid),
+            )
+
+        metrics = ExecutionMetrics(cpu_time=cpu_time, max_rss=max_rss, process_id=pid)
+        if status == 'error':
+            raise TaskExecutionError(value, remote_traceback=error_traceback, metrics=metrics)
+        return TaskResult(value, metrics)
+
+    def close(self):
+        """通知工作进程退出"""
+        try:
+            self.conn.send(None)
+            self.process.join(timeout=5)
+        except Exception:
+            pass
+        if self.process.is_alive():
+            self.kill()
+        self.conn.close()
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(timeout=5)
+
+
+class ProcessTaskRunner:
+    """
+    工作进程任务执行器
+
+    并发数由对应 APScheduler 执行器的线程数限制：每个线程同一时间只占用一个工作进程
+    """
+
+    def __init__(self, reuse: bool):
+        """
+        :param reuse: 是否复用工作进程（process 复用，subprocess 每次执行后退出）
+        """
+        self.reuse = reuse
+        self._context = multiprocessing.get_context('spawn')
+        self._idle: List[_WorkerProcess] = []
+        self._lock = threading.Lock()
+
+    def _acquire(self) -> _WorkerProcess:
+        with self._lock:
+            while self._idle:
+                worker = self._idle.pop()
+                if worker.is_alive():
+                    return worker
+        return _WorkerProcess(self._context)
+
+    def run(self, task_path: str, args, kwargs, timeout: Optional[int] = None) -> TaskResult:
+        """在工作进程中执行任务，超时强制终止工作进程"""
+        worker = self._acquire()
+        try:
+            return worker.run(task_path, args, kwargs, timeout)
+        finally:
+            if self.reuse and worker.is_alive():
+                with self._lock:
+                    self._idle.append(worker)
+            else:
+                worker.close()
+
+    def shutdown(self):
+        """关闭所有空闲工作进程"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for worker in idle:
+            worker.close()
+
+
+def get_executor_workers() -> Dict[str, int]:
+    """各执行器的并发数"""
+    from django.conf import settings
+
+    workers = {EXECUTOR_THREAD: 10, EXECUTOR_PROCESS: 2, EXECUTOR_SUBPROCESS: 2}
+    workers.update(getattr(settings, 'SCHEDULER_EXECUTOR_WORKERS', {}))
+    return workers
@@ -0,0 +1,25 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from scheduler.recorder import backfill_daily_stats
+
+
+class Command(BaseCommand):
+    help = '由执行日志重建定时任务每日统计（升级后执行一次 --overwrite，补齐升级当天之前的统计）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--overwrite', action='store_true', help='按日志重新计算已有的每日统计')
+        parser.add_argument('--since', help='只处理该日期（YYYY-MM-DD，含）之后的日志')
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            try:
+                since = date.fromisoformat(options['since'])
+            except ValueError:
+                raise CommandError(f"日期格式不正确: {options['since']}")
+        result = backfill_daily_stats(overwrite=options['overwrite'], since=since)
+        self.stdout.write(self.style.SUCCESS(
+            f"每日统计新建 {result['created']} 条，覆盖 {result['updated']} 条"
+        ))
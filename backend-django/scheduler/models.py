@@ -29,6 +29,13 @@ class SchedulerJob(RootModel):
         ('date', '指定时间'),
     ]
     
+    # 执行器选择
+    EXECUTOR_CHOICES = [
+        ('thread', '线程池'),
+        ('process', '进程池'),
+        ('subprocess', '独立子进程'),
+    ]
+    
     # 任务状态选择
     STATUS_CHOICES = [
         (0, '禁用'),
@@ -157,6 +164,14 @@ class SchedulerJob(RootModel):
         help_text="超时时间（秒）",
     )
     
+    # 执行器（进程池/独立子进程执行的任务超时会被强制终止，线程池执行的任务执行完后记为超时）
+    executor = models.CharField(
+        max_length=20,
+        choices=EXECUTOR_CHOICES,
+        default='thread',
+        help_text="执行器",
+    )
+    
     # 是否合并执行（如果上次未执行完，是否跳过本次）
     coalesce = models.BooleanField(
         default=True,
@@ -185,6 +200,12 @@ class SchedulerJob(RootModel):
         help_text="失败次数",
     )
     
+    # 超时次数（同时计入失败次数）
+    timeout_count = models.IntegerField(
+        default=0,
+        help_text="超时次数",
+    )
+    
     # 最后执行时间
     last_run_time = models.DateTimeField(
         blank=True,
@@ -389,6 +410,20 @@ class SchedulerLog(RootModel):
         help_text="重试次数",
     )
     
+    # CPU 时间（秒，用户态 + 内核态）
+    cpu_time = models.FloatField(
+        blank=True,
+        null=True,
+        help_text="CPU时间（秒）",
+    )
+    
+    # 峰值内存（字节，本次执行期间工作进程的峰值；线程池执行或无法归属到本次执行时为空）
+    max_rss = models.BigIntegerField(
+        blank=True,
+        null=True,
+        help_text="峰值内存（字节）",
+    )
+    
     class Meta:
         db_table = "core_scheduler_log"
         ordering = ("-start_time",)
@@ -398,6 +433,7 @@ class SchedulerLog(RootModel):
             models.Index(fields=['job', 'status']),
             models.Index(fields=['status', 'start_time']),
             models.Index(fields=['job_code', 'start_time']),
+            models.Index(fields=['job', 'start_time']),
         ]
     
     def __str__(self):
@@ -420,3 +456,88 @@ class SchedulerLog(RootModel):
         status_map = dict(self.STATUS_CHOICES)
         return status_map.get(self.status, 'UNKNOWN')
 
+
+
+class SchedulerJobDailyStat(RootModel):
+    """
+    定时任务每日执行统计
+    
+    功能特点：
+    1. 由执行记录写入线程按 任务 + 日期 预聚合累加
+    2. 统计接口直接读取预聚合数据，不扫描执行日志
+    3. 执行日志按保留期清理后，历史统计仍然保留
+    """
+    
+    # 关联的任务
+    job = models.ForeignKey(
+        to="SchedulerJob",
+        on_delete=models.CASCADE,
+        db_constraint=False,
+        help_text="关联的任务",
+        related_name="daily_stats",
+    )
+    
+    # 任务编码（冗余字段，便于查询）
+    job_code = models.CharField(
+        max_length=128,
+        help_text="任务编码",
+    )
+    
+    # 统计日期
+    date = models.DateField(
+        help_text="统计日期",
+        db_index=True,
+    )
+    
+    # 执行次数
+    total_count = models.IntegerField(
+        default=0,
+        help_text="执行次数",
+    )
+    
+    success_count = models.IntegerField(
+        default=0,
+        help_text="成功次数",
+    )
+    
+    failure_count = models.IntegerField(
+        default=0,
+        help_text="失败次数（含超时）",
+    )
+    
+    timeout_count = models.IntegerField(
+        default=0,
+        help_text="超时次数",
+    )
+    
+    # 耗时统计（秒）
+    total_duration = models.FloatField(
+        default=0,
+        help_text="总耗时（秒）",
+    )
+    
+    max_duration = models.FloatField(
+        default=0,
+        help_text="最大耗时（秒）",
+    )
+    
+    class Meta:
+        db_table = "core_scheduler_job_daily_stat"
+        ordering = ("-date",)
+        verbose_name = "定时任务每日统计"
+        verbose_name_plural = verbose_name
+        constraints = [
+            models.UniqueConstraint(fields=['job_code', 'date'], name='uniq_scheduler_job_daily_stat'),
+        ]
+        indexes = [
+            models.Index(fields=['job', 'date']),
+        ]
+    
+    def __str__(self):
+        return f"{self.job_code} - {self.date}"
+    
+    def get_success_rate(self):
+        """获取成功率"""
+        if self.total_count == 0:
+            return 0
+        return round(self.success_count / self.total_count * 100, 2)
@@ -223,16 +223,19 @@ def cleanup_old_logs(**kwargs):
     """
     清理旧日志任务
     
-    清理 30 天前的执行日志
+    按 SCHEDULER_LOG_RETENTION_DAYS 分批清理过期的执行日志（调度器进程内已有后台清理线程，此任务用于手动触发）
     """
     try:
         from datetime import timedelta
         from scheduler.models import SchedulerLog
+        from scheduler.retention import delete_in_batches, get_retention_settings
         
-        cutoff_date = datetime.now() - timedelta(days=30)
-        deleted_count = SchedulerLog.objects.filter(
-            start_time__lt=cutoff_date
-        ).delete()[0]
+        options = get_retention_settings()
+        cutoff_date = datetime.now() - timedelta(days=options['log_days'])
+        deleted_count = delete_in_batches(
+            SchedulerLog.objects.filter(start_time__lt=cutoff_date).order_by(),
+            options['batch_size'],
+        )
         
         logger.info(f"清理了 {deleted_count} 条旧日志")
         return f"清理了 {deleted_count} 条旧日志"
@@ -247,29 +250,16 @@ def update_job_statistics(**kwargs):
     """
     更新任务统计信息
     
-    定期更新所有任务的统计数据
+    补齐缺少的每日统计（升级前的历史执行只有日志）。任务的累计执行次数由执行记录写入线程原子累加，
+    这里不再按每日统计重新计算（每日统计按保留期清理后会变少）
     """
     try:
-        from scheduler.models import SchedulerJob, SchedulerLog
-        from django.db.models import Count, Q
-        
-        jobs = SchedulerJob.objects.all()
+        from scheduler.recorder import backfill_daily_stats
         
-        for job in jobs:
-            # 统计执行次数
-            stats = SchedulerLog.objects.filter(job=job).aggregate(
-                total=Count('id'),
-                success=Count('id', filter=Q(status='success')),
-                failed=Count('id', filter=Q(status='failed')),
-            )
-            
-            job.total_run_count = stats['total']
-            job.success_count = stats['success']
-            job.failure_count = stats['failed']
-            job.save(update_fields=['total_run_count', 'success_count', 'failure_count'])
+        result = backfill_daily_stats()
         
-        logger.info(f"更新了 {len(jobs)} 个任务的统计信息")
-        return f"更新了 {len(jobs)} 个任务的统计信息"
+        logger.info(f"补齐了 {result['created']} 条每日统计")
+        return f"补齐了 {result['created']} 条每日统计"
     
     except Exception as e:
         logger.error(f"更新任务统计信息失败: {str(e)}")
@@ -0,0 +1,336 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Scheduler Recorder - 任务执行记录器
+APScheduler 监听器只把执行事件放入内存队列，由后台写入线程批量落库
+
+- 执行日志使用 bulk_create 批量写入
+- 任务统计按任务聚合后使用 F() 表达式原子累加，每批每个任务只更新一次
+- 同时按 任务 + 日期 累加每日统计，统计接口读取预聚合数据，不扫描执行日志
+- 复用数据库连接（close_old_connections 遵循 CONN_MAX_AGE），不再每次事件强制断开重连
+"""
+import logging
+import os
+import queue
+import socket
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ExecutionRecord:
+    """一次任务执行的结果（监听器线程内构建，不访问数据库）"""
+    job_code: str
+    start_time: Optional[datetime]
+    end_time: datetime
+    status: str  # success / failed / timeout
+    result: Optional[str]
+    exception: Optional[str]
+    traceback: Optional[str]
+    next_run_time: Optional[datetime]
+    cpu_time: Optional[float] = None
+    max_rss: Optional[int] = None
+    process_id: Optional[int] = None
+
+    @property
+    def success(self) -> bool:
+        return self.status == 'success'
+
+
+def _to_db_datetime(value: Optional[datetime]) -> Optional[datetime]:
+    """USE_TZ=False 时数据库需要 naive datetime"""
+    if value is not None and not settings.USE_TZ and value.tzinfo:
+        return value.replace(tzinfo=None)
+    return value
+
+
+def _local_date(value: datetime):
+    """执行时间所在的本地日期（每日统计的归属日期）"""
+    from django.utils import timezone
+
+    if value.tzinfo:
+        value = timezone.localtime(value)
+    return value.date()
+
+
+class ExecutionRecorder:
+    """任务执行记录的异步批量写入器"""
+
+    def __init__(self, batch_size: int = 500, flush_interval: float = 1.0, max_queue_size: int = 10000):
+        """
+        :param batch_size: 单批最多写入的执行记录数
+        :param flush_interval: 攒批的最长等待时间（秒）
+        :param max_queue_size: 队列上限，写入跟不上时丢弃新记录，避免内存无限增长
+        """
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue[ExecutionRecord]" = queue.Queue(maxsize=max_queue_size)
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._hostname = socket.gethostname()
+        self._process_id = os.getpid()
+        self.dropped_count = 0
+
+    def start(self):
+        """启动写入线程"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='scheduler-recorder', daemon=True)
+        self._thread.start()
+        logger.info("任务执行记录写入线程已启动")
+
+    def stop(self, timeout: float = 10):
+        """停止写入线程，退出前写完队列中剩余的记录"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def record(self, record: ExecutionRecord):
+        """提交一条执行记录（非阻塞）"""
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped_count += 1
+            logger.error(f"任务执行记录队列已满，丢弃记录: {record.job_code}")
+
+    def _run(self):
+        while not (self._stop_event.is_set() and self._queue.empty()):
+            batch = self._take_batch()
+            if batch:
+                self._flush(batch)
+
+    def _take_batch(self) -> List[ExecutionRecord]:
+        """取出一批记录：等待第一条，然后在 flush_interval 内攒满 batch_size"""
+        try:
+            first = self._queue.get(timeout=self.flush_interval)
+        except queue.Empty:
+            return []
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or self._stop_event.is_set():
+                # 停止时不再等待，直接取完已有的记录
+                remaining = 0
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _flush(self, batch: List[ExecutionRecord]):
+        """写入一批记录，数据库连接异常时重连重试一次"""
+        from django.db import connection, close_old_connections
+
+        for attempt in range(2):
+            close_old_connections()
+            try:
+                self._persist(batch)
+                return
+            except Exception as e:
+                logger.error(f"写入任务执行记录失败（第 {attempt + 1} 次）: {e}")
+                try:
+                    connection.close()
+                except Exception:
+                    pass
+        logger.error(f"丢弃 {len(batch)} 条任务执行记录")
+
+    def _persist(self, batch: List[ExecutionRecord]):
+        from django.db import transaction
+        from django.db.models import F
+        from scheduler.models import SchedulerJob, SchedulerLog
+
+        codes = {record.job_code for record in batch}
+        jobs: Dict[str, SchedulerJob] = {
+            job.code: job
+            for job in SchedulerJob.objects.filter(code__in=codes).only('id', 'code', 'name')
+        }
+
+        logs = []
+        counters: Dict[str, Dict] = {}
+        daily: Dict[tuple, Dict] = {}
+        for record in batch:
+            job = jobs.get(record.job_code)
+            if job is None:
+                continue
+            start_time = _to_db_datetime(record.start_time)
+            end_time = _to_db_datetime(record.end_time)
+            duration = self._calc_duration(start_time, end_time)
+            logs.append(SchedulerLog(
+                job_id=job.id,
+                job_name=job.name,
+                job_code=job.code,
+                status=record.status,
+                start_time=start_time,
+                end_time=end_time,
+                duration=duration,
+                result=(record.result or "Success") if record.success else None,
+                exception=record.exception,
+                traceback=record.traceback,
+                hostname=self._hostname,
+                process_id=record.process_id or self._process_id,
+                cpu_time=record.cpu_time,
+                max_rss=record.max_rss,
+            ))
+
+            counter = counters.setdefault(job.code, {
+                'id': job.id, 'total': 0, 'success': 0, 'failure': 0, 'timeout': 0, 'last': record,
+            })
+            counter['total'] += 1
+            counter['success' if record.success else 'failure'] += 1
+            if record.status == 'timeout':
+                counter['timeout'] += 1
+            if record.end_time >= counter['last'].end_time:
+                counter['last'] = record
+
+            day = daily.setdefault((job.code, _local_date(record.start_time or record.end_time)), {
+                'job_id': job.id, 'total': 0, 'success': 0, 'failure': 0, 'timeout': 0,
+                'duration': 0.0, 'max_duration': 0.0,
+            })
+            day['total'] += 1
+            day['success' if record.success else 'failure'] += 1
+            if record.status == 'timeout':
+                day['timeout'] += 1
+            day['duration'] += duration or 0
+            day['max_duration'] = max(day['max_duration'], duration or 0)
+
+        with transaction.atomic():
+            if logs:
+                SchedulerLog.objects.bulk_create(logs, batch_size=self.batch_size)
+            for counter in counters.values():
+                last: ExecutionRecord = counter['last']
+                updates = {
+                    'total_run_count': F('total_run_count') + counter['total'],
+                    'success_count': F('success_count') + counter['success'],
+                    'failure_count': F('failure_count') + counter['failure'],
+                    'timeout_count': F('timeout_count') + counter['timeout'],
+                    'last_run_status': last.status,
+                    'last_run_result': last.result if last.success else last.exception,
+                    'last_run_time': _to_db_datetime(last.end_time),
+                }
+                if last.next_run_time:
+                    updates['next_run_time'] = _to_db_datetime(last.next_run_time)
+                # QuerySet.update 不修改 sys_update_datetime，不会被调度器误判为任务配置变更
+                SchedulerJob.objects.filter(id=counter['id']).update(**updates)
+            for (job_code, date), day in daily.items():
+                self._add_daily_stat(job_code, date, day)
+
+    @staticmethod
+    def _add_daily_stat(job_code: str, date, day: Dict):
+        """累加每日统计，当天第一条记录时创建"""
+        from django.db import IntegrityError, transaction
+        from django.db.models import F
+        from django.db.models.functions import Greatest
+        from scheduler.models import SchedulerJobDailyStat
+
+        query_set = SchedulerJobDailyStat.objects.filter(job_code=job_code, date=date)
+        updates = {
+            'total_count': F('total_count') + day['total'],
+            'success_count': F('success_count') + day['success'],
+            'failure_count': F('failure_count') + day['failure'],
+            'timeout_count': F('timeout_count') + day['timeout'],
+            'total_duration': F('total_duration') + day['duration'],
+            'max_duration': Greatest(F('max_duration'), day['max_duration']),
+        }
+        if query_set.update(**updates):
+            return
+        try:
+            # 保存点：其它节点并发创建同一天的统计时，回退后改为累加
+            with transaction.atomic():
+                SchedulerJobDailyStat.objects.create(
+                    job_id=day['job_id'],
+                    job_code=job_code,
+                    date=date,
+                    total_count=day['total'],
+                    success_count=day['success'],
+                    failure_count=day['failure'],
+                    timeout_count=day['timeout'],
+                    total_duration=day['duration'],
+                    max_duration=day['max_duration'],
+                )
+        except IntegrityError:
+            query_set.update(**updates)
+
+    @staticmethod
+    def _calc_duration(start_time: Optional[datetime], end_time: Optional[datetime]) -> Optional[float]:
+        """计算耗时，确保两者都是 offset-aware 或 offset-naive"""
+        if not start_time or not end_time:
+            return None
+        if start_time.tzinfo and not end_time.tzinfo:
+            end_time = end_time.replace(tzinfo=start_time.tzinfo)
+        elif not start_time.tzinfo and end_time.tzinfo:
+            start_time = start_time.replace(tzinfo=end_time.tzinfo)
+        return max(0, (end_time - start_time).total_seconds())  # 避免负数
+
+
+def backfill_daily_stats(overwrite: bool = False, since=None) -> Dict[str, int]:
+    """
+    由执行日志重建每日统计（升级前的历史执行只有日志，没有每日统计）
+
+    - 默认只补齐缺少统计的 任务 + 日期，写入线程在同一事务中写日志和统计，已有统计的日期无需补齐
+    - overwrite 时按日志重新计算已有统计，用于升级当天（只统计了升级之后的执行）；
+      最早的一天可能已被清理掉一部分日志，当天仍在写入，这两天只补缺不覆盖
+    - 任务的累计执行次数由写入线程累加，这里不修改
+
+    :param overwrite: 是否覆盖已有统计
+    :param since: 只处理该日期（含）之后的日志
+    :return: {'created': 新建数, 'updated': 覆盖数}
+    """
+    from django.db import transaction
+    from django.db.models import Count, Max, Q, Sum
+    from django.db.models.functions import Coalesce, TruncDate
+    from django.utils import timezone
+    from scheduler.models import SchedulerJobDailyStat, SchedulerLog
+
+    query_set = SchedulerLog.objects.filter(status__in=['success', 'failed', 'timeout']).annotate(
+        date=TruncDate(Coalesce('start_time', 'end_time')),
+    )
+    if since:
+        query_set = query_set.filter(date__gte=since)
+    rows = list(query_set.values('job_id', 'job_code', 'date').annotate(
+        total=Count('id'),
+        success=Count('id', filter=Q(status='success')),
+        timeout=Count('id', filter=Q(status='timeout')),
+        duration_sum=Sum('duration'),
+        duration_max=Max('duration'),
+    ).order_by('date'))
+    if not rows:
+        return {'created': 0, 'updated': 0}
+
+    protected_dates = {rows[0]['date'], timezone.localdate() if settings.USE_TZ else datetime.now().date()}
+    existing = set(SchedulerJobDailyStat.objects.filter(
+        date__gte=rows[0]['date'],
+    ).values_list('job_code', 'date'))
+
+    created = []
+    updated = 0
+    with transaction.atomic():
+        for row in rows:
+            values = {
+                'total_count': row['total'],
+                'success_count': row['success'],
+                'failure_count': row['total'] - row['success'],
+                'timeout_count': row['timeout'],
+                'total_duration': row['duration_sum'] or 0,
+                'max_duration': row['duration_max'] or 0,
+            }
+            key = (row['job_code'], row['date'])
+            if key not in existing:
+                created.append(SchedulerJobDailyStat(
+                    job_id=row['job_id'], job_code=row['job_code'], date=row['date'], **values
+                ))
+            elif overwrite and row['date'] not in protected_dates:
+                updated += SchedulerJobDailyStat.objects.filter(
+                    job_code=row['job_code'], date=row['date'],
+                ).update(**values)
+        SchedulerJobDailyStat.objects.bulk_create(created, batch_size=1000, ignore_conflicts=True)
+    return {'created': len(created), 'updated': updated}
@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Scheduler Retention - 执行日志保留策略
+调度器进程内的后台清理线程，按保留期分批删除过期的执行日志和每日统计
+
+- 日志表按 start_time 范围索引，过期数据总是位于索引的一端，按主键分批删除，
+  每批一个短事务，避免长时间锁表和产生巨大的回滚日志
+- 批次之间短暂休眠，把删除压力分散开，不影响执行记录的写入
+- 集群模式下只由排序最靠前的节点执行清理
+"""
+import logging
+import threading
+from datetime import timedelta
+from typing import Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+def get_retention_settings() -> dict:
+    """日志保留策略配置"""
+    return {
+        'log_days': getattr(settings, 'SCHEDULER_LOG_RETENTION_DAYS', 30),
+        'stat_days': getattr(settings, 'SCHEDULER_STAT_RETENTION_DAYS', 365),
+        'batch_size': getattr(settings, 'SCHEDULER_LOG_PRUNE_BATCH_SIZE', 5000),
+        'interval': getattr(settings, 'SCHEDULER_LOG_PRUNE_INTERVAL', 3600),
+    }
+
+
+def delete_in_batches(query_set, batch_size: int = 5000, pause: float = 0,
+                      stop_event: Optional[threading.Event] = None) -> int:
+    """
+    按主键分批删除
+
+    :param query_set: 待删除数据的查询集
+    :param batch_size: 每批删除数量
+    :param pause: 批次之间的休眠时间（秒）
+    :param stop_event: 停止信号，设置后在当前批次完成后退出
+    :return: 删除总数
+    """
+    model = query_set.model
+    stop_event = stop_event or threading.Event()
+    total = 0
+    while True:
+        ids = list(query_set.values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            break
+        # 按主键删除（无级联关系时 Django 直接执行单条 DELETE，不加载模型实例）
+        total += model.objects.filter(pk__in=ids).delete()[0]
+        if len(ids) < batch_size or stop_event.wait(pause):
+            break
+    return total
+
+
+def prune_scheduler_logs(log_days: int, stat_days: int, batch_size: int = 5000, pause: float = 0.1,
+                         stop_event: Optional[threading.Event] = None) -> dict:
+    """删除超过保留期的执行日志和每日统计"""
+    from django.utils import timezone
+    from scheduler.models import SchedulerLog, SchedulerJobDailyStat
+
+    # USE_TZ=False 时为本地 naive 时间，与日志的存储方式一致
+    now = timezone.now()
+    deleted_logs = delete_in_batches(
+        SchedulerLog.objects.filter(start_time__lt=now - timedelta(days=log_days)).order_by(),
+        batch_size, pause, stop_event,
+    )
+    deleted_stats = delete_in_batches(
+        SchedulerJobDailyStat.objects.filter(date__lt=(now - timedelta(days=stat_days)).date()).order_by(),
+        batch_size, pause, stop_event,
+    )
+    return {'logs': deleted_logs, 'stats': deleted_stats}
+
+
+class SchedulerLogPruner:
+    """执行日志后台清理线程"""
+
+    def __init__(self, cluster=None):
+        """
+        :param cluster: 集群模式下的调度节点，只有排序最靠前的节点执行清理
+        """
+        self.cluster = cluster
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """启动清理线程"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='scheduler-log-pruner', daemon=True)
+        self._thread.start()
+        logger.info("执行日志清理线程已启动")
+
+    def stop(self, timeout: float = 10):
+        """停止清理线程（当前批次完成后退出）"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def _is_leader(self) -> bool:
+        if self.cluster is None:
+            return True
+        return bool(self.cluster.nodes) and self.cluster.nodes[0] == self.cluster.node_id
+
+    def _run(self):
+        from django.db import close_old_connections
+
+        # 启动后稍作等待，避开调度器启动时的任务加载高峰
+        wait_seconds = 60
+        while not self._stop_event.wait(wait_seconds):
+            options = get_retention_settings()
+            wait_seconds = options['interval']
+            if not self._is_leader():
+                continue
+            close_old_connections()
+            try:
+                deleted = prune_scheduler_logs(
+                    options['log_days'], options['stat_days'], options['batch_size'],
+                    stop_event=self._stop_event,
+                )
+                if deleted['logs'] or deleted['stats']:
+                    logger.info(f"清理过期执行日志 {deleted['logs']} 条，每日统计 {deleted['stats']} 条")
+            except Exception as e:
+                logger.error(f"清理过期执行日志失败: {e}")
+            finally:
+                close_old_connections()
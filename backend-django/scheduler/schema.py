@@ -4,7 +4,7 @@
 Scheduler Schema - 定时任务数据验证和序列化
 """
 from typing import Optional, List, Any
-from datetime import datetime
+from datetime import datetime, date as date_type
 from pydantic import BaseModel, Field, validator
 from ninja import Schema, FilterSchema
 
@@ -29,6 +29,7 @@ class SchedulerJobSchemaIn(BaseModel):
     max_instances: int = Field(1, description="最大实例数", ge=1)
     max_retries: int = Field(0, description="错误重试次数", ge=0)
     timeout: Optional[int] = Field(None, description="超时时间（秒）", ge=1)
+    executor: str = Field("thread", description="执行器：thread/process/subprocess")
     coalesce: bool = Field(True, description="是否合并执行")
     allow_concurrent: bool = Field(False, description="是否允许并发执行")
     remark: Optional[str] = Field(None, description="备注信息")
@@ -40,6 +41,13 @@ class SchedulerJobSchemaIn(BaseModel):
             raise ValueError('触发器类型必须是 cron、interval 或 date')
         return v
     
+    @validator('executor')
+    def validate_executor(cls, v):
+        """验证执行器"""
+        if v not in ['thread', 'process', 'subprocess']:
+            raise ValueError('执行器必须是 thread、process 或 subprocess')
+        return v
+    
     @validator('status')
     def validate_status(cls, v):
         """验证状态"""
@@ -87,6 +95,7 @@ class SchedulerJobSchemaPatch(BaseModel):
     max_instances: Optional[int] = Field(None, description="最大实例数")
     max_retries: Optional[int] = Field(None, description="错误重试次数")
     timeout: Optional[int] = Field(None, description="超时时间（秒）")
+    executor: Optional[str] = Field(None, description="执行器：thread/process/subprocess")
     coalesce: Optional[bool] = Field(None, description="是否合并执行")
     allow_concurrent: Optional[bool] = Field(None, description="是否允许并发执行")
     remark: Optional[str] = Field(None, description="备注信息")
@@ -111,11 +120,13 @@ class SchedulerJobSchemaOut(Schema):
     max_instances: int
     max_retries: int
     timeout: Optional[int] = None
+    executor: str
     coalesce: bool
     allow_concurrent: bool
     total_run_count: int
     success_count: int
     failure_count: int
+    timeout_count: int
     last_run_time: Optional[datetime] = None
     next_run_time: Optional[datetime] = None
     last_run_status: Optional[str] = None
@@ -197,6 +208,19 @@ class SchedulerJobStatisticsOut(BaseModel):
     total_executions: int = Field(..., description="总执行次数")
     success_executions: int = Field(..., description="成功执行次数")
     failed_executions: int = Field(..., description="失败执行次数")
+    timeout_executions: int = Field(0, description="超时执行次数")
+    success_rate: float = Field(..., description="成功率")
+
+
+class SchedulerJobDailyStatOut(BaseModel):
+    """任务每日执行统计输出"""
+    date: date_type = Field(..., description="统计日期")
+    total_count: int = Field(..., description="执行次数")
+    success_count: int = Field(..., description="成功次数")
+    failure_count: int = Field(..., description="失败次数（含超时）")
+    timeout_count: int = Field(..., description="超时次数")
+    avg_duration: float = Field(..., description="平均耗时（秒）")
+    max_duration: float = Field(..., description="最大耗时（秒）")
     success_rate: float = Field(..., description="成功率")
 
 
@@ -218,6 +242,8 @@ class SchedulerLogSchemaOut(Schema):
     hostname: Optional[str] = None
     process_id: Optional[int] = None
     retry_count: int
+    cpu_time: Optional[float] = None
+    max_rss: Optional[int] = None
     sys_create_datetime: Optional[datetime] = None
 
 
@@ -7,6 +7,7 @@ Scheduler Service - APScheduler 调度服务
 import json
 import logging
 import inspect  # 添加 inspect 模块
+import threading
 from datetime import datetime
 from typing import Optional, Dict, Any
 from apscheduler.schedulers.background import BackgroundScheduler
@@ -27,7 +28,6 @@ import time
 logger = logging.getLogger(__name__)
 
 SCHEDULER_HEARTBEAT_KEY = "scheduler_heartbeat"
-SCHEDULER_COMMAND_PREFIX = "scheduler_cmd_"
 
 class SchedulerService:
     """
@@ -39,13 +39,24 @@ class SchedulerService:
     3. 自动从数据库加载任务
     4. 监听任务执行事件
     5. 自动更新任务状态
-    6. 支持多进程同步（通过数据库和缓存）
+    6. 支持多进程同步（通过任务变更流，数据库高水位和全量对账兜底）
     """
     
     _instance = None
     _scheduler: Optional[BackgroundScheduler] = None
     _initialized = False
     _job_versions: Dict[str, datetime] = {}  # 记录任务版本，用于同步
+    _high_water_mark: Optional[datetime] = None  # 已同步任务的最大更新时间，变更流不可用时使用
+    _command_worker = None  # 命令处理线程
+    _execution_recorder = None  # 任务执行记录写入线程
+    _log_pruner = None  # 过期执行日志清理线程
+    _login_log_rollup = None  # 登录日志汇总线程
+    _monitor_history_sampler = None  # 监控历史采样线程
+    _monitor_in_foreground = False  # 是否由 start_monitor 在前台运行任务同步循环
+    _sync_thread: Optional[threading.Thread] = None  # Web 进程内启动时的任务同步线程
+    _sync_stop_event = threading.Event()
+    _cluster = None  # 集群模式下本进程的调度节点
+    _process_runners: Dict[str, Any] = {}  # 进程池/独立子进程执行器
     
     def __new__(cls):
         """单例模式"""
@@ -62,8 +73,41 @@ class SchedulerService:
     def _init_scheduler(self):
         """初始化 APScheduler"""
         try:
+            from apscheduler.executors.pool import ThreadPoolExecutor
+            from scheduler.cluster import is_cluster_mode
+            from scheduler.executors import (
+                EXECUTOR_PROCESS,
+                EXECUTOR_SUBPROCESS,
+                EXECUTOR_THREAD,
+                ProcessTaskRunner,
+                get_executor_workers,
+            )
+            
+            if is_cluster_mode():
+                # 集群模式：任务按节点分片，执行前抢占防重
+                from scheduler.cluster import SchedulerCluster, FencedThreadPoolExecutor
+                self._cluster = SchedulerCluster()
+                build_executor = lambda workers: FencedThreadPoolExecutor(self._cluster, workers)
+                logger.info(f"调度器以集群模式运行，节点: {self._cluster.node_id}")
+            else:
+                build_executor = ThreadPoolExecutor
+            
+            # 每种执行器独立的线程池，线程数即该执行器的并发上限；
+            # 进程池/独立子进程任务由线程分派到工作进程执行
+            workers = get_executor_workers()
+            executors = {
+                'default': build_executor(workers[EXECUTOR_THREAD]),
+                EXECUTOR_PROCESS: build_executor(workers[EXECUTOR_PROCESS]),
+                EXECUTOR_SUBPROCESS: build_executor(workers[EXECUTOR_SUBPROCESS]),
+            }
+            self._process_runners = {
+                EXECUTOR_PROCESS: ProcessTaskRunner(reuse=True),
+                EXECUTOR_SUBPROCESS: ProcessTaskRunner(reuse=False),
+            }
+            
             # 创建后台调度器
             self._scheduler = BackgroundScheduler(
+                executors=executors,
                 timezone=settings.TIME_ZONE,
                 job_defaults={
                     'coalesce': True,  # 合并执行
@@ -84,39 +128,18 @@ class SchedulerService:
             raise
 
     def start_monitor(self):
-        """启动监控循环（阻塞模式，用于独立进程）"""
-        from django.db import connection, close_old_connections
-
+        """
+        启动监控循环（阻塞模式，用于独立进程）
+        
+        任务同步由变更流驱动：阻塞等待 Web 进程发布的任务变更事件，只同步发生变更的任务；
+        变更流不可用时退化为按更新时间高水位查询增量；另按慢周期做一次全量对账兜底。
+        """
+        self._monitor_in_foreground = True
         self.start()
         logger.info("调度器监控进程已启动")
         
         try:
-            while True:
-                # 每次循环开始时确保数据库连接有效
-                try:
-                    connection.close()
-                except Exception:
-                    pass
-                close_old_connections()
-                
-                # 1. 更新心跳
-                self.touch_heartbeat()
-                
-                # 2. 同步任务
-                self.sync_jobs_from_db()
-                
-                # 3. 检查命令（如立即执行）
-                self.check_commands()
-                
-                # 循环结束时关闭连接
-                try:
-                    connection.close()
-                except Exception:
-                    pass
-                close_old_connections()
-                
-                # 休眠
-                time.sleep(5)
+            self._sync_loop()
         except KeyboardInterrupt:
             logger.info("收到停止信号，正在停止...")
             self.shutdown()
@@ -126,6 +149,58 @@ class SchedulerService:
             traceback.print_exc()
             time.sleep(5) # 防止死循环快速报错
 
+    def _sync_loop(self, stop_event: Optional[threading.Event] = None):
+        """
+        任务同步循环：心跳、消费任务变更流、慢周期全量对账
+
+        独立进程中由 start_monitor 在前台运行；Web 进程内启动调度器时由 start 在后台线程中运行
+        """
+        from django.db import close_old_connections
+        from scheduler.change_feed import job_change_feed
+
+        stop_event = stop_event or threading.Event()
+        last_full_sync = time.time()
+        while not stop_event.is_set():
+            # 1. 更新心跳（集群模式下成员变化时重新分配任务归属）
+            self.touch_heartbeat()
+            if self._cluster and self._cluster.heartbeat():
+                self.sync_jobs_from_db()
+            
+            # 2. 等待任务变更（最长 SCHEDULER_POLL_INTERVAL 秒，兼作心跳节奏）
+            changes = job_change_feed.wait_for_changes(self._poll_interval)
+            close_old_connections()
+            if stop_event.is_set():
+                break
+            if changes is None:
+                stop_event.wait(self._poll_interval)
+                self.sync_changed_jobs_since_high_water_mark()
+            elif changes:
+                self.apply_job_changes(changes)
+            
+            # 3. 慢周期全量对账
+            if time.time() - last_full_sync >= self._full_sync_interval:
+                self.sync_jobs_from_db()
+                last_full_sync = time.time()
+            
+            close_old_connections()
+
+    def _run_sync_thread(self):
+        """后台任务同步线程（Web 进程内启动调度器时使用）"""
+        while not self._sync_stop_event.is_set():
+            try:
+                self._sync_loop(self._sync_stop_event)
+            except Exception as e:
+                logger.error(f"任务同步线程异常: {e}")
+                self._sync_stop_event.wait(5)  # 防止死循环快速报错
+
+    @property
+    def _poll_interval(self) -> float:
+        return getattr(settings, 'SCHEDULER_POLL_INTERVAL', 5)
+
+    @property
+    def _full_sync_interval(self) -> float:
+        return getattr(settings, 'SCHEDULER_FULL_SYNC_INTERVAL', 300)
+
     def touch_heartbeat(self):
         """更新心跳"""
         try:
@@ -144,68 +219,49 @@ class SchedulerService:
         except Exception:
             return False
 
-    def check_commands(self):
-        """检查并执行命令"""
-        try:
-            # 这里简单实现：遍历所有任务，检查是否有立即执行的命令
-            # 更高效的方式是维护一个命令队列，但对于少量任务，这样也行
-            jobs = self._scheduler.get_jobs()
-            for job in jobs:
-                cmd_key = f"{SCHEDULER_COMMAND_PREFIX}run_{job.id}"
-                if cache.get(cmd_key):
-                    logger.info(f"收到立即执行命令: {job.id}")
-                    self.run_job_now(job.id)
-                    cache.delete(cmd_key)
-        except Exception as e:
-            logger.error(f"检查命令失败: {e}")
+    def execute_command(self, command: str, job_code: str = ''):
+        """
+        执行调度器命令（由命令处理线程调用）
+
+        :param command: run / pause / resume / reload
+        :param job_code: 任务编码，reload 时为空表示全量同步
+        """
+        from django.db import close_old_connections
+        from scheduler.commands import COMMAND_RUN, COMMAND_PAUSE, COMMAND_RESUME, COMMAND_RELOAD
+
+        if command == COMMAND_RUN:
+            self.run_job_now(job_code)
+        elif command == COMMAND_PAUSE:
+            self.pause()
+        elif command == COMMAND_RESUME:
+            self.resume()
+        elif command == COMMAND_RELOAD:
+            try:
+                if job_code:
+                    self.apply_job_changes([('upsert', job_code)])
+                else:
+                    self.sync_jobs_from_db()
+            finally:
+                close_old_connections()
+        else:
+            logger.error(f"不支持的调度器命令: {command}")
 
     def sync_jobs_from_db(self):
-        """从数据库同步任务"""
+        """从数据库全量同步任务（启动时和慢周期对账时使用）"""
         try:
-            from django.db import connection, close_old_connections
+            from django.db import close_old_connections
             from scheduler.models import SchedulerJob
             
-            # 确保连接有效
-            try:
-                connection.close()
-            except Exception:
-                pass
             close_old_connections()
             
             # 获取所有未删除的任务
             db_jobs = SchedulerJob.objects.filter(is_deleted=False)
-            active_codes = []
+            active_codes = set()
             
             for job in db_jobs:
-                # 如果任务被禁用，确保从调度器移除
-                if job.status == 0:
-                    if self._scheduler.get_job(job.code):
-                        self.remove_job(job.code)
-                    continue
-                
-                active_codes.append(job.code)
-                
-                current_job = self._scheduler.get_job(job.code)
-                last_version = self._job_versions.get(job.code)
-                
-                # 1. 添加或更新任务
-                # 如果任务不存在，或者版本号不一致（且任务在DB中是启用或暂停状态）
-                if not current_job:
-                    self.add_job(job)
-                elif last_version != job.sys_update_datetime:
-                    logger.info(f"检测到任务变更: {job.code}")
-                    self.modify_job(job)
-                
-                # 2. 同步暂停/恢复状态
-                # modify_job 会根据 status 重新添加任务（如果是 enabled）
-                # 但如果仅仅是状态变更（例如 pause -> resume），modify_job 也会处理
-                # 这里做一次额外的状态检查以确保一致性
-                current_job = self._scheduler.get_job(job.code)
-                if current_job:
-                    if job.status == 2 and current_job.next_run_time is not None:
-                        self.pause_job(job.code)
-                    elif job.status == 1 and current_job.next_run_time is None:
-                        self.resume_job(job.code)
+                self._track_high_water_mark(job)
+                if self._sync_job(job):
+                    active_codes.add(job.code)
             
             # 移除数据库中不存在的任务
             for job in self._scheduler.get_jobs():
@@ -216,6 +272,93 @@ class SchedulerService:
         except Exception as e:
             logger.error(f"同步任务失败: {str(e)}")
 
+    def apply_job_changes(self, changes):
+        """
+        按变更事件增量同步任务
+
+        :param changes: [(action, code), ...]，同一任务的多次变更只按数据库最新状态同步一次
+        """
+        try:
+            from scheduler.models import SchedulerJob
+
+            codes = list(dict.fromkeys(code for _action, code in changes if code))
+            if not codes:
+                return
+            db_jobs = {
+                job.code: job
+                for job in SchedulerJob.objects.filter(code__in=codes, is_deleted=False)
+            }
+            for code in codes:
+                job = db_jobs.get(code)
+                if job is None:
+                    if self._scheduler.get_job(code):
+                        logger.info(f"任务已从数据库删除，移除调度: {code}")
+                        self.remove_job(code)
+                    continue
+                self._track_high_water_mark(job)
+                self._sync_job(job)
+        except Exception as e:
+            logger.error(f"增量同步任务失败: {str(e)}")
+
+    def sync_changed_jobs_since_high_water_mark(self):
+        """变更流不可用时，按更新时间高水位查询发生变更的任务（删除由全量对账兜底）"""
+        try:
+            from scheduler.models import SchedulerJob
+
+            if self._high_water_mark is None:
+                self.sync_jobs_from_db()
+                return
+            codes = list(
+                SchedulerJob.objects.filter(sys_update_datetime__gt=self._high_water_mark)
+                .values_list('code', flat=True)
+            )
+            if codes:
+                self.apply_job_changes([('upsert', code) for code in codes])
+        except Exception as e:
+            logger.error(f"按高水位同步任务失败: {str(e)}")
+
+    def _track_high_water_mark(self, job):
+        """记录已同步任务的最大更新时间"""
+        if job.sys_update_datetime and (
+            self._high_water_mark is None or job.sys_update_datetime > self._high_water_mark
+        ):
+            self._high_water_mark = job.sys_update_datetime
+
+    def _sync_job(self, job) -> bool:
+        """
+        将单个数据库任务同步到调度器
+
+        :return: 任务是否应保留在调度器中（禁用的任务返回 False）
+        """
+        # 如果任务被禁用或不归属本节点，确保从调度器移除
+        if job.status == 0 or (self._cluster and not self._cluster.owns(job.code)):
+            if self._scheduler.get_job(job.code):
+                self.remove_job(job.code)
+            return False
+        
+        current_job = self._scheduler.get_job(job.code)
+        last_version = self._job_versions.get(job.code)
+        
+        # 1. 添加或更新任务
+        # 如果任务不存在，或者版本号不一致（且任务在DB中是启用或暂停状态）
+        if not current_job:
+            self.add_job(job)
+        elif last_version != job.sys_update_datetime:
+            logger.info(f"检测到任务变更: {job.code}")
+            self.modify_job(job)
+        
+        # 2. 同步暂停/恢复状态
+        # modify_job 会根据 status 重新添加任务（如果是 enabled）
+        # 但如果仅仅是状态变更（例如 pause -> resume），modify_job 也会处理
+        # 这里做一次额外的状态检查以确保一致性
+        current_job = self._scheduler.get_job(job.code)
+        if current_job:
+            if job.status == 2 and current_job.next_run_time is not None:
+                self.pause_job(job.code)
+            elif job.status == 1 and current_job.next_run_time is None:
+                self.resume_job(job.code)
+        return True
+
     @staticmethod
     def _ensure_db_connection():
         """
@@ -306,10 +449,28 @@ class SchedulerService:
         """启动调度器"""
         if self._scheduler and not self._scheduler.running:
             try:
+                if self._cluster:
+                    self._cluster.heartbeat()
                 self._scheduler.start()
                 logger.info("APScheduler 已启动")
+                # 先记录变更流位置再全量加载，加载期间发生的变更会在之后被重放
+                from scheduler.change_feed import job_change_feed
+                job_change_feed.mark_position()
                 # 加载数据库中的任务
                 self.load_jobs_from_db()
+                # 启动执行记录写入线程、命令处理线程、日志清理线程、登录日志汇总线程和监控历史采样线程
+                self._get_execution_recorder().start()
+                self._get_command_worker().start()
+                self._get_log_pruner().start()
+                self._get_login_log_rollup().start()
+                self._get_monitor_history_sampler().start()
+                # Web 进程内启动（没有 start_monitor 前台循环）时，在后台线程中消费任务变更流
+                if not self._monitor_in_foreground:
+                    self._sync_stop_event.clear()
+                    self._sync_thread = threading.Thread(
+                        target=self._run_sync_thread, name='scheduler-job-sync', daemon=True
+                    )
+                    self._sync_thread.start()
             except Exception as e:
                 logger.error(f"APScheduler 启动失败: {str(e)}")
                 raise
@@ -318,12 +479,34 @@ class SchedulerService:
         """关闭调度器"""
         if self._scheduler and self._scheduler.running:
             try:
+                self._sync_stop_event.set()
+                if self._sync_thread is not None:
+                    self._sync_thread.join(timeout=self._poll_interval + 1)
+                    self._sync_thread = None
+                self._get_command_worker().stop()
+                self._get_log_pruner().stop()
+                self._get_login_log_rollup().stop()
+                self._get_monitor_history_sampler().stop()
                 self._scheduler.shutdown(wait=wait)
+                for runner in self._process_runners.values():
+                    runner.shutdown()
+                # 调度器关闭后写完剩余的执行记录
+                self._get_execution_recorder().stop()
+                if self._cluster:
+                    self._cluster.leave()
                 logger.info("APScheduler 已关闭")
             except Exception as e:
                 logger.error(f"APScheduler 关闭失败: {str(e)}")
                 raise
     
+    def _get_command_worker(self):
+        """获取命令处理线程（懒加载）"""
+        if self._command_worker is None:
+            from scheduler.commands import SchedulerCommandWorker, SCHEDULER_COMMAND_QUEUE, get_node_command_queue
+            queue = get_node_command_queue(self._cluster.node_id) if self._cluster else SCHEDULER_COMMAND_QUEUE
+            self._command_worker = SchedulerCommandWorker(self.execute_command, queue)
+        return self._command_worker
+    
     def pause(self):
         """暂停调度器"""
         if self._scheduler and self._scheduler.running:
@@ -396,8 +579,6 @@ class SchedulerService:
                 logger.error(f"无法导入任务函数: {job_obj.task_func}")
                 return False
 
-            task_func = self._with_db_connection_cleanup(task_func)
-            
             # 智能注入 job_code 参数
             # 检查函数签名，如果函数接受 job_code 参数或接受 **kwargs，则注入
             try:
@@ -409,9 +590,12 @@ class SchedulerService:
                 # 如果检查签名失败，为了保险起见，不注入参数，避免调用失败
                 logger.warning(f"检查任务函数签名失败 {job_obj.code}: {str(e)}")
 
+            executor = job_obj.executor or 'thread'
+            
             # 添加任务
             self._scheduler.add_job(
-                func=task_func,
+                func=self._build_job_callable(job_obj, task_func, executor),
+                executor='default' if executor == 'thread' else executor,
                 trigger=trigger,
                 args=args,
                 kwargs=kwargs,
@@ -434,6 +618,25 @@ class SchedulerService:
             logger.error(f"添加任务失败 {job_obj.code}: {str(e)}")
             return False
     
+    def _build_job_callable(self, job_obj, task_func, executor: str):
+        """按执行器包装任务函数，返回值携带本次执行的资源占用"""
+        from scheduler.executors import run_in_thread
+        
+        timeout = job_obj.timeout
+        if executor in self._process_runners:
+            runner = self._process_runners[executor]
+            task_path = job_obj.task_func
+            
+            def run_in_worker(*args, **kwargs):
+                return runner.run(task_path, args, kwargs, timeout)
+            return run_in_worker
+        
+        wrapped = self._with_db_connection_cleanup(task_func)
+        
+        def run_in_pool_thread(*args, **kwargs):
+            return run_in_thread(wrapped, args, kwargs, timeout)
+        return run_in_pool_thread
+    
     def remove_job(self, job_code: str):
         """从调度器移除任务"""
         try:
@@ -556,8 +759,10 @@ class SchedulerService:
             
             elif job_obj.trigger_type == 'interval':
                 # 间隔触发器
+                # 集群模式下以任务创建时间为锚点，各节点计算出相同的计划执行时间，用于执行防重
                 return IntervalTrigger(
                     seconds=job_obj.interval_seconds,
+                    start_date=job_obj.sys_create_datetime if self._cluster else None,
                     timezone=settings.TIME_ZONE,
                 )
             
@@ -589,16 +794,12 @@ class SchedulerService:
     def _update_next_run_time(self, job_obj):
         """更新任务的下次执行时间"""
         try:
-            from django.db import connection, close_old_connections
+            from django.db import close_old_connections
             job = self._scheduler.get_job(job_obj.code)
             if job and job.next_run_time:
                 from scheduler.models import SchedulerJob
                 
-                # 确保连接有效
-                try:
-                    connection.close()
-                except Exception:
-                    pass
+                # 复用有效连接，过期连接由 close_old_connections 关闭
                 close_old_connections()
                 # 处理时区问题：如果 USE_TZ=False，需要将时间转换为 naive datetime
                 next_run_time = job.next_run_time
@@ -612,101 +813,76 @@ class SchedulerService:
             logger.error(f"更新下次执行时间失败: {str(e)}")
     
     def _job_executed_listener(self, event: JobExecutionEvent):
-        """任务执行事件监听器"""
+        """
+        任务执行事件监听器
+        
+        在 APScheduler 线程中只构建执行记录放入队列，日志和统计由写入线程批量落库
+        """
         try:
-            from django.db import connection, close_old_connections
-            from scheduler.models import SchedulerJob, SchedulerLog
             from django.utils import timezone
-            import traceback
-            
-            # 确保连接有效
-            try:
-                connection.close()
-            except Exception:
-                pass
-            close_old_connections()
+            from scheduler.executors import TaskExecutionError, TaskResult, TaskTimeoutError
+            from scheduler.recorder import ExecutionRecord
 
-            job_code = event.job_id
+            # 执行后 APScheduler 已计算好下次执行时间，直接从内存读取
+            job = self._scheduler.get_job(event.job_id)
+            exception = event.exception
+            retval = event.retval.value if isinstance(event.retval, TaskResult) else event.retval
+            metrics = getattr(event.retval, 'metrics', None) or getattr(exception, 'metrics', None)
             
-            # 更新任务统计信息
-            job_obj = SchedulerJob.objects.filter(code=job_code).first()
-            if job_obj:
-                # 准备日志数据
-                log_data = {
-                    'job': job_obj,
-                    'job_name': job_obj.name,
-                    'job_code': job_obj.code,
-                    'start_time': event.scheduled_run_time,
-                    'end_time': timezone.now(),
-                    'hostname': 'localhost',  # 简单实现
-                }
-
-                # 处理时区问题
-                if not settings.USE_TZ:
-                    if log_data['start_time'] and log_data['start_time'].tzinfo:
-                        log_data['start_time'] = log_data['start_time'].replace(tzinfo=None)
-                    if log_data['end_time'] and log_data['end_time'].tzinfo:
-                        log_data['end_time'] = log_data['end_time'].replace(tzinfo=None)
-
-                if event.exception:
-                    # 执行失败
-                    job_obj.last_run_status = 'failed'
-                    job_obj.last_run_result = str(event.exception)
-                    job_obj.increment_run_count(success=False)
-                    
-                    log_data['status'] = 'failed'
-                    log_data['exception'] = str(event.exception)
-                    log_data['traceback'] = event.traceback
-                    log_data['result'] = None
-                else:
-                    # 执行成功
-                    job_obj.last_run_status = 'success'
-                    job_obj.last_run_result = str(event.retval) if event.retval else None
-                    job_obj.increment_run_count(success=True)
-                    
-                    log_data['status'] = 'success'
-                    log_data['exception'] = None
-                    log_data['traceback'] = None
-                    log_data['result'] = str(event.retval) if event.retval else "Success"
-                
-                # 计算耗时
-                if log_data['start_time'] and log_data['end_time']:
-                    # 确保两者都是 offset-aware 或 offset-naive
-                    start_dt = log_data['start_time']
-                    end_dt = log_data['end_time']
-                    
-                    if start_dt.tzinfo and not end_dt.tzinfo:
-                         end_dt = end_dt.replace(tzinfo=start_dt.tzinfo)
-                    elif not start_dt.tzinfo and end_dt.tzinfo:
-                         start_dt = start_dt.replace(tzinfo=end_dt.tzinfo)
-                         
-                    duration = (end_dt - start_dt).total_seconds()
-                    log_data['duration'] = max(0, duration) # 避免负数
-                
-                # 创建日志
-                SchedulerLog.objects.create(**log_data)
-
-                job_obj.last_run_time = timezone.now()
-                job_obj.save(update_fields=[
-                    'last_run_status',
-                    'last_run_result',
-                    'last_run_time',
-                    'total_run_count',
-                    'success_count',
-                    'failure_count'
-                ])
-                
-                # 更新下次执行时间
-                self._update_next_run_time(job_obj)
-        
+            if not exception:
+                status = 'success'
+            elif isinstance(exception, TaskTimeoutError):
+                status = 'timeout'
+            else:
+                status = 'failed'
+            error_traceback = event.traceback
+            if isinstance(exception, TaskExecutionError) and exception.remote_traceback:
+                # 工作进程中的异常使用子进程内的堆栈
+                error_traceback = exception.remote_traceback
+            
+            self._get_execution_recorder().record(ExecutionRecord(
+                job_code=event.job_id,
+                start_time=event.scheduled_run_time,
+                end_time=timezone.now(),
+                status=status,
+                result=str(retval) if not exception and retval else None,
+                exception=str(exception) if exception else None,
+                traceback=error_traceback if exception else None,
+                next_run_time=job.next_run_time if job else None,
+                cpu_time=metrics.cpu_time if metrics else None,
+                max_rss=metrics.max_rss if metrics else None,
+                process_id=metrics.process_id if metrics else None,
+            ))
         except Exception as e:
             logger.error(f"处理任务执行事件失败: {str(e)}")
-        finally:
-            try:
-                from django.db import close_old_connections
-                close_old_connections()
-            except Exception:
-                pass
+
+    def _get_execution_recorder(self):
+        """获取任务执行记录写入器（懒加载）"""
+        if self._execution_recorder is None:
+            from scheduler.recorder import ExecutionRecorder
+            self._execution_recorder = ExecutionRecorder()
+        return self._execution_recorder
+
+    def _get_log_pruner(self):
+        """获取过期执行日志清理线程（懒加载）"""
+        if self._log_pruner is None:
+            from scheduler.retention import SchedulerLogPruner
+            self._log_pruner = SchedulerLogPruner(self._cluster)
+        return self._log_pruner
+
+    def _get_login_log_rollup(self):
+        """获取登录日志汇总线程（懒加载）"""
+        if self._login_log_rollup is None:
+            from core.login_log.login_log_rollup import LoginLogRollupWorker
+            self._login_log_rollup = LoginLogRollupWorker(self._cluster)
+        return self._login_log_rollup
+
+    def _get_monitor_history_sampler(self):
+        """获取监控历史采样线程（懒加载）"""
+        if self._monitor_history_sampler is None:
+            from core.monitor_history.monitor_history_sampler import MonitorHistorySampler
+            self._monitor_history_sampler = MonitorHistorySampler(self._cluster)
+        return self._monitor_history_sampler
 
 
 # 全局调度器实例